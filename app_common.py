@@ -0,0 +1,472 @@
+"""
+Shared helpers for the Streamlit pages: Google auth, the process-wide
+background services (write queue flusher, roster API) and the cached
+fetchers every page reads through (sheet_cache / roster_cache).
+
+website.py handles login and routing and imports the view_* page modules
+lazily, so a page's heavy dependencies load only when it is opened.
+"""
+import os
+import threading
+from datetime import date, timedelta
+
+import streamlit as st
+import gspread
+from google.oauth2 import service_account
+from google.oauth2.credentials import Credentials
+from google.auth.transport.requests import Request
+
+import calendar_render
+import duty_rules
+import export_cache
+import holiday_index
+import quota
+import roster_api
+import roster_cache
+import roster_history
+import sheet_cache
+import storage
+import user_engine
+import write_queue
+
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive"
+]
+
+# --------------------------------------------------
+# AUTHENTICATION
+# --------------------------------------------------
+
+def _service_account_client():
+    creds_dict = dict(st.secrets["gcp_service_account"])
+    creds = service_account.Credentials.from_service_account_info(
+        creds_dict,
+        scopes=SCOPES
+    )
+    return gspread.authorize(creds, http_client=quota.QuotaHTTPClient)
+
+def get_gspread_auth():
+    try:
+        if "gcp_service_account" in st.secrets:
+            client = _service_account_client()
+            return client
+        else:
+            st.error("❌ 'gcp_service_account' not found in secrets.toml")
+            st.stop()
+    except Exception as e:
+        st.error(f"❌ Authentication Error: {e}")
+        st.stop()
+
+@st.cache_resource(show_spinner=False)
+def start_write_queue():
+    # one background flusher per server process, shared by every session
+    return write_queue.start_flusher(_service_account_client, on_flush=on_queue_flush)
+
+@st.cache_resource(show_spinner=False)
+def start_roster_api():
+    # one read-only JSON API per server process, answering from the shared caches
+    spreadsheet_name = "MASTER SHEET"
+    lock, holder = threading.Lock(), {}
+
+    def _client():
+        with lock:
+            if "client" not in holder:
+                holder["client"] = _service_account_client()
+            return holder["client"]
+
+    sources = {
+        "roster": lambda mmyy: fetch_roster(_client(), spreadsheet_name, mmyy),
+        "snapshot": lambda mmyy: fetch_month_snapshot(_client(), spreadsheet_name, mmyy),
+        "config": lambda: fetch_config(_client(), spreadsheet_name),
+        "holiday": lambda: fetch_sheet_data(_client(), spreadsheet_name, "Holiday"),
+    }
+    # app_config: roster_api_host / roster_api_port / roster_api_token (required off localhost)
+    try:
+        cfg = dict(st.secrets["app_config"])
+    except Exception:
+        cfg = {}
+    host = cfg.get("roster_api_host", roster_api.DEFAULT_HOST)
+    port = int(os.environ.get("DUTY_PLANNER_API_PORT", cfg.get("roster_api_port", roster_api.DEFAULT_PORT)))
+    try:
+        return roster_api.start(sources, host=host, port=port, token=cfg.get("roster_api_token"))
+    except ValueError as e:
+        print(f"⚠️ Roster API not started: {e}")
+        return None
+    except OSError as e:
+        # another server process on this host already serves it
+        print(f"⚠️ Roster API not started on {host}:{port}: {e}")
+        return None
+
+def on_queue_flush(spreadsheet_name, months):
+    # the re-read C grids reseed roster_aggregates on their next load
+    sheet_cache.invalidate(spreadsheet_name, ["Namelist", "Partners"] + [f"{m}C" for m in months])
+    for m in months:
+        roster_cache.invalidate(mmyy=m)
+
+def record_history(client, spreadsheet_name, mmyy):
+    # keep roster_history in step after a direct edit of a D sheet
+    try:
+        roster_history.sync_month(storage.for_client(client, spreadsheet_name), mmyy)
+    except Exception as e:
+        print(f"⚠️ Roster history not updated for {mmyy}: {e}")
+
+def get_personal_drive_service():
+    # built once per session: httplib2-backed services aren't safe to share across sessions
+    if "_personal_drive" not in st.session_state:
+        st.session_state["_personal_drive"] = _build_personal_drive()
+    return st.session_state["_personal_drive"]
+
+def _build_personal_drive():
+    # the discovery client is slow to import and only needed here, once per session
+    from googleapiclient.discovery import build
+
+    info = st.secrets["personal_account"]
+    creds = Credentials(
+        token=info["token"],
+        refresh_token=info["refresh_token"],
+        client_id=info["client_id"],
+        client_secret=info["client_secret"],
+        token_uri=info["token_uri"]
+    )
+    if creds.expired:
+        creds.refresh(Request())
+    return build('drive', 'v3', credentials=creds)
+
+def _personal_token(info):
+    creds = Credentials(
+        token=info["token"],
+        refresh_token=info["refresh_token"],
+        client_id=info["client_id"],
+        client_secret=info["client_secret"],
+        token_uri=info["token_uri"]
+    )
+    if creds.expired:
+        creds.refresh(Request())
+    return creds.token
+
+def sheet_exporter(client, spreadsheet_name, sheet_id, mmyy=None):
+    """
+    fetch() for export_cache: {mmyy}D as a landscape PDF, or the whole
+    spreadsheet as xlsx when mmyy is None. Secrets are read up front so the
+    export can also run on a background thread.
+    """
+    info = dict(st.secrets["personal_account"])
+
+    def _fetch():
+        if mmyy is None:
+            export_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=xlsx"
+        else:
+            gid = client.open_by_key(sheet_id).worksheet(mmyy + "D").id
+            d_raw = fetch_sheet_data(client, spreadsheet_name, mmyy + "D")
+            last_name_row = 3
+            for ri, rrow in enumerate(d_raw[3:], start=4):
+                if len(rrow) > 1 and rrow[1].strip():
+                    last_name_row = ri
+            export_url = (
+                f"https://docs.google.com/spreadsheets/d/{sheet_id}/export"
+                f"?format=pdf"
+                f"&gid={gid}"
+                f"&portrait=false"
+                f"&scale=4"
+                f"&gridlines=true"
+                f"&r1=0&c1=0&r2={last_name_row}&c2=45"
+                f"&ir=false&ic=false"
+            )
+        resp = quota.http_get(export_url, headers={"Authorization": "Bearer " + _personal_token(info)})
+        if resp.status_code != 200:
+            raise RuntimeError("Export failed: HTTP " + str(resp.status_code))
+        return resp.content
+    return _fetch
+
+def export_download(spreadsheet_name, export_name, revision, fetch, label, file_name, mime):
+    """Download for a cached export: one click when this revision is on disk, else export on click first."""
+    path = export_cache.cached(spreadsheet_name, export_name, revision)
+    if path is None and export_cache.has_any(spreadsheet_name, export_name):
+        # downloaded before, so likely wanted again: re-export while the page is open
+        export_cache.refresh_in_background(spreadsheet_name, export_name, revision, fetch)
+    if path is None and st.button(label, use_container_width=True):
+        try:
+            with st.spinner("Exporting..."):
+                path = export_cache.export(spreadsheet_name, export_name, revision, fetch)
+        except Exception as e:
+            st.error(f"❌ {label} failed: {e}")
+    if path:
+        st.download_button(
+            label="⬇️ " + label,
+            data=export_cache.reader(path),
+            file_name=file_name,
+            mime=mime,
+            use_container_width=True
+        )
+
+def failed_submissions_panel(key):
+    """Lists user submissions the write queue gave up on, with a button to requeue them."""
+    failed = write_queue.failed_submissions()
+    if not failed:
+        return
+    st.warning(f"⚠️ {len(failed)} user submission(s) could not be written to the sheet.")
+    with st.expander("Failed submissions", expanded=False):
+        st.dataframe(
+            [{"Month": f["mmyy"], "Name": f["user_name"], "Attempts": f["attempts"], "Error": f["last_error"]}
+             for f in failed],
+            use_container_width=True, hide_index=True
+        )
+        if st.button("🔁 Retry Failed Submissions", use_container_width=True, key=key):
+            n = write_queue.retry_failed([f["id"] for f in failed])
+            st.success(f"✅ Requeued {n} submission(s); they will be written on the next flush.")
+
+# --------------------------------------------------
+# CACHED DATA FETCHERS
+# --------------------------------------------------
+
+# Reads go through sheet_cache (shared, keyed by Drive modifiedTime). After a
+# write, call sheet_cache.invalidate(spreadsheet_name, [sheets written]).
+
+def fetch_sheet_data(client, spreadsheet_name, sheet_name):
+    return sheet_cache.get(
+        client, spreadsheet_name, ("values", sheet_name), [sheet_name],
+        lambda: client.open(spreadsheet_name).worksheet(sheet_name).get_all_values()
+    )
+
+def fetch_roster(client, spreadsheet_name, mmyy):
+    """
+    (roster_data, sheet_used, err) for a month from the shared roster_cache.
+    Every page and the roster API key it by spreadsheet name, so one
+    invalidate() reaches them all; the Drive revision catches outside edits.
+    """
+    return roster_cache.get_roster(
+        spreadsheet_name, mmyy,
+        lambda: user_engine.calendar_view(client, spreadsheet_name, mmyy),
+        source_revision=sheet_cache.revision(client, spreadsheet_name)
+    )
+
+def fetch_month_snapshot(client, spreadsheet_name, mmyy):
+    return sheet_cache.get(
+        client, spreadsheet_name, ("snapshot", mmyy),
+        ["Namelist", "Partners", "Holiday", f"{mmyy}C"],
+        lambda: user_engine.load_month_snapshot(client, spreadsheet_name, mmyy)
+    )
+
+def build_swap_checker(client, spreadsheet_name, mmyy, cached):
+    """duty_rules.DutyChecker for a month's D sheet, with X markers from the C sheet and history from roster_history."""
+    month, year = int(mmyy[:2]), 2000 + int(mmyy[2:])
+    cal = duty_rules.month_calendar(year, month, holiday_index.from_rows(cached["hol_data"]).month_days(year, month))
+    try:
+        scale = float(cached["scale_raw"]) if cached["scale_raw"] and float(cached["scale_raw"]) > 0 else 1.0
+    except ValueError:
+        scale = 1.0
+    try:
+        c_grid = fetch_sheet_data(client, spreadsheet_name, f"{mmyy}C")
+    except Exception:
+        c_grid = None
+    roster = duty_rules.load_roster(
+        cal, cached["raw_d_data"], c_grid,
+        fetch_sheet_data(client, spreadsheet_name, "Namelist"),
+        fetch_sheet_data(client, spreadsheet_name, "Partners"),
+        scale
+    )
+    overrides = {k[len("dyn_slider_"):]: v for k, v in st.session_state.items()
+                 if isinstance(k, str) and k.startswith("dyn_slider_")}
+    rules = duty_rules.compile_rules(fetch_config(client, "MASTER SHEET"), overrides)
+    prev = date(year, month, 1) - timedelta(days=1)
+    try:
+        last_dates = roster_history.last_duty_dates(spreadsheet_name, date(year, month, 1))
+        last_workers = roster_history.month_workers(spreadsheet_name, f"{prev.month:02d}{prev.year % 100:02d}")
+    except Exception:
+        last_dates, last_workers = None, None
+    return duty_rules.DutyChecker(cal, roster, rules, last_dates, last_workers)
+
+def after_personnel_change(spreadsheet_name, sheets):
+    """Drops everything cached from sheets a personnel change touched."""
+    sheet_cache.invalidate(spreadsheet_name, sheets)
+    roster_cache.invalidate()
+    for key in list(st.session_state.keys()):
+        if key.startswith("adj_data_"):
+            st.session_state.pop(key)
+
+def fetch_submission_checker(client, spreadsheet_name, mmyy, snapshot):
+    def _load():
+        month, year = int(mmyy[:2]), 2000 + int(mmyy[2:])
+        prev = date(year, month, 1) - timedelta(days=1)
+        try:
+            last_dates = roster_history.last_duty_dates(spreadsheet_name, date(year, month, 1))
+            last_workers = roster_history.month_workers(spreadsheet_name, f"{prev.month:02d}{prev.year % 100:02d}")
+        except Exception:
+            last_dates, last_workers = None, None
+        return user_engine.submission_checker(snapshot, fetch_config(client, spreadsheet_name), last_dates, last_workers)
+    return sheet_cache.get(
+        client, spreadsheet_name, ("submission_checker", mmyy),
+        ["Namelist", "Partners", "Holiday", f"{mmyy}C", "CONFIG"], _load
+    )
+
+def fetch_namelist(client, spreadsheet_name):
+    def _load():
+        records = client.open(spreadsheet_name).worksheet("Namelist").get_all_records()
+        return [r['NAME'] for r in records if r.get('NAME')]
+    try:
+        return sheet_cache.get(client, spreadsheet_name, "namelist", ["Namelist"], _load)
+    except Exception as e:
+        print(f"Error fetching namelist: {e}")
+        return []
+
+def fetch_holiday_index(client, spreadsheet_name):
+    # parsed once per Holiday sheet revision, shared by every page
+    return sheet_cache.get(
+        client, spreadsheet_name, "holiday_index", ["Holiday"],
+        lambda: holiday_index.from_rows(fetch_sheet_data(client, spreadsheet_name, "Holiday"))
+    )
+
+def fetch_trait_definitions(client, spreadsheet_name):
+    """
+    Returns an ordered dict: { category_name: [option1, option2, ...] }
+    Sheet format: row with col A = '_TRAITS', col B = comma-separated trait names.
+    Also supports legacy col A = '_TRAIT:<CategoryName>', col B = 'opt1,opt2,...'
+    """
+    def _load():
+        ws = client.open(spreadsheet_name).worksheet("CONFIG")
+        traits = {}
+        for row in ws.get_all_values():
+            if not row:
+                continue
+            key = row[0].strip()
+            if key.upper() == "_TRAITS":
+                # New format: single row, all trait names comma-separated in col B
+                opts_raw = row[1].strip() if len(row) > 1 else ""
+                for opt in [o.strip() for o in opts_raw.split(",") if o.strip()]:
+                    traits.setdefault("Traits", []).append(opt)
+            elif key.startswith("_TRAIT:"):
+                # Legacy format
+                category = key[len("_TRAIT:"):].strip()
+                opts_raw = row[1].strip() if len(row) > 1 else ""
+                opts = [o.strip() for o in opts_raw.split(",") if o.strip()]
+                if category:
+                    traits[category] = opts
+        return traits
+    try:
+        return sheet_cache.get(client, spreadsheet_name, "traits", ["CONFIG"], _load)
+    except Exception as e:
+        print(f"Error fetching trait definitions: {e}")
+        return {}
+
+def fetch_ics_feeds(client, spreadsheet_name, mmyy, roster_data):
+    """Every person's ICS feed for a month, built once per roster and Holiday sheet revision."""
+    def _load():
+        hol_names = user_engine.month_holiday_names(fetch_sheet_data(client, spreadsheet_name, "Holiday"), mmyy)
+        return user_engine.ics_feeds(roster_data, mmyy, hol_names)
+    return sheet_cache.get(
+        client, spreadsheet_name, ("ics", mmyy, calendar_render.roster_digest(roster_data)),
+        ["Holiday", f"{mmyy}D"], _load
+    )
+
+@st.cache_data(ttl=600, show_spinner=False)
+def fetch_spreadsheet_id(_personal_drive, folder_id, spreadsheet_name):
+    gs_query = (
+        f"name = '{spreadsheet_name}' "
+        f"and mimeType = 'application/vnd.google-apps.spreadsheet' "
+        f"and trashed = false "
+        f"and '{folder_id}' in parents"
+    )
+    results = quota.execute(_personal_drive.files().list(q=gs_query, fields="files(id)"))
+    files = results.get('files', [])
+    return files[0]['id'] if files else None
+
+# --------------------------------------------------
+# CONVERT FILES FROM .XLSX TO SHEETS
+# --------------------------------------------------
+
+
+def fetch_config(client, spreadsheet_name):
+    try:
+        return sheet_cache.get(client, spreadsheet_name, "config", ["CONFIG"],
+                               lambda: _load_config(client, spreadsheet_name))
+    except Exception as e:
+        return {"_passwords": {"admin_password": "password", "user_password": "weapons"}, "_error": str(e)}
+
+def _load_config(client, spreadsheet_name):
+    import json as _json, re as _re
+    _CONSTRAINT_PAT = _re.compile(r"^(HC|SC)\d", _re.IGNORECASE)
+    sh = client.open(spreadsheet_name)
+    ws = sh.worksheet("CONFIG")
+    rows = ws.get_all_values()
+    cfg = {}
+    pwd = {}
+    in_passwords = False
+    for row in rows:
+        if not any(row):
+            continue
+        cell = row[0].strip()
+        # Password section: find "key" header row (case-insensitive), read everything after
+        if cell.upper() == "KEY":
+            in_passwords = True
+            continue
+        if in_passwords:
+            k = cell
+            v = row[1].strip() if len(row) > 1 else ""
+            if k:
+                pwd[k] = v
+            continue
+        # Skip header, _TRAITS, and anything that isn't a constraint ID
+        if not cell or not _CONSTRAINT_PAT.match(cell):
+            continue
+        _raw_param = row[5].strip() if len(row) > 5 else ""
+        try:
+            _rule = _json.loads(_raw_param) if _raw_param.startswith("{") else {}
+        except:
+            _rule = {}
+        cfg[cell] = {
+            "label":        row[1].strip() if len(row) > 1 else cell,
+            "type":         row[2].strip() if len(row) > 2 else "",
+            "active":       row[3].strip().upper() == "TRUE" if len(row) > 3 else True,
+            "draft_active": row[4].strip().upper() == "TRUE" if len(row) > 4 else True,
+            "param":        _raw_param,
+            "rule":         _rule,
+            "param_label":  row[6].strip() if len(row) > 6 else "",
+            "duty_type":    row[7].strip() if len(row) > 7 else "",
+            "class":        row[8].strip() if len(row) > 8 else "",
+            "description":  row[9].strip() if len(row) > 9 else "",
+        }
+    cfg["_passwords"] = pwd
+    return cfg
+
+def convert_if_excel(client, spreadsheet_name):
+    personal_drive = get_personal_drive_service()
+    folder_id = st.secrets["app_config"]["personal_drive_folder_id"]
+
+    # check if Google Sheet already exists in personal folder
+    gs_query = (
+        f"name = '{spreadsheet_name}' "
+        f"and mimeType = 'application/vnd.google-apps.spreadsheet' "
+        f"and trashed = false "
+        f"and '{folder_id}' in parents"
+    )
+    gs_results = quota.execute(personal_drive.files().list(q=gs_query, fields="files(id)"))
+    gs_files = gs_results.get('files', [])
+
+    if gs_files:
+        return client.open_by_key(gs_files[0]['id'])
+
+    # check if Excel file exists in personal folder
+    ex_query = (
+        f"(name = '{spreadsheet_name}' or name = '{spreadsheet_name}.xlsx') "
+        f"and mimeType != 'application/vnd.google-apps.spreadsheet' "
+        f"and trashed = false "
+        f"and '{folder_id}' in parents"
+    )
+    ex_results = quota.execute(personal_drive.files().list(q=ex_query, fields="files(id, name)"))
+    ex_files = ex_results.get('files', [])
+
+    if not ex_files:
+        raise FileNotFoundError(f"Could not find any active Excel or Google Sheet named '{spreadsheet_name}' in your Drive folder")
+
+    with st.spinner("📦 Excel source detected. Converting to Google Sheets..."):
+        converted_file = quota.execute(personal_drive.files().copy(
+            fileId=ex_files[0]['id'],
+            body={
+                'name': spreadsheet_name,
+                'mimeType': 'application/vnd.google-apps.spreadsheet',
+                'parents': [folder_id]
+            }
+        ))
+
+    return client.open_by_key(converted_file['id'])
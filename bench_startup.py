@@ -0,0 +1,90 @@
+"""
+Cold-start import benchmark: how long each role's first page takes to import.
+
+Every scenario runs in a fresh interpreter (like a new replica), imports
+streamlit first as the shared baseline, then the modules website.py loads
+for that page. The time after the baseline is what the page itself costs,
+and the heavy modules column shows which of OR-Tools, xhtml2pdf, the Drive
+discovery client, the solver engine and pandas were pulled in.
+
+  python bench_startup.py                # 5 runs per scenario → bench_output.txt
+  python bench_startup.py --runs 10 --out -
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+HEAVY = {
+    "ortools": "OR-Tools",
+    "xhtml2pdf": "xhtml2pdf",
+    "googleapiclient.discovery": "Drive discovery",
+    "planner_engine": "planner_engine",
+    "pandas": "pandas",
+}
+
+# website.py always imports app_common; each page then imports its view module
+SCENARIOS = [
+    ("Login", ["app_common"]),
+    ("User · Planning", ["app_common", "view_user_planning"]),
+    ("User · Viewer", ["app_common", "view_user_viewer"]),
+    ("Admin · Planning", ["app_common", "view_admin_planning"]),
+    ("Admin · Editing", ["app_common", "view_admin_editing"]),
+    ("Dev", ["app_common", "view_dev"]),
+    # deferred costs, paid on first use rather than at page load
+    ("Admin · Run Optimiser", ["app_common", "view_admin_planning", "planner_engine", "horizon_planner"]),
+    ("Admin · Calendar PDF", ["app_common", "view_admin_editing", "xhtml2pdf.pisa"]),
+]
+
+_CHILD = """
+import sys, json, time, warnings, logging
+warnings.simplefilter("ignore")
+t0 = time.perf_counter()
+import streamlit
+logging.disable(logging.WARNING)
+t1 = time.perf_counter()
+for m in {modules!r}:
+    __import__(m)
+t2 = time.perf_counter()
+print(json.dumps({{"baseline": t1 - t0, "page": t2 - t1,
+                   "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(modules, runs):
+    """Median (baseline seconds, page seconds) over `runs` fresh interpreters, plus the heavy modules loaded."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    code = _CHILD.format(modules=modules, heavy=list(HEAVY))
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True, text=True, check=True)
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return (statistics.median(s["baseline"] for s in samples),
+            statistics.median(s["page"] for s in samples),
+            samples[-1]["heavy"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--out", default="bench_output.txt", help="'-' for stdout only")
+    args = parser.parse_args(argv)
+
+    lines = [f"Cold-start imports, median of {args.runs} runs (python {sys.version.split()[0]})", ""]
+    lines.append(f"{'Scenario':<24}{'streamlit':>11}{'page':>10}  heavy modules")
+    for label, modules in SCENARIOS:
+        baseline, page, heavy = measure(modules, args.runs)
+        lines.append(f"{label:<24}{baseline * 1000:>9.0f}ms{page * 1000:>8.0f}ms  "
+                     + (", ".join(HEAVY[h] for h in heavy) or "-"))
+        print(lines[-1], flush=True)
+
+    if args.out != "-":
+        with open(args.out, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        print(f"\nWritten to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
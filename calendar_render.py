@@ -0,0 +1,135 @@
+"""
+Month-calendar HTML shared by the Editing calendar, the User Viewer and the
+Calendar PDF.
+
+The table markup is built once per (mmyy, roster) and memoised; a Viewer
+highlight is a string overlay on that cached markup (two str.replace calls),
+so a rerun costs microseconds instead of rebuilding the table.
+
+  calendar_render.screen_html(mmyy, roster_data, highlight_name="ALICE")
+  calendar_render.month_table(mmyy, roster_data, max_name=20)   bare <table>
+
+Entries are found by the roster dict's identity first (roster_cache hands
+every session the same object) and by a content hash otherwise.
+"""
+import json
+import hashlib
+import calendar
+import threading
+from html import escape
+from collections import OrderedDict
+from datetime import date
+
+MAX_ENTRIES = 32
+DOW = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+# Streamlit's own font is Source Sans Pro, so no web-font import is needed
+SCREEN_CSS = (
+    "<style>"
+    ".cal-container{border:1px solid #444;border-radius:15px;overflow-x:auto;-webkit-overflow-scrolling:touch;"
+    "margin-top:10px;font-family:'Source Sans Pro',sans-serif}"
+    ".cal-table{width:100%;min-width:900px;border-collapse:collapse;table-layout:auto;background-color:#262730}"
+    ".cal-th{background-color:#000;color:#fff;padding:12px;text-align:center;border-bottom:1px solid #444;"
+    "font-weight:600;min-width:80px}"
+    ".cal-td{vertical-align:top;border:0.5px solid rgba(255,255,255,0.1);height:125px;min-width:80px;padding:10px}"
+    ".cal-td .day-num{font-weight:700;font-size:1rem;margin-bottom:10px;display:block;color:#fff}"
+    ".cal-td .duty-item{font-size:10px;line-height:1.2;margin-bottom:6px;font-weight:600;white-space:nowrap;"
+    "overflow:hidden;text-overflow:ellipsis;display:block;padding:4px 8px;border-radius:6px;"
+    "background-color:#007bff;border:1px solid #0056b3;color:#fff !important}"
+    ".cal-td .standby-item{font-size:11px;line-height:1.4;margin-bottom:3px;font-weight:400;white-space:nowrap;"
+    "overflow:hidden;text-overflow:ellipsis;display:block;color:#fff !important;padding-left:2px}"
+    ".cal-td .duty-item.hl{background-color:#e67e22}"
+    ".cal-td .standby-item.hl{font-weight:700;color:#e67e22 !important}"
+    "</style>"
+)
+
+_lock = threading.Lock()
+_tables = OrderedDict()     # (mmyy, digest, max_name) -> table markup
+_by_id = {}                 # id(roster_data) -> (roster_data, digest)
+_highlighted = OrderedDict()
+
+
+def roster_digest(roster_data):
+    """Content hash of a roster dict, memoised by identity; stands in for its revision."""
+    with _lock:
+        hit = _by_id.get(id(roster_data))
+    if hit is not None and hit[0] is roster_data:
+        return hit[1]
+    blob = json.dumps(roster_data, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha256(blob.encode("utf-8")).hexdigest()[:24]
+    with _lock:
+        # keeping a reference pins the id, so it can't be reused by another dict
+        _by_id[id(roster_data)] = (roster_data, digest)
+        while len(_by_id) > MAX_ENTRIES:
+            _by_id.pop(next(iter(_by_id)))
+    return digest
+
+
+def _remember(cache, key, value):
+    with _lock:
+        cache[key] = value
+        while len(cache) > MAX_ENTRIES:
+            cache.popitem(last=False)
+
+
+def _build(mmyy, roster_data, max_name):
+    year, month = 2000 + int(mmyy[2:]), int(mmyy[:2])
+    pad = date(year, month, 1).weekday()
+    num_days = calendar.monthrange(year, month)[1]
+
+    def label(n):
+        return escape(n if not max_name or len(n) <= max_name else n[:max_name - 1] + ".")
+
+    parts = ['<table class="cal-table"><thead><tr>']
+    parts += [f'<th class="cal-th">{d}</th>' for d in DOW]
+    parts.append("</tr></thead><tbody><tr>")
+    parts += ['<td class="cal-td"></td>'] * pad
+    col = pad
+    for day in range(1, num_days + 1):
+        if col == 7:
+            parts.append("</tr><tr>")
+            col = 0
+        info = roster_data.get(str(day), {"duty": [], "standby": []})
+        parts.append(f'<td class="cal-td"><span class="day-num">{day}</span>')
+        parts += [f'<div class="duty-item" title="Duty: {escape(n)}">{label(n)}</div>' for n in info["duty"]]
+        parts += [f'<div class="standby-item" title="Standby: {escape(n)}">{label(n)}</div>'
+                  for n in info["standby"]]
+        parts.append("</td>")
+        col += 1
+    parts += ['<td class="cal-td"></td>'] * (7 - col)
+    parts.append("</tr></tbody></table>")
+    return "".join(parts)
+
+
+def month_table(mmyy, roster_data, max_name=None):
+    """The bare calendar <table>; names longer than max_name are truncated."""
+    key = (mmyy, roster_digest(roster_data), max_name)
+    with _lock:
+        table = _tables.get(key)
+    if table is None:
+        table = _build(mmyy, roster_data, max_name)
+        _remember(_tables, key, table)
+    return table
+
+
+def highlight(table, name):
+    """Overlay: marks name's duty and standby entries in a month_table."""
+    if not name:
+        return table
+    n = escape(name)
+    return (table
+            .replace(f'<div class="duty-item" title="Duty: {n}">', f'<div class="duty-item hl" title="Duty: {n}">')
+            .replace(f'<div class="standby-item" title="Standby: {n}">',
+                     f'<div class="standby-item hl" title="Standby: {n}">'))
+
+
+def screen_html(mmyy, roster_data, highlight_name=""):
+    """CSS + calendar for st.markdown(..., unsafe_allow_html=True), optionally highlighting one person."""
+    key = (mmyy, roster_digest(roster_data), highlight_name)
+    with _lock:
+        html = _highlighted.get(key)
+    if html is None:
+        table = highlight(month_table(mmyy, roster_data), highlight_name)
+        html = SCREEN_CSS + '<div class="cal-container">' + table + "</div>"
+        _remember(_highlighted, key, html)
+    return html
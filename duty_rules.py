@@ -0,0 +1,483 @@
+"""
+CONFIG rules compiled for checking duty changes without a solve.
+
+dynamic_constraints turns CONFIG into CP-SAT constraints for a whole month;
+this module applies the same rule semantics to one concrete roster so a
+single change (a swap, a submission) is checked in microseconds. Days are
+bit positions in Python ints, so a gap or weekly cap is one AND against a
+precomputed mask.
+
+As in dynamic_constraints, fixed duties (D entered in the C sheet) are
+exempt from per-person caps, gaps and ALLOW rules: they don't count toward
+a cap and never break a rule themselves, but a non-fixed D next to one
+still does. A submission's D's become fixed duties, so check_submission
+reports person-rule conflicts among them as warnings, not errors.
+
+  cal = month_calendar(2026, 3, holiday_days)     per-month arrays and masks
+  rules = compile_rules(config, slider_overrides)  [Rule] from CONFIG
+  roster = load_roster(cal, d_grid, c_grid, namelist, partners, scale)
+  checker = DutyChecker(cal, roster, rules, last_duty_dates, last_month_workers)
+  checker.check_swap("ALICE", "BOB", 14)          → (hard, soft)
+  checker.suggest_replacements("ALICE", 14, 2.0)  → [Suggestion], best first
+  checker.check_submission("ALICE", [3, 17], [9])  → (errors, warnings)
+"""
+import json
+import math
+import calendar
+from datetime import date
+from functools import lru_cache
+from collections import namedtuple, Counter
+
+# status keywords that keep a person off the month entirely (as planner_engine)
+EXCLUSION_KEYWORDS = ("SBF", "SAIL", "NDP", "EXCUSED", "MEDICAL", "ON COURSE", "PARTNER")
+DEFAULT_GAP = 4   # model_constraints "hard4" fallback for gap rules without days
+
+Rule = namedtuple("Rule", "cid label cls soft penalty params")
+Suggestion = namedtuple("Suggestion", "name offset new_offset spread_delta soft_penalty soft")
+
+
+def bits(days):
+    mask = 0
+    for d in days:
+        mask |= 1 << d
+    return mask
+
+
+def days_of(mask):
+    out, d = [], 0
+    while mask:
+        if mask & 1:
+            out.append(d)
+        mask >>= 1
+        d += 1
+    return out
+
+
+class MonthCalendar:
+    """Day arrays (1-indexed) and day-type / ISO-week masks for one month."""
+
+    def __init__(self, year, month, holiday_days=()):
+        self.year, self.month = year, month
+        self.num_days = calendar.monthrange(year, month)[1]
+        self.days = range(1, self.num_days + 1)
+        self.dates = [None] + [date(year, month, d) for d in self.days]
+        self.weekday = [None] + [dt.weekday() for dt in self.dates[1:]]
+        self.iso_week = [None] + [dt.isocalendar()[1] for dt in self.dates[1:]]
+        self.holidays = frozenset(d for d in holiday_days if 1 <= d <= self.num_days)
+        self.all_mask = bits(self.days)
+        # same matching as dynamic_constraints._matches_day_type
+        self.type_mask = {
+            "any": self.all_mask,
+            "holiday": bits(self.holidays),
+            "weekday": bits(d for d in self.days if self.weekday[d] <= 3),
+            "friday": bits(d for d in self.days if self.weekday[d] == 4),
+            "weekend": bits(d for d in self.days if self.weekday[d] >= 5),
+        }
+        weeks = {}
+        for d in self.days:
+            weeks[self.iso_week[d]] = weeks.get(self.iso_week[d], 0) | 1 << d
+        self.week_mask = [0] + [weeks[self.iso_week[d]] for d in self.days]
+        self._windows = {}
+
+    def day_type(self, day_type):
+        return self.type_mask.get(day_type.lower(), 0)
+
+    def window(self, day, span):
+        """Mask of the other days at most `span` days from `day`."""
+        key = (day, span)
+        if key not in self._windows:
+            self._windows[key] = bits(e for e in self.days if 0 < abs(e - day) <= span)
+        return self._windows[key]
+
+
+@lru_cache(maxsize=16)
+def _calendar(year, month, holidays):
+    return MonthCalendar(year, month, holidays)
+
+
+def month_calendar(year, month, holiday_days=()):
+    """Shared MonthCalendar, built once per month and holiday set."""
+    return _calendar(year, month, tuple(sorted(set(holiday_days))))
+
+
+def compile_rules(config, slider_overrides=None, default_gap=DEFAULT_GAP):
+    """Active CONFIG rules, parsed and with slider overrides applied as in dynamic_constraints."""
+    slider_overrides = slider_overrides or {}
+    rules = []
+    for cid, cv in config.items():
+        if cid.startswith("_") or not cv.get("active", True):
+            continue
+        param_str = cv.get("param", "")
+        if param_str and param_str.strip().startswith("{"):
+            try:
+                rule = json.loads(param_str)
+            except ValueError:
+                continue
+        elif cv.get("rule"):
+            rule = dict(cv["rule"])
+        else:
+            continue
+
+        cls = rule.get("class", "")
+        if cid in slider_overrides:
+            if cls == "value":
+                rule["number"] = slider_overrides[cid]
+            elif cls == "gap":
+                rule["days"] = slider_overrides[cid]
+            elif cls in ("grouping", "allow"):
+                rule["penalty"] = slider_overrides[cid]
+        if cls == "gap":
+            rule.setdefault("days", default_gap)
+        try:
+            penalty = int(rule.get("penalty", 0))
+        except (TypeError, ValueError):
+            penalty = 0
+        rules.append(Rule(cid, cv.get("label", cid), cls, bool(rule.get("soft", False)), penalty, rule))
+    return rules
+
+
+class Person:
+    __slots__ = ("name", "display", "row", "branch", "driver", "female", "traits", "partner",
+                 "excluded", "offset", "duty", "standby", "blocked", "fixed")
+
+    def __init__(self, name, display, row):
+        self.name, self.display, self.row = name, display, row
+        self.branch, self.driver, self.female = "", False, "(F)" in name
+        self.traits, self.partner, self.excluded, self.offset = {}, "", False, 0.0
+        self.duty = self.standby = self.blocked = self.fixed = 0
+
+
+def _cell(row, i):
+    return str(row[i]).strip() if i < len(row) and row[i] is not None else ""
+
+
+def _float(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def load_roster(cal, grid, c_grid=None, namelist=None, partners=None, scale=1.0):
+    """
+    {NAME: Person} from a month grid (D or C sheet, data from row 4). X markers
+    and fixed duties (D) are taken from c_grid when given (the C sheet is
+    where users enter them). Offsets are AQ divided by `scale` (AU3), status is AR.
+    """
+    roster = {}
+    for i, row in enumerate(grid[3:], start=4):
+        display = _cell(row, 1)
+        name = display.upper()
+        if not name or name in roster:
+            continue
+        p = Person(name, display, i)
+        p.branch = _cell(row, 2).upper()
+        p.offset = round(_float(_cell(row, 42)) / (scale or 1.0), 4)
+        p.excluded = any(k in _cell(row, 43).upper() for k in EXCLUSION_KEYWORDS)
+        for d in cal.days:
+            v = _cell(row, 3 + d).upper()
+            if v == "D":
+                p.duty |= 1 << d
+            elif v == "S":
+                p.standby |= 1 << d
+            elif v == "X":
+                p.blocked |= 1 << d
+        roster[name] = p
+
+    for row in (c_grid or [])[3:]:
+        p = roster.get(_cell(row, 1).upper())
+        if p is not None:
+            p.blocked |= bits(d for d in cal.days if _cell(row, 3 + d).upper() == "X")
+            p.fixed |= bits(d for d in cal.days if _cell(row, 3 + d).upper() == "D")
+
+    if namelist:
+        headers = [h.strip().upper() for h in namelist[0][4:]] if namelist else []
+        for row in namelist[1:]:
+            p = roster.get(_cell(row, 1).upper())
+            if p is None:
+                continue
+            p.branch = _cell(row, 2).upper() or p.branch
+            p.driver = _cell(row, 3).upper() == "DRIVER"
+            p.traits = {h: _cell(row, 4 + j).upper() for j, h in enumerate(headers)
+                        if h and _cell(row, 4 + j)}
+
+    for row in partners or []:
+        a, b = _cell(row, 1).upper(), _cell(row, 2).upper()
+        if a in roster and b in roster and a != b:
+            roster[a].partner = b
+            roster[b].partner = a
+    return roster
+
+
+class DutyChecker:
+    """
+    Hard and soft CONFIG rules for one month's roster. Hard results are
+    messages naming the rule; soft results are (message, penalty).
+    """
+
+    def __init__(self, cal, roster, rules, last_duty_dates=None, last_month_workers=None):
+        self.cal, self.roster, self.rules = cal, roster, rules
+        self.last_duty_dates = {k.upper(): v for k, v in (last_duty_dates or {}).items()}
+        self.last_month_workers = {k: {n.upper() for n in v} for k, v in (last_month_workers or {}).items()}
+        self.on_day = [set() for _ in range(cal.num_days + 1)]
+        self.standby_on_day = [set() for _ in range(cal.num_days + 1)]
+        for p in roster.values():
+            for d in days_of(p.duty):
+                if d <= cal.num_days:
+                    self.on_day[d].add(p.name)
+            for d in days_of(p.standby):
+                if d <= cal.num_days:
+                    self.standby_on_day[d].add(p.name)
+        self.num_female = sum(p.female for p in roster.values())
+        self._trait_groups = {}
+        # tightest hard cap on D per day ("=" or "<=" on subject "day")
+        caps = [int(r.params.get("number", 1)) for r in rules
+                if r.cls == "value" and r.params.get("subject1") == "day"
+                and r.params.get("subject2", "D").upper() == "D"
+                and r.params.get("operator", "=") in ("=", "<=")]
+        self.day_cap = min(caps) if caps else None
+
+    # ── person rules ──
+    def person_violations(self, name, duty, new, fixed=None):
+        """
+        Hard violations for `name` holding duty mask `duty`, where `new` are
+        the days just added. A pair of new days is reported once. `fixed`
+        (default: the person's C-sheet D's) is exempt as in dynamic_constraints.
+        """
+        cal, p = self.cal, self.roster[name]
+        fixed = (p.fixed if fixed is None else fixed) & duty
+        free, new_free = duty & ~fixed, new & ~fixed
+        out = []
+        new_days = days_of(new_free)
+        for r in self.rules:
+            rp = r.params
+            if r.cls == "value" and rp.get("subject1", "person") == "person" \
+                    and rp.get("subject2", "D").upper() == "D":
+                op, number, per = rp.get("operator", "="), int(rp.get("number", 1)), rp.get("per", "month")
+                # fixed duties don't count toward the caps
+                if per == "week" and op in ("<=", "="):
+                    for week_mask in dict.fromkeys(cal.week_mask[d] for d in new_days):
+                        count = bin(free & week_mask).count("1")
+                        if count > number:
+                            week = cal.iso_week[days_of(week_mask)[0]]
+                            out.append(f"{count} duties in week {week} (days "
+                                       f"{', '.join(map(str, days_of(free & week_mask)))}), "
+                                       f"max {number} ({r.label})")
+                elif per == "month" and op == "<=" and not r.soft and new_free:
+                    count = bin(free).count("1")
+                    if count > number:
+                        out.append(f"{count} duties this month, max {number} ({r.label})")
+
+            elif r.cls == "gap":
+                span = int(rp.get("days", DEFAULT_GAP))
+                from_t, to_t = rp.get("from_type", "D").upper(), rp.get("to_type", "D").upper()
+                for d in new_days:
+                    if from_t == "D" and to_t == "D":
+                        near = [e for e in days_of(duty & ~(1 << d) & cal.window(d, span))
+                                if not (new_free >> e & 1 and e < d)]
+                        if near:
+                            out.append(f"day {d} is within {span} days of duty on day "
+                                       f"{', '.join(map(str, near))} ({r.label})")
+                        last = self.last_duty_dates.get(name)
+                        if last is not None:
+                            last = last.date() if hasattr(last, "date") else last
+                            if (cal.dates[d] - last).days < span:
+                                out.append(f"day {d} is {(cal.dates[d] - last).days} days after the last "
+                                           f"duty on {last:%d %b} ({r.label})")
+                    elif from_t == "D" and to_t == "S":
+                        near = days_of(p.standby & cal.window(d, span))
+                        if near:
+                            out.append(f"day {d} is within {span} days of standby on day "
+                                       f"{', '.join(map(str, near))} ({r.label})")
+
+            elif r.cls == "allow" and rp.get("logic", "cannot") == "cannot":
+                cond, action = rp.get("condition_day_type", "weekend"), rp.get("action_day_type", "weekend")
+                when = rp.get("condition_when", "last month")
+                a_mask, c_mask = cal.day_type(action), cal.day_type(cond)
+                if when == "last month":
+                    if name in self.last_month_workers.get(cond.lower(), ()) and new_free & a_mask:
+                        out.append(f"worked a {cond} last month, so no {action} duty ({r.label})")
+                elif when == "this month":
+                    if cond == action:
+                        if new_free & a_mask and bin(duty & a_mask).count("1") > 1:
+                            out.append(f"more than one {action} duty this month ({r.label})")
+                    elif new & (a_mask | c_mask) and free & a_mask and duty & c_mask:
+                        # only a non-fixed action day is blocked by a (fixed or not) condition day
+                        out.append(f"has both a {cond} and a {action} duty this month ({r.label})")
+        return out
+
+    # ── day rules ──
+    def _trait_group(self, trait):
+        if trait not in self._trait_groups:
+            cat, opt = [t.strip().upper() for t in trait.split("::", 1)]
+            self._trait_groups[trait] = {p.name for p in self.roster.values() if p.traits.get(cat) == opt}
+        return self._trait_groups[trait]
+
+    def day_check(self, day, on, standby=None, complete=True):
+        """
+        (hard, soft) for the set of names on D on `day` (and on S, default:
+        as rostered). With complete=False the day may still be filled by
+        the solver, so the all-or-none gender rule is left to it.
+        """
+        standby = self.standby_on_day[day] if standby is None else standby
+        roster = self.roster
+        hard, soft = [], []
+
+        def _flag(rule, msg):
+            if rule.soft:
+                soft.append((f"{msg} ({rule.label})", rule.penalty))
+            else:
+                hard.append(f"{msg} ({rule.label})")
+
+        for r in self.rules:
+            rp = r.params
+            if r.cls != "grouping" or rp.get("duty_type", "D").upper() == "S":
+                continue
+            trait, logic = rp.get("trait", ""), rp.get("logic", "must")
+            if trait == "same_gender" and logic == "must":
+                if not complete:
+                    continue
+                fc = sum(roster[n].female for n in on)
+                n = self.num_female or 2
+                if fc not in (0, n):
+                    hard.append(f"day {day} would have {fc} of {n} female personnel on duty ({r.label})")
+            elif trait == "same_branch" and logic == "must_match_d" and standby:
+                need = Counter(roster[n].branch for n in on if roster[n].branch)
+                have = Counter(roster[n].branch for n in standby)
+                if r.soft:
+                    wrong = [n for n in standby if roster[n].branch not in need]
+                    for n in wrong:
+                        soft.append((f"standby {roster[n].display} is not from a duty branch ({r.label})", r.penalty))
+                elif need != have:
+                    hard.append(f"day {day} standby branches no longer match duty branches ({r.label})")
+            elif trait == "partners" and logic == "must":
+                split = {frozenset((n, roster[n].partner)) for n in on
+                         if roster[n].partner and roster[n].partner not in on}
+                for pair in split:
+                    soft.append((f"partners {' / '.join(sorted(pair))} split on day {day} ({r.label})", r.penalty))
+            elif trait == "same_branch" and logic == "cannot":
+                for branch, c in Counter(roster[n].branch for n in on).items():
+                    if c >= 2:
+                        soft.append((f"{c} from {branch} on day {day} ({r.label})", r.penalty))
+            elif trait == "drivers" and logic == "cannot":
+                dc = sum(roster[n].driver for n in on)
+                if dc != 1 and any(p.driver for p in roster.values()):
+                    soft.append((f"{dc} drivers on day {day} ({r.label})", r.penalty))
+            elif "::" in trait:
+                group = self._trait_group(trait)
+                if len(group) < 2:
+                    continue
+                tc = len(group & on)
+                if logic == "cannot" and tc >= 2:
+                    _flag(r, f"{tc} from {trait} on day {day}")
+                elif logic == "must" and 0 < tc < len(group):
+                    _flag(r, f"{tc} of {len(group)} from {trait} on day {day}")
+        return hard, soft
+
+    # ── swaps ──
+    def check_swap(self, giver, taker, day):
+        """
+        (hard, soft) for `taker` taking over `giver`'s D on `day`. Only
+        problems the swap introduces are reported; soft carries the penalty
+        change as (message, penalty) for new soft breaches.
+        """
+        giver, taker = giver.upper(), taker.upper()
+        p = self.roster.get(taker)
+        if p is None:
+            return [f"{taker} is not on this month's sheet"], []
+        bit = 1 << day
+        hard = []
+        if p.excluded:
+            hard.append(f"{p.display} is excluded this month")
+        if p.duty & bit:
+            hard.append(f"{p.display} already has duty on day {day}")
+        if p.standby & bit:
+            hard.append(f"{p.display} is on standby on day {day}")
+        if p.blocked & bit:
+            hard.append(f"{p.display} marked X on day {day}")
+        hard += self.person_violations(taker, p.duty | bit, bit)
+
+        before_on = self.on_day[day]
+        after_on = (before_on - {giver}) | {taker}
+        hard_before, soft_before = self.day_check(day, before_on)
+        hard_after, soft_after = self.day_check(day, after_on)
+        hard += [h for h in hard_after if h not in hard_before]
+        soft = [s for s in soft_after if s not in soft_before]
+        return hard, soft
+
+    def suggest_replacements(self, giver, day, points):
+        """
+        Every valid replacement for `giver` on `day`, best first: smallest
+        increase in the spread (std dev) of offsets after the swap, then
+        lowest soft penalty. Returns ([Suggestion], {name: [hard reasons]}).
+        """
+        giver = giver.upper()
+        g = self.roster[giver]
+        active = [p.offset for p in self.roster.values() if not p.excluded]
+        n = len(active) or 1
+        total, squares = sum(active), sum(o * o for o in active)
+
+        def _spread(t, q):
+            return math.sqrt(max(q / n - (t / n) ** 2, 0.0))
+
+        base = _spread(total, squares)
+        # the giver's share of the change is the same for every candidate
+        if not g.excluded:
+            total -= points
+            squares += (g.offset - points) ** 2 - g.offset ** 2
+        suggestions, rejected = [], {}
+        for name, p in self.roster.items():
+            if name == giver:
+                continue
+            hard, soft = self.check_swap(giver, name, day)
+            if hard:
+                rejected[p.display] = hard
+                continue
+            new_offset = p.offset + points
+            delta = _spread(total + points, squares + new_offset ** 2 - p.offset ** 2) - base
+            suggestions.append(Suggestion(p.display, p.offset, round(new_offset, 4), round(delta, 4),
+                                          sum(pen for _, pen in soft), soft))
+        suggestions.sort(key=lambda s: (s.spread_delta, s.soft_penalty, s.name))
+        return suggestions, rejected
+
+    # ── submissions ──
+    def check_submission(self, name, pref_days, x_days=(), on_day=None):
+        """
+        (errors, warnings) for `name` submitting D on pref_days and X on
+        x_days, which replace their whole row. on_day ([{NAME}] by day)
+        overrides who is on D, e.g. roster_aggregates with queued submissions.
+        errors break a hard rule; warnings are soft-rule breaches and person-rule
+        conflicts among the submitted (fixed) duties.
+        """
+        name = name.upper()
+        p = self.roster.get(name)
+        if p is None:
+            return [f"{name} is not on this month's sheet"], []
+        cal = self.cal
+        errors, warnings = [], []
+        outside = sorted(d for d in set(pref_days) | set(x_days) if not 1 <= d <= cal.num_days)
+        if outside:
+            errors.append(f"day {', '.join(map(str, outside))} is not in this month")
+        duty = bits(d for d in pref_days if 1 <= d <= cal.num_days)
+        blocked = duty & bits(x_days)
+        if blocked:
+            errors.append(f"day {', '.join(map(str, days_of(blocked)))} is marked both X and D")
+        if not duty:
+            return errors, warnings
+
+        on_day = self.on_day if on_day is None else on_day
+        # every submitted D becomes a fixed duty, which the solver never rejects on person rules
+        warnings += [f"{v}; requested duties are kept anyway"
+                     for v in self.person_violations(name, duty, duty, fixed=0)]
+        for d in days_of(duty):
+            others = on_day[d] - {name}
+            if self.day_cap is not None and len(others) >= self.day_cap:
+                errors.append(f"day {d} already has {len(others)}/{self.day_cap} duty slot(s) filled")
+                continue
+            after = others | {name}
+            complete = self.day_cap is not None and len(after) >= self.day_cap
+            hard_before, soft_before = self.day_check(d, others, standby=set(), complete=complete)
+            hard_after, soft_after = self.day_check(d, after, standby=set(), complete=complete)
+            errors += [h for h in hard_after if h not in hard_before]
+            warnings += [msg for msg, pen in soft_after if (msg, pen) not in soft_before]
+        return errors, warnings
@@ -57,8 +57,14 @@ def apply_dynamic_constraints(
     name_to_row, branch_to_row, is_driver, partner_pairs,
     OFFSET_COL, SCALE,
     model_constraints,
-    slider_overrides=None
+    slider_overrides=None,
+    last_duty_dates=None,
+    last_month_workers=None
 ):
+    """
+    last_duty_dates / last_month_workers come from roster_history (keyed by
+    name); when given they replace the row-by-row scan of last_month_df.
+    """
     import pandas as pd
     soft_penalties = []
     has_at_least_one_duty = {}
@@ -98,10 +104,13 @@ def apply_dynamic_constraints(
         partner_row_set.add((min(r1,r2), max(r1,r2)))
 
     # last month worked by day type (used by CLASS: ALLOW)
-    lm_workers = _last_month_worked(
-        last_month_df, year_old, month_old,
-        row_start, row_end, date_start_col, set()
-    )
+    if last_month_workers is not None:
+        lm_workers = defaultdict(set, {k: set(v) for k, v in last_month_workers.items()})
+    else:
+        lm_workers = _last_month_worked(
+            last_month_df, year_old, month_old,
+            row_start, row_end, date_start_col, set()
+        )
 
     # model_constraints fallbacks
     hard4  = model_constraints.get('hard4', 4)
@@ -286,16 +295,20 @@ def apply_dynamic_constraints(
                 # cross-month and internal D-D gap
                 for r in range(row_start, row_end+1):
                     # cross-month
-                    lm_duties = []
-                    if last_month_df is not None and isinstance(last_month_df, pd.DataFrame):
+                    last_d = None
+                    if last_duty_dates is not None:
+                        last_d = last_duty_dates.get(row_to_name[r])
+                    elif last_month_df is not None and isinstance(last_month_df, pd.DataFrame):
+                        lm_duties = []
                         _, lnd = cal_mod.monthrange(year_old, month_old)
                         for c in range(date_start_col, date_start_col+lnd):
                             try:
                                 if str(last_month_df.iat[r,c]).strip().upper() == "D":
                                     lm_duties.append(c - date_start_col + 1)
                             except: pass
-                    if lm_duties:
-                        last_d = datetime(year_old, month_old, max(lm_duties))
+                        if lm_duties:
+                            last_d = datetime(year_old, month_old, max(lm_duties))
+                    if last_d is not None:
                         for c in range(date_start_col, date_end_col+1):
                             if (r,c) in fixed_duties:
                                 continue
@@ -0,0 +1,125 @@
+"""
+On-disk cache of Google Sheets exports (D sheet PDF, master sheet xlsx).
+
+An export is stored once per spreadsheet revision (the Drive modifiedTime
+sheet_cache already tracks) under exports/, so repeated downloads at month
+start are a local file read instead of a multi-second export round trip:
+
+  path = export_cache.cached("MASTER SHEET", "0326D.pdf", rev)   # None if stale
+  path = export_cache.export("MASTER SHEET", "0326D.pdf", rev, fetch)
+  export_cache.refresh_in_background("MASTER SHEET", "0326D.pdf", rev, fetch)
+
+fetch() returns the exported bytes and is called at most once per
+(spreadsheet, export, revision); concurrent callers wait for that call.
+Only the newest revision of each export is kept.
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import defaultdict
+
+from local_data import data_path
+
+_lock = threading.Lock()
+_key_locks = defaultdict(threading.Lock)
+_refreshing = set()     # (spreadsheet_name, export_name) with a background refresh running
+_stats = {"hits": 0, "exports": 0, "failures": 0}
+
+
+def _paths(spreadsheet_name, export_name):
+    """(data file, metadata file) for an export."""
+    folder = hashlib.sha1(spreadsheet_name.encode("utf-8")).hexdigest()[:16]
+    path = data_path("exports", folder, export_name)
+    return path, path + ".json"
+
+
+def _stored_revision(spreadsheet_name, export_name):
+    _, meta_path = _paths(spreadsheet_name, export_name)
+    try:
+        with open(meta_path) as f:
+            return json.load(f).get("revision")
+    except (OSError, ValueError):
+        return None
+
+
+def cached(spreadsheet_name, export_name, revision):
+    """Path of the export for `revision`, or None if it hasn't been exported yet."""
+    path, _ = _paths(spreadsheet_name, export_name)
+    if revision is not None and _stored_revision(spreadsheet_name, export_name) == revision \
+            and os.path.exists(path):
+        with _lock:
+            _stats["hits"] += 1
+        return path
+    return None
+
+
+def has_any(spreadsheet_name, export_name):
+    """True if some revision of this export was downloaded before."""
+    return os.path.exists(_paths(spreadsheet_name, export_name)[0])
+
+
+def export(spreadsheet_name, export_name, revision, fetch):
+    """Path of the export for `revision`, calling fetch() for the bytes if needed (single-flight)."""
+    path = cached(spreadsheet_name, export_name, revision)
+    if path:
+        return path
+    with _lock:
+        key_lock = _key_locks[(spreadsheet_name, export_name)]
+    with key_lock:
+        # another session may have exported it while we waited
+        path = cached(spreadsheet_name, export_name, revision)
+        if path:
+            return path
+        try:
+            data = fetch()
+        except Exception:
+            with _lock:
+                _stats["failures"] += 1
+            raise
+        path, meta_path = _paths(spreadsheet_name, export_name)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with open(meta_path, "w") as f:
+            json.dump({"revision": revision, "bytes": len(data)}, f)
+        with _lock:
+            _stats["exports"] += 1
+        return path
+
+
+def refresh_in_background(spreadsheet_name, export_name, revision, fetch):
+    """Starts export() on a daemon thread unless it's current or already refreshing."""
+    key = (spreadsheet_name, export_name)
+    if revision is None or cached(spreadsheet_name, export_name, revision):
+        return False
+    with _lock:
+        if key in _refreshing:
+            return False
+        _refreshing.add(key)
+
+    def _run():
+        try:
+            export(spreadsheet_name, export_name, revision, fetch)
+        except Exception as e:
+            print(f"⚠️ Background export of {export_name} failed: {e}")
+        finally:
+            with _lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=_run, name=f"export-{export_name}", daemon=True).start()
+    return True
+
+
+def reader(path):
+    """Zero-argument callable for st.download_button(data=...): reads the file only when clicked."""
+    def _read():
+        with open(path, "rb") as f:
+            return f.read()
+    return _read
+
+
+def stats():
+    with _lock:
+        return dict(_stats, refreshing=len(_refreshing))
@@ -0,0 +1,164 @@
+"""
+Year-level holiday duty assignment (CP-SAT).
+
+Assigns every holiday of a year at once, two people per holiday:
+
+  hard  manual picks are kept
+        a pair is either both "(F)" or both not (a pick from outside the
+        namelist counts by its own name)
+        nobody who did a holiday duty last year gets a free slot
+        nobody gets two holidays (or a holiday and a monthly D) less than
+        `min_gap` days apart — unless both were picked by hand
+  goal  smallest spread of holiday counts over the caller's window of years
+        (this year included), then the most even counts, then lower offsets
+
+A year of holidays is a few thousand booleans. With 120 people and 16
+holidays it settles in one to two seconds on one core; the search stops once
+the best plan is within one offset point of optimal, and `time_limit` caps it
+(the best plan found by then is returned).
+"""
+from collections import Counter
+
+from ortools.sat.python import cp_model
+
+import holiday_index
+
+
+def _is_female(name):
+    return "(F)" in name.upper()
+
+
+def prior_holiday_counts(hol_raw, from_year, to_year):
+    """{NAME: count} of holiday duties (cols D/E) dated in [from_year, to_year]."""
+    idx = holiday_index.from_rows(hol_raw)
+    counts = Counter()
+    for y in range(from_year, to_year + 1):
+        for h in idx.year(y):
+            for name in (h.n1.upper(), h.n2.upper()):
+                if name:
+                    counts[name] += 1
+    return counts
+
+
+def assign_year(holidays, names, last_year_workers=(), prior_counts=None, offsets=None,
+                duty_dates=None, min_gap=7, time_limit=5.0):
+    """
+    holidays:  [{"key", "date", "n1", "n2"}]  (n1/n2 are manual picks or "")
+    names:     everyone who may be assigned (display spelling is kept)
+    prior_counts / offsets / duty_dates are keyed by upper-case name.
+    Returns ({key: (n1, n2)}, None) or (None, error message).
+    """
+    prior_counts = prior_counts or {}
+    offsets = offsets or {}
+    duty_dates = duty_dates or {}
+    excluded = {n.upper() for n in last_year_workers}
+    people = list(dict.fromkeys(n for n in names if n.strip()))
+    upper = {p: p.upper() for p in people}
+
+    model = cp_model.CpModel()
+    y = {}
+    fixed = set()
+    for h in holidays:
+        picks = {(h.get("n1") or "").strip().upper(), (h.get("n2") or "").strip().upper()} - {""}
+        for p in people:
+            if upper[p] in picks:
+                y[(h["key"], p)] = model.NewConstant(1)
+                fixed.add((h["key"], p))
+            elif upper[p] in excluded:
+                continue
+            else:
+                y[(h["key"], p)] = model.NewBoolVar(f"h_{h['key']}_{p}")
+        slots = [y[(h["key"], p)] for p in people if (h["key"], p) in y]
+        outside = len(picks - set(upper.values()))   # manual picks not on the namelist
+        model.Add(sum(slots) == 2 - outside)
+
+        # same-gender pair, unless both were picked by hand; a pick from outside
+        # the namelist has no variable, so its gender is added as a constant
+        if len(picks) < 2:
+            both_female = model.NewBoolVar(f"fem_{h['key']}")
+            outside_female = sum(1 for n in picks - set(upper.values()) if _is_female(n))
+            model.Add(sum(y[(h["key"], p)] for p in people if _is_female(p) and (h["key"], p) in y)
+                      + outside_female == 2 * both_female)
+
+    # spacing between holidays, and to monthly duties already on the roster
+    for i, h1 in enumerate(holidays):
+        for h2 in holidays[i + 1:]:
+            if abs((h2["date"] - h1["date"]).days) >= min_gap:
+                continue
+            for p in people:
+                k1, k2 = (h1["key"], p), (h2["key"], p)
+                if k1 in y and k2 in y and not (k1 in fixed and k2 in fixed):
+                    model.Add(y[k1] + y[k2] <= 1)
+    for h in holidays:
+        for p in people:
+            k = (h["key"], p)
+            if k in y and k not in fixed and any(
+                0 < abs((d - h["date"]).days) < min_gap for d in duty_dates.get(upper[p], ())
+            ):
+                model.Add(y[k] == 0)
+
+    # spread of holiday counts over the window; each person's new holidays
+    # are unary levels (taken[p][k] = "at least k+1 this year") so the count
+    # is linear and needs no squares
+    counts, taken = {}, {}
+    top = max(prior_counts.values(), default=0) + len(holidays)
+    for p in people:
+        mine = [y[(h["key"], p)] for h in holidays if (h["key"], p) in y]
+        taken[p] = [model.NewBoolVar(f"lvl_{p}_{k}") for k in range(len(mine))]
+        for a, b in zip(taken[p], taken[p][1:]):
+            model.AddImplication(b, a)
+        model.Add(sum(taken[p]) == sum(mine))
+        counts[p] = model.NewIntVar(0, top, f"count_{p}")
+        model.Add(counts[p] == prior_counts.get(upper[p], 0) + sum(taken[p]))
+    max_c, min_c = model.NewIntVar(0, top, "max_count"), model.NewIntVar(0, top, "min_count")
+    model.AddMaxEquality(max_c, list(counts.values()))
+    model.AddMinEquality(min_c, list(counts.values()))
+
+    # people nobody can tell apart (same gender, prior count, offset and
+    # monthly duties, no exclusion or manual pick) are interchangeable, so only
+    # keep solutions where earlier ones in the list take at least as many
+    picked = {p for (_, p) in fixed}
+    groups = {}
+    for p in people:
+        if p in picked:
+            continue
+        sig = (_is_female(p), upper[p] in excluded, prior_counts.get(upper[p], 0),
+               offsets.get(upper[p]), frozenset(duty_dates.get(upper[p], ())))
+        groups.setdefault(sig, []).append(p)
+    for group in groups.values():
+        for a, b in zip(group, group[1:]):
+            for la, lb in zip(taken[a], taken[b]):
+                model.AddImplication(lb, la)
+
+    # within the same spread, the k-th holiday of a person already on c costs
+    # 2(c+k)-1, which sums to the squared count: favours people with fewer
+    # holidays in the window; offsets break the remaining ties
+    evenness = sum(
+        (2 * (prior_counts.get(upper[p], 0) + k) + 1) * lvl
+        for p in people for k, lvl in enumerate(taken[p])
+    )
+    low_off = min(offsets.values(), default=0)
+    tie_break = sum(
+        y[(h["key"], p)] * int(round(10 * (offsets.get(upper[p], low_off) - low_off)))
+        for h in holidays for p in people
+        if (h["key"], p) in y and (h["key"], p) not in fixed
+    )
+    model.Minimize(100000 * (max_c - min_c) + 1000 * evenness + tie_break)
+
+    solver = cp_model.CpSolver()
+    solver.parameters.num_search_workers = 8
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.absolute_gap_limit = 9   # under one offset point of tie-break
+    status = solver.Solve(model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None, ("No assignment satisfies the manual picks, pairing, last-year exclusion "
+                      f"and {min_gap}-day spacing — clear some picks or lower the spacing.")
+
+    result = {}
+    for h in holidays:
+        chosen = [p for p in people if (h["key"], p) in y and solver.Value(y[(h["key"], p)]) == 1]
+        # keep manual picks in the column they were entered in
+        n1, n2 = (h.get("n1") or "").strip(), (h.get("n2") or "").strip()
+        rest = [p for p in chosen if upper[p] not in {n1.upper(), n2.upper()}]
+        result[h["key"]] = (n1 or rest.pop(0), n2 or rest.pop(0))
+    return result, None
@@ -0,0 +1,105 @@
+"""
+One parsed view of the Holiday sheet, shared by the engine and every page.
+
+The sheet is parsed once per content (raw rows are hashed) instead of each
+caller looping with strptime. Dates are accepted in every format the sheet
+has used: "1 Jan 2026", "01 Jan 2026" and "2026-01-01".
+
+  idx = holiday_index.from_rows(hol_raw)
+  idx.on(date(2026, 1, 1))        [Holiday(...)]            date → holidays
+  idx.for_person("ALICE")         [Holiday(...)]            person → holidays
+  idx.year(2026)                  [Holiday(...)]            year → rows
+  idx.month(2026, 1)              [Holiday(...)]            month → rows
+  idx.month_days(2026, 1)         {1, 26}                   month → days
+  idx.workers(2025)               {"ALICE", "BOB"}          year → assigned people
+"""
+import json
+import hashlib
+import threading
+from datetime import date, datetime
+from collections import namedtuple, OrderedDict
+
+# sheet_row is the 1-indexed sheet row; n1/n2 keep the sheet's spelling
+Holiday = namedtuple("Holiday", "sheet_row name date day n1 n2")
+
+_MAX_CACHED = 8
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def parse_date(text):
+    """Holiday sheet date → date, or None."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(text, "%d %b %Y").date()
+    except ValueError:
+        return None
+
+
+def _cell(row, i):
+    return str(row[i]).strip() if i < len(row) and row[i] is not None else ""
+
+
+class HolidayIndex:
+    def __init__(self, rows):
+        self.entries = []
+        self._by_date, self._by_person, self._by_year, self._by_month = {}, {}, {}, {}
+        for i, row in enumerate(rows[1:], start=2):   # skip header
+            if not row or not _cell(row, 0):
+                continue
+            d = parse_date(_cell(row, 1))
+            if d is None:
+                continue
+            h = Holiday(i, _cell(row, 0), d, _cell(row, 2), _cell(row, 3), _cell(row, 4))
+            self.entries.append(h)
+            self._by_date.setdefault(d, []).append(h)
+            self._by_year.setdefault(d.year, []).append(h)
+            self._by_month.setdefault((d.year, d.month), set()).add(d.day)
+            for n in {h.n1.upper(), h.n2.upper()} - {""}:
+                self._by_person.setdefault(n, []).append(h)
+
+    def on(self, d):
+        if isinstance(d, datetime):
+            d = d.date()
+        return self._by_date.get(d, [])
+
+    def is_holiday(self, d):
+        return bool(self.on(d))
+
+    def for_person(self, name, year=None, month=None):
+        return [h for h in self._by_person.get(name.strip().upper(), [])
+                if (year is None or h.date.year == year) and (month is None or h.date.month == month)]
+
+    def year(self, y):
+        return self._by_year.get(y, [])
+
+    def month(self, year, month):
+        return [h for h in self._by_year.get(year, []) if h.date.month == month]
+
+    def month_days(self, year, month):
+        return set(self._by_month.get((year, month), ()))
+
+    def workers(self, y):
+        return {n for h in self.year(y) for n in (h.n1.upper(), h.n2.upper()) if n}
+
+
+def from_rows(rows):
+    """HolidayIndex for raw Holiday sheet rows, reused while the rows are unchanged."""
+    key = hashlib.sha1(json.dumps(rows or [], separators=(",", ":"), default=str).encode("utf-8")).hexdigest()
+    with _lock:
+        idx = _cache.get(key)
+        if idx is not None:
+            _cache.move_to_end(key)
+            return idx
+    idx = HolidayIndex(rows or [])
+    with _lock:
+        _cache[key] = idx
+        while len(_cache) > _MAX_CACHED:
+            _cache.popitem(last=False)
+    return idx
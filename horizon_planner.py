@@ -0,0 +1,304 @@
+"""
+Rolling-horizon planning: optimise the next 2–3 months in one CP-SAT model
+and commit only the first.
+
+Every month is built with planner_engine._build_duty_model, so each CONFIG
+rule applies inside its month exactly as in a single-month run. The horizon
+model adds what a single month cannot see:
+
+  - D→D gap rules across month boundaries
+  - weekly D caps ("<=") for ISO weeks that straddle a boundary
+  - "last month … cannot" ALLOW rules between consecutive planned months
+  - fairness (score and duty-count spread) over the whole horizon
+
+Months after the first use their C sheet if it exists, otherwise a blank
+copy of the first month's (statuses cleared, holiday D's stamped). The plan
+for every month is saved locally and used as a solution hint when a month is
+planned again (horizon or single-month), so each run starts from the last
+horizon's answer.
+"""
+import os
+import copy
+import json
+import time
+import threading
+from collections import defaultdict
+
+from ortools.sat.python import cp_model
+
+import storage
+import planner_engine
+from dynamic_constraints import _matches_day_type
+from snapshot_store import next_mmyy
+from local_data import data_path
+
+MAX_MONTHS = 3
+
+_hints_lock = threading.Lock()
+
+
+def _hints_path(spreadsheet_name):
+    safe = "".join(ch if ch.isalnum() else "_" for ch in spreadsheet_name)
+    return data_path("horizon", f"{safe}.json")
+
+
+def _read_hints(spreadsheet_name):
+    try:
+        with open(_hints_path(spreadsheet_name)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_hints(spreadsheet_name, mmyy):
+    """{NAME: {day, ...}} planned for `mmyy` by the last horizon run, or None."""
+    plan = _read_hints(spreadsheet_name).get(mmyy)
+    if not plan:
+        return None
+    return {name: set(days) for name, days in plan["duties"].items()}
+
+
+def _save_hints(spreadsheet_name, plans):
+    with _hints_lock:
+        hints = _read_hints(spreadsheet_name)
+        for mmyy, duties in plans.items():
+            hints[mmyy] = {"saved_at": time.time(),
+                           "duties": {n: sorted(d) for n, d in duties.items()}}
+        path = _hints_path(spreadsheet_name)
+        with open(path + ".tmp", "w") as f:
+            json.dump(hints, f)
+        os.replace(path + ".tmp", path)
+
+
+def _blank_month_bundle(first, mmyy):
+    """A later month's bundle when its C sheet does not exist yet."""
+    m, y = int(mmyy[:2]), 2000 + int(mmyy[2:])
+    constraints = first["constraints"].copy()
+    names = constraints.iloc[:, 1].astype(str).str.strip().str.upper()
+
+    # same reset as generate_next_month_template: empty grid and status
+    for r in range(len(constraints)):
+        if names.iloc[r] in ("", "NAN", "NONE"):
+            break
+        for col in list(range(4, 35)) + [43, 44]:
+            constraints.iat[r, col] = None
+
+    # holiday D's for the people assigned on the Holiday sheet
+    row_of = {n: r for r, n in enumerate(names) if n not in ("", "NAN", "NONE")}
+    for h in planner_engine._bundle_holidays(first).month(y, m):
+        for person in (h.n1.upper(), h.n2.upper()):
+            if person in row_of:
+                constraints.iat[row_of[person], 4 + h.date.day - 1] = "D"
+
+    bundle = dict(first)
+    bundle.update({"constraints": constraints, "year": y, "month": m, "last_month": None,
+                   "manual_adjustments": [], "last_month_recorded": False})
+    return bundle
+
+
+def _future_bundle(store, first, mmyy):
+    if f"{mmyy}C" in store.list_sheets():
+        bundle, _ = planner_engine.load_data_bundle(store, store.title, mmyy)
+    else:
+        bundle = _blank_month_bundle(first, mmyy)
+    m, y = int(mmyy[:2]), 2000 + int(mmyy[2:])
+    bundle["year_old"], bundle["month_old"] = (y - 1, 12) if m == 1 else (y, m - 1)
+    # the previous month is planned in this model: boundary rules are added below,
+    # history only covers the real past
+    bundle["last_duty_dates"] = first.get("last_duty_dates") or {}
+    bundle["last_month_workers"] = {}
+    return bundle
+
+
+def _boundary_rules(config, slider_overrides, model_constraints):
+    """(gap days list, weekly '<=' caps, [(cond_dt, action_dt)] last-month bans) from CONFIG."""
+    gaps, week_caps, last_month_bans = [], [], []
+    for cid, cv in config.items():
+        if cid.startswith("_") or not cv.get("active", True):
+            continue
+        param_str = cv.get("param", "")
+        if not param_str or not param_str.strip().startswith("{"):
+            continue
+        try:
+            rule = json.loads(param_str)
+        except ValueError:
+            continue
+        cls = rule.get("class", "")
+        if cid in (slider_overrides or {}):
+            key = {"value": "number", "gap": "days"}.get(cls)
+            if key:
+                rule[key] = slider_overrides[cid]
+
+        if cls == "gap" and rule.get("from_type", "D").upper() == "D" and rule.get("to_type", "D").upper() == "D":
+            gaps.append(int(rule.get("days", model_constraints.get("hard4", 4))))
+        elif (cls == "value" and rule.get("subject1") == "person" and rule.get("per") == "week"
+              and rule.get("subject2", "D").upper() == "D" and rule.get("operator") == "<="):
+            week_caps.append(int(rule.get("number", 1)))
+        elif (cls == "allow" and rule.get("condition_when") == "last month"
+              and rule.get("logic", "cannot") == "cannot"):
+            last_month_bans.append((rule.get("condition_day_type", "weekend"),
+                                    rule.get("action_day_type", "weekend")))
+    return gaps, week_caps, last_month_bans
+
+
+def _add_boundary_constraints(model, prev, curr, rules):
+    """Links two consecutive months' variables (built by _build_duty_model)."""
+    gaps, week_caps, last_month_bans = rules
+    curr_rows = curr["name_to_row"]
+
+    for name, r1 in prev["name_to_row"].items():
+        r2 = curr_rows.get(name)
+        if r2 is None:
+            continue
+        tail = [(prev["col_to_date"][c], (r1, c), prev) for c in range(prev["date_start_col"], prev["date_end_col"] + 1)]
+        head = [(curr["col_to_date"][c], (r2, c), curr) for c in range(curr["date_start_col"], curr["date_end_col"] + 1)]
+
+        # D→D gap, same test as the cross-month rule in dynamic_constraints
+        for days in gaps:
+            for d1, k1, m1 in tail[-days:]:
+                for d2, k2, m2 in head[:days]:
+                    if (d2 - d1).days >= days:
+                        break
+                    f1, f2 = k1 in m1["fixed_duties"], k2 in m2["fixed_duties"]
+                    if f1 and f2:
+                        continue
+                    if f1:
+                        model.Add(m2["x"][k2] == 0)
+                    elif f2:
+                        model.Add(m1["x"][k1] == 0)
+                    else:
+                        model.Add(m1["x"][k1] + m2["x"][k2] <= 1)
+
+        # ISO week straddling the boundary, counting only free duties like the in-month cap
+        if week_caps:
+            last_week = tail[-1][0].isocalendar()[:2]
+            week_vars = [m["x"][k] for d, k, m in tail + head
+                         if d.isocalendar()[:2] == last_week and k not in m["fixed_duties"]]
+            if week_vars:
+                for cap in week_caps:
+                    model.Add(sum(week_vars) <= cap)
+
+        # "worked <cond> last month → cannot do <action>" between planned months
+        for cond_dt, action_dt in last_month_bans:
+            cond_vars = [m["x"][k] for d, k, m in tail if _matches_day_type(d, cond_dt, set())]
+            action_vars = [m["x"][k] for d, k, m in head
+                           if k not in m["fixed_duties"]
+                           and _matches_day_type(d, action_dt, m["model_args"]["holiday_days"])]
+            if not cond_vars or not action_vars:
+                continue
+            worked = model.NewBoolVar(f"hz_worked_{name}_{cond_dt}")
+            model.AddMaxEquality(worked, cond_vars)
+            for v in action_vars:
+                model.Add(v + worked <= 1)
+
+
+def plan_horizon(client, spreadsheet_name, mmyy, months, config, point_allocations,
+                 model_constraints, slider_overrides=None, data_bundle=None):
+    """
+    Solves `months` months starting at `mmyy` together. Returns
+      {months, plans: {mmyy: {NAME: {day}}}, status, seconds, bundle, warnings}
+    where `bundle` is the first month's data bundle (loaded unless passed in).
+    plans is empty when no feasible horizon plan was found.
+    """
+    months = max(1, min(int(months), MAX_MONTHS))
+    store = storage.for_client(client, spreadsheet_name)
+    if data_bundle is None:
+        first, warnings = planner_engine.load_data_bundle(store, store.title, mmyy)
+    else:
+        first, warnings = data_bundle, []
+
+    month_ids = [mmyy]
+    while len(month_ids) < months:
+        month_ids.append(next_mmyy(month_ids[-1]))
+    bundles = [first] + [_future_bundle(store, first, m) for m in month_ids[1:]]
+
+    model = cp_model.CpModel()
+    built = [
+        planner_engine._build_duty_model(model, copy.copy(b), config, point_allocations,
+                                         model_constraints, slider_overrides, tag=f"m{k}_")
+        for k, b in enumerate(bundles)
+    ]
+
+    rules = _boundary_rules(config, slider_overrides, model_constraints)
+    for prev, curr in zip(built, built[1:]):
+        _add_boundary_constraints(model, prev, curr, rules)
+
+    # fairness over the horizon: first month's carried score + every month's points
+    SCALE = built[0]["SCALE"]
+    score_terms, count_terms, base = defaultdict(list), defaultdict(list), {}
+    for m in built:
+        for name, r in m["name_to_row"].items():
+            base.setdefault(name, m["base_scores"][r])
+            score_terms[name] += m["point_terms"][r]
+            count_terms[name] += [v for v, _ in m["point_terms"][r]]
+
+    ub = sum(m["sum_new_points"] for m in built) + 100 * SCALE
+    max_days = 31 * len(built)
+    max_score, min_score = model.NewIntVar(0, ub, "hz_max_score"), model.NewIntVar(0, ub, "hz_min_score")
+    max_duties, min_duties = model.NewIntVar(0, max_days, "hz_max_duties"), model.NewIntVar(0, max_days, "hz_min_duties")
+    for name in base:
+        total = sum(v * p for v, p in score_terms[name]) + base[name]
+        count = sum(count_terms[name])
+        model.Add(max_score >= total)
+        model.Add(min_score <= total)
+        model.Add(max_duties >= count)
+        model.Add(min_duties <= count)
+    model.Minimize(
+        (max_score - min_score) +
+        (max_duties - min_duties) * 100 +
+        sum(p for m in built for p in m["soft_penalties"])
+    )
+
+    # start from the previous horizon's answer for these months
+    for m, month_id in zip(built, month_ids):
+        hints = load_hints(store.title, month_id)
+        if not hints:
+            continue
+        for (r, c), var in m["x"].items():
+            if (r, c) not in m["fixed_duties"]:
+                name = str(m["fix_assignment_df"].iat[r, 1]).strip().upper()
+                model.AddHint(var, int(c - m["date_start_col"] + 1 in hints.get(name, ())))
+
+    solver = cp_model.CpSolver()
+    solver.parameters.num_search_workers = 8
+    solver.parameters.max_time_in_seconds = 10 * len(built)
+    start = time.time()
+    status = solver.Solve(model)
+    seconds = time.time() - start
+    print(f"Horizon solver ({', '.join(month_ids)}) finished in {seconds:.2f} seconds")
+
+    plans = {}
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        for m, month_id in zip(built, month_ids):
+            duties = defaultdict(set)
+            for (r, c), var in m["x"].items():
+                if (r, c) in m["fixed_duties"] or solver.Value(var) == 1:
+                    duties[str(m["fix_assignment_df"].iat[r, 1]).strip().upper()].add(c - m["date_start_col"] + 1)
+            plans[month_id] = dict(duties)
+        _save_hints(store.title, plans)
+    else:
+        warnings.append("⚠️ No feasible plan over the whole horizon.")
+
+    return {"months": month_ids, "plans": plans, "status": status,
+            "seconds": seconds, "bundle": first, "warnings": warnings}
+
+
+def run_horizon_optimisation(client, spreadsheet_name, mmyy, months, config, point_allocations,
+                             model_constraints, slider_overrides=None, data_bundle=None):
+    """
+    plan_horizon(), then commits the first month through run_optimisation
+    (offsets, normalisation and standby as usual) with next month's forecast
+    taken from the horizon plan. Falls back to a single-month run if the
+    horizon is infeasible. Returns run_optimisation's tuple plus the horizon dict.
+    """
+    horizon = plan_horizon(client, spreadsheet_name, mmyy, months, config, point_allocations,
+                           model_constraints, slider_overrides, data_bundle)
+    plan = horizon["plans"].get(mmyy)
+    estimate = None
+    if plan is not None and len(horizon["months"]) > 1:
+        estimate = {n: len(d) for n, d in horizon["plans"][horizon["months"][1]].items()}
+    result = planner_engine.run_optimisation(
+        horizon["bundle"], config, point_allocations, model_constraints, slider_overrides,
+        fixed_plan=plan, next_month_estimate=estimate
+    )
+    return (*result, horizon)
@@ -0,0 +1,19 @@
+"""
+Location of the app's local working files (journals, snapshots, caches).
+
+Defaults to ./.planner_data next to the app; override with the
+DUTY_PLANNER_DATA environment variable (e.g. a mounted volume).
+"""
+import os
+
+DATA_DIR = os.environ.get(
+    "DUTY_PLANNER_DATA",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".planner_data")
+)
+
+
+def data_path(*parts):
+    """Returns an absolute path under DATA_DIR, creating parent folders."""
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
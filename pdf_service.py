@@ -0,0 +1,223 @@
+"""
+Cached PDF rendering for the month calendar and per-person duty schedules.
+
+xhtml2pdf takes seconds per document, so rendered bytes are cached by
+(roster digest, TEMPLATE_VERSION, document) in memory and on disk under
+pdf_cache/. The digest is a hash of the roster dict itself, so any change to
+the D sheet (save, swap, undo) gives a new key, while every admin clicking
+"Calendar PDF" for an unchanged month shares one render, across restarts too.
+Bump TEMPLATE_VERSION whenever the markup or CSS below changes.
+
+  pdf_service.calendar_pdf(mmyy, roster_data)      whole-unit calendar
+  pdf_service.schedule_pdf(mmyy, roster_data, name)
+  pdf_service.schedules_zip(mmyy, roster_data)     one PDF per person, zipped
+
+schedules_zip renders whatever isn't cached yet across a process pool.
+"""
+import io
+import os
+import zipfile
+import hashlib
+import calendar
+import threading
+from html import escape
+from collections import OrderedDict
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor
+
+import calendar_render
+from local_data import data_path
+
+TEMPLATE_VERSION = 2
+MEMORY_ENTRIES = 64
+CACHE_DIR = os.path.dirname(data_path("pdf_cache", ""))
+
+_lock = threading.Lock()
+_memory = OrderedDict()     # cache key -> bytes (LRU)
+_stats = {"hits": 0, "renders": 0}
+
+DOW = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+# styles calendar_render.month_table's classes for print
+CALENDAR_CSS = (
+    "@page { size: A4 landscape; margin: 1cm; }"
+    "body { font-family: Helvetica, Arial, sans-serif; background: white; color: black; margin: 0; }"
+    "h2 { text-align: center; margin-bottom: 6px; font-size: 15px; }"
+    # let the table overflow instead of shrinking the text
+    ".cal-table { width: 100%; border-collapse: collapse; table-layout: fixed; border: 2px solid #555; -pdf-keep-in-frame-mode: overflow; }"
+    ".cal-th { background-color: #333; color: white; padding: 5px 0; text-align: center; font-size: 13px; font-weight: bold; }"
+    ".cal-td { border: 1px solid #aaa; vertical-align: top; height: 100px; padding: 2px; width: 14.28%; -pdf-keep-in-frame-mode: overflow; }"
+    ".day-num { font-weight: bold; font-size: 15px; display: block; margin: 2px 0 2px 1px; color: #111; }"
+    ".duty-item { font-size: 12px; background-color: #1a73e8; color: white; border-radius: 3px; padding: 1px 3px; display: block; font-weight: bold; line-height: 1.2; margin: 0 1px 1px 1px; white-space: nowrap; -pdf-keep-in-frame-mode: overflow; }"
+    ".standby-item { font-size: 12px; color: #222; display: block; line-height: 1.2; margin: 0 1px 0 1px; white-space: nowrap; -pdf-keep-in-frame-mode: overflow; }"
+)
+
+SCHEDULE_CSS = (
+    "@page { size: A4 portrait; margin: 1.5cm; }"
+    "body { font-family: Helvetica, Arial, sans-serif; color: black; }"
+    "h2 { margin-bottom: 2px; font-size: 16px; }"
+    ".sub { color: #555; font-size: 11px; margin-bottom: 10px; }"
+    "table { width: 100%; border-collapse: collapse; }"
+    "th { background-color: #333; color: white; padding: 4px; text-align: left; font-size: 11px; }"
+    "td { border-bottom: 1px solid #ccc; padding: 4px; font-size: 11px; }"
+    ".duty { color: #1a73e8; font-weight: bold; }"
+)
+
+
+def _month(mmyy):
+    """(first day, number of days) of an mmyy month."""
+    year, month = 2000 + int(mmyy[2:]), int(mmyy[:2])
+    return date(year, month, 1), calendar.monthrange(year, month)[1]
+
+
+def people(roster_data):
+    """Everyone with a duty or standby in the roster, sorted."""
+    names = set()
+    for info in roster_data.values():
+        names.update(info.get("duty", []))
+        names.update(info.get("standby", []))
+    return sorted(n for n in names if n)
+
+
+def calendar_html(mmyy, roster_data):
+    first_day, _ = _month(mmyy)
+    return ("<!DOCTYPE html><html><head><meta charset='utf-8'><style>" + CALENDAR_CSS + "</style></head><body>"
+            "<h2>" + first_day.strftime("%B %Y") + " Duty Roster</h2>"
+            + calendar_render.month_table(mmyy, roster_data, max_name=20) + "</body></html>")
+
+
+def schedule_html(mmyy, roster_data, name):
+    """One person's D and S days for the month, with who they're on with."""
+    first_day, num_days = _month(mmyy)
+    rows = []
+    for day in range(1, num_days + 1):
+        info = roster_data.get(str(day), {"duty": [], "standby": []})
+        if name in info["duty"]:
+            role, cls, others = "Duty", "duty", [n for n in info["duty"] if n != name]
+        elif name in info["standby"]:
+            role, cls, others = "Standby", "", info["duty"]
+        else:
+            continue
+        d = first_day.replace(day=day)
+        rows.append(f"<tr><td>{d.strftime('%d %b')}</td><td>{DOW[d.weekday()]}</td>"
+                    f"<td class='{cls}'>{role}</td><td>{escape(', '.join(others))}</td></tr>")
+    body = "".join(rows) or "<tr><td colspan='4'>No duties this month.</td></tr>"
+    return ("<!DOCTYPE html><html><head><meta charset='utf-8'><style>" + SCHEDULE_CSS + "</style></head><body>"
+            f"<h2>{escape(name)}</h2><div class='sub'>{first_day.strftime('%B %Y')} duty schedule</div>"
+            "<table><thead><tr><th>Date</th><th>Day</th><th>Role</th><th>On duty with</th></tr></thead>"
+            f"<tbody>{body}</tbody></table></body></html>")
+
+
+def render_pdf(html):
+    """HTML → PDF bytes (the slow part)."""
+    from xhtml2pdf import pisa
+    buf = io.BytesIO()
+    result = pisa.CreatePDF(html, dest=buf)
+    if result.err:
+        raise RuntimeError(f"PDF rendering failed ({result.err} errors)")
+    return buf.getvalue()
+
+
+def _render_schedule(args):
+    # top-level so the process pool can pickle it
+    mmyy, roster_data, name = args
+    return name, render_pdf(schedule_html(mmyy, roster_data, name))
+
+
+def _key(mmyy, roster_data, doc):
+    raw = f"{mmyy}|{calendar_render.roster_digest(roster_data)}|{TEMPLATE_VERSION}|{doc}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _disk_path(key):
+    return os.path.join(CACHE_DIR, key[:2], key + ".pdf")
+
+
+def _lookup(key):
+    with _lock:
+        data = _memory.get(key)
+        if data is not None:
+            _memory.move_to_end(key)
+            _stats["hits"] += 1
+            return data
+    try:
+        with open(_disk_path(key), "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    _remember(key, data)
+    with _lock:
+        _stats["hits"] += 1
+    return data
+
+
+def _remember(key, data):
+    with _lock:
+        _memory[key] = data
+        _memory.move_to_end(key)
+        while len(_memory) > MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def _store(key, data):
+    _remember(key, data)
+    path = _disk_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    with _lock:
+        _stats["renders"] += 1
+
+
+def _cached(key, build):
+    data = _lookup(key)
+    if data is None:
+        data = build()
+        _store(key, data)
+    return data
+
+
+def calendar_pdf(mmyy, roster_data):
+    """The month calendar as PDF bytes, rendered at most once per roster."""
+    return _cached(_key(mmyy, roster_data, "calendar"),
+                   lambda: render_pdf(calendar_html(mmyy, roster_data)))
+
+
+def schedule_pdf(mmyy, roster_data, name):
+    return _cached(_key(mmyy, roster_data, "person:" + name),
+                   lambda: render_pdf(schedule_html(mmyy, roster_data, name)))
+
+
+def schedules_zip(mmyy, roster_data, names=None, workers=None):
+    """
+    A zip of per-person schedule PDFs ({mmyy}_{NAME}.pdf) for `names`
+    (default: everyone on the roster). Uncached schedules are rendered in
+    parallel across up to `workers` processes.
+    """
+    names = people(roster_data) if names is None else list(names)
+    pdfs = {n: _lookup(_key(mmyy, roster_data, "person:" + n)) for n in names}
+    todo = [n for n in names if pdfs[n] is None]
+    if len(todo) > 2:
+        workers = workers or min(len(todo), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for n, data in pool.map(_render_schedule, [(mmyy, roster_data, n) for n in todo], chunksize=4):
+                _store(_key(mmyy, roster_data, "person:" + n), data)
+                pdfs[n] = data
+    else:
+        for n in todo:
+            pdfs[n] = schedule_pdf(mmyy, roster_data, n)
+
+    buf = io.BytesIO()
+    # PDFs are already compressed; storing them keeps zipping instant
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:
+        for n in names:
+            safe = "".join(c if c.isalnum() else "_" for c in n)
+            zf.writestr(f"{mmyy}_{safe}.pdf", pdfs[n])
+    return buf.getvalue()
+
+
+def stats():
+    with _lock:
+        return dict(_stats, cached=len(_memory))
@@ -0,0 +1,165 @@
+"""
+Personnel changes (add / remove / CSV intake) in one read and one write.
+
+Every affected sheet is read in a single batch, insert and delete positions
+are worked out locally, and every row insert, template copy, cell write and
+Holiday clear goes out as one Storage.apply_row_changes call (one
+spreadsheets.batchUpdate on Google Sheets).
+
+  plan_add(grids, mmyy, people)     changes for [(NAME, BRANCH)]
+  plan_remove(grids, mmyy, names)   changes for [NAME]
+  parse_intake_csv(data)            [(NAME, BRANCH)] from an uploaded CSV
+"""
+import io
+import csv
+from datetime import date
+
+import storage
+import holiday_index
+
+# first data row (1-based, also the template row copied into new rows)
+NAMELIST_START = 2
+YEAR_START = 3
+C_START = 4
+
+
+def find_insert_row(rows, name_col, branch_col, branch, new_name, data_start_row):
+    """Sheet row for new_name: alphabetical within its branch, else the first blank name row."""
+    branch_rows = []
+    for i, r in enumerate(rows):
+        b = r[branch_col].strip().upper() if len(r) > branch_col else ""
+        n = r[name_col].strip().upper() if len(r) > name_col else ""
+        if b == branch and n:
+            branch_rows.append((i + data_start_row, n))
+    if not branch_rows:
+        for i, r in enumerate(rows):
+            n = r[name_col].strip() if len(r) > name_col else ""
+            if not n:
+                return i + data_start_row
+        return len(rows) + data_start_row
+    for gs_row, existing_name in branch_rows:
+        if new_name < existing_name:
+            return gs_row
+    return branch_rows[-1][0] + 1
+
+
+def _year_str(mmyy):
+    return str(2000 + int(mmyy[2:]))
+
+
+def read_sheets(store, mmyy, with_holiday=False):
+    """{sheet: grid} for Namelist, the year sheet, {mmyy}C (and Holiday) in one batched read."""
+    sheets = ["Namelist", _year_str(mmyy), f"{mmyy}C"]
+    if with_holiday and "Holiday" in store.list_sheets():
+        sheets.append("Holiday")
+    return dict(zip(sheets, store.read_ranges([storage.a1(s) for s in sheets])))
+
+
+def plan_add(grids, mmyy, people):
+    """
+    people: [(NAME, BRANCH)]. Returns (changes, added, skipped) where skipped
+    lists names already on the C sheet (or earlier in `people`). Each insert's row accounts for the rows
+    inserted before it, since changes are applied in order.
+    """
+    year_str, c_sheet = _year_str(mmyy), f"{mmyy}C"
+    # working copies of the data rows so later inserts see earlier ones
+    rows = {
+        "Namelist": [list(r) for r in grids["Namelist"][NAMELIST_START - 1:]],
+        year_str: [list(r) for r in grids[year_str][YEAR_START - 1:]],
+        c_sheet: [list(r) for r in grids[c_sheet][C_START - 1:]],
+    }
+    starts = {"Namelist": NAMELIST_START, year_str: YEAR_START, c_sheet: C_START}
+    existing = {r[1].strip().upper() for r in rows[c_sheet] if len(r) > 1 and r[1].strip()}
+
+    changes, added, skipped = [], [], []
+    for name, branch in people:
+        if name in existing:
+            skipped.append(name)
+            continue
+        existing.add(name)
+        added.append(name)
+        values = {
+            "Namelist": {1: [name, branch, "NON-DRIVER"]},
+            year_str: {1: name},
+            # clear the copied day grid, start the newcomer at offset 0
+            c_sheet: {1: name, 4: [""] * 31, 42: 0.0, 43: "NEW"},
+        }
+        for sheet in ("Namelist", year_str, c_sheet):
+            at = find_insert_row(rows[sheet], 1, 2, branch, name, data_start_row=starts[sheet])
+            rows[sheet].insert(at - starts[sheet], ["", name, branch])
+            changes.append({"sheet": sheet, "op": "insert", "row": at,
+                            "template_row": starts[sheet], "values": values[sheet]})
+    return changes, added, skipped
+
+
+def plan_remove(grids, mmyy, names):
+    """
+    Removes each name's {mmyy}C row and clears them from Holiday duties dated
+    from the 1st of mmyy on. Returns (changes, missing, cleared) where cleared
+    is {NAME: [dates]}.
+    """
+    c_sheet = f"{mmyy}C"
+    targets = {n.strip().upper() for n in names if n.strip()}
+    found, deletes = set(), []
+    for i, r in enumerate(grids[c_sheet]):
+        n = r[1].strip().upper() if len(r) > 1 else ""
+        if n in targets and n not in found:
+            found.add(n)
+            deletes.append(i + 1)
+    # bottom-up so earlier deletes don't shift later rows
+    changes = [{"sheet": c_sheet, "op": "delete", "row": row} for row in sorted(deletes, reverse=True)]
+
+    cleared = {}
+    if "Holiday" in grids:
+        cutoff = date(2000 + int(mmyy[2:]), int(mmyy[:2]), 1)
+        for h in holiday_index.from_rows(grids["Holiday"]).entries:
+            if h.date < cutoff or not {h.n1.upper(), h.n2.upper()} & found:
+                continue
+            n1 = "" if h.n1.upper() in found else h.n1
+            n2 = "" if h.n2.upper() in found else h.n2
+            changes.append({"sheet": "Holiday", "op": "set", "row": h.sheet_row, "values": {3: [n1, n2]}})
+            for n in {h.n1.upper(), h.n2.upper()} & found:
+                cleared.setdefault(n, []).append(h.date)
+    return changes, sorted(targets - found), cleared
+
+
+def add_people(store, mmyy, people):
+    """Adds people to Namelist, the year sheet and {mmyy}C. Returns (added, skipped, sheets touched)."""
+    people = [(n.strip().upper(), b.strip().upper()) for n, b in people if n.strip() and b.strip()]
+    grids = read_sheets(store, mmyy)
+    changes, added, skipped = plan_add(grids, mmyy, people)
+    store.apply_row_changes(changes)
+    return added, skipped, list(grids)
+
+
+def remove_people(store, mmyy, names):
+    """Removes people from {mmyy}C and upcoming Holiday duties. Returns (removed, missing, cleared, sheets touched)."""
+    grids = read_sheets(store, mmyy, with_holiday=True)
+    changes, missing, cleared = plan_remove(grids, mmyy, names)
+    store.apply_row_changes(changes)
+    removed = [n.strip().upper() for n in names if n.strip() and n.strip().upper() not in missing]
+    return removed, missing, cleared, [f"{mmyy}C"] + [s for s in grids if s == "Holiday"]
+
+
+def parse_intake_csv(data):
+    """
+    [(NAME, BRANCH)] from CSV bytes/text with NAME and BRANCH columns (any
+    case, any order). Raises ValueError on a missing column or a blank field.
+    """
+    if isinstance(data, bytes):
+        data = data.decode("utf-8-sig")
+    reader = csv.reader(io.StringIO(data))
+    header = [h.strip().upper() for h in next(reader, [])]
+    if "NAME" not in header or "BRANCH" not in header:
+        raise ValueError("CSV needs NAME and BRANCH columns.")
+    ni, bi = header.index("NAME"), header.index("BRANCH")
+    people = []
+    for line_no, row in enumerate(reader, start=2):
+        if not any(c.strip() for c in row):
+            continue
+        name = row[ni].strip().upper() if len(row) > ni else ""
+        branch = row[bi].strip().upper() if len(row) > bi else ""
+        if not name or not branch:
+            raise ValueError(f"Line {line_no}: both NAME and BRANCH are required.")
+        people.append((name, branch))
+    return people
@@ -1,5 +1,4 @@
 import pandas as pd
-import numpy as np
 import calendar
 import time
 from datetime import datetime
@@ -8,98 +7,181 @@ from ortools.sat.python import cp_model
 import json
 from dynamic_constraints import apply_dynamic_constraints
 import gspread
+import storage
+import roster_history
+import holiday_index
+
+def load_data_bundle(client, spreadsheet_name, mmyy):
+    """
+    Reads everything run_optimisation needs for `mmyy` in one batched read:
+    {mmyy}C, Holiday, Partners and Namelist. Cross-month data (last duty
+    dates, last month's workers, manual adjustments) comes from roster_history;
+    the previous month's D sheet is only read while history lacks that month.
+    `client` may be a gspread client or a storage.Storage.
+    Returns (data_bundle, warnings).
+    """
+    store = storage.for_client(client, spreadsheet_name)
+    curr_m, curr_y = int(mmyy[:2]), int(mmyy[2:])
+    m_old, y_old = (12, curr_y - 1) if curr_m == 1 else (curr_m - 1, curr_y)
+    prev_d = f"{m_old:02d}{y_old:02d}D"
+
+    try:
+        prev_recorded = prev_d[:4] in roster_history.recorded_months(store.title)
+    except Exception as e:
+        print(f"⚠️ Roster history unavailable, using previous D sheet: {e}")
+        prev_recorded = False
+
+    names = [f"{mmyy}C", "Holiday", "Partners", "Namelist"] + ([] if prev_recorded else [prev_d])
+    try:
+        grids = dict(zip(names, store.read_ranges([storage.a1(n) for n in names])))
+    except Exception:
+        # a missing sheet fails the whole batch — read the ones that exist
+        titles = set(store.list_sheets())
+        grids = {n: store.read_ranges([storage.a1(n)])[0] for n in names if n in titles}
+
+    def get_df(sheet_name, header_row=0, use_cols=None):
+        try:
+            data = storage.pad_rows(grids[sheet_name])
+            df = pd.DataFrame(data)
+            df.columns = df.iloc[header_row]
+            df = df[header_row + 1:].reset_index(drop=True)
+            if use_cols:
+                df = df.iloc[:, :use_cols]
+            return df.head(250)
+        except Exception as e:
+            raise ValueError(f"Error loading sheet '{sheet_name}': {e}")
+
+    # read average and scale from current month C sheet (AU2 / AU3)
+    try:
+        c_grid = grids[f"{mmyy}C"]
+        avg_val = c_grid[1][46] if len(c_grid) > 1 and len(c_grid[1]) > 46 else ""
+        scale_val = c_grid[2][46] if len(c_grid) > 2 and len(c_grid[2]) > 46 else ""
+        carry_average = float(avg_val) if avg_val else 0.0
+        carry_scale = float(scale_val) if scale_val else 1.0
+    except:
+        carry_average = 0.0
+        carry_scale = 1.0
+
+    # C sheet: header is row 3 (index 2), offset col is AQ (index 42)
+    constraints_raw = get_df(f"{mmyy}C", header_row=2)
+    constraints_raw.iloc[:, 42] = pd.to_numeric(constraints_raw.iloc[:, 42], errors='coerce').fillna(0)
+
+    warnings = []
+    last_month_raw = None
+    if not prev_recorded:
+        try:
+            last_month_raw = get_df(prev_d, header_row=2)
+        except:
+            warnings.append("⚠️ Previous month data not found.")
+
+    data_bundle = {
+        "constraints": constraints_raw,
+        "holidays": get_df("Holiday", header_row=0),
+        "year": 2000 + curr_y,
+        "year_old": 2000 + y_old,
+        "month": curr_m,
+        "month_old": m_old,
+        "partners": get_df("Partners", header_row=0, use_cols=3),
+        "namelist": get_df("Namelist", header_row=0),
+        "last_month": last_month_raw,
+        "carry_average": carry_average,
+        "carry_scale": carry_scale,
+        "holiday_index": holiday_index.from_rows(grids.get("Holiday", [])),
+        "last_duty_dates": None,
+        "last_month_workers": None,
+        "manual_adjustments": None,
+        "last_month_recorded": False
+    }
+
+    # history is written when a month is saved or edited (save_pipeline,
+    # app_common.record_history); until it has the previous month the engine
+    # scans the D sheet read above instead
+    if prev_recorded:
+        try:
+            last = roster_history.last_duty_dates(store.title, datetime(2000 + curr_y, curr_m, 1).date())
+            data_bundle["last_duty_dates"] = {n: datetime(d.year, d.month, d.day) for n, d in last.items()}
+            data_bundle["last_month_workers"] = roster_history.month_workers(store.title, prev_d[:4])
+            data_bundle["manual_adjustments"] = roster_history.manual_adjustments(store.title, prev_d[:4])
+            data_bundle["last_month_recorded"] = True
+        except Exception as e:
+            print(f"⚠️ Roster history unavailable, using previous D sheet: {e}")
+            data_bundle.update(last_duty_dates=None, last_month_workers=None, manual_adjustments=None,
+                               last_month_recorded=False)
+            try:
+                grids[prev_d] = store.read_ranges([storage.a1(prev_d)])[0]
+                data_bundle["last_month"] = get_df(prev_d, header_row=2)
+            except Exception:
+                warnings.append("⚠️ Previous month data not found.")
+    return data_bundle, warnings
+
+def _bundle_holidays(data_bundle):
+    """The bundle's HolidayIndex (built from its Holiday frame for older bundles)."""
+    idx = data_bundle.get("holiday_index")
+    if idx is None:
+        df = data_bundle["holidays"]
+        idx = holiday_index.from_rows([list(df.columns)] + df.values.tolist())
+    return idx
+
+def _sheet_adjustments(last_month_df):
+    """[(df_row, NAME, change_text, value)] logged in AW:AY of a previous D sheet frame, from row 115."""
+    if not isinstance(last_month_df, pd.DataFrame):
+        return []
+    rows = []
+    for i in range(114, len(last_month_df)):
+        raw_name = last_month_df.iat[i, 48]
+        if pd.isna(raw_name) or str(raw_name).strip() == "":
+            continue
+        name = str(raw_name).strip().upper()
+        if name == "NAN":
+            continue
+        try:
+            value = float(str(last_month_df.iat[i, 50]).strip())   # column AY
+        except ValueError:
+            value = None
+        rows.append((i, name, str(last_month_df.iat[i, 49]).strip().upper(), value))   # column AX
+    return rows
 
 def create_backup_and_output(client, spreadsheet_name, mmyy, planned_df, norm_scale, ranges):
-    sh = client.open(spreadsheet_name)
+    store = storage.for_client(client, spreadsheet_name)
     source_name = f"{mmyy}C"
     output_name = f"{mmyy}D"
     
     # duplicate sheet (preserves formatting/validations)
-    try:
-        sh.del_worksheet(sh.worksheet(output_name))
-    except: pass
-    
-    all_sheets = sh.worksheets()
-    last_index = len(all_sheets)
-
-    source_ws = sh.worksheet(source_name)
-    output_ws = sh.duplicate_sheet(source_ws.id, insert_sheet_index = last_index, new_sheet_name=output_name)
+    store.duplicate_sheet(source_name, output_name)
     
     # prepare updates
     row_start, row_end = ranges['row_start'], ranges['row_end']
     date_start_col, date_end_col = ranges['date_start_col'], ranges['date_end_col']
     offset_col_idx = ranges['constraints_col'] + 1
     
-    # clear the duty grid area (col E to AI, data starts Excel row 4)
-    output_ws.batch_clear([f"E{row_start+4}:AI{row_end+4}"])
-    
     updates = []
     for r_idx in range(row_start, row_end + 1):
         gs_row = r_idx + 4  # data starts at Excel row 4
         
         # write normalised points
         pts_val = planned_df.iat[r_idx, offset_col_idx]
-        updates.append({'range': 'AQ' + str(gs_row), 'values': [[round(pts_val, 2)]]})
+        updates.append({'range': storage.a1(output_name, 'AQ' + str(gs_row)), 'values': [[round(pts_val, 2)]]})
         
         # write estimated duties (AS = offset_col_idx + 2)
         est_val = planned_df.loc[r_idx, "Est_Next_Month_Duties"]
-        updates.append({'range': 'AS' + str(gs_row), 'values': [[est_val]]})
+        updates.append({'range': storage.a1(output_name, 'AS' + str(gs_row)), 'values': [[est_val]]})
 
-        # write D and S assignments
+        # rewrite the whole duty grid row (col E to AI): D/S assignments, blanks elsewhere
+        grid_row = ["" for _ in range(31)]
         for c_idx in range(date_start_col, date_end_col + 1):
             val = planned_df.iat[r_idx, c_idx]
-            if val in ["D", "S"]:
-                updates.append({'range': gspread.utils.rowcol_to_a1(gs_row, c_idx + 1), 
-                                'values': [[val]]})
+            if val in ["D", "S"] and 0 <= c_idx - 4 < 31:
+                grid_row[c_idx - 4] = val
+        updates.append({'range': storage.a1(output_name, f"E{gs_row}:AI{gs_row}"), 'values': [grid_row]})
 
     # write normal scale to reference cell (AR82)
-    updates.append({'range': 'AU3', 'values': [[round(norm_scale, 4)]]})
+    updates.append({'range': storage.a1(output_name, 'AU3'), 'values': [[round(norm_scale, 4)]]})
     
-    output_ws.batch_update(updates)
+    store.batch_write(updates)
     return output_name
 
-def archive_source_sheet(client, spreadsheet_name, mmyy, folder_id, personal_drive, *args, **kwargs):
-    sh = client.open(spreadsheet_name)
-    archive_filename = f"[ARCHIVE] {spreadsheet_name}"
-    temp_filename = f"[ARCHIVE] {spreadsheet_name} 1"
-
-    # step 1: find existing archive and rename it to temp name
-    existing_query = (
-        f"name = '{archive_filename}' "
-        f"and trashed = false "
-        f"and '{folder_id}' in parents"
-    )
-    existing_results = personal_drive.files().list(q=existing_query, fields="files(id)").execute()
-    existing_files = existing_results.get('files', [])
-
-    old_archive_id = None
-    if existing_files:
-        old_archive_id = existing_files[0]['id']
-        personal_drive.files().update(
-            fileId=old_archive_id,
-            body={'name': temp_filename}
-        ).execute()
-
-    # step 2: create the new archive as usual
-    personal_drive.files().copy(
-        fileId=sh.id,
-        body={
-            'name': archive_filename,
-            'parents': [folder_id]
-        }
-    ).execute()
-
-    # step 3: delete the old archive (now renamed to temp)
-    if old_archive_id:
-        personal_drive.files().delete(fileId=old_archive_id).execute()
-
-    # step 4: empty the trash
-    personal_drive.files().emptyTrash().execute()
-
-    return archive_filename
-
 def generate_next_month_template(client, spreadsheet_name, mmyy, planned_df, ranges):
-    sh = client.open(spreadsheet_name)
+    store = storage.for_client(client, spreadsheet_name)
     
     # calculate next month MMYY
     curr_dt = datetime.strptime(mmyy, "%m%y")
@@ -108,159 +190,83 @@ def generate_next_month_template(client, spreadsheet_name, mmyy, planned_df, ran
     next_name = f"{next_dt.strftime('%m%y')}C"
     next_spreadsheet_name = f"Plan_Duty_{next_mmyy}"
     
-    # duplicate current 'C' sheet to the end
+    # ── HOLIDAY AUTO-D ──────────────────────────────────────────────────────
+    # Read the Holiday sheet, find holidays in next month, and stamp D for
+    # each assigned person (cols D & E) in the new C sheet. Names are looked
+    # up in column B, which the new sheet copies from {mmyy}C.
+    holiday_stamps = defaultdict(set)   # sheet row (1-indexed) -> {day_num}
     try:
-        sh.del_worksheet(sh.worksheet(next_name))
-    except: pass
+        if "Holiday" in store.list_sheets():
+            hol_raw, names_col = store.read_ranges([storage.a1("Holiday"), storage.a1(f"{mmyy}C", "B:B")])
+            name_rows = {}
+            for i, r in enumerate(names_col):
+                if r and r[0] and r[0] not in name_rows:
+                    name_rows[r[0]] = i + 1
+
+            # only holidays in the next month
+            for h in holiday_index.from_rows(hol_raw).month(next_dt.year, next_dt.month):
+                for person_name in [h.n1, h.n2]:
+                    if person_name in name_rows:  # skip people not in the sheet
+                        holiday_stamps[name_rows[person_name]].add(h.date.day)
+    except Exception:
+        holiday_stamps.clear()  # holiday stamping is best-effort; don't block template creation
+    # ────────────────────────────────────────────────────────────────────────
 
-    all_sheets = sh.worksheets()
-    last_index = len(all_sheets)
-    
-    source_ws = sh.worksheet(f"{mmyy}C")
-    next_ws = sh.duplicate_sheet(source_ws.id, insert_sheet_index=last_index, new_sheet_name=next_name)
+    # duplicate current 'C' sheet to the end
+    store.duplicate_sheet(f"{mmyy}C", next_name)
     
     # setup ranges
     row_start, row_end = ranges['row_start'], ranges['row_end']
-    date_start_col = ranges['date_start_col']
     offset_col_idx = ranges['constraints_col'] + 1
     num_days_next = calendar.monthrange(next_dt.year, next_dt.month)[1]
 
-    # format header date
-    first_day_str = next_dt.strftime("%Y-%m-%d")
-    next_ws.update_acell('E3', first_day_str)
-    next_ws.format("E3", {
-        "numberFormat": {"type": "DATE", "pattern": "dd"},
-        "horizontalAlignment": "LEFT",
-        "textFormat": {"bold": True}
-    })
+    # format header date and hide unused day columns (col E to AI)
+    store.format_month_sheet(next_name, num_days_next)
 
-    # hide unused columns
-    # col E = sheet index 4, col AI = sheet index 34
-    body = {
-        "requests": [
-            {
-                "updateDimensionProperties": {
-                    "range": {
-                        "sheetId": next_ws.id,
-                        "dimension": "COLUMNS",
-                        "startIndex": 4,   # col E (0-indexed)
-                        "endIndex": 35     # col AI inclusive (0-indexed)
-                    },
-                    "properties": {"hiddenByUser": False},
-                    "fields": "hiddenByUser"
-                }
-            }
-        ]
-    }
-    
-    # if month has fewer than 31 days, hide the trailing columns
-    if num_days_next < 31:
-        body["requests"].append({
-            "updateDimensionProperties": {
-                "range": {
-                    "sheetId": next_ws.id,
-                    "dimension": "COLUMNS",
-                    "startIndex": 4 + num_days_next,   # first unused day col
-                    "endIndex": 35                      # through AI
-                },
-                "properties": {"hiddenByUser": True},
-                "fields": "hiddenByUser"
-            }
-        })
-    
-    sh.batch_update(body)
-
-    # reset grid values and carry points
-    updates = []
+    # header date, reset grid values (keeping holiday D's) and carry points
+    updates = [{'range': storage.a1(next_name, 'E3'), 'values': [[next_dt.strftime("%Y-%m-%d")]]}]
     for r_idx in range(row_start, row_end + 1):
         gs_row = r_idx + 4  # data starts at Excel row 4
         
         # carry points (AQ = offset_col_idx + 1 in 1-indexed gspread)
         pts_val = planned_df.iat[r_idx, offset_col_idx]
         updates.append({
-            'range': gspread.utils.rowcol_to_a1(gs_row, offset_col_idx + 1), 
+            'range': storage.a1(next_name, gspread.utils.rowcol_to_a1(gs_row, offset_col_idx + 1)),
             'values': [[round(pts_val, 2)]]
         })
         
         # reset grid data (col E to AI = cols 5 to 35 in 1-indexed gspread)
         grid_row = ["" for _ in range(31)]
+        for day_num in holiday_stamps.pop(gs_row, ()):
+            grid_row[day_num - 1] = "D"
         start_a1 = gspread.utils.rowcol_to_a1(gs_row, 5)   # col E
         end_a1 = gspread.utils.rowcol_to_a1(gs_row, 35)    # col AI
-        updates.append({'range': f"{start_a1}:{end_a1}", 'values': [grid_row]})
+        updates.append({'range': storage.a1(next_name, f"{start_a1}:{end_a1}"), 'values': [grid_row]})
     
-        # reset status column (AR = col 44 in 1-indexed gspread)
-        updates.append({
-            'range': f"AR{gs_row}",
-            'values': [[""]]
-        })
+        # reset status (AR) and forecast (AS) columns
+        updates.append({'range': storage.a1(next_name, f"AR{gs_row}:AS{gs_row}"), 'values': [["", ""]]})
 
-        # reset forecast column (AS = col 45 in 1-indexed gspread)
-        updates.append({
-            'range': f"AS{gs_row}",
-            'values': [[""]]
-        })
-    
-    next_ws.batch_update(updates)
+    # holiday people outside the planned rows
+    for gs_row, days in holiday_stamps.items():
+        for day_num in days:
+            a1 = gspread.utils.rowcol_to_a1(gs_row, 5 + (day_num - 1))  # col E = day 1
+            updates.append({"range": storage.a1(next_name, a1), "values": [["D"]]})
 
-    # ── HOLIDAY AUTO-D ──────────────────────────────────────────────────────
-    # Read the Holiday sheet, find holidays in next month, and stamp D for
-    # each assigned person (cols D & E) in the new C sheet.
-    try:
-        all_titles = [s.title for s in sh.worksheets()]
-        if "Holiday" in all_titles:
-            hol_ws = sh.worksheet("Holiday")
-            hol_raw = hol_ws.get_all_values()
-
-            holiday_updates = []
-            for row in hol_raw[1:]:  # skip header
-                if not row or not row[0].strip():
-                    continue
-                hol_date_str = row[1].strip() if len(row) > 1 else ""
-                name1 = row[3].strip() if len(row) > 3 else ""
-                name2 = row[4].strip() if len(row) > 4 else ""
-
-                # parse date
-                hol_date = None
-                for fmt in ["%d %b %Y", "%-d %b %Y", "%Y-%m-%d"]:
-                    try:
-                        hol_date = datetime.strptime(hol_date_str, fmt)
-                        break
-                    except:
-                        continue
-                if not hol_date:
-                    continue
-
-                # only process holidays in the next month
-                if hol_date.year != next_dt.year or hol_date.month != next_dt.month:
-                    continue
-
-                day_num = hol_date.day
-                col_idx = 5 + (day_num - 1)  # col E = 5 (1-indexed gspread), day 1 = col 5
-
-                for person_name in [name1, name2]:
-                    if not person_name:
-                        continue
-                    try:
-                        cell = next_ws.find(person_name, in_column=2)
-                        a1 = gspread.utils.rowcol_to_a1(cell.row, col_idx)
-                        holiday_updates.append({"range": a1, "values": [["D"]]})
-                    except:
-                        continue  # person not found in sheet, skip
-
-            if holiday_updates:
-                next_ws.batch_update(holiday_updates, value_input_option="USER_ENTERED")
-    except Exception:
-        pass  # holiday stamping is best-effort; don't block template creation
-    # ────────────────────────────────────────────────────────────────────────
+    store.batch_write(updates)
 
     return next_name, next_spreadsheet_name
 
-def run_optimisation(data_bundle, config, point_allocations, model_constraints, slider_overrides=None):
+def _build_duty_model(model, data_bundle, config, point_allocations, model_constraints, slider_overrides=None, tag=""):
+    """
+    Adds one month's duty variables, CONFIG rules and per-person score terms
+    to `model`. run_optimisation builds a single month with it; horizon_planner
+    puts several months into one model. `tag` prefixes variable names.
+    Returns a dict of the month's structures (see the end of this function).
+    """
     # --------------------------------------------------
     # SETUP AND DATA EXTRACTION
     # --------------------------------------------------
     constraint_df = data_bundle["constraints"]
-    holiday_df = data_bundle["holidays"]
     partners_df = data_bundle["partners"]
     namelist_df = data_bundle["namelist"]
     last_month_df = data_bundle["last_month"]
@@ -331,12 +337,8 @@ def run_optimisation(data_bundle, config, point_allocations, model_constraints,
     # HOLIDAY POINTS
     # --------------------------------------------------
     
-    # ensure the DATE column is datetime
-    holiday_df['DATE'] = pd.to_datetime(holiday_df['DATE'], errors='coerce')
-
-    # filter by year and month
-    mask = (holiday_df['DATE'].dt.year == year) & (holiday_df['DATE'].dt.month == month)
-    holiday_filtered = holiday_df[mask]
+    # holiday day numbers in this month, from the shared parsed index
+    holiday_days = sorted(_bundle_holidays(data_bundle).month_days(year, month))
 
     # generate all days in the month
     num_days = pd.Period(f'{year}-{month:02d}').days_in_month
@@ -355,8 +357,6 @@ def run_optimisation(data_bundle, config, point_allocations, model_constraints,
     points_df.loc[points_df['day'].isin(['sat', 'sun']), 'points'] = sat_sun_points
 
     # override points for holidays
-    # convert holiday_filtered['DATE'] to day numbers in the month
-    holiday_days = holiday_filtered['DATE'].dt.day.tolist()
     points_df.loc[points_df['date'].isin(holiday_days), 'points'] = holiday_points
 
     date_points = {
@@ -364,7 +364,6 @@ def run_optimisation(data_bundle, config, point_allocations, model_constraints,
         for i,c in enumerate(range(date_start_col, date_end_col+1))
     }
 
-    holiday_days = holiday_filtered['DATE'].dt.day.tolist()
     holiday_cols = {date_start_col + (d - 1) for d in holiday_days}
 
     fix_assignment_df = availability_df.copy()
@@ -482,7 +481,6 @@ def run_optimisation(data_bundle, config, point_allocations, model_constraints,
         iso_week = dt.isocalendar().week
         iso_map[iso_week].append(c)
 
-    model = cp_model.CpModel()
     x = {}
     fixed_duties = set()
 
@@ -504,7 +502,7 @@ def run_optimisation(data_bundle, config, point_allocations, model_constraints,
                 continue
 
             # 2. Create the variable for non-manual days
-            x[(r, c)] = model.NewBoolVar(f"x_{r}_{c}")
+            x[(r, c)] = model.NewBoolVar(f"{tag}x_{r}_{c}")
 
             # 3. Excluded (SBF/excused/partner), S, or X cells all block duty assignment.
             #    S is handled fully in the standby pass below — it just means unavailable here.
@@ -535,19 +533,18 @@ def run_optimisation(data_bundle, config, point_allocations, model_constraints,
         is_driver=is_driver, partner_pairs=partner_pairs,
         OFFSET_COL=OFFSET_COL, SCALE=SCALE,
         model_constraints=model_constraints,
+        last_duty_dates=data_bundle.get("last_duty_dates"),
+        last_month_workers=data_bundle.get("last_month_workers"),
         slider_overrides=slider_overrides or {}
     )
 
     # --------------------------------------------------
-    # FAIRNESS OBJECTIVE
+    # FAIRNESS TERMS
     # --------------------------------------------------
 
     # define point scales and constants
     SBF_BONUS = int(sbf_val * SCALE)
 
-    final_scores = {}
-    duty_counts = {}
-
     sum_new_points = sum(
         int(round(p * SCALE * 2))
         for p in points_df["points"]
@@ -558,34 +555,39 @@ def run_optimisation(data_bundle, config, point_allocations, model_constraints,
 
     last_month_scale = carry_scale if carry_scale > 0 else 1.0
 
-    # adjust for any changes to the sheet last month
+    # adjust for any changes to the sheet last month: logged rows (AW:AY from
+    # row 115) come from roster_history, or from the previous D sheet while
+    # history does not have that month yet
+    adjustment_rows = data_bundle.get("manual_adjustments")
+    if adjustment_rows is None:
+        adjustment_rows = _sheet_adjustments(last_month_df)
 
     manual_adjustments = {}
-    if isinstance(last_month_df, pd.DataFrame):
-        # iterate from row 115 onwards
-        for i in range(114, row_end+ 1):
-            raw_name = last_month_df.iat[i, 48]
-            if pd.isna(raw_name) or str(raw_name).strip() == "":
-                continue
-            name = str(raw_name).strip().upper()
-            change_text = str(last_month_df.iat[i, 49]).strip().upper() # column AX
-            base_val = last_month_df.iat[i, 50] # column AY value
-
-            if not name or name == "NAN": continue
-
-            adj = 0
-            if "ADD 1X WD" in change_text:    adj = (1 / last_month_scale)
-            elif "ADD 1X F" in change_text:   adj = (1 / last_month_scale)
-            elif "ADD 1X WE" in change_text:  adj = (2 / last_month_scale)
-            elif "ADD 1X H" in change_text: adj = (2 / last_month_scale)
-            elif "MINUS 1X WD" in change_text:    adj = -(1 / last_month_scale)
-            elif "MINUS 1X F" in change_text:   adj = -(1 / last_month_scale)
-            elif "MINUS 1X WE" in change_text:  adj = -(2 / last_month_scale)
-            elif "MINUS 1X H" in change_text: adj = -(2 / last_month_scale)
-
-            manual_adjustments[name] = base_val + adj
-
-    # calculate scores and counts loop
+    for i, name, change_text, base_val in adjustment_rows:
+        if i > row_end:
+            continue
+        adj = 0
+        if "ADD 1X WD" in change_text:    adj = (1 / last_month_scale)
+        elif "ADD 1X F" in change_text:   adj = (1 / last_month_scale)
+        elif "ADD 1X WE" in change_text:  adj = (2 / last_month_scale)
+        elif "ADD 1X H" in change_text: adj = (2 / last_month_scale)
+        elif "MINUS 1X WD" in change_text:    adj = -(1 / last_month_scale)
+        elif "MINUS 1X F" in change_text:   adj = -(1 / last_month_scale)
+        elif "MINUS 1X WE" in change_text:  adj = -(2 / last_month_scale)
+        elif "MINUS 1X H" in change_text: adj = -(2 / last_month_scale)
+
+        manual_adjustments[name] = (base_val or 0.0) + adj
+
+    # newcomers get last month's average offset when there was a finalised last
+    # month (recorded in history, or a D sheet carrying its "Avg Offset" label)
+    has_last_month_avg = bool(data_bundle.get("last_month_recorded"))
+    if not has_last_month_avg and isinstance(last_month_df, pd.DataFrame):
+        mask = last_month_df.astype(str).apply(lambda col: col.str.contains("Avg Offset", case=False, na=False))
+        has_last_month_avg = bool(mask.values.any())
+
+    # per-person score terms: carried offset + bonuses, and this month's points
+    base_scores = {}
+    point_terms = {}
     for r in range(row_start, row_end + 1):
 
         # pull changes from last month
@@ -612,23 +614,91 @@ def run_optimisation(data_bundle, config, point_allocations, model_constraints,
         if "SBF" in status_cell:
             bonus_points += SBF_BONUS
 
-        if "NEW" in status_cell:
-            mask = last_month_df.astype(str).apply(lambda col: col.str.contains("Avg Offset", case=False, na=False))
-            matches = np.where(mask.values)
-            if len(matches[0]) > 0:
-                row_idx, col_idx = matches[0][0], matches[1][0]
-                bonus_points += int(round(carry_average * SCALE))
+        if "NEW" in status_cell and has_last_month_avg:
+            bonus_points += int(round(carry_average * SCALE))
 
         # current month points
-        assigned_points_expr = sum(
-            x[(r, c)] * int(round(points_df.iloc[c - date_start_col]["points"] * SCALE))
+        base_scores[r] = current_scaled + bonus_points
+        point_terms[r] = [
+            (x[(r, c)], date_points[c])
             for c in range(date_start_col, date_end_col + 1)
             if (r, c) in x
-        )
+        ]
+
+    return {
+        "model_args": dict(
+            config=config,
+            constraint_df=constraint_df,
+            namelist_df=namelist_df,
+            partners_df=partners_df,
+            last_month_df=last_month_df,
+            fix_assignment_df=fix_assignment_df,
+            row_start=row_start, row_end=row_end,
+            date_start_col=date_start_col, date_end_col=date_end_col,
+            col_to_date=col_to_date, iso_map=iso_map,
+            holiday_cols=holiday_cols, holiday_days=holiday_days,
+            fixed_duties=fixed_duties,
+            year=year, month=month, year_old=year_old, month_old=month_old,
+            exclusion_keywords=exclusion_keywords,
+            is_female_pair=is_female_pair, female_indices=female_indices,
+            name_to_row=name_to_row, branch_to_row=branch_to_row,
+            is_driver=is_driver, partner_pairs=partner_pairs,
+            OFFSET_COL=OFFSET_COL, SCALE=SCALE,
+            model_constraints=model_constraints,
+            last_duty_dates=data_bundle.get("last_duty_dates"),
+            last_month_workers=data_bundle.get("last_month_workers"),
+            slider_overrides=slider_overrides or {}
+        ),
+        "x": x,
+        "fixed_duties": fixed_duties,
+        "soft_penalties": soft_penalties,
+        "base_scores": base_scores,
+        "point_terms": point_terms,
+        "sum_new_points": sum_new_points,
+        "points_df": points_df,
+        "fix_assignment_df": fix_assignment_df,
+        "constraint_df": constraint_df,
+        "name_to_row": name_to_row,
+        "row_start": row_start, "row_end": row_end,
+        "date_start_col": date_start_col, "date_end_col": date_end_col,
+        "constraints_col": constraints_col, "OFFSET_COL": OFFSET_COL,
+        "col_to_date": col_to_date,
+        "exclusion_keywords": exclusion_keywords,
+        "SCALE": SCALE,
+        "scalefactor": scalefactor,
+    }
+
+
+def run_optimisation(data_bundle, config, point_allocations, model_constraints, slider_overrides=None,
+                     hints=None, fixed_plan=None, next_month_estimate=None):
+    """
+    Plans one month. Optional, all keyed by NAME:
+      hints                {NAME: {day, ...}}  solution hint (e.g. from a horizon run)
+      fixed_plan           {NAME: {day, ...}}  duty days to commit exactly (horizon mode)
+      next_month_estimate  {NAME: duties}      replaces the weighted-share forecast
+    """
+    model = cp_model.CpModel()
+    m = _build_duty_model(model, data_bundle, config, point_allocations, model_constraints, slider_overrides)
+    x, fixed_duties, soft_penalties = m["x"], m["fixed_duties"], m["soft_penalties"]
+    points_df, fix_assignment_df, constraint_df = m["points_df"], m["fix_assignment_df"], m["constraint_df"]
+    exclusion_keywords = m["exclusion_keywords"]
+    row_start, row_end = m["row_start"], m["row_end"]
+    date_start_col, date_end_col = m["date_start_col"], m["date_end_col"]
+    constraints_col, OFFSET_COL = m["constraints_col"], m["OFFSET_COL"]
+    SCALE, scalefactor, sum_new_points = m["SCALE"], m["scalefactor"], m["sum_new_points"]
+    year, month = data_bundle["year"], data_bundle["month"]
+
+    # --------------------------------------------------
+    # FAIRNESS OBJECTIVE
+    # --------------------------------------------------
+
+    final_scores = {}
+    duty_counts = {}
 
+    for r in range(row_start, row_end + 1):
         # total score variable
         total_score = model.NewIntVar(0, sum_new_points + (100 * SCALE), f"total_score_{r}")
-        model.Add(total_score == assigned_points_expr + current_scaled + bonus_points)
+        model.Add(total_score == sum(v * p for v, p in m["point_terms"][r]) + m["base_scores"][r])
         final_scores[r] = total_score
 
         # duty count variable
@@ -663,6 +733,17 @@ def run_optimisation(data_bundle, config, point_allocations, model_constraints,
         sum(soft_penalties)
     )
 
+    # horizon mode: commit the horizon's plan for this month, or start from it
+    row_names = {r: str(fix_assignment_df.iat[r, 1]).strip().upper() for r in range(row_start, row_end + 1)}
+    if fixed_plan is not None:
+        for (r, c), var in x.items():
+            if (r, c) not in fixed_duties:
+                model.Add(var == int(c - date_start_col + 1 in fixed_plan.get(row_names[r], ())))
+    elif hints:
+        for (r, c), var in x.items():
+            if (r, c) not in fixed_duties:
+                model.AddHint(var, int(c - date_start_col + 1 in hints.get(row_names[r], ())))
+
     # --------------------------------------------------
     # SOLVER
     # --------------------------------------------------
@@ -782,10 +863,8 @@ def run_optimisation(data_bundle, config, point_allocations, model_constraints,
     num_days_new = calendar.monthrange(year_new, month_new)[1]
     dates_new = pd.date_range(start=f'{year_new}-{month_new:02d}-01', periods=num_days_new)
 
-    # use holiday_df to find holidays in the projected month
-    holiday_df['DATE'] = pd.to_datetime(holiday_df['DATE'], errors='coerce')
-    mask_new = (holiday_df['DATE'].dt.year == year_new) & (holiday_df['DATE'].dt.month == month_new)
-    holiday_days_new = holiday_df[mask_new]['DATE'].dt.day.tolist()
+    # holidays in the projected month
+    holiday_days_new = _bundle_holidays(data_bundle).month_days(year_new, month_new)
 
     total_points_next_month = 0
     for d in dates_new:
@@ -806,6 +885,13 @@ def run_optimisation(data_bundle, config, point_allocations, model_constraints,
         est_days = (share * total_points_next_month) / 1.4
         planned_df.loc[r, "Est_Next_Month_Duties"] = round(est_days, 1)
 
+    # a horizon run has actually planned next month — use its counts instead
+    if next_month_estimate:
+        for r in range(row_start, row_end + 1):
+            name = row_names[r]
+            if name in next_month_estimate:
+                planned_df.loc[r, "Est_Next_Month_Duties"] = next_month_estimate[name]
+
     # --------------------------------------------------
     # STANDBY
     # --------------------------------------------------
@@ -854,27 +940,7 @@ def run_optimisation(data_bundle, config, point_allocations, model_constraints,
     # --------------------------------------------------
     # s is now fully populated — safe to apply constraints
     _sb_soft, _ = apply_dynamic_constraints(
-        model=model_s, x={}, s=s,
-        config=config,
-        constraint_df=constraint_df,
-        namelist_df=namelist_df,
-        partners_df=partners_df,
-        last_month_df=last_month_df,
-        fix_assignment_df=fix_assignment_df,
-        planned_df=planned_df,
-        row_start=row_start, row_end=row_end,
-        date_start_col=date_start_col, date_end_col=date_end_col,
-        col_to_date=col_to_date, iso_map=iso_map,
-        holiday_cols=holiday_cols, holiday_days=holiday_days,
-        fixed_duties=fixed_duties,
-        year=year, month=month, year_old=year_old, month_old=month_old,
-        exclusion_keywords=exclusion_keywords,
-        is_female_pair=is_female_pair, female_indices=female_indices,
-        name_to_row=name_to_row, branch_to_row=branch_to_row,
-        is_driver=is_driver, partner_pairs=partner_pairs,
-        OFFSET_COL=OFFSET_COL, SCALE=SCALE,
-        model_constraints=model_constraints,
-        slider_overrides=slider_overrides or {}
+        model=model_s, x={}, s=s, planned_df=planned_df, **m["model_args"]
     )
 
     # Count S per person and cap at 5; minimise the maximum across all persons
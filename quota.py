@@ -0,0 +1,259 @@
+"""
+Central request layer for every Google Sheets / Drive call.
+
+All traffic is funnelled through a shared token bucket sized to the project's
+per-minute quota, retried with exponential backoff + full jitter on 429/5xx,
+and timed so the Dev page can show per-call latency. Requests that are not
+safe to repeat (structural batchUpdate such as addSheet/duplicateSheet, row
+appends, Drive copies) are only retried when the API refused them for quota,
+since a timeout or 5xx may have landed after the change was applied.
+
+  gspread      → gspread.authorize(creds, http_client=quota.QuotaHTTPClient)
+  Drive client → quota.execute(drive.files().list(...))
+  raw exports  → quota.http_get(url, headers=...)
+
+Buckets are module-level, so every Streamlit session in the process shares
+the same budget.
+"""
+import time
+import random
+import threading
+from collections import defaultdict, deque
+
+from gspread.http_client import HTTPClient
+from gspread.exceptions import APIError
+
+# Sheets API: 60 read + 60 write requests / minute / user (the service account
+# is one user). Drive is far more generous. Override via configure().
+QUOTA_PER_MINUTE = {
+    "read":  60,
+    "write": 60,
+    "drive": 600,
+}
+
+MAX_RETRIES  = 6
+BACKOFF_BASE = 1.0    # seconds
+BACKOFF_CAP  = 32.0   # seconds
+RETRY_CODES  = {408, 429, 500, 502, 503, 504}
+THROTTLE_CODES = {429}   # refused before running; a 403 usageLimits counts too
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE"}
+LATENCY_WINDOW = 200  # samples kept per call label
+
+
+class TokenBucket:
+    """Thread-safe token bucket. `acquire()` blocks until a token is free."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0   # tokens per second
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Takes one token, sleeping if needed. Returns seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+_buckets = {k: TokenBucket(v) for k, v in QUOTA_PER_MINUTE.items()}
+_metrics_lock = threading.Lock()
+_latency = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+_counters = defaultdict(lambda: {"calls": 0, "retries": 0, "errors": 0, "throttled_s": 0.0})
+
+
+def configure(read_per_minute=None, write_per_minute=None, drive_per_minute=None):
+    """Resizes the buckets, e.g. after a quota increase on the GCP project."""
+    for key, val in (("read", read_per_minute), ("write", write_per_minute), ("drive", drive_per_minute)):
+        if val:
+            QUOTA_PER_MINUTE[key] = val
+            _buckets[key] = TokenBucket(val)
+
+
+def _record(label, elapsed, retries, throttled, failed):
+    with _metrics_lock:
+        _latency[label].append(elapsed)
+        c = _counters[label]
+        c["calls"] += 1
+        c["retries"] += retries
+        c["throttled_s"] += throttled
+        if failed:
+            c["errors"] += 1
+
+
+def _backoff(attempt):
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2^attempt))."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+def _is_usage_limit(error):
+    # Drive reports rate limits as 403 with domain 'usageLimits'
+    try:
+        return error["errors"][0]["domain"] == "usageLimits"
+    except Exception:
+        return False
+
+
+def call(bucket, label, fn, status_of, retry_codes=RETRY_CODES):
+    """
+    Runs fn() under the named bucket with retry/backoff.
+    status_of(exc) -> (http_status or None, is_usage_limit) for a raised error.
+    retry_codes: statuses worth another attempt; THROTTLE_CODES for requests
+    that must not run twice.
+    """
+    throttled = 0.0
+    retries = 0
+    start = time.perf_counter()
+    while True:
+        throttled += _buckets[bucket].acquire()
+        try:
+            result = fn()
+            _record(label, time.perf_counter() - start, retries, throttled, False)
+            return result
+        except Exception as e:
+            code, usage = status_of(e)
+            retryable = code in retry_codes or (code == 403 and usage)
+            if not retryable or retries >= MAX_RETRIES:
+                _record(label, time.perf_counter() - start, retries, throttled, True)
+                raise
+            time.sleep(_backoff(retries))
+            retries += 1
+
+
+def _endpoint_label(method, endpoint):
+    """'GET .../spreadsheets/<id>/values/Namelist!A1' → 'GET values'."""
+    path = endpoint.split("?", 1)[0]
+    if "/spreadsheets/" in path:
+        tail = path.split("/spreadsheets/", 1)[1].split("/", 1)
+        if len(tail) == 1:
+            rest = tail[0].split(":", 1)
+            return f"{method.upper()} spreadsheets" + (f":{rest[1]}" if len(rest) > 1 else "")
+        seg = tail[1].split("/", 1)[0]
+        return f"{method.upper()} {seg}"
+    if "/drive/" in path:
+        return f"{method.upper()} drive"
+    return f"{method.upper()} other"
+
+
+def _retry_codes(method, endpoint):
+    """
+    RETRY_CODES for requests that can safely run twice: GET/PUT/DELETE and the
+    values writes (values.update, values:batchUpdate, clears), which overwrite
+    the same cells again. Everything else (spreadsheets:batchUpdate with
+    addSheet/duplicateSheet, values:append, sheets:copyTo) gets THROTTLE_CODES.
+    """
+    if method.upper() in IDEMPOTENT_METHODS:
+        return RETRY_CODES
+    path = endpoint.split("?", 1)[0]
+    if "/spreadsheets/" in path:
+        tail = path.split("/spreadsheets/", 1)[1].split("/", 1)
+        if len(tail) > 1 and tail[1].startswith("values") and not path.endswith(":append"):
+            return RETRY_CODES
+    return THROTTLE_CODES
+
+
+def _gspread_status(e):
+    if isinstance(e, APIError):
+        return e.code, _is_usage_limit(e.error)
+    return None, False
+
+
+class QuotaHTTPClient(HTTPClient):
+    """gspread HTTP client that routes every request through the quota layer."""
+
+    def request(self, method, endpoint, *args, **kwargs):
+        if "/drive/" in endpoint:
+            bucket = "drive"
+        else:
+            bucket = "read" if method.lower() == "get" else "write"
+        parent = super().request
+        return call(bucket, _endpoint_label(method, endpoint),
+                    lambda: parent(method, endpoint, *args, **kwargs), _gspread_status,
+                    _retry_codes(method, endpoint))
+
+
+def _drive_status(e):
+    resp = getattr(e, "resp", None)
+    if resp is None:
+        return None, False
+    try:
+        import json as _json
+        err = _json.loads(e.content.decode("utf-8")).get("error", {})
+    except Exception:
+        err = {}
+    return int(resp.status), _is_usage_limit(err)
+
+
+def execute(request, label=None):
+    """Executes a googleapiclient request (e.g. drive.files().list(...)) through the quota layer."""
+    if label is None:
+        label = f"{request.method} {getattr(request, 'methodId', 'drive')}"
+    # files().copy / create are POSTs: a retried timeout would leave a duplicate file
+    retry_codes = RETRY_CODES if request.method.upper() in IDEMPOTENT_METHODS | {"PATCH"} else THROTTLE_CODES
+    return call("drive", label, request.execute, _drive_status, retry_codes)
+
+
+class _HTTPStatusError(Exception):
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+def http_get(url, headers=None, label="GET export"):
+    """
+    requests.get through the read bucket. Retries 429/5xx; any other status is
+    returned to the caller unchanged (so existing status_code checks still work).
+    """
+    import requests as _requests
+
+    def _get():
+        resp = _requests.get(url, headers=headers)
+        if resp.status_code in RETRY_CODES:
+            raise _HTTPStatusError(resp)
+        return resp
+
+    def _status(e):
+        if isinstance(e, _HTTPStatusError):
+            return e.response.status_code, False
+        return None, False
+
+    try:
+        return call("read", label, _get, _status)
+    except _HTTPStatusError as e:
+        return e.response
+
+
+def stats():
+    """
+    Per-label call metrics, slowest first:
+      [{label, calls, retries, errors, throttled_s, mean_ms, p95_ms, max_ms}]
+    """
+    rows = []
+    with _metrics_lock:
+        for label, samples in _latency.items():
+            s = sorted(samples)
+            if not s:
+                continue
+            c = _counters[label]
+            rows.append({
+                "label": label,
+                "calls": c["calls"],
+                "retries": c["retries"],
+                "errors": c["errors"],
+                "throttled_s": round(c["throttled_s"], 2),
+                "mean_ms": round(1000 * sum(s) / len(s), 1),
+                "p95_ms": round(1000 * s[min(len(s) - 1, int(0.95 * len(s)))], 1),
+                "max_ms": round(1000 * s[-1], 1),
+            })
+    rows.sort(key=lambda r: r["p95_ms"], reverse=True)
+    return rows
@@ -0,0 +1,108 @@
+"""
+Write-through per-month aggregates of a {mmyy}C sheet, shared by every session.
+
+  agg = roster_aggregates.get("MASTER SHEET", "0326", c_grid, pending)
+  agg.d_count(14), agg.x_count(14)      people on D / X that day
+  agg.on_day[14]                        {NAME} on D that day
+  agg.days_for("ALICE")                 ALICE's D days
+
+An aggregate is seeded from the C grid plus any queued submissions, then
+kept current with deltas: write_queue applies each submission the moment it
+is journalled, so the User page never rescans the sheet between loads. A new
+grid object (a fresh sheet_cache load after a flush, or an admin or manual
+edit) reseeds it from that grid and the submissions still queued, so an edit
+that lands between a flush and the next load is never masked by old deltas.
+
+Day sets are replaced, never mutated, so readers can iterate them while
+another session is submitting.
+"""
+import threading
+
+_lock = threading.Lock()
+_aggs = {}      # (spreadsheet_name, mmyy) -> MonthAggregate
+
+
+def parse_days(text):
+    """"3, 17, 24" → [3, 17, 24] (1..31, anything else dropped)."""
+    return sorted({int(d) for d in str(text or "").split(",") if d.strip().isdigit() and 1 <= int(d) <= 31})
+
+
+class MonthAggregate:
+    def __init__(self, grid):
+        self.source = grid
+        self.person_d, self.person_x = {}, {}
+        on_day = [set() for _ in range(32)]
+        x_on_day = [set() for _ in range(32)]
+        for row in grid[3:]:
+            name = str(row[1]).strip().upper() if len(row) > 1 else ""
+            if not name:
+                continue
+            d_days, x_days = [], []
+            for day, v in enumerate(row[4:35], start=1):
+                v = str(v).strip().upper()
+                if v == "D":
+                    d_days.append(day)
+                    on_day[day].add(name)
+                elif v == "X":
+                    x_days.append(day)
+                    x_on_day[day].add(name)
+            self.person_d[name], self.person_x[name] = frozenset(d_days), frozenset(x_days)
+        self.on_day = [frozenset(s) for s in on_day]
+        self.x_on_day = [frozenset(s) for s in x_on_day]
+
+    def d_count(self, day):
+        return len(self.on_day[day])
+
+    def x_count(self, day):
+        return len(self.x_on_day[day])
+
+    def day_counts(self):
+        return {d: len(self.on_day[d]) for d in range(1, 32)}
+
+    def days_for(self, name):
+        return sorted(self.person_d.get(name.strip().upper(), ()))
+
+    def x_days_for(self, name):
+        return sorted(self.person_x.get(name.strip().upper(), ()))
+
+    def set_person(self, name, d_days, x_days):
+        """Replaces one person's D and X days, touching only the days that changed."""
+        name = name.strip().upper()
+        new_d, new_x = frozenset(d_days), frozenset(x_days)
+        old_d, old_x = self.person_d.get(name, frozenset()), self.person_x.get(name, frozenset())
+        for d in old_d - new_d:
+            self.on_day[d] = self.on_day[d] - {name}
+        for d in new_d - old_d:
+            self.on_day[d] = self.on_day[d] | {name}
+        for d in old_x - new_x:
+            self.x_on_day[d] = self.x_on_day[d] - {name}
+        for d in new_x - old_x:
+            self.x_on_day[d] = self.x_on_day[d] | {name}
+        self.person_d[name], self.person_x[name] = new_d, new_x
+
+
+def get(spreadsheet_name, mmyy, grid, pending=None):
+    """
+    The shared aggregate for a month. `grid` is the current C grid (e.g. from
+    the cached month snapshot); pending is a callable returning write_queue
+    payloads {(mmyy, user): payload}, applied when the aggregate is seeded.
+    """
+    key = (spreadsheet_name, mmyy)
+    with _lock:
+        agg = _aggs.get(key)
+        if agg is not None and agg.source is grid:
+            return agg
+        agg = MonthAggregate(grid)
+        for (_, user_name), payload in (pending() if pending else {}).items():
+            agg.set_person(user_name, parse_days(payload.get("preferences")), parse_days(payload.get("constraints")))
+        _aggs[key] = agg
+        return agg
+
+
+def apply_submission(spreadsheet_name, mmyy, user_name, preferences, constraints):
+    """Write-through delta for a journalled submission (no-op if the month isn't loaded)."""
+    with _lock:
+        agg = _aggs.get((spreadsheet_name, mmyy))
+        if agg is not None:
+            agg.set_person(user_name, parse_days(preferences), parse_days(constraints))
+
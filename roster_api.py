@@ -0,0 +1,215 @@
+"""
+Read-only local JSON API over the shared roster caches.
+
+For the shift board, the guardroom tablet and scripts that poll roster data:
+every answer comes from roster_cache / sheet_cache, so polling costs nothing
+against the Sheets quota once a month is loaded. Responses carry an ETag and
+honour If-None-Match (304 Not Modified).
+
+  GET /rosters/{mmyy}                      {"days": {"1": {"duty": [...], "standby": [...]}, ...}}
+  GET /people/{name}/duties?mmyy=0326      the person's D and S days
+  GET /people/{name}/calendar.ics?mmyy=    the person's ICS feed (user_engine.ics_feeds)
+  GET /offsets/{mmyy}                      offset and status per person ({mmyy}C)
+  GET /availability/{mmyy}                 per-day coverage (roster_coverage.analyse)
+
+Start it once per process with start(sources, host, port, token), where
+sources maps "roster", "snapshot", "config" and "holiday" to loader
+callables (see app_common.start_roster_api, which reads host, port and
+token from st.secrets["app_config"]). It binds to localhost by default.
+With a token set, every request must send "Authorization: Bearer <token>"
+(or ?token=<token> for calendar apps that can't set headers); start()
+refuses a non-local host without one.
+"""
+import re
+import json
+import hmac
+import hashlib
+import threading
+from datetime import date
+from urllib.parse import urlsplit, parse_qs, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import calendar_render
+import user_engine
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8510     # 8501 is Streamlit, 8502 the OAuth helper in temp.py
+LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1"}
+
+_MMYY = re.compile(r"^(0[1-9]|1[0-2])\d\d$")
+_server = None
+_lock = threading.Lock()
+_ics_cache = {}    # mmyy -> ((mmyy, roster digest, holidays), {NAME: ICS text})
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _mmyy(value):
+    if value is None:
+        today = date.today()
+        return f"{today.month:02d}{today.year % 100:02d}"
+    if not _MMYY.match(value):
+        raise ApiError(400, f"Bad month {value!r}: expected MMYY, e.g. 0326.")
+    return value
+
+
+def _json_default(o):
+    # numpy scalars from coverage DataFrames
+    return o.item() if hasattr(o, "item") else str(o)
+
+
+def _roster(sources, mmyy):
+    roster, sheet_used, err = sources["roster"](mmyy)
+    if err or roster is None:
+        raise ApiError(404, err or f"No roster for {mmyy}.")
+    month, year = int(mmyy[:2]), 2000 + int(mmyy[2:])
+    num_days = (date(year + month // 12, month % 12 + 1, 1) - date(year, month, 1)).days
+    return {d: roster[d] for d in map(str, range(1, num_days + 1)) if d in roster}, sheet_used
+
+
+def rosters(sources, mmyy):
+    days, sheet_used = _roster(sources, mmyy)
+    return {"mmyy": mmyy, "sheet": sheet_used, "days": days}
+
+
+def person_duties(sources, name, mmyy):
+    days, sheet_used = _roster(sources, mmyy)
+    key = name.strip().upper()
+    duty = [int(d) for d, info in days.items() if key in {n.upper() for n in info["duty"]}]
+    standby = [int(d) for d, info in days.items() if key in {n.upper() for n in info["standby"]}]
+    return {"name": key, "mmyy": mmyy, "sheet": sheet_used, "duty": duty, "standby": standby}
+
+
+def person_ics(sources, name, mmyy):
+    days, _ = _roster(sources, mmyy)
+    key = name.strip().upper()
+    names = {n for info in days.values() for n in info["duty"] + info["standby"] if n.upper() == key}
+    if not names:
+        raise ApiError(404, f"{key} has no duties in {mmyy}.")
+    hol_names = user_engine.month_holiday_names(sources["holiday"](), mmyy)
+    # the unit's feeds are built once per roster and holidays; a stable DTSTAMP keeps the ETag stable too
+    cache_key = (mmyy, calendar_render.roster_digest(days), tuple(sorted(hol_names.items())))
+    with _lock:
+        feeds = _ics_cache.get(mmyy)
+    if feeds is None or feeds[0] != cache_key:
+        feeds = (cache_key, user_engine.ics_feeds(days, mmyy, hol_names))
+        with _lock:
+            _ics_cache[mmyy] = feeds
+    return feeds[1][names.pop()]
+
+
+def offsets(sources, mmyy):
+    people = []
+    for row in sources["snapshot"](mmyy).get("c_sheet", [])[3:]:
+        name = str(row[1]).strip() if len(row) > 1 else ""
+        if not name:
+            continue
+        try:
+            offset = float(row[42]) if len(row) > 42 and str(row[42]).strip() else None
+        except ValueError:
+            offset = None
+        people.append({
+            "name": name,
+            "branch": str(row[2]).strip() if len(row) > 2 else "",
+            "offset": offset,
+            "status": str(row[43]).strip() if len(row) > 43 else "",
+        })
+    return {"mmyy": mmyy, "people": people}
+
+
+def availability(sources, mmyy):
+    import roster_coverage     # pandas; only this endpoint needs it, so app start doesn't pay for it
+    cov = roster_coverage.analyse(sources["snapshot"](mmyy), sources["config"]())
+    return {
+        "mmyy": mmyy,
+        "days": cov["days"].to_dict("records"),
+        "x_density": cov["x_density"],
+        "short": cov["short"].to_dict("records"),
+        "no_entries": list(cov["no_entries"]),
+    }
+
+
+def route(sources, path, query):
+    """(content type, body) for a GET; raises ApiError."""
+    parts = [unquote(p) for p in path.strip("/").split("/") if p]
+    month = query.get("mmyy", [None])[0]
+    if not parts:
+        body = {"endpoints": ["/rosters/{mmyy}", "/people/{name}/duties?mmyy=", "/people/{name}/calendar.ics?mmyy=",
+                              "/offsets/{mmyy}", "/availability/{mmyy}"]}
+    elif parts[0] == "rosters" and len(parts) == 2:
+        body = rosters(sources, _mmyy(parts[1]))
+    elif parts[0] == "people" and len(parts) == 3 and parts[2] == "duties":
+        body = person_duties(sources, parts[1], _mmyy(month))
+    elif parts[0] == "people" and len(parts) == 3 and parts[2] == "calendar.ics":
+        return "text/calendar; charset=utf-8", person_ics(sources, parts[1], _mmyy(month)).encode("utf-8")
+    elif parts[0] == "offsets" and len(parts) == 2:
+        body = offsets(sources, _mmyy(parts[1]))
+    elif parts[0] == "availability" and len(parts) == 2:
+        body = availability(sources, _mmyy(parts[1]))
+    else:
+        raise ApiError(404, f"No such endpoint: {path}")
+    return "application/json", json.dumps(body, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+
+def authorised(token, headers, query):
+    """True if no token is configured or the request carries it (Bearer header or ?token=)."""
+    if not token:
+        return True
+    auth = headers.get("Authorization", "")
+    sent = auth[len("Bearer "):].strip() if auth.startswith("Bearer ") else query.get("token", [""])[0]
+    return hmac.compare_digest(sent.encode("utf-8"), token.encode("utf-8"))
+
+
+def _handler(sources, token):
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "DutyPlannerAPI/1"
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+            if not authorised(token, self.headers, query):
+                return self._send(401, "application/json", json.dumps({"error": "Missing or wrong token."}).encode("utf-8"))
+            try:
+                ctype, body = route(sources, url.path, query)
+            except ApiError as e:
+                return self._send(e.status, "application/json", json.dumps({"error": str(e)}).encode("utf-8"))
+            except Exception as e:
+                return self._send(502, "application/json", json.dumps({"error": f"Upstream error: {e}"}).encode("utf-8"))
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            if etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(",")]:
+                return self._send(304, None, b"", etag)
+            self._send(200, ctype, body, etag)
+
+        def _send(self, status, ctype, body, etag=None):
+            self.send_response(status)
+            if ctype:
+                self.send_header("Content-Type", ctype)
+            if etag:
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "no-cache")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start(sources, host=DEFAULT_HOST, port=DEFAULT_PORT, token=None):
+    """Starts (once per process) the API on a daemon thread and returns the server."""
+    global _server
+    if host not in LOCAL_HOSTS and not token:
+        raise ValueError(f"Refusing to serve the roster API on {host} without a token.")
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _handler(sources, token))
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="roster-api", daemon=True).start()
+        return _server
@@ -0,0 +1,107 @@
+"""
+Process-level roster snapshot cache shared by every Streamlit session.
+
+Entries are keyed by (spreadsheet_name, mmyy) and stamped with two tokens:
+
+  - this process's revision counter: write paths that change a month's C/D
+    sheet (save, undo, swap, penalty, personnel changes, queued user
+    submissions) call invalidate(), which bumps it so the next reader refetches
+  - the spreadsheet's Drive modifiedTime (sheet_cache.revision()), passed in
+    by the caller, so edits made directly in Google Sheets or by another
+    replica are picked up too
+
+No entry is served after MAX_AGE, in case a revision check fails.
+
+Loads are single-flight: when many viewers open the same month at once,
+one of them fetches and the rest wait for and reuse that result.
+"""
+import time
+import threading
+from collections import defaultdict
+
+MAX_AGE = 600   # seconds
+
+_lock = threading.Lock()
+_key_locks = defaultdict(threading.Lock)
+_revisions = defaultdict(int)   # (spreadsheet_name, mmyy) -> revision token
+_entries = {}                   # (spreadsheet_name, mmyy) -> {"revision", "source", "value", "loaded_at"}
+_stats = {"hits": 0, "loads": 0}
+
+
+def revision(spreadsheet_name, mmyy):
+    """Current revision token for a month."""
+    with _lock:
+        return _revisions[(spreadsheet_name, mmyy)]
+
+
+def _fresh(entry, rev, source_revision):
+    return (entry is not None and entry["revision"] == rev and entry["source"] == source_revision
+            and time.time() - entry["loaded_at"] < MAX_AGE)
+
+
+def get(spreadsheet_name, mmyy, loader, source_revision=None):
+    """
+    Returns the cached value for (spreadsheet_name, mmyy), calling loader() at
+    most once per revision and source_revision (the spreadsheet's
+    sheet_cache.revision()). loader() must return (value, cacheable); values
+    with cacheable=False (e.g. errors) are returned but not stored.
+    """
+    key = (spreadsheet_name, mmyy)
+    with _lock:
+        rev = _revisions[key]
+        entry = _entries.get(key)
+        if _fresh(entry, rev, source_revision):
+            _stats["hits"] += 1
+            return entry["value"]
+        key_lock = _key_locks[key]
+
+    with key_lock:
+        # another session may have loaded it while we waited
+        with _lock:
+            rev = _revisions[key]
+            entry = _entries.get(key)
+            if _fresh(entry, rev, source_revision):
+                _stats["hits"] += 1
+                return entry["value"]
+
+        value, cacheable = loader()
+
+        with _lock:
+            _stats["loads"] += 1
+            # only store if nobody invalidated the month during the load
+            if cacheable and _revisions[key] == rev:
+                _entries[key] = {"revision": rev, "source": source_revision,
+                                 "value": value, "loaded_at": time.time()}
+        return value
+
+
+def get_roster(spreadsheet_name, mmyy, loader, source_revision=None):
+    """
+    Shared wrapper for user_engine.calendar_view-style loaders returning
+    (roster_data, sheet_used, err). Errors are never cached.
+    """
+    def _load():
+        result = loader()
+        return result, not result[2]
+    return get(spreadsheet_name, mmyy, _load, source_revision)
+
+
+def invalidate(spreadsheet_name=None, mmyy=None):
+    """
+    Bumps the revision of matching entries. None matches everything, e.g.
+    invalidate(mmyy="0326") drops March 2026 for every spreadsheet.
+    """
+    with _lock:
+        keys = set(_revisions) | set(_entries)
+        if spreadsheet_name is not None and mmyy is not None:
+            keys.add((spreadsheet_name, mmyy))
+        for key in keys:
+            if (spreadsheet_name is None or key[0] == spreadsheet_name) and (mmyy is None or key[1] == mmyy):
+                _revisions[key] += 1
+                _entries.pop(key, None)
+
+
+def stats():
+    """{'hits', 'loads', 'entries'} since process start."""
+    with _lock:
+        return {**_stats, "entries": len(_entries)}
@@ -0,0 +1,159 @@
+"""
+Pre-solve coverage analysis of a {mmyy}C sheet, vectorised with numpy.
+
+Works on the cached month snapshot (user_engine.load_month_snapshot), so it
+costs no API calls and runs in milliseconds:
+
+  cov = roster_coverage.analyse(snapshot, config)
+  cov["days"]          per-day DataFrame: type, available, fixed D, X, S, needed, slack
+  cov["x_density"]     {"WD"|"F"|"WE"|"H": share of X cells on that day type}
+  cov["branches"]      branch × day available counts (plus a DRIVERS row)
+  cov["short"]         people whose available days cannot hold their share
+  cov["no_entries"]    people with no X/D/S marked yet (missing submissions?)
+
+"Available" means on the sheet, not excluded by status, and not X or S that
+day, i.e. what the solver may still assign.
+"""
+import math
+import calendar
+
+import numpy as np
+import pandas as pd
+
+import duty_rules
+import holiday_index
+
+DAY_TYPES = ("WD", "F", "WE", "H")
+
+
+def _grid_arrays(c_grid, num_days):
+    """(names, branches, statuses, codes) with codes an (people × days) array of upper-case cells."""
+    rows = [r for r in c_grid[3:] if len(r) > 1 and str(r[1]).strip()]
+    names = np.array([str(r[1]).strip() for r in rows], dtype=object)
+    branches = np.array([str(r[2]).strip().upper() if len(r) > 2 else "" for r in rows], dtype=object)
+    statuses = np.array([str(r[43]).strip().upper() if len(r) > 43 else "" for r in rows], dtype=object)
+    codes = np.full((len(rows), num_days), "", dtype="<U1")
+    for i, r in enumerate(rows):
+        cells = [str(v).strip().upper()[:1] for v in r[4:4 + num_days]]
+        codes[i, :len(cells)] = cells
+    return names, branches, statuses, codes
+
+
+def _max_fit(available_row, gap):
+    """Most duties that fit in a person's available days with `gap` days between them (greedy)."""
+    count, next_ok = 0, 0
+    for d in np.flatnonzero(available_row):
+        if d >= next_ok:
+            count += 1
+            next_ok = d + gap + 1
+    return count
+
+
+def analyse(snapshot, config=None):
+    mmyy = snapshot["mmyy"]
+    month, year = int(mmyy[:2]), 2000 + int(mmyy[2:])
+    num_days = calendar.monthrange(year, month)[1]
+    hol_days = holiday_index.from_rows(snapshot.get("holiday", [])).month_days(year, month)
+    cal = duty_rules.month_calendar(year, month, hol_days)
+    rules = duty_rules.compile_rules(config or {})
+
+    names, branches, statuses, codes = _grid_arrays(snapshot.get("c_sheet", []), num_days)
+    excluded = np.array([any(k in s for k in duty_rules.EXCLUSION_KEYWORDS) for s in statuses], dtype=bool)
+    is_d, is_x, is_s = codes == "D", codes == "X", codes == "S"
+    available = ~excluded[:, None] & ~is_x & ~is_s
+
+    # Namelist gives branch and driver status (the C sheet's branch column may be a formula)
+    nl = {str(r[1]).strip().upper(): r for r in snapshot.get("namelist", [])[1:] if len(r) > 1}
+    upper = np.array([n.upper() for n in names], dtype=object)
+    nl_branch = np.array([str(nl[n][2]).strip().upper() if n in nl and len(nl[n]) > 2 else "" for n in upper],
+                         dtype=object)
+    branches = np.where(nl_branch != "", nl_branch, branches) if len(names) else branches
+    drivers = np.array([n in nl and len(nl[n]) > 3 and str(nl[n][3]).strip().upper() == "DRIVER"
+                        for n in upper], dtype=bool)
+
+    day_type = np.array(["H" if d in cal.holidays else "WE" if cal.weekday[d] >= 5
+                         else "F" if cal.weekday[d] == 4 else "WD" for d in cal.days])
+
+    # per-day D requirement and per-person floor/gap from CONFIG
+    needed = None
+    person_min, gap = 0, 0
+    for r in rules:
+        p = r.params
+        if r.cls == "value" and p.get("subject2", "D").upper() == "D":
+            if p.get("subject1") == "day" and p.get("operator", "=") in ("=", ">="):
+                needed = int(p.get("number", 1))
+            elif p.get("subject1", "person") == "person" and p.get("per", "month") == "month" \
+                    and p.get("operator") == ">=":
+                person_min = max(person_min, int(p.get("number", 1)))
+        elif r.cls == "gap" and p.get("from_type", "D").upper() == "D" and p.get("to_type", "D").upper() == "D":
+            gap = max(gap, int(p.get("days", duty_rules.DEFAULT_GAP)))
+
+    avail_per_day = available.sum(axis=0)
+    days = pd.DataFrame({
+        "day": list(cal.days),
+        "type": day_type,
+        "available": avail_per_day,
+        "fixed_d": is_d.sum(axis=0),
+        "x": is_x.sum(axis=0),
+        "s": is_s.sum(axis=0),
+    })
+    if needed is not None:
+        days["needed"] = needed
+        days["slack"] = days["available"] - needed
+
+    active = ~excluded
+    x_density = {}
+    for t in DAY_TYPES:
+        cols = day_type == t
+        cells = active.sum() * cols.sum()
+        x_density[t] = float(is_x[active][:, cols].sum() / cells) if cells else 0.0
+
+    branch_names = sorted({b for b in branches if b})
+    branch_rows = {b: available[branches == b].sum(axis=0) for b in branch_names}
+    branch_rows["DRIVERS"] = available[drivers].sum(axis=0)
+    branch_df = pd.DataFrame(branch_rows, index=list(cal.days)).T if len(names) else pd.DataFrame()
+
+    # each active person should be able to carry an even share of the month's slots
+    n_active = int(active.sum())
+    share = math.floor(needed * num_days / n_active) if needed and n_active else 0
+    target = max(share, person_min)
+    short = []
+    if target:
+        for i in np.flatnonzero(active):
+            fit = _max_fit(available[i], gap)
+            if fit < target:
+                short.append({"name": names[i], "available_days": int(available[i].sum()),
+                              "fits": fit, "target": target})
+    marked = is_d | is_x | is_s
+    no_entries = [n for n, m, ex in zip(names, marked.any(axis=1), excluded) if not m and not ex]
+
+    return {
+        "days": days,
+        "x_density": x_density,
+        "branches": branch_df,
+        "short": pd.DataFrame(short, columns=["name", "available_days", "fits", "target"]),
+        "no_entries": no_entries,
+        "gap": gap,
+        "target": target,
+    }
+
+
+def heat_css(values, low=None, high=None, reverse=False):
+    """
+    CSS for a red → green heatmap over a DataFrame/Series of numbers, for
+    pandas Styler.apply(axis=None). reverse=True makes high values red.
+    """
+    arr = np.asarray(values, dtype=float)
+    lo = np.nanmin(arr) if low is None else low
+    hi = np.nanmax(arr) if high is None else high
+    t = np.clip((arr - lo) / (hi - lo), 0, 1) if hi > lo else np.ones_like(arr)
+    if reverse:
+        t = 1 - t
+    # red (220, 80, 60) → amber (240, 190, 70) → green (70, 170, 90)
+    r = np.where(t < 0.5, 220 + 40 * t * 2, 240 - 170 * (t - 0.5) * 2)
+    g = np.where(t < 0.5, 80 + 110 * t * 2, 190 - 20 * (t - 0.5) * 2)
+    b = np.where(t < 0.5, 60 + 10 * t * 2, 70 + 20 * (t - 0.5) * 2)
+    css = np.vectorize(lambda r_, g_, b_: f"background-color: rgb({r_:.0f},{g_:.0f},{b_:.0f}); color: #111")(r, g, b)
+    if isinstance(values, pd.DataFrame):
+        return pd.DataFrame(css, index=values.index, columns=values.columns)
+    return css
@@ -0,0 +1,334 @@
+"""
+Append-only history of finalised rosters for cross-month queries.
+
+Every time a month's D sheet is recorded, a new version is appended (only
+if its contents changed) with one row per person-day on duty/standby, one
+row per person with their offsets, and the manual-adjustment log. Queries
+always use the latest version of each month, so analytics and the engine's
+cross-month rules read local SQLite instead of Sheets.
+
+  versions     (id, spreadsheet_name, mmyy, year, month, content_hash, recorded_at)
+  duties       (version_id, name, branch, day, date, weekday, duty, day_type, points)
+  people       (version_id, name, branch, offset, status, est)
+  adjustments  (version_id, df_row, name, change, value)
+
+day_type is WD / F / WE / H; points use DEFAULT_POINTS (the slider defaults).
+
+forget_month() appends a tombstone version (content_hash REMOVED, no rows)
+when a save is undone or the D sheet is deleted, so the month drops out of
+every query until it is recorded again.
+"""
+import json
+import time
+import sqlite3
+import hashlib
+import calendar
+import threading
+from datetime import date
+
+import storage
+from local_data import data_path
+import holiday_index
+
+HISTORY_PATH = data_path("roster_history.sqlite3")
+DEFAULT_POINTS = {"WD": 1.0, "F": 1.0, "WE": 2.0, "H": 2.0}
+ADJ_FIRST_ROW = 117   # grid index of the engine's adjustment scan start (df row 114 + 3 header rows)
+REMOVED = "removed"   # content_hash of a tombstone version
+
+# latest version of every month, unless that version is a tombstone
+CURRENT_VERSIONS_SQL = f"""
+    CREATE VIEW IF NOT EXISTS current_versions AS
+        SELECT v.* FROM versions v
+        JOIN (SELECT spreadsheet_name, mmyy, MAX(id) AS id FROM versions
+              GROUP BY spreadsheet_name, mmyy) m ON v.id = m.id
+        WHERE v.content_hash != '{REMOVED}'
+"""
+
+_lock = threading.Lock()
+
+
+def _connect():
+    conn = sqlite3.connect(HISTORY_PATH, timeout=30)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS versions (
+            id               INTEGER PRIMARY KEY AUTOINCREMENT,
+            spreadsheet_name TEXT NOT NULL,
+            mmyy             TEXT NOT NULL,
+            year             INTEGER NOT NULL,
+            month            INTEGER NOT NULL,
+            content_hash     TEXT NOT NULL,
+            recorded_at      REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_ver_month ON versions(spreadsheet_name, mmyy, id);
+        CREATE TABLE IF NOT EXISTS duties (
+            version_id INTEGER NOT NULL,
+            name       TEXT NOT NULL,
+            branch     TEXT,
+            day        INTEGER NOT NULL,
+            date       TEXT NOT NULL,
+            weekday    INTEGER NOT NULL,
+            duty       TEXT NOT NULL,
+            day_type   TEXT NOT NULL,
+            points     REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_duties_ver ON duties(version_id, name);
+        CREATE TABLE IF NOT EXISTS people (
+            version_id INTEGER NOT NULL,
+            name       TEXT NOT NULL,
+            branch     TEXT,
+            offset     REAL,
+            status     TEXT,
+            est        REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_people_ver ON people(version_id);
+        CREATE TABLE IF NOT EXISTS adjustments (
+            version_id INTEGER NOT NULL,
+            df_row     INTEGER NOT NULL,
+            name       TEXT NOT NULL,
+            change     TEXT,
+            value      REAL
+        );
+    """ + CURRENT_VERSIONS_SQL + ";")
+    return conn
+
+
+def _float(v):
+    try:
+        return float(str(v).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _cell(row, i):
+    return row[i].strip() if i < len(row) and row[i] is not None else ""
+
+
+def day_type(d, holiday_days):
+    if d.day in holiday_days:
+        return "H"
+    if d.weekday() >= 5:
+        return "WE"
+    if d.weekday() == 4:
+        return "F"
+    return "WD"
+
+
+def record_month(spreadsheet_name, mmyy, d_grid, hol_rows=None):
+    """
+    Appends the month's D sheet (raw rows, header rows included) as a new
+    version. Returns the version id, or None if it matches the latest one.
+    """
+    month, year = int(mmyy[:2]), 2000 + int(mmyy[2:])
+    num_days = calendar.monthrange(year, month)[1]
+    holidays = holiday_index.from_rows(hol_rows or []).month_days(year, month)
+    raw = json.dumps([d_grid, sorted(holidays)], separators=(",", ":"))
+    content_hash = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    duties, people, adjustments = [], [], []
+    for row in d_grid[3:]:
+        name = _cell(row, 1).upper()
+        if not name:
+            continue
+        branch = _cell(row, 2).upper()
+        people.append((name, branch, _float(_cell(row, 42)), _cell(row, 43), _float(_cell(row, 44))))
+        for day in range(1, num_days + 1):
+            v = _cell(row, 3 + day).upper()
+            if v in ("D", "S"):
+                d = date(year, month, day)
+                dt = day_type(d, holidays)
+                duties.append((name, branch, day, d.isoformat(), d.weekday(), v, dt,
+                               DEFAULT_POINTS[dt] if v == "D" else 0.0))
+    for i, row in enumerate(d_grid[ADJ_FIRST_ROW:], start=ADJ_FIRST_ROW - 3):
+        name = _cell(row, 48).upper()
+        if name:
+            adjustments.append((i, name, _cell(row, 49).upper(), _float(_cell(row, 50))))
+
+    with _lock:
+        conn = _connect()
+        try:
+            latest = conn.execute(
+                "SELECT content_hash FROM versions WHERE spreadsheet_name = ? AND mmyy = ? ORDER BY id DESC LIMIT 1",
+                (spreadsheet_name, mmyy)
+            ).fetchone()
+            if latest and latest[0] == content_hash:
+                return None
+            with conn:
+                vid = conn.execute(
+                    "INSERT INTO versions (spreadsheet_name, mmyy, year, month, content_hash, recorded_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (spreadsheet_name, mmyy, year, month, content_hash, time.time())
+                ).lastrowid
+                conn.executemany("INSERT INTO duties VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                 [(vid,) + d for d in duties])
+                conn.executemany("INSERT INTO people VALUES (?, ?, ?, ?, ?, ?)",
+                                 [(vid,) + p for p in people])
+                conn.executemany("INSERT INTO adjustments VALUES (?, ?, ?, ?, ?)",
+                                 [(vid,) + a for a in adjustments])
+            return vid
+        finally:
+            conn.close()
+
+
+def forget_month(spreadsheet_name, mmyy):
+    """
+    Appends a tombstone for the month (its save was undone or its D sheet
+    deleted). Returns the version id, or None if there was nothing to forget.
+    """
+    month, year = int(mmyy[:2]), 2000 + int(mmyy[2:])
+    with _lock:
+        conn = _connect()
+        try:
+            latest = conn.execute(
+                "SELECT content_hash FROM versions WHERE spreadsheet_name = ? AND mmyy = ? ORDER BY id DESC LIMIT 1",
+                (spreadsheet_name, mmyy)
+            ).fetchone()
+            if latest is None or latest[0] == REMOVED:
+                return None
+            with conn:
+                return conn.execute(
+                    "INSERT INTO versions (spreadsheet_name, mmyy, year, month, content_hash, recorded_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (spreadsheet_name, mmyy, year, month, REMOVED, time.time())
+                ).lastrowid
+        finally:
+            conn.close()
+
+
+def sync_month(store, mmyy):
+    """
+    Reads {mmyy}D and Holiday in one batch and records them; forgets the month
+    if its D sheet no longer exists. Returns the version id or None.
+    """
+    try:
+        d_grid, hol_rows = store.read_ranges([storage.a1(f"{mmyy}D"), storage.a1("Holiday")])
+    except Exception:
+        if f"{mmyy}D" in store.list_sheets():
+            raise
+        return forget_month(store.title, mmyy)
+    return record_month(store.title, mmyy, d_grid, hol_rows)
+
+
+def sync_all(store):
+    """
+    Records every D sheet in the workbook (e.g. a first-time backfill) and
+    forgets recorded months whose D sheet is gone. Returns months recorded.
+    """
+    recorded = []
+    months = [m for m, kinds in store.list_months().items() if kinds["D"]]
+    for m in set(recorded_months(store.title)) - set(months):
+        forget_month(store.title, m)
+    if not months:
+        return recorded
+    grids = store.read_ranges([storage.a1(f"{m}D") for m in months] + [storage.a1("Holiday")])
+    hol_rows = grids[-1]
+    for m, grid in zip(months, grids[:-1]):
+        if record_month(store.title, m, grid, hol_rows):
+            recorded.append(m)
+    return recorded
+
+
+def _query(sql, args=()):
+    conn = _connect()
+    try:
+        return conn.execute(sql, args).fetchall()
+    finally:
+        conn.close()
+
+
+def recorded_months(spreadsheet_name):
+    """Months with history, oldest first: ['0126', '0226', ...]."""
+    rows = _query("SELECT mmyy FROM current_versions WHERE spreadsheet_name = ? ORDER BY year, month",
+                  (spreadsheet_name,))
+    return [m for (m,) in rows]
+
+
+def month_duties(spreadsheet_name, mmyy):
+    """[{name, branch, day, date, duty, day_type, points}] for the latest version of a month."""
+    rows = _query(
+        "SELECT d.name, d.branch, d.day, d.date, d.duty, d.day_type, d.points FROM duties d "
+        "JOIN current_versions v ON d.version_id = v.id "
+        "WHERE v.spreadsheet_name = ? AND v.mmyy = ? ORDER BY d.day, d.name",
+        (spreadsheet_name, mmyy)
+    )
+    keys = ("name", "branch", "day", "date", "duty", "day_type", "points")
+    return [dict(zip(keys, r)) for r in rows]
+
+
+def person_totals(spreadsheet_name, years=None):
+    """
+    Per person and year: D counts by day type, standby count and points.
+    [{name, year, WD, F, WE, H, S, duties, points}], sorted by year then name.
+    """
+    sql = (
+        "SELECT d.name, v.year, "
+        "SUM(d.duty = 'D' AND d.day_type = 'WD'), SUM(d.duty = 'D' AND d.day_type = 'F'), "
+        "SUM(d.duty = 'D' AND d.day_type = 'WE'), SUM(d.duty = 'D' AND d.day_type = 'H'), "
+        "SUM(d.duty = 'S'), SUM(d.duty = 'D'), SUM(d.points) "
+        "FROM duties d JOIN current_versions v ON d.version_id = v.id "
+        "WHERE v.spreadsheet_name = ?"
+    )
+    args = [spreadsheet_name]
+    if years:
+        sql += f" AND v.year IN ({','.join('?' for _ in years)})"
+        args += list(years)
+    sql += " GROUP BY d.name, v.year ORDER BY v.year, d.name"
+    keys = ("name", "year", "WD", "F", "WE", "H", "S", "duties", "points")
+    return [dict(zip(keys, r)) for r in _query(sql, args)]
+
+
+def last_duty_dates(spreadsheet_name, before):
+    """{NAME: date} of each person's latest D strictly before `before`, across all months."""
+    rows = _query(
+        "SELECT d.name, MAX(d.date) FROM duties d JOIN current_versions v ON d.version_id = v.id "
+        "WHERE v.spreadsheet_name = ? AND d.duty = 'D' AND d.date < ? GROUP BY d.name",
+        (spreadsheet_name, before.isoformat())
+    )
+    return {name: date.fromisoformat(d) for name, d in rows}
+
+
+def month_workers(spreadsheet_name, mmyy):
+    """
+    {'weekday'|'friday'|'weekend': {NAME}} of people on D in a month, by
+    calendar weekday (holidays are not split out, matching the engine's
+    last-month rule).
+    """
+    workers = {"weekday": set(), "friday": set(), "weekend": set()}
+    for name, wd in _query(
+        "SELECT DISTINCT d.name, d.weekday FROM duties d JOIN current_versions v ON d.version_id = v.id "
+        "WHERE v.spreadsheet_name = ? AND v.mmyy = ? AND d.duty = 'D'",
+        (spreadsheet_name, mmyy)
+    ):
+        workers["weekend" if wd >= 5 else "friday" if wd == 4 else "weekday"].add(name)
+    return workers
+
+
+def manual_adjustments(spreadsheet_name, mmyy):
+    """[(df_row, NAME, change_text, value)] logged in the month's D sheet (AW:AY from row 115)."""
+    return _query(
+        "SELECT a.df_row, a.name, a.change, a.value FROM adjustments a "
+        "JOIN current_versions v ON a.version_id = v.id "
+        "WHERE v.spreadsheet_name = ? AND v.mmyy = ? ORDER BY a.df_row",
+        (spreadsheet_name, mmyy)
+    )
+
+
+def duty_dates(spreadsheet_name, year):
+    """{NAME: {date, ...}} of every recorded D in a calendar year."""
+    dates = {}
+    for name, d in _query(
+        "SELECT d.name, d.date FROM duties d JOIN current_versions v ON d.version_id = v.id "
+        "WHERE v.spreadsheet_name = ? AND v.year = ? AND d.duty = 'D'",
+        (spreadsheet_name, year)
+    ):
+        dates.setdefault(name, set()).add(date.fromisoformat(d))
+    return dates
+
+
+def latest_offsets(spreadsheet_name):
+    """{NAME: offset} from the most recent recorded month (AQ of its D sheet)."""
+    rows = _query(
+        "SELECT p.name, p.offset FROM people p WHERE p.version_id = ("
+        "  SELECT id FROM current_versions WHERE spreadsheet_name = ? ORDER BY year DESC, month DESC LIMIT 1)",
+        (spreadsheet_name,)
+    )
+    return {name: off for name, off in rows if off is not None}
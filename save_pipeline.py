@@ -0,0 +1,153 @@
+"""
+"Save the Optimisation" as a staged, resumable pipeline.
+
+  archive ─┬─► output        (pre-save snapshot, then the D sheet ...)
+           └─► next_month    (... and next month's C sheet, concurrently)
+
+The archive is a snapshot_store snapshot of the sheets the save touches,
+taken and stored before anything is written. Writes only start once it is
+checkpointed as done, and a re-run reuses that snapshot, so the "pre-save"
+state undo restores is never read from sheets a failed run already wrote.
+output and next_month are independent (the template is built from {mmyy}C
+and Holiday, never the D sheet), so they run side by side.
+
+Every stage's outcome is checkpointed to a local JSON file keyed by
+spreadsheet, month and a digest of the plan. Re-running the same plan skips
+stages already marked done, so a failure in next_month no longer repeats
+the archive copy. A different plan for the same month starts a fresh run.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import storage
+import snapshot_store
+import roster_history
+from local_data import data_path
+
+_checkpoint_lock = threading.Lock()
+
+STAGES = ("archive", "output", "next_month")
+STAGE_LABELS = {
+    "archive": "🧳 Snapshot",
+    "output": "✏️ Output (D sheet)",
+    "next_month": "⏭️ Next month template",
+}
+
+
+def plan_digest(planned_df, norm_scale):
+    """Stable short hash of a solved plan."""
+    h = hashlib.sha1(planned_df.to_csv(index=False).encode("utf-8"))
+    h.update(f"{float(norm_scale):.6f}".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def _checkpoint_path(spreadsheet_name, mmyy):
+    safe = "".join(ch if ch.isalnum() else "_" for ch in spreadsheet_name)
+    return data_path("save_runs", f"{safe}_{mmyy}.json")
+
+
+def load_checkpoint(spreadsheet_name, mmyy):
+    """Latest run for a month, or None."""
+    try:
+        with open(_checkpoint_path(spreadsheet_name, mmyy)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_checkpoint(run):
+    path = _checkpoint_path(run["spreadsheet_name"], run["mmyy"])
+    with _checkpoint_lock:
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(run, f, indent=1)
+        os.replace(tmp, path)
+
+
+def clear_checkpoint(spreadsheet_name, mmyy):
+    """Forgets the month's run, e.g. after an undo, so the next save starts fresh."""
+    try:
+        os.remove(_checkpoint_path(spreadsheet_name, mmyy))
+    except OSError:
+        pass
+
+
+def pending_stages(spreadsheet_name, mmyy, digest):
+    """Stages still to run for this plan (all of them if it was never started)."""
+    run = load_checkpoint(spreadsheet_name, mmyy)
+    if not run or run.get("digest") != digest:
+        return list(STAGES)
+    return [s for s in STAGES if run["stages"].get(s, {}).get("status") != "done"]
+
+
+def run_save(client, spreadsheet_name, mmyy, planned_df, norm_scale, ranges):
+    """
+    Runs (or resumes) the save. Returns the checkpoint dict:
+      { digest, stages: { name: {status, error, seconds, result} }, complete }
+    The archive stage's result is the snapshot id. Stage errors are recorded,
+    not raised; nothing is written until the archive stage is done.
+    """
+    # loads OR-Tools; kept out of module import so the save page's checkpoint helpers stay light
+    import planner_engine
+
+    digest = plan_digest(planned_df, norm_scale)
+    run = load_checkpoint(spreadsheet_name, mmyy)
+    if not run or run.get("digest") != digest:
+        run = {
+            "spreadsheet_name": spreadsheet_name,
+            "mmyy": mmyy,
+            "digest": digest,
+            "created_at": time.time(),
+            "stages": {s: {"status": "pending"} for s in STAGES},
+        }
+
+    run_lock = threading.Lock()   # the write stages checkpoint from two threads
+
+    def _stage(name, fn):
+        if run["stages"][name].get("status") == "done":
+            return True
+        start = time.perf_counter()
+        try:
+            result = fn()
+            outcome = {"status": "done", "result": result}
+        except Exception as e:
+            outcome = {"status": "failed", "error": str(e)}
+        outcome["seconds"] = round(time.perf_counter() - start, 2)
+        with run_lock:
+            run["stages"][name] = outcome
+            _write_checkpoint(run)
+        return outcome["status"] == "done"
+
+    store = storage.for_client(client, spreadsheet_name)
+
+    def _archive():
+        return snapshot_store.snapshot_month(store, mmyy)
+
+    def _output():
+        result = planner_engine.create_backup_and_output(client, spreadsheet_name, mmyy, planned_df, norm_scale, ranges)
+        try:
+            roster_history.sync_month(store, mmyy)
+        except Exception as e:
+            print(f"⚠️ Roster history not updated for {mmyy}: {e}")
+        return result
+
+    def _next_month():
+        next_name, next_file_name = planner_engine.generate_next_month_template(
+            client, spreadsheet_name, mmyy, planned_df, ranges
+        )
+        return {"next_name": next_name, "next_file_name": next_file_name}
+
+    # the snapshot must be stored before any write touches the sheets
+    if _stage("archive", _archive):
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="save") as pool:
+            jobs = [pool.submit(_stage, "output", _output), pool.submit(_stage, "next_month", _next_month)]
+            for job in jobs:
+                job.result()
+
+    run["complete"] = all(run["stages"][s].get("status") == "done" for s in STAGES)
+    _write_checkpoint(run)
+    return run
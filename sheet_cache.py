@@ -0,0 +1,133 @@
+"""
+Revision-aware cache for whole-sheet reads, shared by every session.
+
+Each entry remembers the spreadsheet's Drive modifiedTime at load and the
+sheet titles it was built from. Freshness is confirmed with one cheap Drive
+metadata call (at most once per CHECK_INTERVAL per spreadsheet):
+
+  - modifiedTime unchanged          → every entry is still valid
+  - changed after our own write     → only entries reading the sheets that
+                                      write touched were dropped (invalidate());
+                                      the rest are carried forward
+  - changed by someone else         → all entries for that spreadsheet reload
+
+  sheet_cache.get(client, "MASTER SHEET", "0326D", ["0326D"], loader)
+  sheet_cache.invalidate("MASTER SHEET", ["0326D"])   # after writing 0326D
+
+An edit made directly in Google Sheets between one of our writes and the
+next freshness check is indistinguishable from our own write; the affected
+entries stay until MAX_AGE, like the old TTL.
+"""
+import time
+import threading
+from collections import defaultdict
+
+CHECK_INTERVAL = 15   # seconds between modifiedTime checks per spreadsheet
+MAX_AGE = 600         # hard ceiling on any entry's age (seconds)
+
+_lock = threading.Lock()
+_key_locks = defaultdict(threading.Lock)
+_entries = {}    # (spreadsheet_name, key) -> {"value", "sheets", "modified", "loaded_at"}
+_meta = {}       # spreadsheet_name -> {"modified", "checked_at", "own_write"}
+_stats = {"hits": 0, "loads": 0, "checks": 0}
+
+
+def _remote_modified(client, spreadsheet_name):
+    """Drive modifiedTime for a spreadsheet (one files.list call, drive bucket)."""
+    files = client.list_spreadsheet_files(title=spreadsheet_name)
+    return files[0].get("modifiedTime") if files else None
+
+
+def _check(client, spreadsheet_name):
+    """Returns the current modifiedTime, refreshing it if the last check is old."""
+    with _lock:
+        meta = _meta.get(spreadsheet_name)
+        if meta and not meta["own_write"] and time.time() - meta["checked_at"] < CHECK_INTERVAL:
+            return meta["modified"]
+
+    try:
+        modified = _remote_modified(client, spreadsheet_name)
+    except Exception as e:
+        print(f"⚠️ modifiedTime check failed for {spreadsheet_name}: {e}")
+        with _lock:
+            return meta["modified"] if meta else None
+
+    with _lock:
+        _stats["checks"] += 1
+        meta = _meta.get(spreadsheet_name)
+        if meta and modified != meta["modified"]:
+            for key in [k for k in _entries if k[0] == spreadsheet_name]:
+                if meta["own_write"]:
+                    # our write already dropped what it touched; carry the rest forward
+                    _entries[key]["modified"] = modified
+                else:
+                    _entries.pop(key)
+        _meta[spreadsheet_name] = {"modified": modified, "checked_at": time.time(), "own_write": False}
+        return modified
+
+
+def revision(client, spreadsheet_name):
+    """The spreadsheet's Drive modifiedTime (checked at most once per CHECK_INTERVAL)."""
+    return _check(client, spreadsheet_name)
+
+
+def get(client, spreadsheet_name, key, sheets, loader):
+    """
+    Returns loader() for (spreadsheet_name, key), reusing the cached value while
+    the spreadsheet revision is unchanged. `sheets` lists the sheet titles the
+    value is built from, so invalidate() can drop it precisely. Loads are
+    single-flight per key.
+    """
+    modified = _check(client, spreadsheet_name)
+    cache_key = (spreadsheet_name, key)
+
+    def _cached():
+        entry = _entries.get(cache_key)
+        if entry and entry["modified"] == modified and time.time() - entry["loaded_at"] < MAX_AGE:
+            _stats["hits"] += 1
+            return True, entry["value"]
+        return False, None
+
+    with _lock:
+        hit, value = _cached()
+        if hit:
+            return value
+        key_lock = _key_locks[cache_key]
+
+    with key_lock:
+        with _lock:
+            hit, value = _cached()
+            if hit:
+                return value
+        value = loader()
+        with _lock:
+            _stats["loads"] += 1
+            meta = _meta.get(spreadsheet_name)
+            # skip storing if a write landed while we were loading
+            if meta is None or (meta["modified"] == modified and not meta["own_write"]):
+                _entries[cache_key] = {
+                    "value": value, "sheets": set(sheets),
+                    "modified": modified, "loaded_at": time.time(),
+                }
+        return value
+
+
+def invalidate(spreadsheet_name, sheets=None):
+    """
+    Call after writing to `sheets` of a spreadsheet. Drops only entries built
+    from those sheets (all entries if sheets is None) and forces a modifiedTime
+    check on the next read so the remaining entries can be carried forward.
+    """
+    touched = set(sheets) if sheets is not None else None
+    with _lock:
+        for key in [k for k in _entries if k[0] == spreadsheet_name]:
+            if touched is None or _entries[key]["sheets"] & touched:
+                _entries.pop(key)
+        if spreadsheet_name in _meta:
+            _meta[spreadsheet_name]["own_write"] = True
+
+
+def stats():
+    """{'hits', 'loads', 'checks', 'entries'} since process start."""
+    with _lock:
+        return {**_stats, "entries": len(_entries)}
@@ -0,0 +1,315 @@
+"""
+Incremental snapshot history for the sheets a save touches.
+
+Instead of copying the whole spreadsheet on Drive, each save records only
+{mmyy}C, {mmyy}D and the next month's C sheet. Sheets are read with
+their formulas in one batched read and stored column by column as
+zlib-compressed JSON. Blobs are content-addressed (sha256) so unchanged
+sheets are shared between snapshots.
+
+  snapshots/index.sqlite3         one row per snapshot: {sheet: hash | null}
+  snapshots/blobs/ab/abcd….json.z one blob per distinct sheet grid
+
+A null hash means the sheet did not exist when the snapshot was taken; a
+restore deletes it. Restoring is a local read, one read for sheet sizes and
+one batch write.
+
+Undo / redo of a save (shared by every session, since it lives in the index):
+  undo_save()  takes a "pre-undo" snapshot of the current sheets, restores
+               the latest "pre-save" snapshot and marks it undone
+  redo_save()  restores that "pre-undo" snapshot and marks the save active again
+Both restore only month_sheets() and then re-sync the month's roster_history
+entry.
+"""
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+from datetime import datetime
+
+import storage
+import roster_history
+from local_data import data_path
+
+INDEX_PATH = data_path("snapshots", "index.sqlite3")
+BLOB_DIR = os.path.dirname(data_path("snapshots", "blobs", ""))
+
+
+def _connect():
+    conn = sqlite3.connect(INDEX_PATH, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS snapshots (
+            id               INTEGER PRIMARY KEY AUTOINCREMENT,
+            spreadsheet_name TEXT NOT NULL,
+            mmyy             TEXT NOT NULL,
+            label            TEXT NOT NULL,
+            created_at       REAL NOT NULL,
+            sheets           TEXT NOT NULL,
+            new_bytes        INTEGER NOT NULL DEFAULT 0,
+            status           TEXT NOT NULL DEFAULT 'active',
+            redo_id          INTEGER,
+            actor            TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_snap_month ON snapshots(spreadsheet_name, mmyy)")
+    return conn
+
+
+def next_mmyy(mmyy):
+    """'1226' → '0127'."""
+    m, y = int(mmyy[:2]), int(mmyy[2:])
+    return f"{1 if m == 12 else m + 1:02d}{(y + 1 if m == 12 else y) % 100:02d}"
+
+
+def month_sheets(mmyy):
+    """Sheets written by a save of `mmyy`."""
+    return [f"{mmyy}C", f"{mmyy}D", f"{next_mmyy(mmyy)}C"]
+
+
+def _blob_path(digest):
+    return data_path("snapshots", "blobs", digest[:2], f"{digest}.json.z")
+
+
+def _encode(grid):
+    """Row grid → canonical column-major JSON bytes."""
+    width = max((len(r) for r in grid), default=0)
+    cols = []
+    for c in range(width):
+        col = [r[c] if c < len(r) else "" for r in grid]
+        while col and col[-1] == "":
+            col.pop()
+        cols.append(col)
+    return json.dumps({"rows": len(grid), "cols": cols}, separators=(",", ":")).encode("utf-8")
+
+
+def _decode(raw):
+    data = json.loads(raw)
+    cols = data["cols"]
+    grid = [["" for _ in cols] for _ in range(data["rows"])]
+    for c, col in enumerate(cols):
+        for r, v in enumerate(col):
+            grid[r][c] = v
+    return grid
+
+
+def capture(store, sheets):
+    """Reads `sheets` (with formulas) in one batch. Returns {title: grid | None}."""
+    titles = set(store.list_sheets())
+    present = [s for s in sheets if s in titles]
+    grids = dict(zip(present, store.read_ranges([storage.a1(s) for s in present], formulas=True))) if present else {}
+    return {s: grids.get(s) for s in sheets}
+
+
+def save(spreadsheet_name, mmyy, grids, label="pre-save"):
+    """Stores captured grids; returns the snapshot id. Only new blobs hit the disk."""
+    hashes = {}
+    new_bytes = 0
+    for title, grid in grids.items():
+        if grid is None:
+            hashes[title] = None
+            continue
+        raw = _encode(grid)
+        digest = hashlib.sha256(raw).hexdigest()
+        path = _blob_path(digest)
+        if not os.path.exists(path):
+            packed = zlib.compress(raw, 6)
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(packed)
+            os.replace(tmp, path)
+            new_bytes += len(packed)
+        hashes[title] = digest
+
+    conn = _connect()
+    try:
+        with conn:
+            cur = conn.execute(
+                "INSERT INTO snapshots (spreadsheet_name, mmyy, label, created_at, sheets, new_bytes) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (spreadsheet_name, mmyy, label, time.time(), json.dumps(hashes), new_bytes)
+            )
+            return cur.lastrowid
+    finally:
+        conn.close()
+
+
+def snapshot_month(store, mmyy, label="pre-save"):
+    """capture() + save() for the sheets a save of `mmyy` touches."""
+    return save(store.title, mmyy, capture(store, month_sheets(mmyy)), label)
+
+
+def _latest_save(spreadsheet_name, mmyy, status):
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT id, created_at, redo_id, actor FROM snapshots "
+            "WHERE spreadsheet_name = ? AND mmyy = ? AND label = 'pre-save' AND status = ? "
+            "ORDER BY id DESC LIMIT 1",
+            (spreadsheet_name, mmyy, status)
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    i, ts, redo_id, actor = row
+    return {"id": i, "created_at": ts, "redo_id": redo_id, "actor": actor or "",
+            "when": datetime.fromtimestamp(ts).strftime("%d %b %Y %H:%M")}
+
+
+def undo_state(spreadsheet_name, mmyy):
+    """
+    {'undo': latest active save or None, 'redo': latest undone save or None}.
+    Redo is only offered when it is newer than anything still undoable.
+    """
+    undo = _latest_save(spreadsheet_name, mmyy, "active")
+    redo = _latest_save(spreadsheet_name, mmyy, "undone")
+    if redo and undo and undo["id"] > redo["id"]:
+        redo = None
+    return {"undo": undo, "redo": redo}
+
+
+def _set_status(snapshot_id, status, redo_id=None, actor=None):
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("UPDATE snapshots SET status = ?, redo_id = COALESCE(?, redo_id), actor = ? WHERE id = ?",
+                         (status, redo_id, actor, snapshot_id))
+    finally:
+        conn.close()
+
+
+def undo_save(store, mmyy, actor=""):
+    """Reverts the latest save of `mmyy`. Returns log lines."""
+    target = _latest_save(store.title, mmyy, "active")
+    if target is None:
+        raise ValueError(f"No save of {mmyy} to undo.")
+    redo_id = snapshot_month(store, mmyy, label="pre-undo")
+    logs = restore(store, target["id"], sheets=month_sheets(mmyy))
+    _set_status(target["id"], "undone", redo_id=redo_id, actor=actor)
+    return logs + _sync_history(store, mmyy)
+
+
+def redo_save(store, mmyy, actor=""):
+    """Re-applies the most recently undone save of `mmyy`. Returns log lines."""
+    target = undo_state(store.title, mmyy)["redo"]
+    if target is None or not target["redo_id"]:
+        raise ValueError(f"Nothing to redo for {mmyy}.")
+    logs = restore(store, target["redo_id"], sheets=month_sheets(mmyy))
+    _set_status(target["id"], "active", actor=actor)
+    return logs + _sync_history(store, mmyy)
+
+
+def _sync_history(store, mmyy):
+    # the restored D sheet (or its absence) replaces whatever the undone save recorded
+    try:
+        roster_history.sync_month(store, mmyy)
+    except Exception as e:
+        return [f"⚠️ Roster history not updated for {mmyy}: {e}"]
+    return []
+
+
+def list_snapshots(spreadsheet_name, mmyy=None):
+    """Newest first: [{id, mmyy, label, created_at, when, sheets, new_bytes}]."""
+    conn = _connect()
+    try:
+        q = "SELECT id, mmyy, label, created_at, sheets, new_bytes FROM snapshots WHERE spreadsheet_name = ?"
+        args = [spreadsheet_name]
+        if mmyy:
+            q += " AND mmyy = ?"
+            args.append(mmyy)
+        q += " ORDER BY id DESC"
+        return [{
+            "id": i, "mmyy": m, "label": label, "created_at": ts,
+            "when": datetime.fromtimestamp(ts).strftime("%d %b %Y %H:%M"),
+            "sheets": json.loads(sheets), "new_bytes": nb,
+        } for i, m, label, ts, sheets, nb in conn.execute(q, args)]
+    finally:
+        conn.close()
+
+
+def get_snapshot(snapshot_id):
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT id, spreadsheet_name, mmyy, label, created_at, sheets FROM snapshots WHERE id = ?",
+            (snapshot_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        raise KeyError(f"Snapshot {snapshot_id} not found")
+    i, name, m, label, ts, sheets = row
+    return {"id": i, "spreadsheet_name": name, "mmyy": m, "label": label,
+            "created_at": ts, "sheets": json.loads(sheets)}
+
+
+def load(snapshot_id):
+    """{title: grid | None} for a snapshot, read from local blobs."""
+    grids = {}
+    for title, digest in get_snapshot(snapshot_id)["sheets"].items():
+        if digest is None:
+            grids[title] = None
+        else:
+            with open(_blob_path(digest), "rb") as f:
+                grids[title] = _decode(zlib.decompress(f.read()))
+    return grids
+
+
+def restore(store, snapshot_id, sheets=None):
+    """
+    Puts the snapshot's sheets back: grids are rewritten in one batch write
+    (formulas included), sheets that did not exist are deleted, and missing
+    sheets are recreated from the month's C sheet first. Returns log lines.
+    """
+    snap = get_snapshot(snapshot_id)
+    grids = load(snapshot_id)
+    if sheets is not None:
+        grids = {t: g for t, g in grids.items() if t in sheets}
+
+    logs = []
+    titles = set(store.list_sheets())
+    for title, grid in grids.items():
+        if grid is None and title in titles:
+            store.delete_sheet(title)
+            titles.discard(title)
+            logs.append(f"🗑️ Removed {title} (did not exist at snapshot)")
+        elif grid is not None and title not in titles:
+            template = f"{snap['mmyy']}C"
+            store.duplicate_sheet(template if template in titles else title, title)
+            titles.add(title)
+
+    keep = [t for t, g in grids.items() if g is not None]
+    current = dict(zip(keep, store.read_ranges([storage.a1(t) for t in keep]))) if keep else {}
+
+    updates = []
+    for title in keep:
+        grid = grids[title]
+        # blank out anything the sheet has grown since the snapshot
+        rows = max(len(grid), len(current.get(title, [])))
+        cols = max([len(r) for r in grid] + [len(r) for r in current.get(title, [])] + [1])
+        block = [[(grid[r][c] if r < len(grid) and c < len(grid[r]) else "") for c in range(cols)]
+                 for r in range(rows)]
+        if block:
+            updates.append({"range": storage.a1(title, f"A1:{storage.col_letter(cols)}{rows}"),
+                            "values": block})
+        logs.append(f"↩️ Restored {title}")
+    store.batch_write(updates)
+    return logs
+
+
+def stats():
+    """{'snapshots', 'blobs', 'blob_bytes'} for the whole store."""
+    conn = _connect()
+    try:
+        n = conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+    finally:
+        conn.close()
+    blobs, size = 0, 0
+    for root, _, files in os.walk(BLOB_DIR):
+        for f in files:
+            if f.endswith(".json.z"):
+                blobs += 1
+                size += os.path.getsize(os.path.join(root, f))
+    return {"snapshots": n, "blobs": blobs, "blob_bytes": size}
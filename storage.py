@@ -0,0 +1,464 @@
+"""
+Storage backends for the planner's spreadsheet.
+
+The engines only need a handful of operations on the workbook, so they talk
+to a Storage object instead of gspread directly:
+
+  list_sheets()                    sheet titles in tab order
+  list_months()                    {"0326": {"C": True, "D": False}, ...}
+  read_grid(sheet)                 whole sheet, rows padded to equal length
+  read_ranges(ranges)              batched A1 reads ("'0326C'!A:B"), API-style
+                                   (trailing blanks trimmed, missing sheet → error);
+                                   formulas=True returns formulas instead of values
+  batch_write(updates)             [{"range": "'0326D'!AQ4", "values": [[1.5]]}]
+  apply_row_changes(changes)       row inserts / deletes / cell sets applied in
+                                   order as one structural write, e.g.
+                                   {"sheet": "Namelist", "op": "insert", "row": 7,
+                                    "template_row": 2, "values": {1: "ALICE"}}
+                                   (rows 1-based, columns 0-based, a list value
+                                   fills consecutive columns)
+  duplicate_sheet(src, new_name)   copy a sheet to the end, replacing new_name
+  delete_sheet(name)
+  format_month_sheet(sheet, n)     date-format the E3 header and hide day
+                                   columns past day n (E:AI)
+
+GSpreadStorage wraps a live spreadsheet. LocalStorage keeps the same grid in
+a SQLite file (optionally seeded from / exported to .xlsx), so solves, saves
+and user submissions can run and be benchmarked without Google:
+
+  store = storage.LocalStorage("bench.sqlite3")
+  store.import_xlsx("MASTER SHEET.xlsx")
+  bundle, warnings = planner_engine.load_data_bundle(store, "MASTER SHEET", "0326")
+
+Engine functions accept either a gspread client or a Storage as `client`;
+for_client() picks the backend.
+
+Values are stored as displayed strings. LocalStorage does not evaluate
+formulas — import an .xlsx saved with computed values.
+"""
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range, rowcol_to_a1
+
+
+DAY_COL_START = 4   # column E (0-indexed)
+DAY_COL_END = 35    # column AI, exclusive
+
+
+class SheetNotFound(KeyError):
+    """Raised by every backend when a named sheet does not exist."""
+
+
+def a1(sheet, rng=""):
+    """Quote a sheet title for A1 notation, e.g. ('0326C', 'E4') → "'0326C'!E4"."""
+    quoted = "'" + sheet.replace("'", "''") + "'"
+    return f"{quoted}!{rng}" if rng else quoted
+
+
+def col_letter(n):
+    """1-based column index → letters, e.g. 1 → A, 47 → AU."""
+    return rowcol_to_a1(1, n)[:-1]
+
+
+def split_a1(a1):
+    """"'0326C'!A:B" → ("0326C", "A:B"); "Namelist" → ("Namelist", "")."""
+    if "!" in a1:
+        sheet, rng = a1.rsplit("!", 1)
+    else:
+        sheet, rng = a1, ""
+    if sheet.startswith("'") and sheet.endswith("'"):
+        sheet = sheet[1:-1].replace("''", "'")
+    return sheet, rng
+
+
+def _cell_str(v):
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return "TRUE" if v else "FALSE"
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+
+def _trim(rows):
+    """Drops trailing blank cells/rows the way the Sheets values API does."""
+    out = [list(r) for r in rows]
+    for r in out:
+        while r and r[-1] == "":
+            r.pop()
+    while out and not out[-1]:
+        out.pop()
+    return out
+
+
+def pad_rows(rows):
+    """Pads rows to equal length, like gspread's get_all_values()."""
+    width = max((len(r) for r in rows), default=0)
+    return [list(r) + [""] * (width - len(r)) for r in rows]
+
+
+def _cell_values(values):
+    """{col: value | [values]} → [(col, value)] one per cell."""
+    cells = []
+    for col, v in sorted(values.items()):
+        if isinstance(v, (list, tuple)):
+            cells.extend((col + i, x) for i, x in enumerate(v))
+        else:
+            cells.append((col, v))
+    return cells
+
+
+def _cell_data(v):
+    """Python value → Sheets CellData (userEnteredValue)."""
+    if v is None or v == "":
+        return {}
+    if isinstance(v, bool):
+        return {"userEnteredValue": {"boolValue": v}}
+    if isinstance(v, (int, float)):
+        return {"userEnteredValue": {"numberValue": v}}
+    v = str(v)
+    if v.startswith("="):
+        return {"userEnteredValue": {"formulaValue": v}}
+    return {"userEnteredValue": {"stringValue": v}}
+
+
+def _months_from_titles(titles):
+    months = {}
+    for t in titles:
+        if len(t) == 5 and t[:4].isdigit() and t[4] in ("C", "D"):
+            months.setdefault(t[:4], {"C": False, "D": False})[t[4]] = True
+    # sort chronologically by (yy, mm)
+    return dict(sorted(months.items(), key=lambda kv: (kv[0][2:], kv[0][:2])))
+
+
+class Storage(ABC):
+    """Interface shared by every backend. See module docstring."""
+
+    title = ""
+
+    @abstractmethod
+    def list_sheets(self):
+        ...
+
+    def list_months(self):
+        return _months_from_titles(self.list_sheets())
+
+    @abstractmethod
+    def read_grid(self, sheet):
+        ...
+
+    @abstractmethod
+    def read_ranges(self, ranges, formulas=False):
+        ...
+
+    @abstractmethod
+    def batch_write(self, updates):
+        ...
+
+    @abstractmethod
+    def apply_row_changes(self, changes):
+        ...
+
+    @abstractmethod
+    def duplicate_sheet(self, source, new_name):
+        ...
+
+    @abstractmethod
+    def delete_sheet(self, name):
+        ...
+
+    @abstractmethod
+    def format_month_sheet(self, sheet, num_days):
+        ...
+
+
+class GSpreadStorage(Storage):
+    """A live Google spreadsheet."""
+
+    def __init__(self, client, spreadsheet_name):
+        self.client = client
+        self.title = spreadsheet_name
+        self._sh = None
+
+    @property
+    def sh(self):
+        if self._sh is None:
+            self._sh = self.client.open(self.title)
+        return self._sh
+
+    def list_sheets(self):
+        return [ws.title for ws in self.sh.worksheets()]
+
+    def _ws(self, sheet):
+        try:
+            return self.sh.worksheet(sheet)
+        except WorksheetNotFound:
+            raise SheetNotFound(sheet)
+
+    def read_grid(self, sheet):
+        return self._ws(sheet).get_all_values()
+
+    def read_ranges(self, ranges, formulas=False):
+        params = {"valueRenderOption": "FORMULA"} if formulas else None
+        value_ranges = self.sh.values_batch_get(ranges, params=params).get("valueRanges", [])
+        return [vr.get("values", []) for vr in value_ranges]
+
+    def batch_write(self, updates):
+        if updates:
+            self.sh.values_batch_update({"valueInputOption": "USER_ENTERED", "data": updates})
+
+    def apply_row_changes(self, changes):
+        if not changes:
+            return
+        ids = {ws.title: ws.id for ws in self.sh.worksheets()}
+        requests = []
+        for ch in changes:
+            if ch["sheet"] not in ids:
+                raise SheetNotFound(ch["sheet"])
+            sid, r0 = ids[ch["sheet"]], ch["row"] - 1
+            if ch["op"] == "insert":
+                requests.append({"insertDimension": {
+                    "range": {"sheetId": sid, "dimension": "ROWS", "startIndex": r0, "endIndex": r0 + 1},
+                    "inheritFromBefore": False
+                }})
+                if ch.get("template_row"):
+                    # the template moved down if it sat at or below the new row
+                    src = ch["template_row"] - 1 + (1 if ch["template_row"] >= ch["row"] else 0)
+                    requests.append({"copyPaste": {
+                        "source": {"sheetId": sid, "startRowIndex": src, "endRowIndex": src + 1,
+                                   "startColumnIndex": 0, "endColumnIndex": 70},
+                        "destination": {"sheetId": sid, "startRowIndex": r0, "endRowIndex": r0 + 1,
+                                        "startColumnIndex": 0, "endColumnIndex": 70},
+                        "pasteType": "PASTE_FORMULA",
+                        "pasteOrientation": "NORMAL"
+                    }})
+            elif ch["op"] == "delete":
+                requests.append({"deleteDimension": {
+                    "range": {"sheetId": sid, "dimension": "ROWS", "startIndex": r0, "endIndex": r0 + 1}
+                }})
+            for col, v in _cell_values(ch.get("values", {})):
+                requests.append({"updateCells": {
+                    "start": {"sheetId": sid, "rowIndex": r0, "columnIndex": col},
+                    "rows": [{"values": [_cell_data(v)]}],
+                    "fields": "userEnteredValue"
+                }})
+        self.sh.batch_update({"requests": requests})
+
+    def duplicate_sheet(self, source, new_name):
+        try:
+            self.sh.del_worksheet(self.sh.worksheet(new_name))
+        except Exception:
+            pass
+        source_ws = self._ws(source)
+        self.sh.duplicate_sheet(source_ws.id, insert_sheet_index=len(self.sh.worksheets()),
+                                new_sheet_name=new_name)
+
+    def delete_sheet(self, name):
+        self.sh.del_worksheet(self._ws(name))
+
+    def format_month_sheet(self, sheet, num_days):
+        ws_id = self._ws(sheet).id
+        header_format = {
+            "numberFormat": {"type": "DATE", "pattern": "dd"},
+            "horizontalAlignment": "LEFT",
+            "textFormat": {"bold": True}
+        }
+        requests = [{
+            "repeatCell": {
+                "range": {"sheetId": ws_id, "startRowIndex": 2, "endRowIndex": 3,
+                          "startColumnIndex": DAY_COL_START, "endColumnIndex": DAY_COL_START + 1},
+                "cell": {"userEnteredFormat": header_format},
+                "fields": "userEnteredFormat(numberFormat,horizontalAlignment,textFormat)"
+            }
+        }, {
+            "updateDimensionProperties": {
+                "range": {"sheetId": ws_id, "dimension": "COLUMNS",
+                          "startIndex": DAY_COL_START, "endIndex": DAY_COL_END},
+                "properties": {"hiddenByUser": False},
+                "fields": "hiddenByUser"
+            }
+        }]
+        if num_days < 31:
+            requests.append({
+                "updateDimensionProperties": {
+                    "range": {"sheetId": ws_id, "dimension": "COLUMNS",
+                              "startIndex": DAY_COL_START + num_days, "endIndex": DAY_COL_END},
+                    "properties": {"hiddenByUser": True},
+                    "fields": "hiddenByUser"
+                }
+            })
+        self.sh.batch_update({"requests": requests})
+
+
+class LocalStorage(Storage):
+    """
+    Workbook held in SQLite: one row per sheet with its grid as JSON.
+    Thread-safe; every call is its own transaction.
+    """
+
+    def __init__(self, path, title="MASTER SHEET"):
+        self.path = path
+        self.title = title
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sheets (
+                    title       TEXT PRIMARY KEY,
+                    position    INTEGER NOT NULL,
+                    grid        TEXT NOT NULL,
+                    hidden_cols TEXT NOT NULL DEFAULT '[]'
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _grid(self, conn, sheet):
+        row = conn.execute("SELECT grid FROM sheets WHERE title = ?", (sheet,)).fetchone()
+        if row is None:
+            raise SheetNotFound(sheet)
+        return json.loads(row[0])
+
+    def list_sheets(self):
+        with self._connect() as conn:
+            return [t for (t,) in conn.execute("SELECT title FROM sheets ORDER BY position")]
+
+    def read_grid(self, sheet):
+        with self._connect() as conn:
+            return pad_rows(self._grid(conn, sheet))
+
+    def read_ranges(self, ranges, formulas=False):
+        # local grids hold values only, so formulas=True reads the same thing
+        out = []
+        with self._connect() as conn:
+            for a1 in ranges:
+                sheet, rng = split_a1(a1)
+                grid = self._grid(conn, sheet)
+                if rng:
+                    g = a1_range_to_grid_range(rng)
+                    r0, r1 = g.get("startRowIndex", 0), g.get("endRowIndex", len(grid))
+                    c0 = g.get("startColumnIndex", 0)
+                    c1 = g.get("endColumnIndex")
+                    grid = [row[c0:c1] for row in grid[r0:r1]]
+                out.append(_trim(grid))
+        return out
+
+    def write_sheet(self, sheet, rows):
+        """Creates or replaces a whole sheet (used by import_xlsx and fixtures)."""
+        with self._lock, self._connect() as conn:
+            pos = conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM sheets").fetchone()[0]
+            conn.execute(
+                "INSERT INTO sheets (title, position, grid) VALUES (?, ?, ?) "
+                "ON CONFLICT(title) DO UPDATE SET grid = excluded.grid",
+                (sheet, pos, json.dumps([[_cell_str(v) for v in r] for r in rows]))
+            )
+
+    def batch_write(self, updates):
+        by_sheet = {}
+        for u in updates:
+            sheet, rng = split_a1(u["range"])
+            by_sheet.setdefault(sheet, []).append((rng, u["values"]))
+        with self._lock, self._connect() as conn:
+            for sheet, writes in by_sheet.items():
+                grid = self._grid(conn, sheet)
+                for rng, values in writes:
+                    g = a1_range_to_grid_range(rng)
+                    r0, c0 = g.get("startRowIndex", 0), g.get("startColumnIndex", 0)
+                    for dr, vals in enumerate(values):
+                        r = r0 + dr
+                        while len(grid) <= r:
+                            grid.append([])
+                        row = grid[r]
+                        for dc, v in enumerate(vals):
+                            c = c0 + dc
+                            if len(row) <= c:
+                                row.extend([""] * (c + 1 - len(row)))
+                            row[c] = _cell_str(v)
+                conn.execute("UPDATE sheets SET grid = ? WHERE title = ?", (json.dumps(grid), sheet))
+
+    def apply_row_changes(self, changes):
+        # no formulas offline: an inserted row copies the template row's values
+        grids = {}
+        with self._lock, self._connect() as conn:
+            for ch in changes:
+                if ch["sheet"] not in grids:
+                    grids[ch["sheet"]] = self._grid(conn, ch["sheet"])
+                grid, r0 = grids[ch["sheet"]], ch["row"] - 1
+                while len(grid) < r0:
+                    grid.append([])
+                if ch["op"] == "insert":
+                    tpl = ch.get("template_row")
+                    src = tpl - 1 + (1 if tpl and tpl >= ch["row"] else 0) if tpl else None
+                    grid.insert(r0, [])
+                    if src is not None and src < len(grid):
+                        grid[r0] = list(grid[src])
+                elif ch["op"] == "delete":
+                    if r0 < len(grid):
+                        grid.pop(r0)
+                    continue
+                while len(grid) <= r0:
+                    grid.append([])
+                row = grid[r0]
+                for c, v in _cell_values(ch.get("values", {})):
+                    if len(row) <= c:
+                        row.extend([""] * (c + 1 - len(row)))
+                    row[c] = _cell_str(v)
+            for sheet, grid in grids.items():
+                conn.execute("UPDATE sheets SET grid = ? WHERE title = ?", (json.dumps(grid), sheet))
+
+    def duplicate_sheet(self, source, new_name):
+        with self._lock, self._connect() as conn:
+            grid = self._grid(conn, source)
+            conn.execute("DELETE FROM sheets WHERE title = ?", (new_name,))
+            pos = conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM sheets").fetchone()[0]
+            conn.execute("INSERT INTO sheets (title, position, grid) VALUES (?, ?, ?)",
+                         (new_name, pos, json.dumps(grid)))
+
+    def delete_sheet(self, name):
+        with self._lock, self._connect() as conn:
+            if conn.execute("DELETE FROM sheets WHERE title = ?", (name,)).rowcount == 0:
+                raise SheetNotFound(name)
+
+    def format_month_sheet(self, sheet, num_days):
+        # formatting has no meaning offline; only column visibility is kept
+        hidden = list(range(DAY_COL_START + num_days, DAY_COL_END)) if num_days < 31 else []
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE sheets SET hidden_cols = ? WHERE title = ?", (json.dumps(hidden), sheet))
+
+    def import_xlsx(self, path):
+        """Loads every sheet of an .xlsx (computed values, not formulas). Needs openpyxl."""
+        try:
+            import openpyxl
+        except ImportError:
+            raise ImportError("import_xlsx needs openpyxl: pip install openpyxl")
+        wb = openpyxl.load_workbook(path, data_only=True, read_only=True)
+        for ws in wb.worksheets:
+            self.write_sheet(ws.title, [list(r) for r in ws.iter_rows(values_only=True)])
+        return [ws.title for ws in wb.worksheets]
+
+    def export_xlsx(self, path):
+        """Writes the workbook's values to an .xlsx. Needs openpyxl."""
+        try:
+            import openpyxl
+        except ImportError:
+            raise ImportError("export_xlsx needs openpyxl: pip install openpyxl")
+        wb = openpyxl.Workbook()
+        wb.remove(wb.active)
+        for title in self.list_sheets():
+            ws = wb.create_sheet(title)
+            for row in self.read_grid(title):
+                ws.append(row)
+        wb.save(path)
+        return path
+
+
+def for_client(client, spreadsheet_name):
+    """Returns `client` itself if it is already a Storage, else wraps a gspread client."""
+    if isinstance(client, Storage):
+        return client
+    return GSpreadStorage(client, spreadsheet_name)
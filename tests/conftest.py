@@ -0,0 +1,41 @@
+"""
+Shared fixtures. Tests run against LocalStorage workbooks and a throwaway
+DUTY_PLANNER_DATA directory, so nothing touches Google or the real journals.
+"""
+import os
+import sys
+import tempfile
+
+# local_data reads this at import, so it must be set before any app module loads
+os.environ["DUTY_PLANNER_DATA"] = tempfile.mkdtemp(prefix="duty_planner_tests_")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import storage
+
+NAMES = ["ALICE", "BOB", "CAROL (F)", "DAVE", "ERIN (F)", "FRANK"]
+
+
+def month_grid(names, marks=None, num_days=31):
+    """A {mmyy}C / {mmyy}D style grid: header rows, then one row per person (day d in column 3 + d)."""
+    grid = [[""] * 51 for _ in range(3)]
+    for i, name in enumerate(names):
+        row = [""] * 51
+        row[0], row[1], row[2], row[42] = str(i + 1), name, "AB"[i % 2], "0"
+        for day, mark in (marks or {}).get(name, {}).items():
+            row[3 + day] = mark
+        grid.append(row)
+    return grid
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    """A LocalStorage MASTER SHEET with Namelist, Partners, Holiday and 0326C."""
+    store = storage.LocalStorage(str(tmp_path / "book.sqlite3"))
+    store.write_sheet("Namelist", [["S/N", "NAME", "BRANCH", "DESIGNATION"]]
+                      + [[str(i + 1), n, "AB"[i % 2], ""] for i, n in enumerate(NAMES)])
+    store.write_sheet("Partners", [["S/N", "Names", "Partner"]] + [[str(i + 1), n, ""] for i, n in enumerate(NAMES)])
+    store.write_sheet("Holiday", [["HOLIDAY", "DATE", "DAY", "NAME 1", "NAME 2"], ["Good Friday", "3 Apr 2026", "Fri", "", ""]])
+    store.write_sheet("0326C", month_grid(NAMES))
+    return store
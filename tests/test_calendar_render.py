@@ -0,0 +1,34 @@
+import calendar_render
+
+ROSTER = {str(d): {"duty": [], "standby": []} for d in range(1, 32)}
+ROSTER["3"] = {"duty": ["ALICE", "BOB <B>"], "standby": ["CAROL (F)"]}
+ROSTER["10"] = {"duty": ["ALICE"], "standby": []}
+
+
+def test_month_layout():
+    table = calendar_render.month_table("0326", ROSTER)
+    # 1 March 2026 is a Sunday: six blank cells before it, 31 days, five blanks after
+    assert table.count('<td class="cal-td"></td>') == 6 + 5
+    assert table.count('class="day-num"') == 31
+    assert table.count("<tr>") == 7   # header + six weeks
+    assert "BOB &lt;B&gt;" in table and "<B>" not in table
+
+
+def test_names_truncated():
+    table = calendar_render.month_table("0326", ROSTER, max_name=4)
+    assert ">ALI.<" in table and 'title="Duty: ALICE"' in table
+
+
+def test_highlight_marks_only_that_person():
+    html = calendar_render.screen_html("0326", ROSTER, "ALICE")
+    assert html.count("duty-item hl") == 2 and "standby-item hl" not in html
+    assert calendar_render.screen_html("0326", ROSTER, "CAROL (F)").count("standby-item hl") == 1
+    assert "hl" not in calendar_render.month_table("0326", ROSTER).replace("<th", "")
+
+
+def test_memoised_by_content():
+    first = calendar_render.month_table("0326", ROSTER)
+    copy = {k: dict(v) for k, v in ROSTER.items()}
+    assert calendar_render.month_table("0326", copy) is first
+    changed = {**copy, "10": {"duty": ["BOB <B>"], "standby": []}}
+    assert calendar_render.month_table("0326", changed) is not first
@@ -0,0 +1,118 @@
+import json
+import calendar
+from datetime import datetime, date
+from collections import defaultdict
+
+import pandas as pd
+import pytest
+from ortools.sat.python import cp_model
+
+import duty_rules
+import dynamic_constraints
+from conftest import NAMES, month_grid
+
+YEAR, MONTH = 2026, 3          # 1 Mar 2026 is a Sunday
+NUM_DAYS = calendar.monthrange(YEAR, MONTH)[1]
+
+
+def _config(*rules):
+    return {f"R{i}": {"active": True, "param": json.dumps(r)} for i, r in enumerate(rules, 1)}
+
+
+WEEK_CAP = {"class": "value", "subject1": "person", "per": "week", "operator": "<=", "number": 1, "subject2": "D"}
+MONTH_CAP = {"class": "value", "subject1": "person", "per": "month", "operator": "<=", "number": 2, "subject2": "D"}
+GAP = {"class": "gap", "from_type": "D", "to_type": "D", "days": 3}
+ONE_WEEKEND = {"class": "allow", "condition_day_type": "weekend", "logic": "cannot",
+               "action_day_type": "weekend", "condition_when": "this month"}
+FRI_NOT_WEEKEND = {"class": "allow", "condition_day_type": "friday", "logic": "cannot",
+                   "action_day_type": "weekend", "condition_when": "this month"}
+
+
+def _solver_accepts(config, fixed_days, free_days):
+    """Is ALICE holding fixed_days (C-sheet D's) plus free_days (solver-chosen) feasible for dynamic_constraints?"""
+    r, c0 = 3, 4
+    grid = month_grid(["ALICE"], {"ALICE": {d: "D" for d in fixed_days}})
+    constraint_df = pd.DataFrame(grid)
+    namelist_df = pd.DataFrame([["1", "ALICE", "A", ""]], columns=["S/N", "NAME", "BRANCH", "DESIGNATION"])
+    col_to_date = {c0 + d - 1: datetime(YEAR, MONTH, d) for d in range(1, NUM_DAYS + 1)}
+    iso_map = defaultdict(list)
+    for c, dt in col_to_date.items():
+        iso_map[dt.isocalendar().week].append(c)
+    model = cp_model.CpModel()
+    x, fixed = {}, set()
+    for d in range(1, NUM_DAYS + 1):
+        c = c0 + d - 1
+        if d in fixed_days:
+            x[(r, c)] = model.NewConstant(1)
+            fixed.add((r, c))
+        else:
+            x[(r, c)] = model.NewBoolVar(f"x{d}")
+            model.Add(x[(r, c)] == (1 if d in free_days else 0))
+    dynamic_constraints.apply_dynamic_constraints(
+        model, x, {}, config, constraint_df, namelist_df, pd.DataFrame(), None, constraint_df, None,
+        r, r, c0, c0 + NUM_DAYS - 1, col_to_date, iso_map, [], set(), fixed,
+        YEAR, MONTH, YEAR, MONTH - 1, [], False, [], {"ALICE": r}, {}, {}, [], 42, 1.0,
+        {"hard4": 4}, last_duty_dates={}, last_month_workers={},
+    )
+    return cp_model.CpSolver().Solve(model) in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+
+
+def _checker_accepts(config, fixed_days, free_days):
+    cal = duty_rules.month_calendar(YEAR, MONTH)
+    c_grid = month_grid(["ALICE"], {"ALICE": {d: "D" for d in fixed_days}})
+    d_grid = month_grid(["ALICE"], {"ALICE": {d: "D" for d in set(fixed_days) | set(free_days)}})
+    checker = duty_rules.DutyChecker(cal, duty_rules.load_roster(cal, d_grid, c_grid), duty_rules.compile_rules(config))
+    p = checker.roster["ALICE"]
+    return not checker.person_violations("ALICE", p.duty, duty_rules.bits(free_days))
+
+
+@pytest.mark.parametrize("rule, fixed_days, free_days", [
+    (WEEK_CAP, [2, 3], []),              # two fixed in one week: allowed
+    (WEEK_CAP, [2], [4]),                # fixed doesn't count toward the cap
+    (WEEK_CAP, [], [2, 4]),
+    (MONTH_CAP, [2, 9, 16], [23]),
+    (MONTH_CAP, [], [2, 9, 16]),
+    (GAP, [2, 3], []),                   # fixed pair inside the gap
+    (GAP, [2], [4]),                     # free next to fixed
+    (GAP, [2], [10]),
+    (ONE_WEEKEND, [7, 8], []),           # two fixed weekend D's
+    (ONE_WEEKEND, [7], [14]),
+    (ONE_WEEKEND, [], [14]),
+    (FRI_NOT_WEEKEND, [6], [7]),         # fixed Friday blocks a free weekend day
+    (FRI_NOT_WEEKEND, [7], [6]),         # fixed weekend, free Friday: not blocked
+    (FRI_NOT_WEEKEND, [6, 7], []),
+])
+def test_checker_agrees_with_solver(rule, fixed_days, free_days):
+    config = _config(rule)
+    assert _checker_accepts(config, fixed_days, free_days) == _solver_accepts(config, fixed_days, free_days)
+
+
+def test_submission_person_conflicts_are_warnings():
+    cal = duty_rules.month_calendar(YEAR, MONTH)
+    checker = duty_rules.DutyChecker(cal, duty_rules.load_roster(cal, month_grid(NAMES)),
+                                     duty_rules.compile_rules(_config(ONE_WEEKEND, WEEK_CAP)))
+    errors, warnings = checker.check_submission("ALICE", [7, 14], [])
+    assert errors == []
+    assert any("weekend" in w for w in warnings)
+
+
+def test_submission_errors():
+    cal = duty_rules.month_calendar(YEAR, MONTH)
+    day_cap = {"class": "value", "subject1": "day", "operator": "=", "number": 1, "subject2": "D"}
+    roster = duty_rules.load_roster(cal, month_grid(NAMES, {"BOB": {5: "D"}}))
+    checker = duty_rules.DutyChecker(cal, roster, duty_rules.compile_rules(_config(day_cap)))
+    errors, _ = checker.check_submission("ALICE", [5, 40], [5])
+    assert any("not in this month" in e for e in errors)
+    assert any("both X and D" in e for e in errors)
+    assert any("1/1 duty slot" in e for e in errors)
+
+
+def test_cross_month_gap_and_swap():
+    cal = duty_rules.month_calendar(YEAR, MONTH)
+    roster = duty_rules.load_roster(cal, month_grid(NAMES, {"ALICE": {2: "D"}}))
+    checker = duty_rules.DutyChecker(cal, roster, duty_rules.compile_rules(_config(GAP)),
+                                     last_duty_dates={"BOB": date(2026, 2, 28)})
+    hard, _ = checker.check_swap("ALICE", "BOB", 2)
+    assert any("after the last duty" in h for h in hard)
+    hard, _ = checker.check_swap("ALICE", "DAVE", 2)
+    assert hard == []
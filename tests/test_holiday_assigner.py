@@ -0,0 +1,87 @@
+import random
+import time
+from datetime import date, timedelta
+
+import holiday_assigner
+
+START = date(2026, 1, 1)
+
+
+def _holidays(n, every=22, picks=None):
+    picks = picks or {}
+    return [{"key": i, "date": START + timedelta(days=i * every),
+             "n1": picks.get(i, ("", ""))[0], "n2": picks.get(i, ("", ""))[1]} for i in range(n)]
+
+
+def _gendered(pair):
+    return holiday_assigner._is_female(pair[0]) == holiday_assigner._is_female(pair[1])
+
+
+def test_pairs_are_same_gender_and_skip_last_year():
+    names = ["ALICE", "BOB", "CAROL (F)", "DAVE", "ERIN (F)", "FRANK", "GINA (F)", "HANK"]
+    result, err = holiday_assigner.assign_year(_holidays(6), names, last_year_workers={"HANK"})
+    assert err is None
+    assert all(_gendered(pair) for pair in result.values())
+    assert "HANK" not in {n for pair in result.values() for n in pair}
+
+
+def test_outside_pick_is_paired_by_its_own_gender():
+    names = ["ALICE", "BOB", "CAROL (F)", "DAVE", "ERIN (F)"]
+    hols = _holidays(2, picks={0: ("LOCUM (F)", ""), 1: ("", "LOCUM")})
+    result, err = holiday_assigner.assign_year(hols, names)
+    assert err is None
+    assert result[0][0] == "LOCUM (F)" and holiday_assigner._is_female(result[0][1])
+    assert result[1][1] == "LOCUM" and not holiday_assigner._is_female(result[1][0])
+
+
+def test_manual_picks_kept_in_their_column():
+    names = ["ALICE", "BOB", "CAROL (F)", "DAVE"]
+    result, _ = holiday_assigner.assign_year(_holidays(1, picks={0: ("", "bob")}), names)
+    assert result[0][1] == "bob" and result[0][0] != "BOB"
+
+
+def test_spacing_and_monthly_duties():
+    names = ["ALICE", "BOB", "DAVE", "FRANK", "GREG"]
+    hols = _holidays(2, every=3)
+    result, err = holiday_assigner.assign_year(hols, names, min_gap=7,
+                                               duty_dates={"ALICE": {START + timedelta(days=2)}})
+    assert err is None
+    assert not set(result[0]) & set(result[1])
+    assert "ALICE" not in result[0] + result[1]
+
+
+def test_fewest_prior_holidays_go_first():
+    names = ["ALICE", "BOB", "DAVE", "FRANK", "GREG", "HANK"]
+    prior = {"ALICE": 2, "BOB": 2, "DAVE": 0, "FRANK": 0, "GREG": 1, "HANK": 1}
+    result, _ = holiday_assigner.assign_year(_holidays(1), names, prior_counts=prior)
+    assert set(result[0]) == {"DAVE", "FRANK"}
+
+
+def test_infeasible_reports_error():
+    result, err = holiday_assigner.assign_year(_holidays(1), ["ALICE", "CAROL (F)"])
+    assert result is None and "spacing" in err
+
+
+def test_full_year_settles_quickly():
+    rng = random.Random(11)
+    names = [f"P{i:03d}" + (" (F)" if i % 5 == 0 else "") for i in range(120)]
+    duty_dates = {n: {START + timedelta(days=rng.randint(0, 360)) for _ in range(8)}
+                  for n in rng.sample(names, 60)}
+    prior = {n: rng.randint(0, 3) for n in names}
+    offsets = {n: round(rng.random() * 2, 1) for n in names}
+    hols = _holidays(16, every=22, picks={5: ("LOCUM (F)", "")})
+    t0 = time.perf_counter()
+    result, err = holiday_assigner.assign_year(hols, names, rng.sample(names, 20), prior, offsets,
+                                               duty_dates, min_gap=7, time_limit=10.0)
+    assert err is None and len(result) == 16
+    assert all(_gendered(pair) for pair in result.values())
+    assert time.perf_counter() - t0 < 5
+
+
+def test_prior_holiday_counts_by_year():
+    rows = [["HOLIDAY", "DATE", "DAY", "NAME 1", "NAME 2"],
+            ["New Year", "1 Jan 2025", "Wed", "Alice", "Bob"],
+            ["Good Friday", "3 Apr 2026", "Fri", "ALICE", ""],
+            ["Christmas", "25 Dec 2024", "Wed", "BOB", "DAVE"]]
+    counts = holiday_assigner.prior_holiday_counts(rows, 2025, 2026)
+    assert counts == {"ALICE": 2, "BOB": 1}
@@ -0,0 +1,44 @@
+from datetime import date, datetime
+
+import pytest
+
+import holiday_index
+
+ROWS = [["HOLIDAY", "DATE", "DAY", "NAME 1", "NAME 2"],
+        ["New Year", "1 Jan 2026", "Thu", "Alice", "bob"],
+        ["Good Friday", "03 Apr 2026", "Fri", "ALICE", ""],
+        ["Christmas", "2025-12-25", "Thu", "CAROL (F)", "ERIN (F)"],
+        ["Unknown", "sometime", "", "", ""],
+        ["", "1 May 2026", "Fri", "", ""],
+        []]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1 Jan 2026", date(2026, 1, 1)),
+    ("01 Jan 2026", date(2026, 1, 1)),
+    (" 2026-01-01 ", date(2026, 1, 1)),
+    ("1 January 2026", None),
+    ("31 Feb 2026", None),
+    ("", None),
+    (None, None),
+])
+def test_parse_date(text, expected):
+    assert holiday_index.parse_date(text) == expected
+
+
+def test_index_lookups():
+    idx = holiday_index.from_rows(ROWS)
+    assert [h.name for h in idx.entries] == ["New Year", "Good Friday", "Christmas"]
+    assert idx.on(datetime(2026, 1, 1, 9))[0].sheet_row == 2
+    assert idx.is_holiday(date(2025, 12, 25)) and not idx.is_holiday(date(2026, 5, 1))
+    assert [h.name for h in idx.for_person(" alice ")] == ["New Year", "Good Friday"]
+    assert idx.for_person("ALICE", year=2026, month=4)[0].n1 == "ALICE"
+    assert idx.month_days(2026, 1) == {1}
+    assert idx.workers(2025) == {"CAROL (F)", "ERIN (F)"}
+    assert idx.workers(2026) == {"ALICE", "BOB"}
+
+
+def test_parsed_once_per_content():
+    assert holiday_index.from_rows(ROWS) is holiday_index.from_rows([list(r) for r in ROWS])
+    assert holiday_index.from_rows(ROWS[:2]) is not holiday_index.from_rows(ROWS)
+    assert holiday_index.from_rows(None).entries == []
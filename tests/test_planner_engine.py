@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import pytest
+
+import planner_engine
+import roster_history
+from conftest import NAMES, month_grid
+
+
+@pytest.fixture(autouse=True)
+def history(tmp_path, monkeypatch):
+    monkeypatch.setattr(roster_history, "HISTORY_PATH", str(tmp_path / "history.sqlite3"))
+
+
+def _prev_d_grid():
+    grid = month_grid(NAMES, {"ALICE": {27: "D"}, "BOB": {28: "D"}}, num_days=28)
+    grid += [[""] * 51 for _ in range(roster_history.ADJ_FIRST_ROW + 2 - len(grid))]
+    grid[roster_history.ADJ_FIRST_ROW][48:51] = ["bob", "add 1x we", "1.5"]
+    grid[roster_history.ADJ_FIRST_ROW + 1][48:51] = ["ALICE", "MINUS 1X WD", ""]
+    return grid
+
+
+def _reads(store, monkeypatch):
+    seen = []
+    read_ranges = store.read_ranges
+
+    def spy(ranges):
+        seen.extend(ranges)
+        return read_ranges(ranges)
+
+    monkeypatch.setattr(store, "read_ranges", spy)
+    return seen
+
+
+def test_previous_month_from_history_without_reading_it(workbook, monkeypatch):
+    workbook.write_sheet("0226D", _prev_d_grid())
+    roster_history.record_month(workbook.title, "0226", _prev_d_grid())
+    seen = _reads(workbook, monkeypatch)
+
+    bundle, warnings = planner_engine.load_data_bundle(workbook, workbook.title, "0326")
+    assert warnings == [] and not any("0226D" in r for r in seen)
+    assert bundle["last_month"] is None and bundle["last_month_recorded"]
+    assert bundle["last_duty_dates"]["BOB"] == datetime(2026, 2, 28)
+    assert bundle["last_month_workers"]["weekend"] == {"BOB"}      # 28 Feb 2026 is a Saturday
+    assert [a[1:3] for a in bundle["manual_adjustments"]] == [("BOB", "ADD 1X WE"), ("ALICE", "MINUS 1X WD")]
+
+
+def test_previous_d_sheet_read_until_history_has_it(workbook):
+    workbook.write_sheet("0226D", _prev_d_grid())
+    bundle, warnings = planner_engine.load_data_bundle(workbook, workbook.title, "0326")
+    assert warnings == [] and bundle["last_month"] is not None
+    assert bundle["last_duty_dates"] is None and bundle["manual_adjustments"] is None
+    assert roster_history.recorded_months(workbook.title) == []     # loading never writes history
+
+
+def test_missing_previous_month_warns(workbook):
+    bundle, warnings = planner_engine.load_data_bundle(workbook, workbook.title, "0326")
+    assert bundle["last_month"] is None and warnings == ["⚠️ Previous month data not found."]
+
+
+def test_sheet_scan_matches_history(workbook):
+    workbook.write_sheet("0226D", _prev_d_grid())
+    bundle, _ = planner_engine.load_data_bundle(workbook, workbook.title, "0326")
+    roster_history.record_month(workbook.title, "0226", _prev_d_grid())
+    assert planner_engine._sheet_adjustments(bundle["last_month"]) == \
+        roster_history.manual_adjustments(workbook.title, "0226")
@@ -0,0 +1,93 @@
+import pytest
+from gspread.exceptions import APIError
+from gspread.http_client import HTTPClient
+
+import quota
+
+SHEET = "https://sheets.googleapis.com/v4/spreadsheets/abc123"
+_backoff = quota._backoff   # the autouse fixture zeroes it for the retry tests
+
+
+class _Response:
+    def __init__(self, code, domain="global"):
+        self.code, self.domain, self.text = code, domain, ""
+
+    def json(self):
+        return {"error": {"code": self.code, "errors": [{"domain": self.domain}]}}
+
+
+@pytest.fixture(autouse=True)
+def no_waiting(monkeypatch):
+    monkeypatch.setattr(quota, "_backoff", lambda attempt: 0)
+    monkeypatch.setattr(quota, "_buckets", {k: quota.TokenBucket(10 ** 6) for k in quota.QUOTA_PER_MINUTE})
+
+
+def _client(monkeypatch, failures):
+    """QuotaHTTPClient whose transport raises the given status codes, then succeeds."""
+    sent = []
+
+    def fake_request(self, method, endpoint, *args, **kwargs):
+        sent.append((method, endpoint))
+        if len(sent) <= len(failures):
+            raise APIError(_Response(*failures[len(sent) - 1]))
+        return "ok"
+
+    monkeypatch.setattr(HTTPClient, "request", fake_request)
+    client = quota.QuotaHTTPClient.__new__(quota.QuotaHTTPClient)
+    return client, sent
+
+
+def test_bucket_waits_for_refill(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(quota.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(quota.time, "sleep", lambda s: clock.__setitem__(0, clock[0] + s))
+    bucket = quota.TokenBucket(60)
+    assert all(bucket.acquire() == 0 for _ in range(60))
+    assert bucket.acquire() == pytest.approx(1.0)
+
+
+def test_backoff_is_capped_full_jitter():
+    for attempt in range(10):
+        wait = _backoff(attempt)
+        assert 0 <= wait <= min(quota.BACKOFF_CAP, quota.BACKOFF_BASE * 2 ** attempt)
+
+
+@pytest.mark.parametrize("method, endpoint, safe", [
+    ("get", f"{SHEET}/values/Namelist!A1", True),
+    ("put", f"{SHEET}/values/0326C!A1", True),
+    ("post", f"{SHEET}/values:batchUpdate", True),
+    ("post", f"{SHEET}/values:batchClear", True),
+    ("post", f"{SHEET}:batchUpdate", False),
+    ("post", f"{SHEET}/values/Log!A1:append", False),
+    ("post", f"{SHEET}/sheets/0:copyTo", False),
+])
+def test_retry_codes_by_request(method, endpoint, safe):
+    expected = quota.RETRY_CODES if safe else quota.THROTTLE_CODES
+    assert quota._retry_codes(method, endpoint) == expected
+
+
+def test_value_writes_retry_server_errors(monkeypatch):
+    client, sent = _client(monkeypatch, [(503,), (500,)])
+    assert client.request("post", f"{SHEET}/values:batchUpdate") == "ok"
+    assert len(sent) == 3
+
+
+def test_structural_batch_update_not_repeated_after_server_error(monkeypatch):
+    client, sent = _client(monkeypatch, [(503,)])
+    with pytest.raises(APIError):
+        client.request("post", f"{SHEET}:batchUpdate")
+    assert len(sent) == 1
+
+
+def test_structural_batch_update_retried_when_throttled(monkeypatch):
+    client, sent = _client(monkeypatch, [(429,), (403, "usageLimits")])
+    assert client.request("post", f"{SHEET}:batchUpdate") == "ok"
+    assert len(sent) == 3
+
+
+def test_gives_up_after_max_retries(monkeypatch):
+    client, sent = _client(monkeypatch, [(429,)] * (quota.MAX_RETRIES + 1))
+    with pytest.raises(APIError):
+        client.request("get", f"{SHEET}/values/Namelist!A1")
+    assert len(sent) == quota.MAX_RETRIES + 1
+    assert any(r["errors"] for r in quota.stats() if r["label"] == "GET values")
@@ -0,0 +1,46 @@
+import pytest
+
+import roster_aggregates
+from conftest import NAMES, month_grid
+
+
+@pytest.fixture(autouse=True)
+def fresh():
+    roster_aggregates._aggs.clear()
+    yield
+    roster_aggregates._aggs.clear()
+
+
+def test_parse_days():
+    assert roster_aggregates.parse_days("17, 3,3, 0, 32, x, ") == [3, 17]
+
+
+def test_seeded_from_grid_and_queue():
+    grid = month_grid(NAMES, {"ALICE": {3: "D", 4: "X"}, "BOB": {3: "D"}})
+    queued = {("0326", "BOB"): {"preferences": "5", "constraints": "6"}}
+    agg = roster_aggregates.get("MS", "0326", grid, lambda: queued)
+    assert agg.on_day[3] == {"ALICE"} and agg.days_for("bob") == [5]
+    assert agg.x_count(4) == 1 and agg.x_days_for("BOB") == [6]
+    assert roster_aggregates.get("MS", "0326", grid) is agg
+
+
+def test_submission_is_a_delta():
+    grid = month_grid(NAMES, {"ALICE": {3: "D"}})
+    agg = roster_aggregates.get("MS", "0326", grid)
+    before = agg.on_day[3]
+    roster_aggregates.apply_submission("MS", "0326", "alice", "7, 8", "")
+    assert agg.days_for("ALICE") == [7, 8] and agg.d_count(3) == 0
+    assert before == {"ALICE"}     # readers holding the old set are unaffected
+
+
+def test_new_grid_reseeds_with_edits_and_queue():
+    agg = roster_aggregates.get("MS", "0326", month_grid(NAMES))
+    roster_aggregates.apply_submission("MS", "0326", "ALICE", "3", "")     # flushed below
+    roster_aggregates.apply_submission("MS", "0326", "BOB", "9", "")       # still queued
+
+    # the flush wrote ALICE, then an admin cleared it and marked CAROL before the next load
+    edited = month_grid(NAMES, {"CAROL (F)": {3: "D"}})
+    queued = {("0326", "BOB"): {"preferences": "9", "constraints": ""}}
+    reseeded = roster_aggregates.get("MS", "0326", edited, lambda: queued)
+    assert reseeded is not agg
+    assert reseeded.on_day[3] == {"CAROL (F)"} and reseeded.days_for("BOB") == [9]
@@ -0,0 +1,114 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import roster_api
+from conftest import NAMES, month_grid
+
+ROSTER = {str(d): {"duty": [], "standby": []} for d in range(1, 32)}
+ROSTER["3"] = {"duty": ["ALICE", "BOB"], "standby": ["CAROL (F)"]}
+ROSTER["10"] = {"duty": ["ALICE"], "standby": []}
+
+SOURCES = {
+    "roster": lambda mmyy: (ROSTER, "D", None) if mmyy == "0326" else (None, None, f"No {mmyy}D"),
+    "snapshot": lambda mmyy: {"mmyy": mmyy, "c_sheet": month_grid(NAMES, {"ALICE": {3: "X"}})},
+    "config": lambda: {},
+    "holiday": lambda: [["HOLIDAY", "DATE", "DAY"], ["Founders Day", "3 Mar 2026", "Tue"]],
+}
+
+
+def _json(path, query=None):
+    ctype, body = roster_api.route(SOURCES, path, query or {})
+    assert ctype == "application/json"
+    return json.loads(body)
+
+
+def test_rosters():
+    body = _json("/rosters/0326")
+    assert body["sheet"] == "D" and len(body["days"]) == 31
+    assert body["days"]["3"]["standby"] == ["CAROL (F)"]
+
+
+def test_person_duties_is_case_insensitive():
+    body = _json("/people/alice/duties", {"mmyy": ["0326"]})
+    assert body == {"name": "ALICE", "mmyy": "0326", "sheet": "D", "duty": [3, 10], "standby": []}
+
+
+def test_person_calendar():
+    ctype, body = roster_api.route(SOURCES, "/people/CAROL%20(F)/calendar.ics", {"mmyy": ["0326"]})
+    assert ctype.startswith("text/calendar")
+    assert b"BEGIN:VCALENDAR" in body and b"Founders Day" in body
+
+
+def test_offsets():
+    people = _json("/offsets/0326")["people"]
+    assert [p["name"] for p in people] == NAMES and people[0]["offset"] == 0.0
+
+
+def test_availability():
+    body = _json("/availability/0326")
+    days = {d["day"]: d for d in body["days"]}
+    assert days[3]["available"] == len(NAMES) - 1 and days[4]["available"] == len(NAMES)
+
+
+@pytest.mark.parametrize("path, status", [
+    ("/rosters/1326", 400),
+    ("/rosters/0426", 404),
+    ("/people/NOBODY/calendar.ics?mmyy=0326", 404),
+    ("/nope", 404),
+])
+def test_errors(path, status):
+    path, _, q = path.partition("?")
+    with pytest.raises(roster_api.ApiError) as e:
+        roster_api.route(SOURCES, path, {k: [v] for k, v in (p.split("=") for p in q.split("&") if p)})
+    assert e.value.status == status
+
+
+@pytest.fixture
+def server():
+    def serve(token=None):
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), roster_api._handler(SOURCES, token))
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append(httpd)
+        return f"http://127.0.0.1:{httpd.server_address[1]}"
+    servers = []
+    yield serve
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def _get(url, headers=None):
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers or {})) as r:
+            return r.status, dict(r.headers), r.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), e.read()
+
+
+def test_etag_and_not_modified(server):
+    base = server()
+    status, headers, body = _get(base + "/rosters/0326")
+    assert status == 200 and headers["ETag"]
+    status, _, body = _get(base + "/rosters/0326", {"If-None-Match": headers["ETag"]})
+    assert status == 304 and body == b""
+    # ICS feeds keep their ETag between requests
+    ics = [_get(base + "/people/ALICE/calendar.ics?mmyy=0326")[1]["ETag"] for _ in range(2)]
+    assert ics[0] == ics[1]
+
+
+def test_token_required(server):
+    base = server(token="s3cret")
+    assert _get(base + "/rosters/0326")[0] == 401
+    assert _get(base + "/rosters/0326", {"Authorization": "Bearer wrong"})[0] == 401
+    assert _get(base + "/rosters/0326", {"Authorization": "Bearer s3cret"})[0] == 200
+    assert _get(base + "/rosters/0326?token=s3cret")[0] == 200
+
+
+def test_refuses_public_host_without_token():
+    with pytest.raises(ValueError):
+        roster_api.start(SOURCES, host="0.0.0.0", port=0)
@@ -0,0 +1,59 @@
+import pytest
+
+import roster_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    roster_cache.invalidate()
+    yield
+    roster_cache.invalidate()
+
+
+def _loader(calls, err=None):
+    def load():
+        calls.append(1)
+        return {"1": {"duty": ["ALICE"], "standby": []}}, "D", err
+    return load
+
+
+def test_cached_until_invalidated():
+    calls = []
+    for _ in range(3):
+        roster_cache.get_roster("MASTER SHEET", "0326", _loader(calls), source_revision="r1")
+    assert len(calls) == 1
+    roster_cache.invalidate(mmyy="0326")
+    roster_cache.get_roster("MASTER SHEET", "0326", _loader(calls), source_revision="r1")
+    assert len(calls) == 2
+
+
+def test_outside_edit_changes_source_revision():
+    calls = []
+    roster_cache.get_roster("MASTER SHEET", "0326", _loader(calls), source_revision="r1")
+    roster_cache.get_roster("MASTER SHEET", "0326", _loader(calls), source_revision="r2")
+    assert len(calls) == 2
+
+
+def test_entries_expire(monkeypatch):
+    calls = []
+    roster_cache.get_roster("MASTER SHEET", "0326", _loader(calls))
+    monkeypatch.setattr(roster_cache, "MAX_AGE", 0)
+    roster_cache.get_roster("MASTER SHEET", "0326", _loader(calls))
+    assert len(calls) == 2
+
+
+def test_errors_are_not_cached():
+    calls = []
+    for _ in range(2):
+        roster_cache.get_roster("MASTER SHEET", "0326", _loader(calls, err="no D sheet"))
+    assert len(calls) == 2
+
+
+def test_invalidate_by_spreadsheet_name():
+    calls = []
+    roster_cache.get_roster("MASTER SHEET", "0326", _loader(calls))
+    roster_cache.get_roster("OTHER", "0326", _loader(calls))
+    roster_cache.invalidate("MASTER SHEET")
+    roster_cache.get_roster("MASTER SHEET", "0326", _loader(calls))
+    roster_cache.get_roster("OTHER", "0326", _loader(calls))
+    assert len(calls) == 3
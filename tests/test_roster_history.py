@@ -0,0 +1,60 @@
+from datetime import date
+
+import pytest
+
+import roster_history
+from conftest import NAMES, month_grid
+
+
+@pytest.fixture(autouse=True)
+def history(tmp_path, monkeypatch):
+    monkeypatch.setattr(roster_history, "HISTORY_PATH", str(tmp_path / "history.sqlite3"))
+
+
+def _d_grid():
+    return month_grid(NAMES, {"ALICE": {1: "D", 2: "S"}, "BOB": {7: "D"}})
+
+
+def test_record_and_query():
+    assert roster_history.record_month("MS", "0326", _d_grid())
+    assert roster_history.record_month("MS", "0326", _d_grid()) is None    # unchanged
+    duties = roster_history.month_duties("MS", "0326")
+    assert [(d["name"], d["day"], d["duty"]) for d in duties] == [("ALICE", 1, "D"), ("ALICE", 2, "S"), ("BOB", 7, "D")]
+    assert duties[0]["day_type"] == "WE"     # 1 Mar 2026 is a Sunday
+    assert roster_history.last_duty_dates("MS", date(2026, 4, 1)) == {"ALICE": date(2026, 3, 1), "BOB": date(2026, 3, 7)}
+
+
+def test_forget_month_hides_it_until_recorded_again():
+    roster_history.record_month("MS", "0226", _d_grid())
+    roster_history.record_month("MS", "0326", _d_grid())
+    assert roster_history.forget_month("MS", "0326")
+    assert roster_history.forget_month("MS", "0326") is None
+    assert roster_history.recorded_months("MS") == ["0226"]
+    assert roster_history.month_duties("MS", "0326") == []
+    assert roster_history.month_workers("MS", "0326")["weekend"] == set()
+    assert "ALICE" in roster_history.latest_offsets("MS")     # falls back to 0226
+
+    assert roster_history.record_month("MS", "0326", _d_grid())
+    assert roster_history.recorded_months("MS") == ["0226", "0326"]
+
+
+def test_forget_unknown_month_is_noop():
+    assert roster_history.forget_month("MS", "0126") is None
+
+
+def test_sync_forgets_deleted_d_sheet(workbook):
+    workbook.write_sheet("0326D", _d_grid())
+    assert roster_history.sync_month(workbook, "0326")
+    workbook.delete_sheet("0326D")
+    assert roster_history.sync_month(workbook, "0326")
+    assert roster_history.recorded_months(workbook.title) == []
+
+
+def test_sync_all_forgets_missing_months(workbook):
+    workbook.write_sheet("0326D", _d_grid())
+    workbook.write_sheet("0426D", _d_grid())
+    assert roster_history.sync_all(workbook) == ["0326", "0426"]
+    workbook.delete_sheet("0426D")
+    roster_history.sync_all(workbook)
+    assert roster_history.recorded_months(workbook.title) == ["0326"]
+
@@ -0,0 +1,76 @@
+import threading
+
+import pandas as pd
+import pytest
+
+import planner_engine
+import roster_history
+import save_pipeline
+import snapshot_store
+from conftest import NAMES, month_grid
+
+
+@pytest.fixture(autouse=True)
+def stores(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_store, "INDEX_PATH", str(tmp_path / "index.sqlite3"))
+    monkeypatch.setattr(roster_history, "HISTORY_PATH", str(tmp_path / "history.sqlite3"))
+    monkeypatch.setattr(save_pipeline, "_checkpoint_path", lambda name, mmyy: str(tmp_path / f"{mmyy}.json"))
+
+
+def _run(store):
+    return save_pipeline.run_save(store, store.title, "0326", pd.DataFrame({"a": [1]}), 1.0, {})
+
+
+def test_failed_write_reuses_the_pre_save_snapshot(workbook, monkeypatch):
+    calls = {"output": 0}
+
+    def output(client, name, mmyy, df, scale, ranges):
+        calls["output"] += 1
+        client.write_sheet("0326D", month_grid(NAMES, {"ALICE": {1: "D"}}))
+        if calls["output"] == 1:
+            raise RuntimeError("quota")     # D sheet already written when it failed
+        return "ok"
+
+    def next_month(client, name, mmyy, df, ranges):
+        client.write_sheet("0426C", month_grid(NAMES))
+        return "0426C", "MASTER SHEET"
+
+    monkeypatch.setattr(planner_engine, "create_backup_and_output", output)
+    monkeypatch.setattr(planner_engine, "generate_next_month_template", next_month)
+
+    first = _run(workbook)
+    assert first["stages"]["archive"]["status"] == "done"
+    assert first["stages"]["output"]["status"] == "failed" and not first["complete"]
+    assert first["stages"]["next_month"]["status"] == "done"     # independent of the D sheet
+
+    second = _run(workbook)
+    assert second["complete"]
+    assert second["stages"]["archive"]["result"] == first["stages"]["archive"]["result"]
+    snaps = snapshot_store.list_snapshots(workbook.title)
+    assert len(snaps) == 1 and snaps[0]["sheets"]["0326D"] is None     # taken before any write
+
+
+def test_nothing_is_written_if_the_snapshot_fails(workbook, monkeypatch):
+    monkeypatch.setattr(snapshot_store, "snapshot_month", lambda store, mmyy: 1 / 0)
+    monkeypatch.setattr(planner_engine, "create_backup_and_output", lambda *a: pytest.fail("wrote before snapshot"))
+    run = _run(workbook)
+    assert run["stages"]["archive"]["status"] == "failed"
+    assert save_pipeline.pending_stages(workbook.title, "0326", run["digest"]) == list(save_pipeline.STAGES)
+
+
+def test_write_stages_run_side_by_side(workbook, monkeypatch):
+    both_started = threading.Barrier(2, timeout=5)
+
+    def output(*a):
+        both_started.wait()
+        return "0326D"
+
+    def next_month(*a):
+        both_started.wait()
+        return "0426C", "MASTER SHEET"
+
+    monkeypatch.setattr(planner_engine, "create_backup_and_output", output)
+    monkeypatch.setattr(planner_engine, "generate_next_month_template", next_month)
+    run = _run(workbook)
+    assert run["complete"], run["stages"]
+    assert save_pipeline.load_checkpoint(workbook.title, "0326")["stages"] == run["stages"]
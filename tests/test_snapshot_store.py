@@ -0,0 +1,66 @@
+import pytest
+
+import roster_history
+import snapshot_store
+from conftest import NAMES, month_grid
+
+
+@pytest.fixture(autouse=True)
+def stores(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_store, "INDEX_PATH", str(tmp_path / "index.sqlite3"))
+    monkeypatch.setattr(roster_history, "HISTORY_PATH", str(tmp_path / "history.sqlite3"))
+
+
+def _save(store, d_marks):
+    """What a save does: snapshot, then write 0326D and 0426C."""
+    snapshot_store.snapshot_month(store, "0326")
+    store.write_sheet("0326D", month_grid(NAMES, d_marks))
+    store.write_sheet("0426C", month_grid(NAMES))
+    roster_history.sync_month(store, "0326")
+
+
+def test_encode_round_trip():
+    grid = [["a", "", "=SUM(A1:A2)"], ["", "b"], []]
+    assert snapshot_store._decode(snapshot_store._encode(grid)) == [["a", "", "=SUM(A1:A2)"], ["", "b", ""], ["", "", ""]]
+
+
+def test_unchanged_sheets_share_blobs(workbook):
+    first = snapshot_store.snapshot_month(workbook, "0326")
+    second = snapshot_store.snapshot_month(workbook, "0326")
+    a, b = (snapshot_store.get_snapshot(i)["sheets"] for i in (first, second))
+    assert a == b and a["0326D"] is None
+    assert snapshot_store.list_snapshots(workbook.title)[0]["new_bytes"] == 0
+
+
+def test_month_sheets_leave_holiday_alone():
+    assert "Holiday" not in snapshot_store.month_sheets("1226")
+    assert snapshot_store.month_sheets("1226")[-1] == "0127C"
+
+
+def test_undo_and_redo_restore_sheets_and_history(workbook):
+    _save(workbook, {"ALICE": {3: "D"}})
+    assert roster_history.recorded_months(workbook.title) == ["0326"]
+    workbook.write_sheet("Holiday", [["HOLIDAY", "DATE", "DAY", "NAME 1", "NAME 2"], ["Good Friday", "3 Apr 2026", "Fri", "BOB", ""]])
+
+    snapshot_store.undo_save(workbook, "0326")
+    assert "0326D" not in workbook.list_sheets() and "0426C" not in workbook.list_sheets()
+    assert roster_history.recorded_months(workbook.title) == []
+    assert workbook.read_grid("Holiday")[1][3] == "BOB"      # edited after the save, kept
+    state = snapshot_store.undo_state(workbook.title, "0326")
+    assert state["undo"] is None and state["redo"]
+
+    snapshot_store.redo_save(workbook, "0326")
+    assert workbook.read_grid("0326D")[3][6] == "D"
+    assert [d["name"] for d in roster_history.month_duties(workbook.title, "0326")] == ["ALICE"]
+
+
+def test_undo_second_save_restores_first(workbook):
+    _save(workbook, {"ALICE": {3: "D"}})
+    _save(workbook, {"BOB": {4: "D"}})
+    snapshot_store.undo_save(workbook, "0326")
+    assert [d["name"] for d in roster_history.month_duties(workbook.title, "0326")] == ["ALICE"]
+
+
+def test_nothing_to_undo(workbook):
+    with pytest.raises(ValueError):
+        snapshot_store.undo_save(workbook, "0326")
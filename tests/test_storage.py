@@ -0,0 +1,28 @@
+import pytest
+
+import storage
+
+
+def test_backend_missing_a_method_fails_at_construction():
+    class Partial(storage.Storage):
+        def list_sheets(self):
+            return []
+
+    with pytest.raises(TypeError, match="abstract"):
+        Partial()
+
+
+def test_backends_implement_the_interface(tmp_path):
+    assert storage.GSpreadStorage(None, "MASTER SHEET").title == "MASTER SHEET"
+    store = storage.LocalStorage(str(tmp_path / "book.sqlite3"))
+    assert storage.for_client(store, "ignored") is store
+
+
+def test_local_storage_round_trip(workbook):
+    workbook.batch_write([{"range": storage.a1("0326C", "AQ4"), "values": [[1.5]]}])
+    workbook.duplicate_sheet("0326C", "0326D")
+    assert workbook.read_ranges([storage.a1("0326D", "AQ4")]) == [[["1.5"]]]
+    assert workbook.list_months() == {"0326": {"C": True, "D": True}}
+    workbook.delete_sheet("0326D")
+    with pytest.raises(storage.SheetNotFound):
+        workbook.read_ranges([storage.a1("0326D")])
@@ -0,0 +1,55 @@
+import user_engine
+
+ROSTER = {str(d): {"duty": [], "standby": []} for d in range(1, 32)}
+ROSTER["3"] = {"duty": ["ALICE", "BOB"], "standby": ["CAROL (F)"]}
+ROSTER["10"] = {"duty": ["ALICE"], "standby": []}
+
+
+def _unfold(feed):
+    return feed.replace("\r\n ", "")
+
+
+def test_ics_text_escapes():
+    assert user_engine._ics_text("a\\b;c,d\ne\r\nf") == "a\\\\b\\;c\\,d\\ne\\nf"
+
+
+def test_fold_at_75_octets():
+    line = "DESCRIPTION:" + "x" * 200
+    folded = user_engine._fold(line)
+    assert all(len(part.encode("utf-8")) <= 75 for part in folded.split("\r\n"))
+    assert folded.split("\r\n")[1].startswith(" ")
+    assert folded.replace("\r\n ", "") == line
+    assert user_engine._fold("SUMMARY:Duty") == "SUMMARY:Duty"
+
+
+def test_fold_never_splits_a_character():
+    line = "SUMMARY:" + "é" * 60 + "日本" * 20
+    folded = user_engine._fold(line)
+    for part in folded.split("\r\n"):
+        assert len(part.encode("utf-8")) <= 75
+    assert folded.replace("\r\n ", "") == line
+
+
+def test_feeds_per_person():
+    feeds = user_engine.ics_feeds(ROSTER, "0326", {3: "Founders Day"})
+    assert set(feeds) == {"ALICE", "BOB", "CAROL (F)"}
+    alice = _unfold(feeds["ALICE"])
+    assert alice.count("BEGIN:VEVENT") == 2
+    assert "DTSTART;VALUE=DATE:20260303" in alice and "SUMMARY:Duty (Founders Day)" in alice
+    assert "DESCRIPTION:On duty: BOB" in alice
+    assert "TRANSP:TRANSPARENT" in feeds["CAROL (F)"]
+    assert feeds["ALICE"].endswith("END:VCALENDAR\r\n")
+
+
+def test_long_lines_are_folded():
+    roster = {"3": {"duty": ["ALICE"] + [f"COLLEAGUE NUMBER {i}, ESQ." for i in range(6)], "standby": []}}
+    feed = user_engine.ics_feeds(roster, "0326", names=["ALICE"])["ALICE"]
+    assert all(len(line.encode("utf-8")) <= 75 for line in feed.split("\r\n"))
+    assert "COLLEAGUE NUMBER 5\\, ESQ." in _unfold(feed)
+
+
+def test_uids_are_stable():
+    first = user_engine.ics_feeds(ROSTER, "0326")["BOB"]
+    again = user_engine.ics_feeds(dict(ROSTER), "0326")["BOB"]
+    uid = [line for line in first.split("\r\n") if line.startswith("UID:")]
+    assert uid == [line for line in again.split("\r\n") if line.startswith("UID:")]
@@ -0,0 +1,72 @@
+import pytest
+
+import write_queue
+
+
+@pytest.fixture(autouse=True)
+def journal(tmp_path, monkeypatch):
+    monkeypatch.setattr(write_queue, "JOURNAL_PATH", str(tmp_path / "queue.sqlite3"))
+
+
+def _submit(mmyy, name, constraints="1,2", preferences="5"):
+    return write_queue.enqueue_submission("MASTER SHEET", mmyy, name, "None", "Yes", {},
+                                          constraints, preferences, "submitted")
+
+
+def test_flush_writes_and_marks_done(workbook):
+    _submit("0326", "ALICE")
+    flushed = []
+    logs = write_queue.flush(workbook, lambda name, months: flushed.append(months))
+    row = workbook.read_grid("0326C")[3]
+    assert row[4:9] == ["X", "X", "", "", "D"]
+    assert flushed == [["0326"]]
+    assert write_queue.queue_status()["done"] == 1
+    assert logs and logs[0].startswith("✅")
+
+
+def test_newer_submission_supersedes_pending():
+    _submit("0326", "ALICE", "1")
+    _submit("0326", "ALICE", "3")
+    assert write_queue.queue_status()["superseded"] == 1
+    assert write_queue.pending_for("MASTER SHEET", "0326", "ALICE")["constraints"] == "3"
+
+
+def test_missing_month_only_holds_back_that_month(workbook):
+    _submit("0326", "ALICE")
+    _submit("0426", "BOB")          # no 0426C sheet
+    logs = write_queue.flush(workbook)
+    assert workbook.read_grid("0326C")[3][4] == "X"
+    status = write_queue.queue_status()
+    assert status["done"] == 1 and status["pending"] == 1
+    assert any("0426" in line and "held back" in line for line in logs)
+
+
+def test_gives_up_after_max_attempts_then_retries(workbook):
+    _submit("0426", "BOB")
+    for _ in range(write_queue.MAX_ATTEMPTS):
+        write_queue.flush(workbook)
+    failed = write_queue.failed_submissions()
+    assert [f["user_name"] for f in failed] == ["BOB"]
+    assert "0426C" in failed[0]["last_error"]
+
+    workbook.write_sheet("0426C", workbook.read_grid("0326C"))
+    assert write_queue.retry_failed() == 1
+    write_queue.flush(workbook)
+    assert write_queue.queue_status()["failed"] == 0
+    assert workbook.read_grid("0426C")[4][4] == "X"
+
+
+def test_retry_skips_people_who_resubmitted(workbook):
+    _submit("0426", "BOB")
+    for _ in range(write_queue.MAX_ATTEMPTS):
+        write_queue.flush(workbook)
+    _submit("0426", "BOB", "9")
+    assert write_queue.retry_failed() == 0
+
+
+def test_unknown_person_fails_alone(workbook):
+    _submit("0326", "ALICE")
+    _submit("0326", "NOBODY")
+    write_queue.flush(workbook)
+    status = write_queue.queue_status()
+    assert status["done"] == 1 and status["pending"] == 1
@@ -1,4 +1,9 @@
-from datetime import date
+import hashlib
+from datetime import date, datetime, timedelta, timezone
+
+import storage
+import holiday_index
+import duty_rules
 
 def _col_letter(n):
     """Convert 1-based column index to spreadsheet letter(s), e.g. 1→A, 27→AA."""
@@ -8,409 +13,335 @@ def _col_letter(n):
         result = chr(65 + remainder) + result
     return result
 
+_a1_sheet = storage.a1
+
+def user_current_data_from_snapshot(snapshot, user_name):
+    """
+    Same result as get_user_current_data, derived from a load_month_snapshot()
+    dict without any further API calls. Returns None if the user has no row
+    in the {mmyy}C sheet.
+    """
+    nl_data = snapshot.get("namelist", [])
+    p_data = snapshot.get("partners", [])
+    c_data = snapshot.get("c_sheet", [])
+
+    nl_row = next((row for row in nl_data if len(row) > 1 and row[1] == user_name), None)
+
+    # get driving status from Namelist sheet column D
+    driving = "NON-DRIVER"
+    if nl_row is not None:
+        driving = (nl_row[3] if len(nl_row) > 3 else "") or "NON-DRIVER"
+
+    # get partner from Partners sheet
+    # structure: col B = Names (everyone), col C = Partner
+    partner = "None"
+    p_row = next((row for row in p_data if len(row) > 1 and row[1] == user_name), None)
+    if p_row is not None:
+        partner = (p_row[2] if len(p_row) > 2 else "") or "None"
+
+    # get trait values — any column beyond D (index 4+) is a trait column
+    traits = {}
+    if nl_row is not None and nl_data:
+        all_headers = nl_data[0]  # e.g. ['', 'NAME', 'BRANCH', 'DRIVING', 'Seniority', 'Team']
+        for col_idx, header in enumerate(all_headers[4:], start=4):
+            header = header.strip()
+            if header:
+                val = nl_row[col_idx] if col_idx < len(nl_row) else ""
+                traits[header] = (val or "").strip()
+
+    # get X and D markers
+    c_row = next((row for row in c_data if len(row) > 1 and row[1] == user_name), None)
+    if c_row is None:
+        return None
+    c_list = [str(i+1) for i, v in enumerate(c_row[4:35]) if v == 'X']
+    p_list = [str(i+1) for i, v in enumerate(c_row[4:35]) if v == 'D']
+
+    result = {
+        "partner": partner,
+        "driving": driving,
+        "constraints": ", ".join(c_list),
+        "preferences": ", ".join(p_list)
+    }
+    # add trait values as 'trait_<CategoryName>' keys so the form can pre-populate
+    for cat, val in traits.items():
+        result[f"trait_{cat}"] = val
+    return result
+
 def get_user_current_data(client, spreadsheet_name, mmyy, user_name):
     try:
-        sh = client.open(spreadsheet_name)
-        p_ws = sh.worksheet("Partners")
-        nl_ws = sh.worksheet("Namelist")
-        c_ws = sh.worksheet(f"{mmyy}C")
-
-        # get driving status from Namelist sheet column D
-        driving = "NON-DRIVER"
-        try:
-            nl_cell = nl_ws.find(user_name, in_column=2)
-            driving = nl_ws.cell(nl_cell.row, 4).value or "NON-DRIVER"
-        except:
-            pass
-
-        # get partner from Partners sheet
-        # structure: col B = Names (everyone), col C = Partner
-        partner = "None"
-        try:
-            cell = p_ws.find(user_name, in_column=2)
-            partner = p_ws.cell(cell.row, 3).value or "None"
-        except:
-            pass
-
-        # get trait values — any column beyond D (index 4+) is a trait column
-        # read headers from row 1 to find trait column positions
-        traits = {}
-        try:
-            all_headers = nl_ws.row_values(1)  # e.g. ['', 'NAME', 'BRANCH', 'DRIVING', 'Seniority', 'Team']
-            for col_idx, header in enumerate(all_headers[4:], start=5):  # col 5 onward (1-indexed)
-                header = header.strip()
-                if header:
-                    val = nl_ws.cell(nl_cell.row, col_idx).value or ""
-                    traits[header] = val.strip()
-        except:
-            pass
-
-        # get X and D markers
-        user_cell = c_ws.find(user_name, in_column=2)
-        row_values = c_ws.row_values(user_cell.row)
-        c_list = [str(i+1) for i, v in enumerate(row_values[4:35]) if v == 'X']
-        p_list = [str(i+1) for i, v in enumerate(row_values[4:35]) if v == 'D']
-
-        result = {
-            "partner": partner,
-            "driving": driving,
-            "constraints": ", ".join(c_list),
-            "preferences": ", ".join(p_list)
-        }
-        # add trait values as 'trait_<CategoryName>' keys so the form can pre-populate
-        for cat, val in traits.items():
-            result[f"trait_{cat}"] = val
-        return result
+        return user_current_data_from_snapshot(
+            load_month_snapshot(client, spreadsheet_name, mmyy), user_name
+        )
     except:
         return None
 
+def load_month_snapshot(client, spreadsheet_name, mmyy):
+    """
+    Reads Namelist, Partners, Holiday and {mmyy}C in a single values.batchGet.
+    Returns { mmyy, namelist, partners, holiday, c_sheet } as raw row lists;
+    c_sheet is [] when the month's C sheet does not exist yet.
+    Every user's context can then be derived with get_user_context().
+    """
+    store = storage.for_client(client, spreadsheet_name)
+    keys = ["namelist", "partners", "holiday", "c_sheet"]
+    ranges = [_a1_sheet("Namelist"), _a1_sheet("Partners", "A:C"),
+              _a1_sheet("Holiday"), _a1_sheet(f"{mmyy}C")]
+    try:
+        values = store.read_ranges(ranges)
+    except Exception:
+        # a missing sheet fails the whole batch — retry with only those that exist
+        titles = set(store.list_sheets())
+        present = [(k, r) for k, r, title in zip(keys, ranges, ["Namelist", "Partners", "Holiday", f"{mmyy}C"])
+                   if title in titles]
+        keys = [k for k, _ in present]
+        values = store.read_ranges([r for _, r in present]) if present else []
+
+    snapshot = {"mmyy": mmyy, "namelist": [], "partners": [], "holiday": [], "c_sheet": []}
+    for key, vals in zip(keys, values):
+        snapshot[key] = vals
+    return snapshot
+
+def get_user_context(snapshot, user_name):
+    """
+    Everything the User Planning page needs for one person, from a shared
+    load_month_snapshot() dict:
+      current:         as get_user_current_data (None if not in {mmyy}C)
+      holiday_days:    as get_holiday_duty_days
+    Per-day counts come from roster_aggregates, shared across sessions.
+    """
+    return {
+        "current": user_current_data_from_snapshot(snapshot, user_name),
+        "holiday_days": holiday_duty_days_from_rows(snapshot.get("holiday", []), snapshot["mmyy"], user_name),
+    }
+
+def submission_read_ranges(mmyy):
+    """Ranges needed by build_submission_updates, in the order it expects them."""
+    return [_a1_sheet("Namelist"), _a1_sheet("Partners", "A:C"), _a1_sheet(f"{mmyy}C", "A:B")]
+
+def build_submission_updates(nl_data, p_data, c_data, mmyy, user_name, partner, driving_status,
+                             selected_traits, constraints, preferences, status_string):
+    """
+    Pure version of a User-page submission: given the raw values of Namelist,
+    Partners and the {mmyy}C name column, returns (updates, logs) where updates
+    is a list of {'range': "'Sheet'!A1", 'values': [[...]]} ready for a single
+    values.batchUpdate.
+
+    p_data is updated in place with the new partner links so several queued
+    submissions can be applied in order against the same snapshot.
+    """
+    updates = []
+    logs = []
+
+    # update driving status in Namelist sheet column D
+    nl_row = None
+    for i, row in enumerate(nl_data):
+        if len(row) > 1 and row[1] == user_name:
+            nl_row = i + 1
+            break
+    if nl_row:
+        updates.append({'range': _a1_sheet("Namelist", f"D{nl_row}"), 'values': [[driving_status]]})
+        logs.append(f"✅ Step 1a: Updated driving status in Namelist for {user_name}")
+    else:
+        logs.append(f"⚠️ Could not update driving status in Namelist for {user_name}")
+
+    # update trait values — find each category's column by header name in row 1
+    if selected_traits and nl_row:
+        all_headers = nl_data[0] if nl_data else []
+        for cat, val in selected_traits.items():
+            for col_idx, header in enumerate(all_headers, start=1):
+                if header.strip() == cat:
+                    updates.append({
+                        'range': _a1_sheet("Namelist", f"{_col_letter(col_idx)}{nl_row}"),
+                        'values': [[val or ""]]
+                    })
+                    break
+        logs.append(f"✅ Step 1b: Updated trait values in Namelist for {user_name}")
+
+    # update Partners sheet
+    # structure: col B = Names (everyone), col C = Partner
+    name_to_prow = {}
+    for i, row in enumerate(p_data):
+        n = row[1].strip() if len(row) > 1 else ""
+        if n:
+            name_to_prow[n] = i + 1  # 1-indexed gspread row
+
+    def _partner_of(prow):
+        row = p_data[prow - 1]
+        return row[2].strip() if len(row) > 2 else ""
+
+    def _set_partner(prow, value):
+        row = p_data[prow - 1]
+        while len(row) < 3:
+            row.append("")
+        row[2] = value
+        updates.append({'range': _a1_sheet("Partners", f"C{prow}"), 'values': [[value]]})
+
+    partner_name = partner if partner != "None" else ""
+
+    if user_name in name_to_prow:
+        u_prow = name_to_prow[user_name]
+
+        # read old partner before overwriting
+        old_partner = _partner_of(u_prow)
+
+        # write new partner for user
+        _set_partner(u_prow, partner_name)
+
+        # blank old partner's col C if they had a different partner
+        if old_partner and old_partner != partner_name and old_partner in name_to_prow:
+            _set_partner(name_to_prow[old_partner], "")
+
+        # update new partner's row
+        if partner_name and partner_name in name_to_prow:
+            np_row = name_to_prow[partner_name]
+            np_old_partner = _partner_of(np_row)
+            # blank new partner's old partner if different
+            if np_old_partner and np_old_partner != user_name and np_old_partner in name_to_prow:
+                _set_partner(name_to_prow[np_old_partner], "")
+            # write user as new partner's partner
+            _set_partner(np_row, user_name)
+
+        logs.append(f"✅ Step 1b: Updated Partners sheet for {user_name} → {partner_name or 'None'}")
+    else:
+        logs.append(f"⚠️ {user_name} not found in Partners sheet — skipping partner update.")
+
+    # update constraint sheet
+    u_row = None
+    for i, row in enumerate(c_data):
+        if len(row) > 1 and row[1] == user_name:
+            u_row = i + 1
+            break
+    if u_row is None:
+        raise ValueError(f"{user_name} not found in {mmyy}C")
+
+    # the whole E:AI row is rewritten in one range, so no separate blanking call
+    grid = ["" for _ in range(31)]
+    if constraints:
+        for day in [d.strip() for d in constraints.split(',') if d.strip().isdigit()]:
+            if 1 <= int(day) <= 31:
+                grid[int(day) - 1] = 'X'
+    if preferences:
+        for day in [d.strip() for d in preferences.split(',') if d.strip().isdigit()]:
+            if 1 <= int(day) <= 31:
+                grid[int(day) - 1] = 'D'
+
+    updates.append({'range': _a1_sheet(f"{mmyy}C", f"E{u_row}:AI{u_row}"), 'values': [grid]})
+    updates.append({'range': _a1_sheet(f"{mmyy}C", f"AR{u_row}"), 'values': [[status_string]]})  # status = AR
+    logs.append(f"✅ Step 2: Updated {mmyy}C markers.")
+
+    return updates, logs
+
 def update_user_data(client, spreadsheet_name, mmyy, user_name, partner, driving_status, selected_traits, constraints, preferences, status_string):
     """
     selected_traits: dict of { category_name: chosen_option }
                      e.g. {'Seniority': 'Senior', 'Team': 'Alpha'}
                      Written to the matching header columns in the Namelist sheet.
+
+    Synchronous path: one batched read and one values.batchUpdate.
+    The User page normally goes through write_queue instead.
     """
-    logs = []
     try:
-        sh = client.open(spreadsheet_name)
-        p_ws = sh.worksheet("Partners")
-        nl_ws = sh.worksheet("Namelist")
-
-        # update driving status in Namelist sheet column D
-        try:
-            nl_cell = nl_ws.find(user_name, in_column=2)
-            nl_ws.update_acell(f'D{nl_cell.row}', driving_status)
-            logs.append(f"✅ Step 1a: Updated driving status in Namelist for {user_name}")
-        except:
-            logs.append(f"⚠️ Could not update driving status in Namelist for {user_name}")
-
-        # update trait values — find each category's column by header name in row 1
-        if selected_traits:
-            try:
-                nl_cell = nl_ws.find(user_name, in_column=2)
-                all_headers = nl_ws.row_values(1)
-                trait_updates = []
-                for cat, val in selected_traits.items():
-                    # find the column index (1-based) for this category header
-                    for col_idx, header in enumerate(all_headers, start=1):
-                        if header.strip() == cat:
-                            trait_updates.append({
-                                'range': f'{_col_letter(col_idx)}{nl_cell.row}',
-                                'values': [[val or ""]]
-                            })
-                            break
-                if trait_updates:
-                    nl_ws.batch_update(trait_updates, value_input_option='USER_ENTERED')
-                logs.append(f"✅ Step 1b: Updated trait values in Namelist for {user_name}")
-            except Exception as e:
-                logs.append(f"⚠️ Could not update traits in Namelist for {user_name}: {e}")
-
-        # update Partners sheet
-        # structure: col B = Names (everyone), col C = Partner
-        # read all partner data once to avoid repeated API calls
-        p_data = p_ws.get_all_values()
-        name_to_prow = {}
-        for i, row in enumerate(p_data):
-            n = row[1].strip() if len(row) > 1 else ""
-            if n:
-                name_to_prow[n] = i + 1  # 1-indexed gspread row
-
-        partner_name = partner if partner != "None" else ""
-        p_updates = []
-
-        if user_name in name_to_prow:
-            u_prow = name_to_prow[user_name]
-
-            # read old partner before overwriting
-            old_partner = p_data[u_prow - 1][2].strip() if len(p_data[u_prow - 1]) > 2 else ""
-
-            # write new partner for user
-            p_updates.append({'range': f'C{u_prow}', 'values': [[partner_name]]})
-
-            # blank old partner's col C if they had a different partner
-            if old_partner and old_partner != partner_name and old_partner in name_to_prow:
-                old_prow = name_to_prow[old_partner]
-                p_updates.append({'range': f'C{old_prow}', 'values': [[""]]})
-
-            # update new partner's row
-            if partner_name and partner_name in name_to_prow:
-                np_row = name_to_prow[partner_name]
-                np_old_partner = p_data[np_row - 1][2].strip() if len(p_data[np_row - 1]) > 2 else ""
-                # blank new partner's old partner if different
-                if np_old_partner and np_old_partner != user_name and np_old_partner in name_to_prow:
-                    npo_row = name_to_prow[np_old_partner]
-                    p_updates.append({'range': f'C{npo_row}', 'values': [[""]]})
-                # write user as new partner's partner
-                p_updates.append({'range': f'C{np_row}', 'values': [[user_name]]})
-
-            if p_updates:
-                p_ws.batch_update(p_updates, value_input_option='USER_ENTERED')
-            logs.append(f"✅ Step 1b: Updated Partners sheet for {user_name} → {partner_name or 'None'}")
-
-        else:
-            logs.append(f"⚠️ {user_name} not found in Partners sheet — skipping partner update.")
-
-        # update constraint sheet
-        c_ws = sh.worksheet(f"{mmyy}C")
-        user_cell = c_ws.find(user_name, in_column=2)
-        u_row = user_cell.row
-        date_start_col = 5   # col E = 5 in 1-indexed gspread
-        date_end_col = 35    # col AI = 35 in 1-indexed gspread
-        c_updates = []
-
-        c_updates.append({'range': f'AR{u_row}', 'values': [[status_string]]})  # status = AR
-
-        def get_col_let(n):
-            if n <= 26:
-                return chr(64 + n)
-            else:
-                first = chr(64 + (n - 1) // 26)
-                second = chr(64 + (n - 1) % 26 + 1)
-                return f"{first}{second}"
-
-        # wipe existing data
-        clear_range = f"{get_col_let(date_start_col)}{u_row}:{get_col_let(date_end_col)}{u_row}"
-        blank_row = [["" for _ in range(31)]]
-        c_ws.update(clear_range, blank_row)
-
-        if constraints:
-            for day in [d.strip() for d in constraints.split(',') if d.strip().isdigit()]:
-                col_let = get_col_let(date_start_col + int(day) - 1)
-                c_updates.append({'range': f'{col_let}{u_row}', 'values': [['X']]})
-
-        if preferences:
-            for day in [d.strip() for d in preferences.split(',') if d.strip().isdigit()]:
-                col_let = get_col_let(date_start_col + int(day) - 1)
-                c_updates.append({'range': f'{col_let}{u_row}', 'values': [['D']]})
-
-        if c_updates:
-            c_ws.batch_update(c_updates, value_input_option='USER_ENTERED')
-            logs.append(f"✅ Step 2: Updated {mmyy}C markers.")
-
+        store = storage.for_client(client, spreadsheet_name)
+        nl_data, p_data, c_data = store.read_ranges(submission_read_ranges(mmyy))
+
+        updates, logs = build_submission_updates(
+            nl_data, p_data, c_data, mmyy, user_name, partner, driving_status,
+            selected_traits, constraints, preferences, status_string
+        )
+        store.batch_write(updates)
         return True, logs
 
     except Exception as e:
         return False, [f"❌ Error: {str(e)}"]
 
+def roster_context_from_rows(raw):
+    """
+    Builds (day_duty_counts, all_person_days) from raw {mmyy}C values.
+    Day cols are 0-indexed 4..34 (days 1..31). Data rows start at index 3.
+    """
+    day_duty_counts = {d: 0 for d in range(1, 32)}
+    all_person_days = {}
+    for row in raw[3:]:
+        if not row or len(row) < 2 or not row[1].strip():
+            continue
+        name = row[1].strip()
+        person_d_days = []
+        for i in range(31):
+            col_idx = 4 + i
+            if col_idx >= len(row):
+                break
+            if row[col_idx].strip().upper() == 'D':
+                day_duty_counts[i + 1] += 1
+                person_d_days.append(i + 1)
+        all_person_days[name] = person_d_days
+    return day_duty_counts, all_person_days
+
 def get_roster_context(client, spreadsheet_name, mmyy):
     """
     Reads {mmyy}C sheet and returns:
       day_duty_counts: { day_int: int }        — total D count per day
       all_person_days: { name_str: [day_int] } — each person's D days
-    Day cols are 0-indexed 4..34 (days 1..31). Data rows start at index 3.
     """
-    day_duty_counts = {d: 0 for d in range(1, 32)}
-    all_person_days = {}
     try:
-        sh = client.open(spreadsheet_name)
-        all_titles = [s.title for s in sh.worksheets()]
-        sheet_name = f"{mmyy}C"
-        if sheet_name not in all_titles:
-            return day_duty_counts, all_person_days
-        ws = sh.worksheet(sheet_name)
-        raw = ws.get_all_values()
-        for row in raw[3:]:
-            if not row or len(row) < 2 or not row[1].strip():
-                continue
-            name = row[1].strip()
-            person_d_days = []
-            for i in range(31):
-                col_idx = 4 + i
-                if col_idx >= len(row):
-                    break
-                if row[col_idx].strip().upper() == 'D':
-                    day_duty_counts[i + 1] += 1
-                    person_d_days.append(i + 1)
-            all_person_days[name] = person_d_days
+        store = storage.for_client(client, spreadsheet_name)
+        return roster_context_from_rows(store.read_grid(f"{mmyy}C"))
     except Exception:
-        pass
-    return day_duty_counts, all_person_days
+        return roster_context_from_rows([])
 
 
-def get_applicable_constraints(config):
+def submission_checker(snapshot, config, last_duty_dates=None, last_month_workers=None):
     """
-    Reads CONFIG (as returned by fetch_config) and extracts hard constraints
-    enforceable at submission time. Returns a list of dicts with key 'kind':
-      kind='day_max':          max D per day            → {limit}
-      kind='person_month_max': max D per person/month   → {limit}
-      kind='person_week_max':  max D per person/week    → {limit}
-      kind='gap_dd':           min gap between own D's  → {days}
-    Automatically picks up new constraints added via the Dev page.
+    duty_rules.DutyChecker for a month's User-page submissions, built from a
+    load_month_snapshot() dict and CONFIG (as returned by fetch_config). The
+    calendar arrays and compiled rules are built once, so keep the checker
+    for as long as the snapshot; validate_submission then runs in O(days).
+    Picks up new constraints added via the Dev page like the solver does.
     """
-    results = []
-    for cid, cv in config.items():
-        if cid.startswith("_"):
-            continue
-        if not cv.get("active", True):
-            continue
-        if cv.get("type", "").lower() != "hard":
-            continue
-        rule = cv.get("rule", {})
-        if not rule:
-            continue
-
-        cls   = rule.get("class", "")
-        soft  = rule.get("soft", False)
-        label = cv.get("label", cid)
-
-        if cls == "value" and not soft:
-            subj1 = rule.get("subject1", "person")
-            op    = rule.get("operator", "=")
-            subj2 = rule.get("subject2", "D").upper()
-            per   = rule.get("per", "month")
-            if subj2 != "D" or op not in ("=", "<="):
-                continue
-            try:
-                number = int(rule.get("number", 1))
-            except Exception:
-                continue
-            if subj1 == "day":
-                results.append({"kind": "day_max", "limit": number, "label": label})
-            elif subj1 == "person" and per == "month":
-                results.append({"kind": "person_month_max", "limit": number, "label": label})
-            elif subj1 == "person" and per == "week":
-                results.append({"kind": "person_week_max", "limit": number, "label": label})
-
-        elif cls == "gap" and not soft:
-            from_type = rule.get("from_type", "D").upper()
-            to_type   = rule.get("to_type", "D").upper()
-            if from_type != "D" or to_type != "D":
-                continue
-            try:
-                days = int(rule.get("days", 4))
-            except Exception:
-                continue
-            results.append({"kind": "gap_dd", "days": days, "label": label})
-
-    return results
-
-
-def validate_preferences(pref_days, user_name, mmyy, constraints_list, day_duty_counts, all_person_days):
+    mmyy = snapshot["mmyy"]
+    month, year = int(mmyy[:2]), 2000 + int(mmyy[2:])
+    cal = duty_rules.month_calendar(
+        year, month, holiday_index.from_rows(snapshot.get("holiday", [])).month_days(year, month)
+    )
+    roster = duty_rules.load_roster(cal, snapshot.get("c_sheet", []), None,
+                                    snapshot.get("namelist", []), snapshot.get("partners", []))
+    return duty_rules.DutyChecker(cal, roster, duty_rules.compile_rules(config),
+                                  last_duty_dates, last_month_workers)
+
+
+def validate_submission(checker, user_name, pref_days, x_days=(), on_day=None):
     """
-    Validates preference day integers against all applicable constraints.
-    Excludes the user's own existing days from counts to avoid double-counting
-    when re-submitting.
-
-    Returns: list of str error messages. Empty = no violations.
+    Checks a submission's D days (replacing the user's row) against the
+    CONFIG rules. Per-day caps and hard groupings are errors. Submitted D's
+    become fixed duties, which the solver exempts from weekly/monthly caps,
+    D-D gaps (also across months), D-S gaps and ALLOW rules, so breaches of
+    those are warnings. on_day ([{NAME}] by day, e.g. roster_aggregates)
+    should include queued submissions.
+
+    Returns (errors, warnings) as markdown lines; errors block the save,
+    warnings are soft-rule breaches and person-rule conflicts.
     """
-    from datetime import date as _date
-    from collections import defaultdict
-
-    errors = []
-    if not pref_days or not constraints_list:
-        return errors
-
-    mm = int(mmyy[:2])
-    yy = 2000 + int(mmyy[2:])
-
-    existing_person_days = set(all_person_days.get(user_name, []))
-    combined_days = sorted(existing_person_days | set(pref_days))
-
-    def adjusted_day_count(day):
-        """Day count excluding this person's own existing entry."""
-        base = day_duty_counts.get(day, 0)
-        return base - (1 if day in existing_person_days else 0)
-
-    for c in constraints_list:
-        kind  = c["kind"]
-        label = c.get("label", kind)
-
-        if kind == "day_max":
-            limit = c["limit"]
-            for d in pref_days:
-                current = adjusted_day_count(d)
-                if current >= limit:
-                    errors.append(
-                        f"❌ **Day {d}**: already has {current}/{limit} duty slot(s) filled "
-                        f"— cannot add another ({label})."
-                    )
-
-        elif kind == "person_month_max":
-            limit = c["limit"]
-            if len(combined_days) > limit:
-                errors.append(
-                    f"❌ **Monthly cap**: requesting {len(combined_days)} duty day(s) but "
-                    f"max per person is {limit}/month ({label})."
-                )
-
-        elif kind == "person_week_max":
-            limit = c["limit"]
-            week_days = defaultdict(list)
-            for d in combined_days:
-                iso_week = _date(yy, mm, d).isocalendar()[1]
-                week_days[iso_week].append(d)
-            for week, days_in_week in week_days.items():
-                if len(days_in_week) > limit:
-                    errors.append(
-                        f"❌ **Weekly cap (week {week})**: days {sorted(days_in_week)} gives "
-                        f"{len(days_in_week)} duties — max is {limit}/week ({label})."
-                    )
-
-        elif kind == "gap_dd":
-            gap = c["days"]
-            sorted_days = sorted(combined_days)
-            for i in range(len(sorted_days) - 1):
-                d1, d2 = sorted_days[i], sorted_days[i + 1]
-                diff = (_date(yy, mm, d2) - _date(yy, mm, d1)).days
-                if diff < gap and (d1 in pref_days or d2 in pref_days):
-                    errors.append(
-                        f"❌ **Gap violation**: day {d1} and day {d2} are only {diff} day(s) apart "
-                        f"— minimum required is {gap} days ({label})."
-                    )
-
-    return errors
+    errors, warnings = checker.check_submission(user_name, pref_days, x_days, on_day)
+    return [f"❌ {e}" for e in errors], [f"⚠️ {w}" for w in warnings]
 
 
-def get_holiday_duty_days(client, spreadsheet_name, mmyy, user_name):
+def holiday_duty_days_from_rows(hol_raw, mmyy, user_name):
     """
-    Reads the Holiday sheet and returns a list of dicts for any holiday where
-    the user (matched case-insensitively against col D or E) is assigned,
-    AND the holiday falls in the given mmyy month.
+    Returns a list of dicts for any holiday row in hol_raw (raw Holiday sheet
+    values) where the user (matched case-insensitively against col D or E) is
+    assigned, AND the holiday falls in the given mmyy month.
     Each dict: { "date": date_obj, "name": holiday_name_str }
     """
-    results = []
-    try:
-        sh = client.open(spreadsheet_name)
-        all_titles = [s.title for s in sh.worksheets()]
-        if "Holiday" not in all_titles:
-            return results
-        hol_ws = sh.worksheet("Holiday")
-        hol_raw = hol_ws.get_all_values()
-
-        mm = int(mmyy[:2])
-        yy = 2000 + int(mmyy[2:])
-
-        for row in hol_raw[1:]:  # skip header
-            if not row or not row[0].strip():
-                continue
-            hol_holiday_name = row[0].strip()
-            hol_date_str = row[1].strip() if len(row) > 1 else ""
-            name1 = row[3].strip() if len(row) > 3 else ""
-            name2 = row[4].strip() if len(row) > 4 else ""
-
-            # check if this user is assigned
-            if user_name.upper() not in (name1.upper(), name2.upper()):
-                continue
-
-            # parse date
-            hol_date = None
-            from datetime import datetime as _dt
-            for fmt in ["%d %b %Y", "%-d %b %Y", "%Y-%m-%d"]:
-                try:
-                    hol_date = _dt.strptime(hol_date_str, fmt).date()
-                    break
-                except:
-                    continue
-            if not hol_date:
-                continue
-
-            # only include if it falls in the target month
-            if hol_date.year == yy and hol_date.month == mm:
-                results.append({"date": hol_date, "name": hol_holiday_name})
+    idx = holiday_index.from_rows(hol_raw)
+    return [{"date": h.date, "name": h.name}
+            for h in idx.for_person(user_name, 2000 + int(mmyy[2:]), int(mmyy[:2]))]
 
+def get_holiday_duty_days(client, spreadsheet_name, mmyy, user_name):
+    """Reads the Holiday sheet; see holiday_duty_days_from_rows."""
+    try:
+        store = storage.for_client(client, spreadsheet_name)
+        return holiday_duty_days_from_rows(store.read_grid("Holiday"), mmyy, user_name)
     except Exception:
-        pass
-    return results
+        return []
 
 
 def parse_string_to_days(day_string, month_year_str):
@@ -437,10 +368,10 @@ def format_date_list(history_collection):
 
 def calendar_view(client, spreadsheet_name, mmyy):
     try:
-        sh = client.open(spreadsheet_name)
+        store = storage.for_client(client, spreadsheet_name)
 
         # 1. Get all available sheet titles to check for existence
-        all_sheet_titles = [s.title for s in sh.worksheets()]
+        all_sheet_titles = store.list_sheets()
 
         # 2. Define our targets
         primary_sheet = f"{mmyy}D"
@@ -448,16 +379,16 @@ def calendar_view(client, spreadsheet_name, mmyy):
 
         # 3. If-Else Logic for sheet selection
         if primary_sheet in all_sheet_titles:
-            worksheet = sh.worksheet(primary_sheet)
+            target_sheet = primary_sheet
             sheet_used = "D"
         elif backup_sheet in all_sheet_titles:
-            worksheet = sh.worksheet(backup_sheet)
+            target_sheet = backup_sheet
             sheet_used = "C"
         else:
             return None, None, f"No data for this {mmyy} was found."
 
         # 4. Pull data once the correct sheet is selected
-        raw_data = worksheet.get_all_values()
+        raw_data = store.read_grid(target_sheet)
 
         # Data starts from index 3 (Row 4)
         rows = raw_data[3:]
@@ -490,4 +421,73 @@ def calendar_view(client, spreadsheet_name, mmyy):
         return roster, sheet_used, None
 
     except Exception as e:
-        return None, None, str(e)
\ No newline at end of file
+        return None, None, str(e)
+
+def month_holiday_names(hol_raw, mmyy):
+    """{day: holiday name} for mmyy from raw Holiday sheet rows."""
+    idx = holiday_index.from_rows(hol_raw)
+    return {h.date.day: h.name for h in idx.month(2000 + int(mmyy[2:]), int(mmyy[:2]))}
+
+def _ics_text(value):
+    return (str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\r", "\\n").replace("\n", "\\n"))
+
+def _fold(line, limit=75):
+    """RFC 5545 §3.1: content lines longer than 75 octets continue on CRLF + space, never inside a UTF-8 char."""
+    data = line.encode("utf-8")
+    if len(data) <= limit:
+        return line
+    parts, start, width = [], 0, limit
+    while start < len(data):
+        end = min(start + width, len(data))
+        while end < len(data) and (data[end] & 0xC0) == 0x80:   # back off a continuation byte
+            end -= 1
+        parts.append(data[start:end].decode("utf-8"))
+        start, width = end, limit - 1   # the leading space counts towards the next line
+    return "\r\n ".join(parts)
+
+def ics_feeds(roster_data, mmyy, holiday_names=None, names=None, cal_name="Duty Roster"):
+    """
+    {NAME: ICS calendar text} with an all-day event for each of a person's D
+    and S days, built in one pass over a calendar_view() roster. Holiday days
+    carry the holiday's name (holiday_names from month_holiday_names). UIDs
+    are stable per person, day and role, so re-importing a feed updates the
+    events instead of duplicating them. names limits the output.
+    """
+    holiday_names = holiday_names or {}
+    wanted = set(names) if names is not None else None
+    month, year = int(mmyy[:2]), 2000 + int(mmyy[2:])
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    events = {}
+    for day_str, info in roster_data.items():
+        day = int(day_str)
+        try:
+            start = date(year, month, day)
+        except ValueError:
+            continue
+        hol = holiday_names.get(day)
+        for role, people in (("Duty", info.get("duty", [])), ("Standby", info.get("standby", []))):
+            for name in people:
+                if wanted is not None and name not in wanted:
+                    continue
+                with_others = [n for n in info.get("duty", []) if n != name]
+                summary = role + (f" ({hol})" if hol else "")
+                uid = hashlib.sha1(f"{mmyy}|{day}|{role}|{name}".encode("utf-8")).hexdigest()[:20]
+                events.setdefault(name, []).extend([
+                    "BEGIN:VEVENT",
+                    f"UID:{uid}@duty-planner",
+                    f"DTSTAMP:{stamp}",
+                    f"DTSTART;VALUE=DATE:{start:%Y%m%d}",
+                    f"DTEND;VALUE=DATE:{start + timedelta(days=1):%Y%m%d}",
+                    f"SUMMARY:{_ics_text(summary)}",
+                    f"DESCRIPTION:{_ics_text('On duty: ' + ', '.join(with_others) if with_others else role)}",
+                    "TRANSP:TRANSPARENT" if role == "Standby" else "TRANSP:OPAQUE",
+                    "END:VEVENT",
+                ])
+    head = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Duty Planner//Roster//EN", "CALSCALE:GREGORIAN",
+            "METHOD:PUBLISH"]
+    feeds = {}
+    for name, lines in events.items():
+        cal = head + [f"X-WR-CALNAME:{_ics_text(f'{cal_name} - {name}')}"] + lines + ["END:VCALENDAR"]
+        feeds[name] = "\r\n".join(_fold(line) for line in cal) + "\r\n"
+    return feeds
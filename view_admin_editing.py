@@ -0,0 +1,628 @@
+"""
+Admin ✏️ Editing page: roster views, downloads and the sidebar swap / penalty tools.
+"""
+import io
+import zipfile
+import calendar
+from datetime import date
+
+import streamlit as st
+import pandas as pd
+import gspread
+
+import calendar_render
+import holiday_index
+import pdf_service
+import roster_cache
+import roster_coverage
+import roster_history
+import sheet_cache
+from app_common import (
+    build_swap_checker, export_download, fetch_config, fetch_ics_feeds, fetch_month_snapshot,
+    fetch_roster, fetch_sheet_data, fetch_spreadsheet_id, get_personal_drive_service, record_history,
+    sheet_exporter,
+)
+
+
+def render(client):
+    _now = date.today(); _opts = [f"{m:02d}{str(y)[2:]}" for y in [_now.year, _now.year+1] for m in range(1,13)]
+    _next = date(_now.year + (_now.month // 12), (_now.month % 12) + 1, 1)
+    _default_mmyy = f"{_next.month:02d}{str(_next.year)[2:]}"
+    _default_idx = _opts.index(_default_mmyy) if _default_mmyy in _opts else 0
+    mmyy = st.selectbox("Month/Year (MMYY) to edit", options=_opts, index=_default_idx, key="edit_mmyy")
+    spreadsheet_name = "MASTER SHEET"
+
+    curr_m, curr_y = int(mmyy[:2]), int(mmyy[2:])
+    m_old = curr_m - 1
+    if curr_m == 1:
+        m_old = 12
+        y_old = curr_y - 1
+    else:
+        y_old = curr_y
+
+    # point allocations — use planning page slider values if available, else defaults
+    point_allocations = {
+        "weekday_points": st.session_state.get("weekday_slider", 1.0),
+        "friday_points": st.session_state.get("friday_slider", 1.0),
+        "weekend_points": st.session_state.get("weekend_slider", 2.0),
+        "holiday_points": st.session_state.get("holiday_slider", 2.0),
+    }
+
+    st.info(f"Editing **{mmyy}**!")
+
+    sheet_id = None
+    try:
+        personal_drive = get_personal_drive_service()
+        folder_id = st.secrets["app_config"]["personal_drive_folder_id"]
+        sheet_id = fetch_spreadsheet_id(personal_drive, folder_id, spreadsheet_name)
+        if sheet_id:
+            st.success(f"✅ Connected to storage!")
+        else:
+            st.warning(f"⚠️ Connection error: storage failed!")
+    except Exception as e:
+        st.error(f"❌ Storage failed: {e}")
+
+    # shared across sessions; write paths call roster_cache.invalidate(mmyy=...)
+    roster_data, sheet_used, err = fetch_roster(client, spreadsheet_name, mmyy)
+
+    if err:
+        st.warning(f"⚠️ Roster not yet finalised or accessible: {err}")
+    else:
+
+        if sheet_used == "D":
+            st.success("✅ Showing finalised roster")
+        elif sheet_used == "C":
+            st.info("ℹ️ Showing draft constraints — roster not yet finalised")
+
+        # segmented control: Calendar / C Sheet / Summary
+        cal_view_mode = st.segmented_control(
+            "View", options=["Calendar", "C Sheet", "Coverage", "Summary"], default="Calendar", key="edit_cal_mode"
+        )
+
+        if cal_view_mode == 'Coverage':
+            try:
+                _cov = roster_coverage.analyse(fetch_month_snapshot(client, spreadsheet_name, mmyy),
+                                        fetch_config(client, "MASTER SHEET"))
+                _cov_days = _cov["days"].set_index("day")
+                _dens = _cov["x_density"]
+                _m = st.columns(5)
+                _m[0].metric("Tightest day", f"{_cov_days['available'].idxmin()}",
+                             f"{_cov_days['available'].min()} available", delta_color="off")
+                for _col, _t, _lbl in zip(_m[1:], roster_coverage.DAY_TYPES, ["Weekday", "Friday", "Weekend", "Holiday"]):
+                    _col.metric(f"X on {_lbl}", f"{_dens[_t]:.0%}")
+
+                st.markdown("**Available people per day**")
+                _heat_rows = ["available", "slack"] if "slack" in _cov_days else ["available"]
+                _heat = _cov_days[_heat_rows].T
+                _heat.columns = [f"{d} {t}" for d, t in zip(_cov_days.index, _cov_days["type"])]
+                st.dataframe(_heat.style.apply(roster_coverage.heat_css, axis=None), use_container_width=True)
+                _counts = _cov_days[["fixed_d", "x", "s"]].T.rename(index={"fixed_d": "D (fixed)", "x": "X", "s": "S"})
+                _counts.columns = _heat.columns
+                st.dataframe(_counts.style.apply(roster_coverage.heat_css, axis=None, reverse=True), use_container_width=True)
+
+                if not _cov["branches"].empty:
+                    st.markdown("**Available by branch / drivers**")
+                    _br = _cov["branches"]
+                    _br.columns = _heat.columns
+                    st.dataframe(_br.style.apply(roster_coverage.heat_css, axis=None), use_container_width=True)
+
+                if not _cov["short"].empty:
+                    st.warning(f"⚠️ {len(_cov['short'])} person(s) cannot fit {_cov['target']} duties "
+                               f"in their available days (gap {_cov['gap']}):")
+                    st.dataframe(_cov["short"].rename(columns={
+                        "name": "Name", "available_days": "Available days", "fits": "Duties that fit", "target": "Share"
+                    }), hide_index=True, use_container_width=True)
+                if _cov["no_entries"]:
+                    st.info(f"📝 No X/D marked yet: {', '.join(_cov['no_entries'])}")
+            except Exception as e:
+                st.error(f"❌ Could not analyse coverage: {e}")
+
+        if cal_view_mode == 'Summary':
+            year_str_sum = str(2000 + int(mmyy[2:]))
+            _hist_months = roster_history.recorded_months(spreadsheet_name)
+            _hist_years = sorted({2000 + int(m[2:]) for m in _hist_months})
+            if _hist_years:
+                _sum_years = st.multiselect(
+                    "Years (from roster history)", options=_hist_years,
+                    default=[y for y in _hist_years if str(y) == year_str_sum] or _hist_years[-1:],
+                    key="edit_sum_years"
+                )
+                _totals = roster_history.person_totals(spreadsheet_name, _sum_years)
+                if _totals:
+                    _tot_df = pd.DataFrame(_totals).rename(columns={
+                        "name": "Name", "year": "Year", "WD": "Weekday", "F": "Friday",
+                        "WE": "Weekend", "H": "Holiday", "S": "Standby",
+                        "duties": "Duties", "points": "Points"
+                    })
+                    st.dataframe(_tot_df, use_container_width=True, hide_index=True)
+                st.caption(f"📚 History covers {len(_hist_months)} month(s): {', '.join(_hist_months)}")
+            try:
+                yr_cache_key = f'yr_summary_{year_str_sum}'
+                if yr_cache_key not in st.session_state:
+                    yr_raw = fetch_sheet_data(client, spreadsheet_name, year_str_sum)
+                    st.session_state[yr_cache_key] = yr_raw
+                yr_raw = st.session_state[yr_cache_key]
+                if yr_raw:
+                    yr_df = pd.DataFrame(yr_raw)
+                    st.dataframe(yr_df, use_container_width=True, hide_index=True)
+                else:
+                    st.warning(f'⚠️ No data found in {year_str_sum} sheet.')
+            except Exception as e:
+                st.error(f'❌ Could not load year sheet: {e}')
+
+        if cal_view_mode == 'C Sheet':
+            c_sheet_name = f"{mmyy}C"
+            c_cache_key = f"c_sheet_preview_{mmyy}"
+            try:
+                if c_cache_key not in st.session_state:
+                    raw_c = fetch_sheet_data(client, spreadsheet_name, c_sheet_name)
+                    st.session_state[c_cache_key] = raw_c
+                raw_c = st.session_state[c_cache_key]
+
+                if not raw_c or len(raw_c) < 2:
+                    st.warning(f"⚠️ No data found in {c_sheet_name}.")
+                else:
+                    # Row 3 (index 2) is the header; data starts row 4 (index 3) onwards.
+                    # Columns A–AR = indices 0–43.
+                    header_row = raw_c[2][:44]
+                    data_rows  = raw_c[2:]
+
+                    # Find last row with a name in column B (index 1)
+                    last_name_idx = 0
+                    for i, row in enumerate(data_rows):
+                        name_val = row[1].strip() if len(row) > 1 else ""
+                        if name_val:
+                            last_name_idx = i
+                    data_rows = data_rows[:last_name_idx + 1]
+
+                    # Trim each row to 44 columns (A–AR), padding short rows
+                    trimmed = []
+                    for row in data_rows:
+                        padded = (row + [""] * 44)[:44]
+                        trimmed.append(padded)
+
+                    c_df = pd.DataFrame(trimmed, columns=header_row)
+                    st.dataframe(c_df, use_container_width=True, hide_index=True)
+                    st.caption(f"Showing {c_sheet_name} — columns A to AR, {len(trimmed)} person(s).")
+            except Exception as e:
+                st.error(f"❌ Could not load {c_sheet_name}: {e}")
+
+        if cal_view_mode == 'Calendar':
+            st.markdown(calendar_render.screen_html(mmyy, roster_data), unsafe_allow_html=True)
+
+    # --------------------------------------------------
+    # MANUAL ADJUSTMENTS TABLE
+    # --------------------------------------------------
+    st.markdown("### 🔄 Manual Adjustments")
+    adj_cache_key = f"adj_data_{mmyy}"
+    try:
+        # use cached D sheet data if available, otherwise fetch
+        if adj_cache_key in st.session_state:
+            adj_raw = st.session_state[adj_cache_key]["raw_d_data"]
+        else:
+            adj_raw = fetch_sheet_data(client, spreadsheet_name, f"{mmyy}D")
+
+        # find "NAME 1" header row in col AU (index 46)
+        header_row_idx = None
+        for li, rrow in enumerate(adj_raw):
+            if len(rrow) > 46 and rrow[46].strip().upper() == "NAME 1":
+                header_row_idx = li
+                break
+
+        if header_row_idx is None:
+            st.caption("No adjustments table found in sheet.")
+        else:
+            # collect rows below header until empty
+            adj_entries = []
+            for rrow in adj_raw[header_row_idx + 1:]:
+                name1 = rrow[46].strip() if len(rrow) > 46 else ""
+                if not name1:
+                    break
+                name2 = rrow[47].strip() if len(rrow) > 47 else ""
+                day   = rrow[48].strip() if len(rrow) > 48 else ""
+                dtype = rrow[49].strip() if len(rrow) > 49 else ""
+                adj_entries.append({"Name 1": name1, "Name 2": name2, "Day": day, "Day Type": dtype})
+
+            if adj_entries:
+                st.dataframe(pd.DataFrame(adj_entries), use_container_width=True, hide_index=True)
+            else:
+                st.caption("No adjustments recorded yet.")
+    except Exception as e:
+        st.caption(f"Could not load adjustments: {e}")
+
+    # --------------------------------------------------
+    # DOWNLOADS
+    # --------------------------------------------------
+    st.markdown("### 📥 Downloads")
+    dl_col1, dl_col2, dl_col3 = st.columns(3)
+
+    # Button 1: Calendar PDF
+    with dl_col1:
+        if sheet_used == "D" and roster_data:
+            if st.button("🗓️ Calendar PDF", use_container_width=True):
+                try:
+                    with st.spinner("Rendering calendar..."):
+                        pdf_bytes = pdf_service.calendar_pdf(mmyy, roster_data)
+                    st.download_button(
+                        label="⬇️ Download Calendar PDF",
+                        data=pdf_bytes,
+                        file_name=mmyy + "_roster_calendar.pdf",
+                        mime="application/pdf",
+                        use_container_width=True
+                    )
+                except Exception as e:
+                    st.error("❌ Calendar PDF failed: " + str(e))
+            if st.button("📦 Personal schedules (zip)", use_container_width=True,
+                         help="One PDF per person with their duty and standby days"):
+                try:
+                    with st.spinner("Rendering personal schedules..."):
+                        zip_bytes = pdf_service.schedules_zip(mmyy, roster_data)
+                    st.download_button(
+                        label="⬇️ Download schedules",
+                        data=zip_bytes,
+                        file_name=mmyy + "_schedules.zip",
+                        mime="application/zip",
+                        use_container_width=True
+                    )
+                except Exception as e:
+                    st.error("❌ Schedules failed: " + str(e))
+            if st.button("📅 Calendar feeds (zip)", use_container_width=True,
+                         help="One .ics file per person, to import into phone calendars"):
+                try:
+                    _feeds = fetch_ics_feeds(client, spreadsheet_name, mmyy, roster_data)
+                    _ics_buf = io.BytesIO()
+                    with zipfile.ZipFile(_ics_buf, "w", zipfile.ZIP_DEFLATED) as zf:
+                        for _n, _text in sorted(_feeds.items()):
+                            zf.writestr(f"{mmyy}_{_n}.ics", _text)
+                    st.download_button(
+                        label="⬇️ Download calendar feeds",
+                        data=_ics_buf.getvalue(),
+                        file_name=mmyy + "_calendar_feeds.zip",
+                        mime="application/zip",
+                        use_container_width=True
+                    )
+                except Exception as e:
+                    st.error("❌ Calendar feeds failed: " + str(e))
+        else:
+            st.button("🗓️ Calendar PDF", disabled=True, use_container_width=True,
+                      help="Only available when D sheet exists")
+
+    # Buttons 2 and 3: Google Sheets exports, kept on disk per spreadsheet revision
+    export_rev = sheet_cache.revision(client, spreadsheet_name) if sheet_id else None
+    with dl_col2:
+        if sheet_used == "D" and sheet_id:
+            export_download(
+                spreadsheet_name, f"{mmyy}D.pdf", export_rev,
+                sheet_exporter(client, spreadsheet_name, sheet_id, mmyy),
+                "📄 D Sheet PDF", mmyy + "D_sheet.pdf", "application/pdf"
+            )
+        else:
+            st.button("📄 D Sheet PDF", disabled=True, use_container_width=True,
+                      help="Only available when D sheet exists")
+
+    with dl_col3:
+        if sheet_id:
+            export_download(
+                spreadsheet_name, "master.xlsx", export_rev,
+                sheet_exporter(client, spreadsheet_name, sheet_id),
+                "📊 Master Sheet Excel", spreadsheet_name + ".xlsx",
+                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+        else:
+            st.button("📊 Master Sheet Excel", disabled=True, use_container_width=True,
+                      help="Spreadsheet not found in storage")
+
+    # --------------------------------------------------
+    # SIDEBAR: MANUAL DUTY SWAP
+    # --------------------------------------------------
+    # fragments: a widget change in the swap or penalty tool reruns only that tool
+    @st.fragment
+    def _swap_tool():
+        st.title("📅 Editing Settings")
+        st.subheader("🔄 Manual Duty Swap")
+
+        target_sheet_name = f"{mmyy}D"
+        cache_key = f"adj_data_{mmyy}"
+
+        try:
+            personal_drive = get_personal_drive_service()
+            folder_id = st.secrets["app_config"]["personal_drive_folder_id"]
+
+            # cached Drive file ID lookup
+            sheet_id = fetch_spreadsheet_id(personal_drive, folder_id, spreadsheet_name)
+            if not sheet_id:
+                raise FileNotFoundError(f"Could not find '{spreadsheet_name}'")
+
+            # load D sheet and holiday data once, cache in session state
+            if cache_key not in st.session_state:
+                with st.spinner("📥 Loading sheet data..."):
+                    raw_d_data = fetch_sheet_data(client, spreadsheet_name, target_sheet_name)
+                    hol_data = fetch_sheet_data(client, spreadsheet_name, "Holiday")
+                    # AU3 = row index 2, col index 46
+                    scale_raw = raw_d_data[2][46] if len(raw_d_data) > 2 and len(raw_d_data[2]) > 46 else None
+                    st.session_state[cache_key] = {
+                        "raw_d_data": raw_d_data,
+                        "scale_raw": scale_raw,
+                        "hol_data": hol_data
+                    }
+
+            if "checker" not in st.session_state[cache_key]:
+                st.session_state[cache_key]["checker"] = build_swap_checker(
+                    client, spreadsheet_name, mmyy, st.session_state[cache_key]
+                )
+
+            if st.button("🔄 Refresh Data", key="refresh_adj"):
+                st.session_state.pop(cache_key, None)
+                sheet_cache.invalidate(spreadsheet_name, [target_sheet_name, "Holiday"])
+                roster_cache.invalidate(mmyy=mmyy)
+                st.rerun()
+
+            cached = st.session_state[cache_key]
+            raw_d_data = cached["raw_d_data"]
+            scale_raw = cached["scale_raw"]
+            hol_data = cached["hol_data"]
+
+            # parse scale
+            try:
+                adj_scale = float(scale_raw) if scale_raw and float(scale_raw) > 0 else 1.0
+            except:
+                adj_scale = 1.0
+
+            # holiday lookup from the shared index (every date format the sheet uses)
+            hol_idx = holiday_index.from_rows(hol_data)
+
+            # step 1: day picker
+            view_y = curr_y + 2000
+            num_days_in_month = calendar.monthrange(curr_y, curr_m)[1]
+            day_options = [date(view_y, curr_m, d) for d in range(1, num_days_in_month + 1)]
+            day_labels = [d.strftime("%d %b %Y (%a)") for d in day_options]
+
+            selected_label = st.selectbox(
+                "Select Day",
+                options=day_labels,
+                key="swap_date_picker"
+            )
+
+            swap_date = day_options[day_labels.index(selected_label)]
+            selected_day = swap_date.day
+
+            # determine day type automatically
+            weekday_num = swap_date.weekday()
+            if hol_idx.is_holiday(swap_date):
+                day_type_code, day_type_label = "H", "Holiday"
+                day_points = point_allocations["holiday_points"]
+            elif weekday_num == 4:
+                day_type_code, day_type_label = "F", "Friday"
+                day_points = point_allocations["friday_points"]
+            elif weekday_num >= 5:
+                day_type_code, day_type_label = "WE", "Weekend"
+                day_points = point_allocations["weekend_points"]
+            else:
+                day_type_code, day_type_label = "WD", "Weekday"
+                day_points = point_allocations["weekday_points"]
+
+            st.caption(f"📅 Day type: **{day_type_label}** ({day_points} pts)")
+
+            # people on D that day, from the checker's in-memory roster
+            swap_checker = cached["checker"]
+            names_with_d = sorted(swap_checker.roster[n].display for n in swap_checker.on_day[selected_day])
+
+            # step 2: person 1 — must have D on selected day
+            person_1 = st.selectbox(
+                "Person giving up duty",
+                options=[""] + names_with_d,
+                key="swap_person_1"
+            )
+
+            # step 3: person 2 — only replacements that pass every CONFIG rule,
+            # best first by how little they widen the spread of offsets
+            swap_suggestions, swap_rejected = ([], {})
+            if person_1:
+                swap_suggestions, swap_rejected = swap_checker.suggest_replacements(
+                    person_1, selected_day, day_points
+                )
+            suggestion_by_name = {sg.name: sg for sg in swap_suggestions}
+
+            def _suggestion_label(n):
+                if not n:
+                    return ""
+                sg = suggestion_by_name[n]
+                label = f"{n} ({sg.offset:+.2f} → {sg.new_offset:+.2f})"
+                return label + (f" ⚠️ {sg.soft_penalty}" if sg.soft_penalty else "")
+
+            person_2 = st.selectbox(
+                "Person taking over duty",
+                options=[""] + [sg.name for sg in swap_suggestions],
+                format_func=_suggestion_label,
+                key="swap_person_2"
+            )
+            if person_2 and suggestion_by_name[person_2].soft:
+                for msg, pen in suggestion_by_name[person_2].soft:
+                    st.caption(f"⚠️ {msg} (+{pen})")
+            if swap_rejected:
+                with st.expander(f"🚫 {len(swap_rejected)} not eligible"):
+                    for n, reasons in swap_rejected.items():
+                        st.caption(f"**{n}**: {'; '.join(reasons)}")
+
+            # step 4: save button
+            if st.button("💾 Save Swap", use_container_width=True):
+                if not person_1:
+                    st.error("❌ No one has a D on this day.")
+                elif not person_2:
+                    st.error("❌ Please select a person to take over.")
+                else:
+                    try:
+                        p1_row = swap_checker.roster[person_1.upper()].row if person_1.upper() in swap_checker.roster else None
+                        p2_row = swap_checker.roster[person_2.upper()].row if person_2.upper() in swap_checker.roster else None
+
+                        if not p1_row or not p2_row:
+                            st.error("❌ Could not locate one or both people in the sheet.")
+                        else:
+                            # col letter for selected day
+                            day_gs_col = 5 + selected_day - 1
+                            day_col_letter = gspread.utils.rowcol_to_a1(1, day_gs_col)[:-1]
+
+                            # read offsets from cached data (AQ = col index 42 in 0-indexed)
+                            p1_offset_raw = raw_d_data[p1_row - 1][42] if len(raw_d_data[p1_row - 1]) > 42 else None
+                            p2_offset_raw = raw_d_data[p2_row - 1][42] if len(raw_d_data[p2_row - 1]) > 42 else None
+                            p1_offset = float(p1_offset_raw) if p1_offset_raw else 0.0
+                            p2_offset = float(p2_offset_raw) if p2_offset_raw else 0.0
+
+                            # compute new offsets
+                            p1_new_offset = round((p1_offset / adj_scale) - day_points, 4)
+                            p2_new_offset = round((p2_offset / adj_scale) + day_points, 4)
+
+                            # find row with "NAME 1" in col AU (index 46), then write below it
+                            header_row_idx = None
+                            for li, rrow in enumerate(raw_d_data):
+                                if len(rrow) > 46 and rrow[46].strip().upper() == "NAME 1":
+                                    header_row_idx = li
+                                    break
+
+                            if header_row_idx is None:
+                                raise ValueError("Could not find 'NAME 1' header in column AU")
+
+                            # find next empty row below the header
+                            next_log_row = header_row_idx + 2  # start one row below header (1-indexed)
+                            for li in range(header_row_idx + 1, len(raw_d_data)):
+                                row_au = raw_d_data[li][46] if len(raw_d_data[li]) > 46 else ""
+                                if not row_au.strip():
+                                    next_log_row = li + 1  # convert to 1-indexed
+                                    break
+                            else:
+                                next_log_row = len(raw_d_data) + 1
+
+                            updates = [
+                                {'range': f'{day_col_letter}{p1_row}', 'values': [['']]},
+                                {'range': f'{day_col_letter}{p2_row}', 'values': [['D']]},
+                                {'range': f'AQ{p1_row}', 'values': [[p1_new_offset]]},
+                                {'range': f'AQ{p2_row}', 'values': [[p2_new_offset]]},
+                                {'range': f'AU{next_log_row}:AX{next_log_row}',
+                                 'values': [[person_1, person_2, selected_day, day_type_code]]}
+                            ]
+
+                            # open the sheet only to write (not on every rerun)
+                            adj_ws = client.open_by_key(sheet_id).worksheet(target_sheet_name)
+                            adj_ws.batch_update(updates, value_input_option='USER_ENTERED')
+
+                            # clear caches so next load gets fresh data
+                            st.session_state.pop(cache_key, None)
+                            roster_cache.invalidate(mmyy=mmyy)
+                            sheet_cache.invalidate(spreadsheet_name, [target_sheet_name])
+                            record_history(client, spreadsheet_name, mmyy)
+                            st.success(f"✅ Swapped day {selected_day}: {person_1} → {person_2}")
+                            st.rerun()
+
+                    except Exception as e:
+                        st.error(f"❌ Swap failed: {e}")
+
+        except Exception as e:
+            st.warning(f"⚠️ Could not load adjustment tool: {e}")
+
+    with st.sidebar:
+        _swap_tool()
+
+    # --------------------------------------------------
+    # SIDEBAR: PENALTY
+    # --------------------------------------------------
+    @st.fragment
+    def _penalty_tool():
+        st.markdown("---")
+        st.subheader("⚠️ Penalties")
+
+        try:
+            # reuse the same cache loaded by the swap section above
+            _pen_cache_key = f"adj_data_{mmyy}"
+            if _pen_cache_key not in st.session_state:
+                with st.spinner("📥 Loading sheet data for penalties..."):
+                    _pen_raw = fetch_sheet_data(client, spreadsheet_name, f"{mmyy}D")
+                    st.session_state[_pen_cache_key] = {
+                        "raw_d_data": _pen_raw,
+                        "scale_raw": (_pen_raw[2][46] if len(_pen_raw) > 2 and len(_pen_raw[2]) > 46 else None),
+                        "hol_data": []
+                    }
+
+            _pen_cached   = st.session_state[_pen_cache_key]
+            _pen_raw_data = _pen_cached["raw_d_data"]
+            _pen_d_rows   = _pen_raw_data[3:]  # data starts row 4
+
+            # build name list from D sheet col B
+            _pen_names = [
+                row[1].strip()
+                for row in _pen_d_rows
+                if row and len(row) > 1 and row[1].strip()
+            ]
+
+            _pen_name = st.selectbox(
+                "Select person",
+                options=[""] + _pen_names,
+                key="pen_name"
+            )
+
+            _pen_amount = st.slider(
+                "Penalty (deducted from AQ offset)",
+                min_value=0.0, max_value=5.0, value=0.5, step=0.5,
+                key="pen_amount"
+            )
+
+            if _pen_name:
+                # find and show current AQ value for context
+                _pen_row_data = next(
+                    (r for r in _pen_d_rows if r and len(r) > 1 and r[1].strip() == _pen_name),
+                    None
+                )
+                _cur_aq = ""
+                if _pen_row_data and len(_pen_row_data) > 42:
+                    _cur_aq = _pen_row_data[42]
+                st.caption(f"Current offset (AQ): **{_cur_aq if _cur_aq else '—'}**")
+
+            if st.button("💾 Apply Penalty", use_container_width=True, key="pen_apply"):
+                if not _pen_name:
+                    st.error("❌ Please select a person.")
+                elif _pen_amount == 0:
+                    st.warning("⚠️ Penalty is 0 — nothing to apply.")
+                else:
+                    try:
+                        # find sheet row number (data starts row 4, so +4 offset)
+                        _pen_sheet_row = next(
+                            (i + 4 for i, r in enumerate(_pen_d_rows)
+                             if r and len(r) > 1 and r[1].strip() == _pen_name),
+                            None
+                        )
+                        if _pen_sheet_row is None:
+                            st.error("❌ Could not locate person in D sheet.")
+                        else:
+                            # read current AQ value
+                            _pen_row_d = _pen_raw_data[_pen_sheet_row - 1]
+                            _aq_raw = _pen_row_d[42] if len(_pen_row_d) > 42 else ""
+                            try:
+                                _aq_current = float(_aq_raw) if _aq_raw else 0.0
+                            except:
+                                _aq_current = 0.0
+
+                            _aq_new = round(_aq_current - _pen_amount, 4)
+
+                            # write back to D sheet AQ column
+                            _pen_sh  = client.open(spreadsheet_name)
+                            _pen_ws  = _pen_sh.worksheet(f"{mmyy}D")
+                            _pen_ws.update_acell(f"AQ{_pen_sheet_row}", _aq_new)
+
+                            # clear cache so refreshed data is loaded next time
+                            st.session_state.pop(_pen_cache_key, None)
+                            sheet_cache.invalidate(spreadsheet_name, [f"{mmyy}D"])
+                            roster_cache.invalidate(mmyy=mmyy)
+                            record_history(client, spreadsheet_name, mmyy)
+
+                            st.success(
+                                f"✅ Applied -{_pen_amount} to {_pen_name}: "
+                                f"{_aq_current} → {_aq_new}"
+                            )
+                            st.rerun()
+                    except Exception as e:
+                        st.error(f"❌ Penalty failed: {e}")
+
+        except Exception as e:
+            st.warning(f"⚠️ Could not load penalty tool: {e}")
+
+    with st.sidebar:
+        _penalty_tool()
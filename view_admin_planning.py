@@ -0,0 +1,686 @@
+"""
+Admin 🗓 Planning page: solve and save a month, undo, personnel and holidays.
+"""
+import traceback
+from datetime import date
+
+import streamlit as st
+import pandas as pd
+import gspread
+
+import personnel
+import roster_cache
+import roster_history
+import save_pipeline
+import sheet_cache
+import snapshot_store
+import storage
+from app_common import (
+    after_personnel_change, convert_if_excel, failed_submissions_panel, fetch_config, fetch_holiday_index,
+    fetch_namelist, fetch_sheet_data, fetch_spreadsheet_id, get_personal_drive_service,
+)
+
+
+def render(client):
+    st.title ("🗓 Planning")
+
+    # planning parameters
+
+    def update_slider(key):
+        st.session_state[key + "_slider"] = st.session_state[key + "_input"]
+
+    def update_input(key):
+        st.session_state[key + "_input"] = st.session_state[key + "_slider"]
+
+    st.sidebar.title("📅 Planning Settings")
+
+    # ── Load CONFIG sheet ──
+    sheet_cfg = fetch_config(client, "MASTER SHEET")
+    config = sheet_cfg
+
+    # ── Dynamic constraint sliders from CONFIG ──
+    # slider_overrides: cid -> numeric value (overrides CONFIG param at runtime)
+    slider_overrides = {}
+
+    def _get_rule_num(cv):
+        import json as _j
+        try:
+            rule = cv.get("rule", {})
+            cls  = rule.get("class","")
+            soft = rule.get("soft", False)
+            if cls == "value":   return int(rule.get("number", 1))
+            if cls == "gap":     return int(rule.get("days", 1))
+            if cls in ("grouping","allow") and soft:
+                return int(rule.get("penalty", 0))
+            # hard grouping and hard allow have no adjustable param
+            return None
+        except:
+            return None
+
+    def _get_rule_num_label(cv):
+        """Human label for the numeric param."""
+        try:
+            rule = cv.get("rule", {})
+            cls = rule.get("class","")
+            if cls == "value":   return cv.get("label","") + " (number)"
+            if cls == "gap":     return cv.get("label","") + " (days)"
+            if cls in ("grouping","allow"): return cv.get("label","") + " (penalty)"
+        except: pass
+        return cv.get("label","")
+
+    hard_constraints = {k: v for k, v in sheet_cfg.items()
+                        if not k.startswith("_") and v.get("type","").lower() == "hard"
+                        and v.get("active", True)}
+    soft_constraints = {k: v for k, v in sheet_cfg.items()
+                        if not k.startswith("_") and v.get("type","").lower() == "soft"
+                        and v.get("active", True)}
+
+    st.sidebar.subheader("🔒 Hard Constraints")
+    for cid, cv in hard_constraints.items():
+        default_num = _get_rule_num(cv)
+        if default_num is not None:
+            sk = f"dyn_slider_{cid}"
+            max_val = max(default_num * 3, 20)
+            val = st.sidebar.slider(cv.get("label", cid), 0, max_val,
+                                    value=st.session_state.get(sk, default_num),
+                                    key=sk, step=1)
+            slider_overrides[cid] = val
+        else:
+            st.sidebar.caption(f"✅ {cv.get('label', cid)}")
+
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("🔓 Soft Constraints")
+    for cid, cv in soft_constraints.items():
+        default_num = _get_rule_num(cv)
+        if default_num is not None:
+            sk = f"dyn_slider_{cid}"
+            max_val = max(default_num * 3, 100)
+            val = st.sidebar.slider(cv.get("label", cid), 0, max_val,
+                                    value=st.session_state.get(sk, default_num),
+                                    key=sk, step=10)
+            slider_overrides[cid] = val
+        else:
+            st.sidebar.caption(f"✅ {cv.get('label', cid)}")
+
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("💯 Point Allocations")
+
+    if "weekday_slider" not in st.session_state:
+        st.session_state["weekday_slider"] = 1.0
+    if "friday_slider" not in st.session_state:
+        st.session_state["friday_slider"] = 1.0
+    if "weekend_slider" not in st.session_state:
+        st.session_state["weekend_slider"] = 2.0
+    if "holiday_slider" not in st.session_state:
+        st.session_state["holiday_slider"] = 2.0
+
+    weekday_val = st.sidebar.slider("Weekday Points", 0.0, 10.0, key="weekday_slider", step=0.5)
+    friday_val  = st.sidebar.slider("Friday Points",  0.0, 10.0, key="friday_slider",  step=0.5)
+    weekend_val = st.sidebar.slider("Weekend Points", 0.0, 10.0, key="weekend_slider", step=0.5)
+    holiday_val = st.sidebar.slider("Holiday Points", 0.0, 10.0, key="holiday_slider", step=0.5)
+
+    point_allocations = {
+        "weekday_points": weekday_val,
+        "friday_points":  friday_val,
+        "weekend_points": weekend_val,
+        "holiday_points": holiday_val
+    }
+
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("⚙️ Optimiser Settings")
+    if "scalefactor_slider" not in st.session_state:
+        st.session_state["scalefactor_slider"] = 4
+    if "sbf_slider" not in st.session_state:
+        st.session_state["sbf_slider"] = 2
+    scalefactor_val = st.sidebar.slider("Normalisation Scale", 0, 5, key="scalefactor_slider", step=1)
+    sbf_val         = st.sidebar.slider("SBF Bonus",           0, 5, key="sbf_slider",         step=1)
+
+    model_constraints = {
+        "scalefactor": scalefactor_val,
+        "sbf_val":     sbf_val
+    }
+    horizon_months = st.sidebar.select_slider(
+        "Planning Horizon (months)", options=[1, 2, 3], value=1, key="horizon_slider",
+        help="Plan the next months together for cross-month fairness; only the first month is saved."
+    )
+
+    # main interface
+
+    _now = date.today(); _opts = [f"{m:02d}{str(y)[2:]}" for y in [_now.year, _now.year+1] for m in range(1,13)]
+    _next = date(_now.year + (_now.month // 12), (_now.month % 12) + 1, 1)
+    _default_mmyy = f"{_next.month:02d}{str(_next.year)[2:]}"
+    _default_idx = _opts.index(_default_mmyy) if _default_mmyy in _opts else 0
+    mmyy = st.selectbox("Month/Year (MMYY) to plan", options=_opts, index=_default_idx, key="plan_mmyy")
+    spreadsheet_name = f"MASTER SHEET"
+
+    curr_m, curr_y = int(mmyy[:2]), int(mmyy[2:])
+    m_new = curr_m + 1 
+    if m_new > 12:
+        m_new = 1
+        y_new = curr_y + 1
+    else:
+        y_new = curr_y
+    m_old = curr_m - 1
+    if curr_m == 1:
+        m_old = 12
+        y_old = curr_y - 1
+    else:
+        y_old = curr_y
+
+    st.info(f"Planning **{mmyy}**!")
+    failed_submissions_panel("plan_retry_failed")
+
+    try:
+        personal_drive = get_personal_drive_service()
+        folder_id = st.secrets["app_config"]["personal_drive_folder_id"]
+        sheet_id = fetch_spreadsheet_id(personal_drive, folder_id, spreadsheet_name)
+        if sheet_id:
+            st.success(f"✅ Connected to storage!")
+        else:
+            st.warning(f"⚠️ Connection error: storage failed!")
+    except Exception as e:
+        st.error(f"❌ Storage failed: {e}")
+
+    col1, col2 = st.columns([2,3])
+
+    with col1:
+        st.write("Step 1:")
+
+    with col2:
+        if st.button("🔥 Run Optimiser"):
+            # the solver stack (OR-Tools, planner_engine) loads on the first run, not with the page
+            import planner_engine
+            import horizon_planner
+            from ortools.sat.python import cp_model
+            try:
+
+                sh = convert_if_excel(client, spreadsheet_name)
+
+                with st.spinner("📥 Fetching Sheet Data..."):
+                    data_bundle, bundle_warnings = planner_engine.load_data_bundle(client, sh.title, mmyy)
+                    for _w in bundle_warnings:
+                        st.warning(_w)
+
+                with st.spinner("🧠 Solving Optimisation..."):
+
+                    if horizon_months > 1:
+                        planned_df, n_scale, status, status_s, ranges, horizon = horizon_planner.run_horizon_optimisation(
+                            client, sh.title, mmyy, horizon_months, config, point_allocations, model_constraints,
+                            slider_overrides, data_bundle
+                        )
+                        for _w in horizon["warnings"]:
+                            st.warning(_w)
+                        if horizon["plans"]:
+                            st.info(
+                                f"🔭 Planned {', '.join(horizon['months'])} together in {horizon['seconds']:.1f}s — "
+                                f"only {mmyy} is committed; later months are kept as hints for their own run."
+                            )
+                    else:
+                        planned_df, n_scale, status, status_s, ranges = planner_engine.run_optimisation(
+                            data_bundle, config, point_allocations, model_constraints, slider_overrides,
+                            hints=horizon_planner.load_hints(sh.title, mmyy)
+                        )
+
+                    if planned_df is not None:
+                        st.session_state['planned_df'] = planned_df
+                        st.session_state['n_scale'] = n_scale
+                        st.session_state['ranges'] = ranges
+                        st.session_state['active_sh_name'] = sh.title
+
+                        # if the next month falls in a new year, duplicate the
+                        # current year's summary sheet and update it for the new year
+                        if curr_m == 12:
+                            curr_year_full = 2000 + curr_y
+                            next_year_full = curr_year_full + 1
+                            curr_year_str = str(curr_year_full)
+                            next_year_str = str(next_year_full)
+
+                            with st.spinner(f"📅 Creating {next_year_str} sheet..."):
+                                try:
+                                    # check if the new year sheet already exists
+                                    existing_names = [ws.title for ws in sh.worksheets()]
+                                    if next_year_str in existing_names:
+                                        st.info(f"ℹ️ Sheet '{next_year_str}' already exists — skipping duplication.")
+                                    else:
+                                        # find and duplicate the current year sheet
+                                        curr_year_ws = sh.worksheet(curr_year_str)
+                                        all_sheets = sh.worksheets()
+                                        last_index = len(all_sheets)
+                                        new_year_ws = sh.duplicate_sheet(
+                                            curr_year_ws.id,
+                                            insert_sheet_index=last_index,
+                                            new_sheet_name=next_year_str
+                                        )
+                                        # update the year label cell
+                                        new_year_ws.update_acell('BM73', '')
+                                        new_year_ws.update_acell('BM73', next_year_full)
+                                        st.success(f"✅ Created '{next_year_str}' sheet from '{curr_year_str}'!")
+                                except gspread.exceptions.WorksheetNotFound:
+                                    st.warning(f"⚠️ Sheet '{curr_year_str}' not found — skipping year sheet creation.")
+                                except Exception as e:
+                                    st.warning(f"⚠️ Could not create {next_year_str} sheet: {e}")
+
+                        if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
+                            if status_s == cp_model.OPTIMAL or status_s == cp_model.FEASIBLE:
+                                st.success("✅ Optimisation Successful!")
+                            else:
+                                st.warning("⚠️ Standby Pass Unsuccessful")
+                        else:
+                            if status_s == cp_model.OPTIMAL or status_s == cp_model.FEASIBLE:
+                                st.warning("⚠️ Duty Pass Unsuccessful")
+                            else:
+                                st.warning("⚠️ No Solution Found")
+            except Exception:
+                st.error("❌ Critical Error Detected")
+                st.code(traceback.format_exc())
+
+    # planning buttons
+
+    final_name = st.session_state.get('active_sh_name', spreadsheet_name)
+
+    col1, col2 = st.columns([2,3])
+
+    with col1:
+        st.write("Step 2:")
+
+    with col2:
+        if st.button("💾 Save the Optimisation"):
+            if 'planned_df' in st.session_state:
+                _todo = save_pipeline.pending_stages(
+                    final_name, mmyy,
+                    save_pipeline.plan_digest(st.session_state['planned_df'], st.session_state['n_scale'])
+                )
+                if len(_todo) < len(save_pipeline.STAGES):
+                    st.info("ℹ️ Resuming previous save: " + ", ".join(save_pipeline.STAGE_LABELS[s] for s in _todo))
+
+                # the snapshot is stored before any write, then the D sheet and next
+                # month run side by side; finished stages are checkpointed and skipped on retry
+                with st.spinner("💾 Saving (snapshot, output, next month)..."):
+                    _run = save_pipeline.run_save(
+                        client, final_name, mmyy,
+                        st.session_state['planned_df'],
+                        st.session_state['n_scale'],
+                        st.session_state['ranges']
+                    )
+
+                # D sheet for this month and the next month's C sheet changed
+                roster_cache.invalidate()
+                sheet_cache.invalidate(final_name)
+
+                for _s in save_pipeline.STAGES:
+                    _info = _run["stages"][_s]
+                    if _info.get("status") == "failed":
+                        st.error(f"❌ {save_pipeline.STAGE_LABELS[_s]} failed: {_info.get('error')}")
+
+                if _run["complete"]:
+                    st.success(f"✅ Done!")
+                    st.session_state.pop('planned_df', None)
+                else:
+                    st.warning("⚠️ Save incomplete — click Save again to resume from the failed step.")
+            else:
+                st.warning("⚠️ Run the optimiser first!")
+
+    # undo / redo — backed by the save snapshots, so any admin session can use them
+    try:
+        _undo = snapshot_store.undo_state(final_name, mmyy)
+    except Exception as e:
+        _undo = {"undo": None, "redo": None}
+        st.warning(f"⚠️ Could not read save history: {e}")
+
+    if _undo["undo"] or _undo["redo"]:
+        _next_mmyy = snapshot_store.next_mmyy(mmyy)
+        _touched   = snapshot_store.month_sheets(mmyy)
+
+        st.markdown("---")
+        col_u1, col_u2 = st.columns([2, 3])
+        with col_u1:
+            st.write("Undo / redo last save:")
+        with col_u2:
+            if _undo["undo"] and st.button(f"↩️ Undo Save ({mmyy}, {_undo['undo']['when']})", type="secondary"):
+                st.session_state['confirm_undo'] = "undo"
+            if _undo["redo"] and st.button(f"↪️ Redo Save ({mmyy})", type="secondary"):
+                st.session_state['confirm_undo'] = "redo"
+
+        if st.session_state.get('confirm_undo'):
+            _action = st.session_state['confirm_undo']
+            st.warning(
+                f"⚠️ This will {'restore' if _action == 'undo' else 're-apply'} "
+                f"**{', '.join(_touched)}** {'to before' if _action == 'undo' else 'as of'} the save. "
+                f"You can {'redo' if _action == 'undo' else 'undo'} it afterwards. Are you sure?"
+            )
+            col_yes, col_no = st.columns(2)
+            with col_yes:
+                if st.button(f"✅ Yes, {_action.title()}", use_container_width=True):
+                    try:
+                        _store = storage.for_client(client, final_name)
+                        _actor = st.session_state.get('user_role') or ""
+                        with st.spinner("⏳ Restoring sheets..."):
+                            if _action == "undo":
+                                _logs = snapshot_store.undo_save(_store, mmyy, actor=_actor)
+                            else:
+                                _logs = snapshot_store.redo_save(_store, mmyy, actor=_actor)
+                        save_pipeline.clear_checkpoint(final_name, mmyy)
+                        sheet_cache.invalidate(final_name, _touched)
+                        roster_cache.invalidate(mmyy=mmyy)
+                        roster_cache.invalidate(mmyy=_next_mmyy)
+                        st.session_state.pop('confirm_undo', None)
+                        st.toast(f"✅ {_action.title()} complete — " + "; ".join(_logs))
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"❌ {_action.title()} failed: {e}")
+                        st.code(traceback.format_exc())
+            with col_no:
+                if st.button("❌ Cancel", use_container_width=True):
+                    st.session_state.pop('confirm_undo', None)
+                    st.rerun()
+
+    # --------------------------------------------------
+    # ADD PERSONNEL
+    # --------------------------------------------------
+
+    st.markdown("---")
+    st.subheader("👤 Add Personnel")
+
+    with st.container(border=True):
+        col_name, col_branch = st.columns(2)
+        with col_name:
+            new_name = st.text_input("Full Name (as it should appear)", key="new_person_name").strip().upper()
+        with col_branch:
+            new_branch = st.text_input("Branch (e.g. OS1)", key="new_person_branch").strip().upper()
+
+        if st.button("➕ Add Person", use_container_width=True):
+            if not new_name or not new_branch:
+                st.error("❌ Please enter both name and branch.")
+            else:
+                # set a confirmation flag in session_state
+                st.session_state["confirm_add_person"] = True
+        if st.session_state.get("confirm_add_person"):
+            if st.button(f"⚠️ Confirm Add {new_name} ({new_branch})"):
+                try:
+                    with st.spinner("📋 Updating Namelist, year sheet and C sheet..."):
+                        added, skipped, touched = personnel.add_people(
+                            storage.for_client(client, spreadsheet_name), mmyy, [(new_name, new_branch)]
+                        )
+                    after_personnel_change(spreadsheet_name, touched)
+                    st.session_state.pop("confirm_add_person", None)
+                    if added:
+                        st.success(f"✅ {new_name} ({new_branch}) added to {', '.join(touched)}!")
+                    else:
+                        st.warning(f"⚠️ {new_name} is already on {mmyy}C — nothing added.")
+
+                except Exception as e:
+                    st.error(f"❌ Failed to add person: {e}")
+                    st.code(traceback.format_exc())
+
+    with st.expander("📥 Bulk Onboarding (CSV)"):
+        st.caption("CSV with NAME and BRANCH columns. The whole intake is added in one write.")
+        intake_file = st.file_uploader("Intake CSV", type=["csv"], key="intake_csv")
+        if intake_file is not None:
+            try:
+                intake = personnel.parse_intake_csv(intake_file.getvalue())
+            except ValueError as e:
+                st.error(f"❌ {e}")
+                intake = []
+            if intake:
+                st.dataframe(pd.DataFrame(intake, columns=["Name", "Branch"]), hide_index=True)
+                if st.button(f"➕ Add {len(intake)} People", use_container_width=True):
+                    try:
+                        with st.spinner(f"📋 Adding {len(intake)} people..."):
+                            added, skipped, touched = personnel.add_people(
+                                storage.for_client(client, spreadsheet_name), mmyy, intake
+                            )
+                        after_personnel_change(spreadsheet_name, touched)
+                        if added:
+                            st.success(f"✅ Added {len(added)} to {', '.join(touched)}: {', '.join(added)}")
+                        if skipped:
+                            st.warning(f"⚠️ Already on {mmyy}C, skipped: {', '.join(skipped)}")
+                    except Exception as e:
+                        st.error(f"❌ Failed to add intake: {e}")
+                        st.code(traceback.format_exc())
+
+    st.subheader("🗑️ Remove Personnel")
+
+    with st.container(border=True):
+        names_for_removal = fetch_namelist(client, spreadsheet_name)
+        remove_names = st.multiselect("Select People to Remove", options=names_for_removal, key="remove_person_name")
+
+        if st.button("🗑️ Remove Selected", use_container_width=True):
+            if not remove_names:
+                st.error("❌ Please select a person.")
+            else:
+                # set a confirmation flag in session_state
+                st.session_state["confirm_remove_person"] = list(remove_names)
+        if st.session_state.get("confirm_remove_person"):
+            to_remove = st.session_state["confirm_remove_person"]
+            if st.button(f"⚠️ Confirm Remove {', '.join(to_remove)}"):
+                try:
+                    c_sheet = f"{mmyy}C"
+                    with st.spinner(f"🗑️ Updating {c_sheet} and Holiday..."):
+                        removed, missing, cleared, touched = personnel.remove_people(
+                            storage.for_client(client, spreadsheet_name), mmyy, to_remove
+                        )
+                    after_personnel_change(spreadsheet_name, touched)
+                    st.session_state.pop("confirm_remove_person", None)
+
+                    for name in removed:
+                        if cleared.get(name):
+                            days = ", ".join(d.strftime("%-d %b %Y") for d in cleared[name])
+                            st.success(f"✅ {name} removed from {c_sheet} and cleared from Holiday sheet on: {days}.")
+                        else:
+                            st.success(f"✅ {name} removed from {c_sheet}.")
+                    if missing:
+                        st.error(f"❌ Not found in {c_sheet}: {', '.join(missing)}")
+
+                except Exception as e:
+                    st.error(f"❌ Failed to remove person: {e}")
+                    st.code(traceback.format_exc())
+
+    # --------------------------------------------------
+    # HOLIDAY SECTION
+    # --------------------------------------------------
+    # a fragment: picking names for each holiday reruns only this section
+    @st.fragment
+    def _holiday_section():
+        st.markdown("---")
+        st.subheader("🗓️ Holiday Management")
+
+        hol_tab1, hol_tab2 = st.tabs(["📥 Upload Holidays", "👥 Assign Duty"])
+
+        # ── Tab 1: Upload ICS ──
+        with hol_tab1:
+            uploaded_ics = st.file_uploader("Upload .ics file", type=["ics"], key="ics_uploader")
+
+            if uploaded_ics:
+                try:
+                    from datetime import date as _date, timedelta as _td
+                    content_ics = uploaded_ics.read().decode("utf-8")
+                    lines = content_ics.splitlines()
+
+                    holidays = []
+                    current_date = None
+                    current_name = None
+                    for line in lines:
+                        line = line.strip()
+                        if line.startswith("DTSTART"):
+                            date_str = line.split(":")[-1].strip()
+                            try:
+                                current_date = _date(int(date_str[:4]), int(date_str[4:6]), int(date_str[6:8]))
+                            except:
+                                current_date = None
+                        elif line.startswith("SUMMARY"):
+                            current_name = line.split(":", 1)[-1].strip()
+                        elif line == "END:VEVENT":
+                            if current_date and current_name:
+                                holidays.append((current_date, current_name))
+                                if current_date.weekday() == 6:
+                                    holidays.append((current_date + _td(days=1), f"{current_name} (in lieu)"))
+                            current_date = None
+                            current_name = None
+
+                    if holidays:
+                        yr = holidays[0][0].year
+                        holidays.append((_date(yr, 12, 31), "NEW YEAR'S EVE"))
+                        holidays.append((_date(yr, 12, 24), "CHRISTMAS EVE"))
+                        cny_names = ["chinese new year", "cny"]
+                        cny_dates = sorted([h[0] for h in holidays if any(c in h[1].lower() for c in cny_names)])
+                        if cny_dates:
+                            holidays.append((cny_dates[0] - _td(days=1), "CHINESE NEW YEAR EVE"))
+
+                    holidays.sort(key=lambda h: h[0])
+
+                    preview_df = pd.DataFrame([
+                        {"Date": h[0].strftime("%-d %b %Y"), "Day": h[0].strftime("%a"), "Holiday": h[1].upper()}
+                        for h in holidays
+                    ])
+                    st.dataframe(preview_df, use_container_width=True, hide_index=True)
+                    st.caption(f"{len(holidays)} holidays (including eves and in lieu days)")
+
+                    if st.button("📥 Write to Holiday Sheet", use_container_width=True, key="write_holidays"):
+                        try:
+                            sh_hol = convert_if_excel(client, spreadsheet_name)
+                            hol_ws = sh_hol.worksheet("Holiday")
+                            hol_data = hol_ws.get_all_values()
+                            last_data_row = len(hol_data)
+                            start_row = last_data_row + 1
+                            end_row = start_row + len(holidays) - 1
+                            sheet_id = hol_ws.id
+                            n = len(holidays)
+
+                            sh_hol.batch_update({"requests": [{
+                                "insertDimension": {
+                                    "range": {"sheetId": sheet_id, "dimension": "ROWS",
+                                              "startIndex": last_data_row, "endIndex": last_data_row + n},
+                                    "inheritFromBefore": True
+                                }
+                            }]})
+                            sh_hol.batch_update({"requests": [{
+                                "copyPaste": {
+                                    "source": {"sheetId": sheet_id,
+                                               "startRowIndex": last_data_row - 1, "endRowIndex": last_data_row,
+                                               "startColumnIndex": 0, "endColumnIndex": 5},
+                                    "destination": {"sheetId": sheet_id,
+                                                    "startRowIndex": last_data_row, "endRowIndex": last_data_row + n,
+                                                    "startColumnIndex": 0, "endColumnIndex": 5},
+                                    "pasteType": "PASTE_FORMAT", "pasteOrientation": "NORMAL"
+                                }
+                            }]})
+
+                            rows_to_write = [
+                                [h[1].upper(), h[0].strftime("%-d %b %Y"), h[0].strftime("%a"), "", ""]
+                                for h in holidays
+                            ]
+                            hol_ws.update(f"A{start_row}:E{end_row}", rows_to_write)
+                            sheet_cache.invalidate(spreadsheet_name, ["Holiday"])
+                            st.success(f"✅ Written {n} holidays to Holiday sheet!")
+
+                        except Exception as e:
+                            st.error(f"❌ Failed to write holidays: {e}")
+                            st.code(traceback.format_exc())
+
+                except Exception as e:
+                    st.error(f"❌ Failed to parse ICS file: {e}")
+
+        # ── Tab 2: Assign Duty ──
+        with hol_tab2:
+            try:
+                # load holiday sheet and namelist
+                hol_raw = fetch_sheet_data(client, spreadsheet_name, "Holiday")
+                all_names = fetch_namelist(client, spreadsheet_name)
+
+                if not hol_raw or len(hol_raw) < 2:
+                    st.caption("No holidays found in Holiday sheet.")
+                else:
+                    # identify female names (contain "(F)")
+                    female_names = [n for n in all_names if "(F)" in n.upper()]
+
+                    # parse holiday rows: col A=name, B=date, C=day, D=name1, E=name2
+                    # filter to selected year from mmyy
+                    target_year = 2000 + int(mmyy[2:])
+
+                    hol_idx = fetch_holiday_index(client, spreadsheet_name)
+                    hol_rows = [{
+                        "sheet_row": h.sheet_row,
+                        "name": h.name,
+                        "date": h.date,
+                        "date_str": h.date.strftime("%-d %b %Y"),
+                        "day": h.day,
+                        "n1": h.n1,
+                        "n2": h.n2,
+                    } for h in hol_idx.year(target_year)]
+
+                    if not hol_rows:
+                        st.caption(f"No holidays found for {target_year}. Upload holidays first.")
+                    else:
+                        # "did holiday last year" lookup from the same sheet
+                        last_year_workers = hol_idx.workers(target_year - 1)
+
+                        st.caption(f"Showing {len(hol_rows)} holidays for {target_year}. "
+                                   f"Excluded from automatic assignment (did duty last year): {len(last_year_workers)} people.")
+
+                        # build input table
+                        name_options = [""] + all_names
+                        assignments = {}
+
+                        st.markdown("**Enter names for each holiday (leave blank to assign automatically):**")
+                        for h in hol_rows:
+                            col_hol, col_n1, col_n2 = st.columns([3, 2, 2])
+                            with col_hol:
+                                st.markdown(f"**{h['name']}**")
+                                st.caption(f"{h['date_str']} ({h['day']})")
+                            with col_n1:
+                                n1 = st.selectbox("Name 1", name_options,
+                                                  index=name_options.index(h['n1']) if h['n1'] in name_options else 0,
+                                                  key=f"hol_n1_{h['sheet_row']}", label_visibility="collapsed")
+                            with col_n2:
+                                n2 = st.selectbox("Name 2", name_options,
+                                                  index=name_options.index(h['n2']) if h['n2'] in name_options else 0,
+                                                  key=f"hol_n2_{h['sheet_row']}", label_visibility="collapsed")
+                            assignments[h['sheet_row']] = {"h": h, "n1": n1, "n2": n2}
+                            st.markdown("<hr style='margin:4px 0;border:none;border-top:1px solid rgba(255,255,255,0.1);'>", unsafe_allow_html=True)
+
+                        _hol_gap = st.number_input(
+                            "Minimum days between a person's holiday and other duties", 1, 60, 7, key="hol_min_gap"
+                        )
+                        if st.button("🎲 Generate & Save", use_container_width=True, key="gen_hol_duty"):
+                            # one CP-SAT model for the whole year: manual picks kept, pairs
+                            # same-gender, last year's workers excluded, counts balanced over
+                            # three years (this year's holidays are all in the model)
+                            import holiday_assigner
+                            _prior = holiday_assigner.prior_holiday_counts(hol_raw, target_year - 2, target_year - 1)
+                            try:
+                                _offsets = roster_history.latest_offsets(spreadsheet_name)
+                                _duty_dates = roster_history.duty_dates(spreadsheet_name, target_year)
+                            except Exception:
+                                _offsets, _duty_dates = {}, {}
+                            _hol_input = [
+                                {"key": sr, "date": a["h"]["date"], "n1": a["n1"], "n2": a["n2"]}
+                                for sr, a in assignments.items()
+                            ]
+                            _assigned, _hol_err = holiday_assigner.assign_year(
+                                _hol_input, all_names, last_year_workers, _prior,
+                                _offsets, _duty_dates, min_gap=int(_hol_gap)
+                            )
+                            if _hol_err:
+                                st.error(f"❌ {_hol_err}")
+                                st.stop()
+                            updates = [{"sheet_row": sr, "n1": n1, "n2": n2} for sr, (n1, n2) in _assigned.items()]
+
+                            # write to sheet
+                            try:
+                                sh_hol2 = convert_if_excel(client, spreadsheet_name)
+                                hol_ws2 = sh_hol2.worksheet("Holiday")
+                                batch = []
+                                for u in updates:
+                                    batch.append({"range": f"D{u['sheet_row']}:E{u['sheet_row']}",
+                                                  "values": [[u['n1'], u['n2']]]})
+                                hol_ws2.batch_update(batch, value_input_option='USER_ENTERED')
+                                sheet_cache.invalidate(spreadsheet_name, ["Holiday"])
+                                st.success("✅ Holiday duties saved!")
+                                st.rerun()
+                            except Exception as e:
+                                st.error(f"❌ Failed to save: {e}")
+
+            except Exception as e:
+                st.error(f"❌ Could not load holiday duty section: {e}")
+
+    _holiday_section()
@@ -0,0 +1,452 @@
+"""
+Dev panel: passwords, traits, CONFIG rules and cache / queue diagnostics.
+"""
+import streamlit as st
+import pandas as pd
+
+import quota
+import roster_cache
+import roster_history
+import sheet_cache
+import snapshot_store
+import storage
+import write_queue
+from app_common import failed_submissions_panel, fetch_config, fetch_trait_definitions, on_queue_flush
+
+
+def _rule_to_sentence(rule):
+    if not rule:
+        return ""
+    cls     = rule.get("class","")
+    soft    = rule.get("soft", False)
+    penalty = rule.get("penalty", 0)
+    prefix  = "🔴 Soft —" if soft else "🔵 Hard —"
+
+    if cls == "value":
+        s1  = rule.get("subject1","person")
+        op  = rule.get("operator","=")
+        n   = rule.get("number","")
+        s2  = rule.get("subject2","D")
+        per = rule.get("per","month")
+        op_word = {"=":"exactly","<=":"at most",">=":"at least"}.get(op, op)
+        penalty_str = f" *(penalty: {penalty})*" if soft else ""
+        return f"{prefix} Each **{s1}** must have {op_word} **{n}** **{s2}** per **{per}**{penalty_str}"
+
+    elif cls == "allow":
+        cdt  = rule.get("condition_day_type","weekend")
+        lg   = rule.get("logic","cannot")
+        adt  = rule.get("action_day_type","weekend")
+        when = rule.get("condition_when","last month")
+        return f"{prefix} If person worked a **{cdt}** {when}, they **{lg}** work a **{adt}** this month"
+
+    elif cls == "gap":
+        ft   = rule.get("from_type","D")
+        tt   = rule.get("to_type","D")
+        days = rule.get("days","")
+        return f"{prefix} Between **{ft}** and **{tt}** must be at least **{days}** days"
+
+    elif cls == "grouping":
+        trait = rule.get("trait","")
+        logic = rule.get("logic","must")
+        penalty_str = f" *(penalty: {penalty})*" if soft else ""
+        trait_map = {
+            "same_gender":  "Same gender",
+            "partners":     "Partners",
+            "same_branch":  "Same branch",
+            "drivers":      "Drivers",
+        }
+        if trait in trait_map:
+            trait_str = trait_map[trait]
+        elif "::" in trait:
+            cat, opt = trait.split("::", 1)
+            trait_str = f'{cat}: "{opt}"'
+        else:
+            trait_str = trait
+        if logic == "must_match_d":
+            return f"{prefix} **{trait_str}** of S must match D on the same day"
+        return f"{prefix} **{trait_str}** **{logic}** be together{penalty_str}"
+
+    return ""
+
+
+def render(client):
+    # ── Password Management ──
+    st.subheader("🔑 Password Management")
+    with st.container(border=True):
+        try:
+            _dev_cfg = fetch_config(client, "MASTER SHEET")
+            _cur_admin = _dev_cfg.get("_passwords", {}).get("admin_password", "")
+            _cur_user  = _dev_cfg.get("_passwords", {}).get("user_password", "")
+        except:
+            _cur_admin = ""
+            _cur_user  = ""
+        new_admin_pw = st.text_input("New Admin Password", value=_cur_admin, type="password", key="new_admin_pw")
+        new_user_pw  = st.text_input("New User Password",  value=_cur_user,  type="password", key="new_user_pw")
+        if st.button("💾 Save Passwords", use_container_width=True, key="dev_save_pw"):
+            try:
+                _dev_sh   = client.open("MASTER SHEET")
+                _dev_ws   = _dev_sh.worksheet("CONFIG")
+                _dev_rows = _dev_ws.get_all_values()
+                _pw_upd   = []
+                for i, row in enumerate(_dev_rows):
+                    if row and row[0].strip() == "admin_password":
+                        _pw_upd.append({"range": f"B{i+1}", "values": [[new_admin_pw]]})
+                    if row and row[0].strip() == "user_password":
+                        _pw_upd.append({"range": f"B{i+1}", "values": [[new_user_pw]]})
+                if _pw_upd:
+                    _dev_ws.batch_update(_pw_upd)
+                    sheet_cache.invalidate("MASTER SHEET", ["CONFIG"])
+                    st.success("✅ Passwords updated!")
+                else:
+                    st.warning("⚠️ Password rows not found in CONFIG sheet.")
+            except Exception as e:
+                st.error(f"❌ Failed to save passwords: {e}")
+
+    # ── Trait Management ──
+    st.markdown("---")
+    st.subheader("🏷️ Trait Management")
+    with st.container(border=True):
+        _trait_defs = fetch_trait_definitions(client, "MASTER SHEET")
+
+        if _trait_defs:
+            for _tc, _topts in _trait_defs.items():
+                with st.expander(f"📌 **{_tc}** — options: {', '.join(_topts)}", expanded=False):
+                    _new_opt = st.text_input(f"Add option to '{_tc}'", key=f"dev_addopt_{_tc}",
+                                             placeholder="e.g. Senior")
+                    _oc1, _oc2 = st.columns(2)
+                    with _oc1:
+                        if st.button("➕ Add option", key=f"dev_addopt_btn_{_tc}", use_container_width=True):
+                            if not _new_opt.strip():
+                                st.error("Option name cannot be empty.")
+                            elif _new_opt.strip() in _topts:
+                                st.warning(f"'{_new_opt.strip()}' already exists.")
+                            else:
+                                try:
+                                    _updated_opts = _topts + [_new_opt.strip()]
+                                    _tr_ws = client.open("MASTER SHEET").worksheet("CONFIG")
+                                    for i, r in enumerate(_tr_ws.get_all_values()):
+                                        if r and r[0].strip() == f"_TRAIT:{_tc}":
+                                            _tr_ws.update_acell(f"B{i+1}", ",".join(_updated_opts))
+                                            break
+                                    sheet_cache.invalidate("MASTER SHEET", ["CONFIG"])
+                                    st.success(f"✅ Added '{_new_opt.strip()}' to {_tc}")
+                                    st.rerun()
+                                except Exception as e:
+                                    st.error(f"❌ {e}")
+                    with _oc2:
+                        if st.button(f"🗑️ Delete '{_tc}'", key=f"dev_delcat_{_tc}", use_container_width=True):
+                            try:
+                                _tr_ws = client.open("MASTER SHEET").worksheet("CONFIG")
+                                _all_rows = _tr_ws.get_all_values()
+                                for i, r in enumerate(_all_rows):
+                                    if r and r[0].strip() == f"_TRAIT:{_tc}":
+                                        _tr_ws.delete_rows(i + 1)
+                                        break
+                                sheet_cache.invalidate("MASTER SHEET", ["CONFIG"])
+                                st.success(f"✅ Deleted trait category '{_tc}'")
+                                st.rerun()
+                            except Exception as e:
+                                st.error(f"❌ {e}")
+        else:
+            st.caption("No trait categories defined yet.")
+
+        st.markdown("**➕ Create new trait category**")
+        _nc1, _nc2 = st.columns(2)
+        with _nc1:
+            _new_cat = st.text_input("Category name", key="dev_new_trait_cat",
+                                     placeholder="e.g. Seniority")
+        with _nc2:
+            _new_opts_raw = st.text_input("Options (comma-separated)", key="dev_new_trait_opts",
+                                          placeholder="e.g. Junior, Senior, Lead")
+        if st.button("➕ Create Trait Category", use_container_width=True, key="dev_create_trait"):
+            if not _new_cat.strip():
+                st.error("❌ Category name cannot be empty.")
+            elif not _new_opts_raw.strip():
+                st.error("❌ Please provide at least one option.")
+            elif _new_cat.strip() in _trait_defs:
+                st.warning(f"⚠️ '{_new_cat.strip()}' already exists.")
+            else:
+                try:
+                    _opts_list = [o.strip() for o in _new_opts_raw.split(",") if o.strip()]
+                    _tr_sh = client.open("MASTER SHEET")
+                    _tr_cfg = _tr_sh.worksheet("CONFIG")
+                    _cfg_rows = _tr_cfg.get_all_values()
+                    _key_idx = next(
+                        (i for i, r in enumerate(_cfg_rows) if r and r[0].strip().upper() == "KEY"),
+                        len(_cfg_rows)
+                    )
+                    _tr_cfg.insert_row([f"_TRAIT:{_new_cat.strip()}", ",".join(_opts_list)], _key_idx + 1)
+                    # add column header to Namelist sheet
+                    _nl_ws = _tr_sh.worksheet("Namelist")
+                    _nl_headers = _nl_ws.row_values(1)
+                    if _new_cat.strip() not in _nl_headers:
+                        _nl_ws.update_cell(1, len(_nl_headers) + 1, _new_cat.strip())
+                    sheet_cache.invalidate("MASTER SHEET", ["CONFIG", "Namelist"])
+                    st.success(f"✅ Created '{_new_cat.strip()}' with options: {', '.join(_opts_list)}")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"❌ Failed to create trait: {e}")
+
+    # ── Constraint Settings ──
+    st.markdown("---")
+    st.subheader("⚙️ Constraint Settings")
+    try:
+        _dev_sheet_cfg = fetch_config(client, "MASTER SHEET")
+        if "_error" in _dev_sheet_cfg:
+            st.warning(f"⚠️ Could not load CONFIG sheet: {_dev_sheet_cfg['_error']}")
+        else:
+            _dev_constraint_ids = [k for k in _dev_sheet_cfg.keys() if not k.startswith("_")]
+            _dev_hard = {k: v for k, v in _dev_sheet_cfg.items() if not k.startswith("_") and v.get("type","").lower() == "hard"}
+            _dev_soft = {k: v for k, v in _dev_sheet_cfg.items() if not k.startswith("_") and v.get("type","").lower() == "soft"}
+            _dev_drafts = {}
+
+            with st.expander("🪨 Hard Constraints", expanded=False):
+                for cid, cv in _dev_hard.items():
+                    cur = cv.get("draft_active", cv.get("active", True))
+                    nv = st.toggle(cv.get('label', cid), value=cur, key=f"dev_tog_{cid}")
+                    if nv != cur:
+                        _dev_drafts[cid] = nv
+                    _sentence = _rule_to_sentence(cv.get("rule", {}))
+                    if _sentence:
+                        st.markdown(_sentence, unsafe_allow_html=True)
+                    if cv.get("description",""):
+                        st.caption(cv.get("description",""))
+                    st.markdown("<hr style='margin: 2px 0 8px 0; border: none; border-top: 1px solid rgba(255,255,255,0.1);'>", unsafe_allow_html=True)
+
+            with st.expander("🪶 Soft Constraints", expanded=False):
+                for cid, cv in _dev_soft.items():
+                    cur = cv.get("draft_active", cv.get("active", True))
+                    nv = st.toggle(cv.get('label', cid), value=cur, key=f"dev_tog_{cid}")
+                    if nv != cur:
+                        _dev_drafts[cid] = nv
+                    _sentence = _rule_to_sentence(cv.get("rule", {}))
+                    if _sentence:
+                        st.markdown(_sentence, unsafe_allow_html=True)
+                    if cv.get("description",""):
+                        st.caption(cv.get("description",""))
+                    st.markdown("<hr style='margin: 2px 0 8px 0; border: none; border-top: 1px solid rgba(255,255,255,0.1);'>", unsafe_allow_html=True)
+
+            if _dev_drafts:
+                try:
+                    _dws = client.open("MASTER SHEET").worksheet("CONFIG")
+                    _drows = _dws.get_all_values()
+                    _dupd = []
+                    for i, row in enumerate(_drows):
+                        if row and row[0].strip() in _dev_drafts:
+                            _dupd.append({"range": f"E{i+1}", "values": [["TRUE" if _dev_drafts[row[0].strip()] else "FALSE"]]})
+                    if _dupd:
+                        _dws.batch_update(_dupd)
+                        sheet_cache.invalidate("MASTER SHEET", ["CONFIG"])
+                except Exception as e:
+                    st.warning(f"⚠️ Could not save draft: {e}")
+
+            if st.button("✅ Publish Changes", use_container_width=True, key="dev_publish"):
+                try:
+                    _dws = client.open("MASTER SHEET").worksheet("CONFIG")
+                    _drows = _dws.get_all_values()
+                    _dpub = []
+                    for i, row in enumerate(_drows):
+                        if row and row[0].strip() in _dev_constraint_ids:
+                            draft_val = row[4].strip() if len(row) > 4 else "TRUE"
+                            _dpub.append({"range": f"D{i+1}", "values": [[draft_val]]})
+                    if _dpub:
+                        _dws.batch_update(_dpub)
+                        sheet_cache.invalidate("MASTER SHEET", ["CONFIG"])
+                        st.success("✅ Constraints published!")
+                except Exception as e:
+                    st.error(f"❌ Publish failed: {e}")
+
+            # ── Add New Constraint (Rule Builder) ──
+            st.markdown("---")
+            st.subheader("➕ Add New Constraint")
+            with st.container(border=True):
+                import json as _json
+
+                _DAY_TYPES = ["weekday", "friday", "weekend", "holiday"]
+                _TRAITS    = ["same_gender", "partners", "same_branch", "drivers"]
+                _TRAIT_LBL = {"same_gender":"Same Gender","partners":"Partners","same_branch":"Same Branch","drivers":"Drivers"}
+                _OPERATORS = ["=", "<=", ">="]
+                _SUBJECTS1 = ["person", "day"]
+                _SUBJECTS2 = ["D", "S"]
+                _LOGICS_ALLOW    = ["can", "cannot"]
+                _LOGICS_GROUPING = ["must", "cannot", "must_match_d"]
+                _PER_OPTIONS     = ["day", "week", "month"]
+                _CLASSES  = ["value", "allow", "gap", "grouping"]
+                _CLASS_LBL = {"value":"Value (>, < or =)","allow":"Allow (can/cannot based on condition)","gap":"Gap (minimum days between)","grouping":"Grouping (pairs/traits)"}
+
+                nc_top1, nc_top2, nc_top3 = st.columns(3)
+                with nc_top1:
+                    nc_type       = st.selectbox("Constraint Type", ["hard","soft"], key="nc_type")
+                    nc_duty_type  = st.selectbox("Assignment", ["D","S","DS"], key="nc_duty_type")
+                with nc_top2:
+                    nc_cls        = st.selectbox("Class", _CLASSES, format_func=lambda x: _CLASS_LBL[x], key="nc_cls")
+                with nc_top3:
+                    nc_label      = st.text_input("Label", key="nc_label", placeholder="e.g. Max 1 duty per week")
+                    nc_desc       = st.text_input("Description", key="nc_desc", placeholder="What does this constraint do?")
+
+                st.markdown("---")
+                _preview_rule = {"class": nc_cls, "soft": nc_type=="soft"}
+
+                # ── Class-specific fields ──
+                if nc_cls == "value":
+                    vc1, vc2, vc3, vc4, vc5 = st.columns(5)
+                    with vc1: nc_subj1 = st.selectbox("Subject 1", _SUBJECTS1, key="nc_v_subj1")
+                    with vc2: nc_op    = st.selectbox("Operator", _OPERATORS, key="nc_v_op")
+                    with vc3: nc_num   = st.number_input("Number", min_value=0, value=1, key="nc_v_num")
+                    with vc4: nc_subj2 = st.selectbox("Subject 2", _SUBJECTS2, key="nc_v_subj2",
+                                                       index=0 if nc_duty_type=="D" else 1)
+                    with vc5: nc_per   = st.selectbox("Per", _PER_OPTIONS, key="nc_v_per")
+                    if nc_type == "soft":
+                        nc_penalty = st.number_input("Penalty", min_value=0, value=100, step=10, key="nc_v_penalty")
+                    else:
+                        nc_penalty = 0
+                    _preview_rule.update({"subject1":nc_subj1,"operator":nc_op,"number":nc_num,
+                                          "subject2":nc_subj2,"per":nc_per,"penalty":nc_penalty})
+
+                elif nc_cls == "allow":
+                    ac1, ac2, ac3 = st.columns(3)
+                    with ac1: nc_cond_dt   = st.selectbox("Condition Day Type", _DAY_TYPES, key="nc_a_cond")
+                    with ac2: nc_logic_a   = st.selectbox("Logic", _LOGICS_ALLOW, key="nc_a_logic")
+                    with ac3: nc_action_dt = st.selectbox("Action Day Type", _DAY_TYPES, key="nc_a_action")
+                    aw1, aw2 = st.columns(2)
+                    with aw1: nc_cond_when = st.selectbox("Condition When", ["last month", "this month"], key="nc_a_when")
+                    nc_penalty = 0
+                    _preview_rule.update({"condition_day_type":nc_cond_dt,"logic":nc_logic_a,
+                                          "action_day_type":nc_action_dt,"condition_when":nc_cond_when,"penalty":0})
+
+                elif nc_cls == "gap":
+                    gc1, gc2, gc3 = st.columns(3)
+                    with gc1: nc_from = st.selectbox("From", ["D","S"], key="nc_g_from")
+                    with gc2: nc_to   = st.selectbox("To",   ["D","S"], key="nc_g_to")
+                    with gc3: nc_days = st.number_input("Days", min_value=1, value=2, key="nc_g_days")
+                    nc_penalty = 0
+                    _preview_rule.update({"from_type":nc_from,"to_type":nc_to,"days":nc_days,"penalty":0})
+
+                elif nc_cls == "grouping":
+                    _BUILTIN_TRAITS    = ["same_gender", "partners", "same_branch", "drivers"]
+                    _BUILTIN_TRAIT_LBL = {"same_gender":"Same Gender","partners":"Partners",
+                                          "same_branch":"Same Branch","drivers":"Drivers"}
+                    _live_trait_defs   = fetch_trait_definitions(client, "MASTER SHEET")
+                    _custom_trait_keys = [
+                        f"{cat}::{opt}"
+                        for cat, opts in _live_trait_defs.items()
+                        for opt in opts
+                    ]
+                    _all_trait_keys = _BUILTIN_TRAITS + _custom_trait_keys
+                    def _trait_fmt(x):
+                        if x in _BUILTIN_TRAIT_LBL:
+                            return _BUILTIN_TRAIT_LBL[x]
+                        if "::" in x:
+                            cat, opt = x.split("::", 1)
+                            return f'{cat}: "{opt}"'
+                        return x
+                    grc1, grc2 = st.columns(2)
+                    with grc1: nc_trait   = st.selectbox("Trait", _all_trait_keys,
+                                                          format_func=_trait_fmt, key="nc_gr_trait")
+                    with grc2: nc_logic_g = st.selectbox("Logic", _LOGICS_GROUPING, key="nc_gr_logic")
+                    if nc_type == "soft":
+                        nc_penalty = st.number_input("Penalty", min_value=0, value=100, step=10, key="nc_gr_penalty")
+                    else:
+                        nc_penalty = 0
+                    _preview_rule.update({"trait":nc_trait,"logic":nc_logic_g,"penalty":nc_penalty})
+
+                nc_param_label = st.text_input("Param Label (optional)", key="nc_param_label",
+                                               placeholder="e.g. Gap days")
+
+                # preview
+                _prev_str = _rule_to_sentence(_preview_rule)
+                if _prev_str:
+                    st.markdown("**Preview:** " + _prev_str, unsafe_allow_html=True)
+
+                if st.button("➕ Add Constraint", use_container_width=True, key="nc_add"):
+                    if not nc_label:
+                        st.error("❌ Label is required.")
+                    else:
+                        try:
+                            _dws = client.open("MASTER SHEET").worksheet("CONFIG")
+                            _drows = _dws.get_all_values()
+                            existing_ids = [r[0].strip() for r in _drows
+                                            if r and r[0].strip()
+                                            and r[0].strip().upper() not in ("CONSTRAINT_ID","KEY")]
+                            if nc_type == "hard" and nc_duty_type in ("S","DS"):
+                                nums = [int(i[2:-1]) for i in existing_ids
+                                        if i.upper().startswith("HC") and i.upper().endswith("S")
+                                        and i[2:-1].isdigit()]
+                                new_cid = f"HC{max(nums)+1 if nums else 1}S"
+                            elif nc_type == "hard":
+                                nums = [int(i[2:]) for i in existing_ids
+                                        if i.upper().startswith("HC") and not i.upper().endswith("S")
+                                        and i[2:].isdigit()]
+                                new_cid = f"HC{max(nums)+1 if nums else 1}"
+                            else:
+                                nums = [int(i[2:]) for i in existing_ids
+                                        if i.upper().startswith("SC") and i[2:].isdigit()]
+                                new_cid = f"SC{max(nums)+1 if nums else 1}"
+
+                            # Insert immediately after the last HC*/SC* row (1-based gspread index)
+                            import re as _re
+                            _cid_pat = _re.compile(r"^(HC|SC)\d", _re.IGNORECASE)
+                            last_constraint_gs_row = 1
+                            for _i, _row in enumerate(_drows):
+                                if _row and _cid_pat.match(_row[0].strip()):
+                                    last_constraint_gs_row = _i + 1  # 0-based → 1-based
+                            insert_row = last_constraint_gs_row + 1
+
+                            new_row_data = [
+                                new_cid, nc_label, nc_type, "TRUE", "TRUE",
+                                _json.dumps(_preview_rule),
+                                nc_param_label, nc_duty_type, nc_cls, nc_desc
+                            ]
+                            _dws.insert_row(new_row_data, insert_row, value_input_option="RAW")
+                            sheet_cache.invalidate("MASTER SHEET", ["CONFIG"])
+                            st.success(f"✅ Added **{new_cid}**: {nc_label}")
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"❌ Failed to add constraint: {e}")
+    except Exception as e:
+        st.error(f"❌ Could not load constraints: {e}")
+
+    # ── API Usage ──
+    st.markdown("---")
+    st.subheader("📈 API Usage")
+    with st.container(border=True):
+        _q_stats = quota.stats()
+        st.caption(
+            f"Quota per minute — read: {quota.QUOTA_PER_MINUTE['read']}, "
+            f"write: {quota.QUOTA_PER_MINUTE['write']}, drive: {quota.QUOTA_PER_MINUTE['drive']}"
+        )
+        if _q_stats:
+            st.dataframe(pd.DataFrame(_q_stats), use_container_width=True, hide_index=True)
+        else:
+            st.caption("No API calls recorded since the app started.")
+
+        _wq = write_queue.queue_status()
+        st.caption(
+            f"Write queue — pending: {_wq['pending']}, written: {_wq['done']}, "
+            f"superseded: {_wq['superseded']}, failed: {_wq['failed']}"
+        )
+        if st.button("📤 Flush Write Queue Now", use_container_width=True, key="dev_flush_queue"):
+            for _line in write_queue.flush(client, on_queue_flush) or ["ℹ️ Nothing pending."]:
+                st.write(_line)
+        failed_submissions_panel("dev_retry_failed")
+
+        _rc = roster_cache.stats()
+        st.caption(f"Shared roster cache — entries: {_rc['entries']}, hits: {_rc['hits']}, sheet loads: {_rc['loads']}")
+        _ss = snapshot_store.stats()
+        st.caption(
+            f"Save snapshots — {_ss['snapshots']} snapshot(s), {_ss['blobs']} stored sheet(s), "
+            f"{_ss['blob_bytes'] / 1024:.0f} KB on disk"
+        )
+        if st.button("📚 Backfill Roster History", use_container_width=True, key="dev_history_backfill"):
+            try:
+                _rec = roster_history.sync_all(storage.for_client(client, "MASTER SHEET"))
+                st.success(f"✅ Recorded {len(_rec)} month(s): {', '.join(_rec) or 'all up to date'}")
+            except Exception as e:
+                st.error(f"❌ Backfill failed: {e}")
+        _sc = sheet_cache.stats()
+        st.caption(
+            f"Sheet cache — entries: {_sc['entries']}, hits: {_sc['hits']}, "
+            f"loads: {_sc['loads']}, revision checks: {_sc['checks']}"
+        )
+
+    st.caption("Database: https://docs.google.com/spreadsheets/d/1ESayKfUojDOl8XidHOq-yuNLTATvkhDTr6UpXdYKjF4/edit?usp=sharing")
@@ -0,0 +1,254 @@
+"""
+User ✏️ Planning page: pick X and D days and submit them to the write queue.
+"""
+from datetime import date, timedelta
+
+import streamlit as st
+
+import roster_aggregates
+import user_engine
+import write_queue
+from app_common import (
+    fetch_month_snapshot, fetch_namelist, fetch_submission_checker, fetch_trait_definitions,
+    fetch_spreadsheet_id, get_personal_drive_service,
+)
+
+
+def render(client):
+    # initialize session state for date history if not present
+    if 'hist_constraints' not in st.session_state:
+        st.session_state.hist_constraints = set()
+    if 'hist_preferences' not in st.session_state:
+        st.session_state.hist_preferences = set()
+
+    _now = date.today(); _opts = [f"{m:02d}{str(y)[2:]}" for y in [_now.year, _now.year+1] for m in range(1,13)]
+    _next = date(_now.year + (_now.month // 12), (_now.month % 12) + 1, 1)
+    _default_mmyy = f"{_next.month:02d}{str(_next.year)[2:]}"
+    _default_idx = _opts.index(_default_mmyy) if _default_mmyy in _opts else 0
+    view_mmyy = st.selectbox("Month (MMYY)", options=_opts, index=_default_idx, key="view_mmyy")
+    spreadsheet_name = "MASTER SHEET"
+
+    try:
+        personal_drive = get_personal_drive_service()
+        folder_id = st.secrets["app_config"]["personal_drive_folder_id"]
+        # cached Drive file ID lookup
+        if fetch_spreadsheet_id(personal_drive, folder_id, spreadsheet_name):
+            st.success(f"✅ Connected to storage!")
+        else:
+            st.warning(f"⚠️ Connection error: storage failed!")
+    except Exception as e:
+        st.error(f"❌ Storage failed: {e}")
+
+    names_list = fetch_namelist(client, spreadsheet_name)
+    st.subheader("Step 1: Select Your Name")
+    selected_name = st.selectbox("", options=[""] + names_list)
+    if selected_name:
+        st.session_state["user_selected_name"] = selected_name
+
+    defaults = {"partner": "None", "driving": "NON-DRIVER", "constraints": "", "preferences": ""}
+
+    # Namelist, Partners, Holiday and {mmyy}C in one batched read, shared by
+    # every session for this month — switching names costs no API calls
+    with st.spinner("📦 Loading month data..."):
+        _snapshot = fetch_month_snapshot(client, spreadsheet_name, view_mmyy)
+    _user_ctx = user_engine.get_user_context(_snapshot, selected_name or "")
+
+    if selected_name:
+        if "last_fetched_user" not in st.session_state or st.session_state.last_fetched_user != selected_name:
+            existing = _user_ctx["current"]
+            # a submission still waiting in the write queue is newer than the sheet
+            _pending = write_queue.pending_for(spreadsheet_name, view_mmyy, selected_name)
+            if existing and _pending:
+                existing.update({
+                    "partner": _pending["partner"],
+                    "driving": _pending["driving_status"],
+                    "constraints": _pending["constraints"],
+                    "preferences": _pending["preferences"],
+                })
+                for _cat, _val in _pending["selected_traits"].items():
+                    existing[f"trait_{_cat}"] = _val
+            if existing:
+                st.session_state.user_defaults = existing
+                st.session_state.last_fetched_user = selected_name
+                st.session_state.hist_constraints = set(user_engine.parse_string_to_days(existing.get('constraints', ""), view_mmyy))
+                st.session_state.hist_preferences = set(user_engine.parse_string_to_days(existing.get('preferences', ""), view_mmyy))
+                st.toast(f"Loaded data for {selected_name}")
+
+        if "user_defaults" in st.session_state:
+            defaults = st.session_state.user_defaults
+
+        # check if this user has any auto-assigned holiday D days this month
+        _hol_days = _user_ctx["holiday_days"]
+        if _hol_days:
+            _hol_lines = ", ".join(
+                f"{h['date'].strftime('%-d %b')} ({h['name']})"
+                for h in sorted(_hol_days, key=lambda x: x['date'])
+            )
+            st.info(
+                f"🗓️ **Holiday duty notice**: You have been automatically assigned duty on: **{_hol_lines}**. "
+                f"These days have been pre-filled as D in the schedule.",
+                icon="ℹ️"
+            )
+
+    # per-day counts shared by every session: seeded once from the snapshot
+    # and queued submissions, then updated as each submission is journalled
+    _roster_agg = roster_aggregates.get(
+        spreadsheet_name, view_mmyy, _snapshot["c_sheet"],
+        lambda: write_queue.pending_submissions(spreadsheet_name, view_mmyy)
+    )
+    _sub_checker = fetch_submission_checker(client, spreadsheet_name, view_mmyy, _snapshot)
+
+    # a fragment: picking dates and filling in the form rerun only Steps 2 and 3;
+    # saving still reruns the whole page
+    @st.fragment
+    def _dates_and_form():
+        st.subheader("Step 2: Pick Your Dates")
+        tab1, tab2 = st.tabs(["❌ Constraints (X)", "✅ Duty Days (D)"])
+
+        with tab1:
+
+            c_input = st.date_input("Select Date or Range", value=[], key="c_picker")
+            c_col1, c_col2 = st.columns(2)
+
+            if c_col1.button("➕ Add Constraint"):
+                if isinstance(c_input, (list, tuple)):
+                    if len(c_input) == 2: # date range
+                        curr = c_input[0]
+                        while curr <= c_input[1]:
+                            st.session_state.hist_constraints.add(curr)
+                            curr += timedelta(days=1)
+                    elif len(c_input) == 1: # single date
+                        st.session_state.hist_constraints.add(c_input[0])
+                st.rerun(scope="fragment")
+
+            if c_col2.button("🗑️ Reset to Saved (X)"):
+                # resets it back to the original spreadsheet data
+                st.session_state.hist_constraints = set(user_engine.parse_string_to_days(defaults['constraints'], view_mmyy))
+                st.rerun(scope="fragment")
+
+            constraints_string = user_engine.format_date_list(st.session_state.hist_constraints)
+            st.caption(f"Current: {constraints_string if constraints_string else 'None'}")
+
+        with tab2:
+            p_input = st.date_input("Select Date or Range", value=[], key="p_picker")
+            p_col1, p_col2 = st.columns(2)
+
+            if p_col1.button("➕ Add Preference"):
+                if isinstance(p_input, (list, tuple)):
+                    if len(p_input) == 2:
+                        curr = p_input[0]
+                        while curr <= p_input[1]:
+                            st.session_state.hist_preferences.add(curr)
+                            curr += timedelta(days=1)
+                    elif len(p_input) == 1:
+                        st.session_state.hist_preferences.add(p_input[0])
+                st.rerun(scope="fragment")
+
+            if p_col2.button("🗑️ Reset to Saved (D)"):
+                st.session_state.hist_preferences = set(user_engine.parse_string_to_days(defaults['preferences'], view_mmyy))
+                st.rerun(scope="fragment")
+
+            preferences_string = user_engine.format_date_list(st.session_state.hist_preferences)
+            st.caption(f"Current: {preferences_string if preferences_string else 'None'}")
+
+            if _sub_checker.day_cap:
+                _own = set(_roster_agg.days_for(selected_name or ""))
+                _full = [d for d in _sub_checker.cal.days
+                         if d not in _own and _roster_agg.d_count(d) >= _sub_checker.day_cap]
+                st.caption(f"Days already full: {', '.join(map(str, _full)) if _full else 'None'}")
+
+        # form section
+
+        with st.form("user_submission_form"):
+            st.subheader("Step 3: Finalise Details")
+            col1, col2, col3, col4 = st.columns(4)
+
+            with col1:
+                d_options = ["NON-DRIVER", "DRIVER", "RIDER"]
+                d_idx = d_options.index(defaults['driving']) if defaults['driving'] in d_options else 0
+                driving_status = st.selectbox("Your Driving Status", options=d_options, index=d_idx)
+
+            with col2:
+                p_options = ["None"] + names_list
+                p_idx = p_options.index(defaults['partner']) if defaults['partner'] in p_options else 0
+                selected_partner = st.selectbox("Your Preferred Partner", options=p_options, index=p_idx)
+
+            with col3:
+                s_options = ["", "EXCUSED", "SBF", "NEW"]
+                s_idx = 0
+                selected_status = st.multiselect("Your Status (If Applicable)", options=s_options, default=s_options[s_idx])
+
+            with col4:
+                excused_reason = st.text_input("Reason (if EXCUSED)", placeholder="e.g. Medical appointment...")
+                if excused_reason and "EXCUSED" in selected_status:
+                    status_string = ", ".join(selected_status) + f" ({excused_reason})"
+                else:
+                    status_string = ", ".join(selected_status)
+
+            # ── Dynamic trait questions — one selectbox per trait category ──
+            _form_trait_defs = fetch_trait_definitions(client, spreadsheet_name)
+            selected_traits = {}
+            if _form_trait_defs:
+                trait_cols = st.columns(len(_form_trait_defs))
+                for _tidx, (_cat, _opts) in enumerate(_form_trait_defs.items()):
+                    with trait_cols[_tidx]:
+                        _tdropdown = [""] + _opts
+                        _saved_val = defaults.get(f"trait_{_cat}", "")
+                        _sel_idx   = _tdropdown.index(_saved_val) if _saved_val in _tdropdown else 0
+                        selected_traits[_cat] = st.selectbox(
+                            _cat, options=_tdropdown, index=_sel_idx,
+                            format_func=lambda x: x if x else "— not set —",
+                            key=f"user_trait_{_cat}"
+                        )
+
+            final_constraints = st.text_input("Constraints (X)", value=constraints_string)
+            final_preferences = st.text_input("Duty Days (D)", value=preferences_string)
+
+            if st.form_submit_button("Save Changes"):
+                if not selected_name:
+                    st.error("❌ Please select your name before saving.")
+                else:
+                    # Parse the final preference days the user typed/selected
+                    _pref_day_ints = []
+                    for _p in final_preferences.split(","):
+                        _p = _p.strip()
+                        if _p.isdigit():
+                            _pref_day_ints.append(int(_p))
+
+                    _x_day_ints = [int(_c.strip()) for _c in final_constraints.split(",") if _c.strip().isdigit()]
+
+                    # Run constraint validation against every hard CONFIG rule
+                    _val_errors, _val_warnings = user_engine.validate_submission(
+                        _sub_checker, selected_name, _pref_day_ints, _x_day_ints, _roster_agg.on_day
+                    )
+
+                    if _val_errors:
+                        st.error("❌ Your duty day preferences violate one or more constraints. Please adjust before saving:")
+                        for _err in _val_errors:
+                            st.markdown(_err)
+                    else:
+                        for _warn in _val_warnings:
+                            st.caption(_warn)
+                        # journal locally and acknowledge; the background flusher
+                        # batches everyone's changes into the sheet every few seconds
+                        try:
+                            write_queue.enqueue_submission(
+                                spreadsheet_name, view_mmyy,
+                                selected_name, selected_partner,
+                                driving_status, selected_traits,
+                                final_constraints, final_preferences, status_string
+                            )
+                            success, logs = True, []
+                        except Exception as e:
+                            success, logs = False, [f"❌ Error: {str(e)}"]
+                        if success:
+                            st.success("Preferences saved! They will appear in the sheet within a few seconds.")
+                            st.session_state.hist_constraints = []
+                            st.session_state.hist_preferences = []
+                            if "user_defaults" in st.session_state:
+                                del st.session_state.user_defaults
+                            st.rerun()
+                        else:
+                            st.error(f"❌ Failed to update: {logs[0]}")
+
+    _dates_and_form()
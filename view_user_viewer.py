@@ -0,0 +1,62 @@
+"""
+User 🗓️ Viewer page: the month calendar with the signed-in user highlighted.
+"""
+from datetime import date
+
+import streamlit as st
+
+import calendar_render
+from app_common import fetch_ics_feeds, fetch_roster, fetch_spreadsheet_id, get_personal_drive_service
+
+
+def render(client):
+    _now = date.today(); _opts = [f"{m:02d}{str(y)[2:]}" for y in [_now.year, _now.year+1] for m in range(1,13)]
+    _next = date(_now.year + (_now.month // 12), (_now.month % 12) + 1, 1)
+    _default_mmyy = f"{_next.month:02d}{str(_next.year)[2:]}"
+    _default_idx = _opts.index(_default_mmyy) if _default_mmyy in _opts else 0
+    mmyy = st.selectbox("Month/Year (MMYY) to view", options=_opts, index=_default_idx, key="view_mmyy2")
+    spreadsheet_name = "MASTER SHEET"
+
+    curr_m, curr_y = int(mmyy[:2]), int(mmyy[2:])
+
+    st.info(f"Viewing **{mmyy}**!")
+
+    sheet_id = None
+    try:
+        personal_drive = get_personal_drive_service()
+        folder_id = st.secrets["app_config"]["personal_drive_folder_id"]
+        sheet_id = fetch_spreadsheet_id(personal_drive, folder_id, spreadsheet_name)
+        if sheet_id:
+            st.success(f"✅ Connected to storage!")
+        else:
+            st.warning(f"⚠️ Connection error: storage failed!")
+    except Exception as e:
+        st.error(f"❌ Storage failed: {e}")
+
+    # shared across sessions; write paths call roster_cache.invalidate(mmyy=...)
+    roster_data, sheet_used, err = fetch_roster(client, spreadsheet_name, mmyy)
+
+    if err:
+        st.warning(f"⚠️ Roster not yet finalised or accessible: {err}")
+    else:
+
+        if sheet_used == "D":
+            st.success("✅ Showing finalised roster")
+        elif sheet_used == "C":
+            st.info("ℹ️ Showing draft constraints — roster not yet finalised")
+
+        st.markdown(
+            calendar_render.screen_html(mmyy, roster_data, st.session_state.get("user_selected_name", "")),
+            unsafe_allow_html=True
+        )
+
+        _ics_name = st.session_state.get("user_selected_name", "")
+        if sheet_used == "D" and _ics_name:
+            _feed = fetch_ics_feeds(client, spreadsheet_name, mmyy, roster_data).get(_ics_name)
+            if _feed:
+                st.download_button(
+                    label=f"📅 Add {_ics_name}'s duties to my calendar (.ics)",
+                    data=_feed,
+                    file_name=f"{mmyy}_{_ics_name}.ics",
+                    mime="text/calendar"
+                )
@@ -0,0 +1,328 @@
+"""
+Write-behind queue for User-page submissions.
+
+A submission is written to a local SQLite journal and acknowledged straight
+away. A background flusher wakes every few seconds, keeps only the latest
+pending submission per (spreadsheet, month, person), reads Namelist /
+Partners / {mmyy}C once, and writes every merged change back in a single
+values.batchUpdate per spreadsheet. A month whose C sheet can't be read or
+written is retried on its own; the other months still go through.
+
+Journal rows: pending → done | superseded | failed (after MAX_ATTEMPTS).
+Failed rows stay in the journal; failed_submissions() lists them and
+retry_failed() puts them back in the queue.
+"""
+import json
+import time
+import sqlite3
+import threading
+from collections import defaultdict
+
+import storage
+import user_engine
+import roster_aggregates
+from local_data import data_path
+
+JOURNAL_PATH = data_path("write_queue.sqlite3")
+FLUSH_INTERVAL = 5   # seconds
+MAX_ATTEMPTS = 5
+
+_flusher = None
+_flush_lock = threading.Lock()
+
+
+def _connect():
+    conn = sqlite3.connect(JOURNAL_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS submissions (
+            id               INTEGER PRIMARY KEY AUTOINCREMENT,
+            spreadsheet_name TEXT NOT NULL,
+            mmyy             TEXT NOT NULL,
+            user_name        TEXT NOT NULL,
+            payload          TEXT NOT NULL,
+            status           TEXT NOT NULL DEFAULT 'pending',
+            attempts         INTEGER NOT NULL DEFAULT 0,
+            last_error       TEXT,
+            created_at       REAL NOT NULL,
+            flushed_at       REAL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sub_status ON submissions(status, spreadsheet_name, mmyy)")
+    return conn
+
+
+def enqueue_submission(spreadsheet_name, mmyy, user_name, partner, driving_status,
+                       selected_traits, constraints, preferences, status_string):
+    """
+    Durably records a submission and returns its journal id. Any older pending
+    submission from the same person for the same month is superseded.
+    """
+    payload = {
+        "partner": partner,
+        "driving_status": driving_status,
+        "selected_traits": selected_traits or {},
+        "constraints": constraints,
+        "preferences": preferences,
+        "status_string": status_string,
+    }
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "UPDATE submissions SET status = 'superseded' "
+                "WHERE status = 'pending' AND spreadsheet_name = ? AND mmyy = ? AND user_name = ?",
+                (spreadsheet_name, mmyy, user_name)
+            )
+            cur = conn.execute(
+                "INSERT INTO submissions (spreadsheet_name, mmyy, user_name, payload, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (spreadsheet_name, mmyy, user_name, json.dumps(payload), time.time())
+            )
+        roster_aggregates.apply_submission(spreadsheet_name, mmyy, user_name, preferences, constraints)
+        return cur.lastrowid
+    finally:
+        conn.close()
+
+
+def pending_submissions(spreadsheet_name, mmyy=None):
+    """Returns { (mmyy, user_name): payload } for submissions not yet written."""
+    conn = _connect()
+    try:
+        q = ("SELECT mmyy, user_name, payload FROM submissions "
+             "WHERE status = 'pending' AND spreadsheet_name = ?")
+        args = [spreadsheet_name]
+        if mmyy:
+            q += " AND mmyy = ?"
+            args.append(mmyy)
+        q += " ORDER BY id"
+        return {(m, u): json.loads(p) for m, u, p in conn.execute(q, args)}
+    finally:
+        conn.close()
+
+
+def pending_for(spreadsheet_name, mmyy, user_name):
+    """Latest pending payload for one person, or None."""
+    return pending_submissions(spreadsheet_name, mmyy).get((mmyy, user_name))
+
+
+def queue_status():
+    """Counts by status, e.g. {'pending': 3, 'done': 120, 'failed': 0}."""
+    conn = _connect()
+    try:
+        counts = {"pending": 0, "done": 0, "superseded": 0, "failed": 0}
+        for status, n in conn.execute("SELECT status, COUNT(*) FROM submissions GROUP BY status"):
+            counts[status] = n
+        return counts
+    finally:
+        conn.close()
+
+
+def flush(client, on_flush=None):
+    """
+    Writes every pending submission. Returns a list of log lines.
+    Normally one batched read + one values.batchUpdate per spreadsheet; if
+    that fails, each month is read and written on its own so a missing or
+    renamed {mmyy}C only holds back that month's submissions.
+    on_flush(spreadsheet_name, months) is called after each successful write
+    so callers can drop cached reads of those sheets.
+    """
+    with _flush_lock:
+        conn = _connect()
+        try:
+            rows = conn.execute(
+                "SELECT id, spreadsheet_name, mmyy, user_name, payload, attempts FROM submissions "
+                "WHERE status = 'pending' ORDER BY id"
+            ).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            return []
+
+        by_sheet = defaultdict(list)
+        for row in rows:
+            by_sheet[row[1]].append(row)
+
+        logs = []
+        for spreadsheet_name, subs in by_sheet.items():
+            try:
+                logs += _flush_spreadsheet(client, spreadsheet_name, subs, on_flush)
+            except Exception as e:
+                # Namelist / Partners unreadable: nothing can be applied
+                for sub_id, _, _, _, _, attempts in subs:
+                    _mark_retry(sub_id, attempts, str(e))
+                logs.append(f"⚠️ Flush to {spreadsheet_name} failed, will retry: {e}")
+        return logs
+
+
+def _flush_spreadsheet(client, spreadsheet_name, subs, on_flush):
+    store = storage.for_client(client, spreadsheet_name)
+    by_month = defaultdict(list)
+    for row in subs:
+        by_month[row[2]].append(row)
+    months = sorted(by_month)
+    shared = [storage.a1("Namelist"), storage.a1("Partners", "A:C")]
+    month_errors = {}    # mmyy -> error that holds back that month's submissions
+
+    try:
+        values = store.read_ranges(shared + [storage.a1(f"{m}C", "A:B") for m in months])
+        nl_data, p_data = values[0], values[1]
+        c_by_month = dict(zip(months, values[2:]))
+    except Exception:
+        if len(months) == 1:
+            raise
+        nl_data, p_data = store.read_ranges(shared)
+        c_by_month = {}
+        for m in months:
+            try:
+                c_by_month[m] = store.read_ranges([storage.a1(f"{m}C", "A:B")])[0]
+            except Exception as e:
+                month_errors[m] = f"{m}C: {e}"
+
+    # later submissions win on the same cell
+    merged = {m: {} for m in c_by_month}
+    failed = {}
+    for mmyy in c_by_month:
+        for sub_id, _, _, user_name, payload, attempts in by_month[mmyy]:
+            p = json.loads(payload)
+            try:
+                updates, _ = user_engine.build_submission_updates(
+                    nl_data, p_data, c_by_month[mmyy], mmyy, user_name,
+                    p["partner"], p["driving_status"], p["selected_traits"],
+                    p["constraints"], p["preferences"], p["status_string"]
+                )
+            except Exception as e:
+                failed[sub_id] = (attempts, str(e))
+                continue
+            for u in updates:
+                merged[mmyy][u["range"]] = u["values"]
+
+    def _write(ms):
+        store.batch_write([{"range": rng, "values": vals} for m in ms for rng, vals in merged[m].items()])
+
+    written = [m for m in months if m in c_by_month]
+    try:
+        _write(written)
+    except Exception:
+        if len(written) <= 1:
+            raise
+        for m in list(written):
+            try:
+                _write([m])
+            except Exception as e:
+                month_errors[m] = f"{m}C: {e}"
+                written.remove(m)
+
+    logs = []
+    done_ids = [r[0] for m in written for r in by_month[m] if r[0] not in failed]
+    _mark_done(done_ids)
+    if on_flush and any(merged[m] for m in written):
+        on_flush(spreadsheet_name, written)
+    for sub_id, (attempts, err) in failed.items():
+        _mark_retry(sub_id, attempts, err)
+    for m, err in month_errors.items():
+        for sub_id, _, _, _, _, attempts in by_month[m]:
+            _mark_retry(sub_id, attempts, err)
+        logs.append(f"⚠️ {len(by_month[m])} submission(s) for {m} held back, will retry: {err}")
+    if done_ids:
+        logs.append(f"✅ Flushed {len(done_ids)} submission(s) to {spreadsheet_name} "
+                    f"({len(written)} month(s), {sum(len(merged[m]) for m in written)} range(s)).")
+    return logs
+
+
+def failed_submissions(spreadsheet_name=None):
+    """Submissions that gave up after MAX_ATTEMPTS, newest first, for the admin to review and retry."""
+    conn = _connect()
+    try:
+        q = ("SELECT id, spreadsheet_name, mmyy, user_name, attempts, last_error, created_at "
+             "FROM submissions WHERE status = 'failed'")
+        args = []
+        if spreadsheet_name:
+            q += " AND spreadsheet_name = ?"
+            args.append(spreadsheet_name)
+        q += " ORDER BY id DESC"
+        cols = ["id", "spreadsheet_name", "mmyy", "user_name", "attempts", "last_error", "created_at"]
+        return [dict(zip(cols, r)) for r in conn.execute(q, args)]
+    finally:
+        conn.close()
+
+
+def retry_failed(ids=None):
+    """
+    Puts failed submissions (all, or just `ids`) back to pending with a fresh
+    attempt count, unless the same person has submitted for that month since.
+    Returns the number requeued.
+    """
+    conn = _connect()
+    try:
+        with conn:
+            q = ("UPDATE submissions SET status = 'pending', attempts = 0 "
+                 "WHERE status = 'failed' AND NOT EXISTS ("
+                 "  SELECT 1 FROM submissions newer WHERE newer.spreadsheet_name = submissions.spreadsheet_name"
+                 "  AND newer.mmyy = submissions.mmyy AND newer.user_name = submissions.user_name"
+                 "  AND newer.id > submissions.id AND newer.status IN ('pending', 'done'))")
+            args = []
+            if ids is not None:
+                ids = list(ids)
+                if not ids:
+                    return 0
+                q += f" AND id IN ({','.join('?' * len(ids))})"
+                args = ids
+            return conn.execute(q, args).rowcount
+    finally:
+        conn.close()
+
+
+def _mark_done(ids):
+    if not ids:
+        return
+    conn = _connect()
+    try:
+        with conn:
+            conn.executemany(
+                "UPDATE submissions SET status = 'done', flushed_at = ? WHERE id = ? AND status = 'pending'",
+                [(time.time(), i) for i in ids]
+            )
+    finally:
+        conn.close()
+
+
+def _mark_retry(sub_id, attempts, error):
+    status = "failed" if attempts + 1 >= MAX_ATTEMPTS else "pending"
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "UPDATE submissions SET attempts = ?, last_error = ?, status = ? "
+                "WHERE id = ? AND status = 'pending'",
+                (attempts + 1, error, status, sub_id)
+            )
+    finally:
+        conn.close()
+
+
+def start_flusher(client_factory, interval=FLUSH_INTERVAL, on_flush=None):
+    """
+    Starts (once per process) a daemon thread that flushes the journal every
+    `interval` seconds. client_factory() must return an authorised gspread client.
+    """
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return _flusher
+
+    def _loop():
+        client = None
+        while True:
+            time.sleep(interval)
+            try:
+                if client is None:
+                    client = client_factory()
+                for line in flush(client, on_flush):
+                    print(line)
+            except Exception as e:
+                client = None
+                print(f"⚠️ Write queue flusher error: {e}")
+
+    _flusher = threading.Thread(target=_loop, name="write-queue-flusher", daemon=True)
+    _flusher.start()
+    return _flusher